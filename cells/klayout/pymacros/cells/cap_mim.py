@@ -18,8 +18,7 @@
 
 import pya
 from .draw_cap_mim import draw_cap_mim
-from .pcell_utilities import gf_to_pya
-
+from .pcell_utilities import draw_to_pya
 
 mim_min_l = 5
 mim_min_w = 5
@@ -98,7 +97,11 @@ class cap_mim(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_cap_mim(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_cap_mim,
+            "mim_cap",
             lc=self.lc,
             wc=self.wc,
             mim_option=self.mim_option,
@@ -108,9 +111,6 @@ class cap_mim(pya.PCellDeclarationHelper):
             bot_lbl=self.bot_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "mim_cap")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
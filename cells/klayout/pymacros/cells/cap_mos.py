@@ -18,8 +18,7 @@
 
 import pya
 from .draw_cap_mos import draw_cap_mos
-from .pcell_utilities import gf_to_pya
-
+from .pcell_utilities import draw_to_pya
 
 cap_nmos_w = 1
 cap_nmos_l = 1
@@ -96,7 +95,11 @@ class cap_nmos(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_cap_mos(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_cap_mos,
+            "cap_mos",
             type="cap_nmos",
             lc=self.lc,
             wc=self.wc,
@@ -108,9 +111,6 @@ class cap_nmos(pya.PCellDeclarationHelper):
             sd_lbl=self.sd_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "cap_mos")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -184,7 +184,11 @@ class cap_pmos(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_cap_mos(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_cap_mos,
+            "cap_mos",
             type="cap_pmos",
             lc=self.lc,
             wc=self.wc,
@@ -196,9 +200,6 @@ class cap_pmos(pya.PCellDeclarationHelper):
             sd_lbl=self.sd_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "cap_mos")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -270,7 +271,11 @@ class cap_nmos_b(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_cap_mos(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_cap_mos,
+            "cap_mos",
             type="cap_nmos_b",
             lc=self.lc,
             wc=self.wc,
@@ -282,9 +287,6 @@ class cap_nmos_b(pya.PCellDeclarationHelper):
             sd_lbl=self.sd_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "cap_mos")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -356,7 +358,11 @@ class cap_pmos_b(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_cap_mos(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_cap_mos,
+            "cap_mos",
             type="cap_pmos_b",
             lc=self.lc,
             wc=self.wc,
@@ -368,9 +374,6 @@ class cap_pmos_b(pya.PCellDeclarationHelper):
             sd_lbl=self.sd_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "cap_mos")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -25,8 +25,7 @@ from .draw_diode import (
     draw_diode_pw2dw,
     draw_sc_diode,
 )
-from .pcell_utilities import gf_to_pya
-
+from .pcell_utilities import draw_to_pya
 
 np_l = 0.36
 np_w = 0.36
@@ -119,7 +118,11 @@ class diode_nd2ps(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_diode_nd2ps(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_diode_nd2ps,
+            "diode_nd2ps",
             la=self.la,
             wa=self.wa,
             cw=self.cw,
@@ -131,9 +134,6 @@ class diode_nd2ps(pya.PCellDeclarationHelper):
             n_lbl=self.n_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "diode_nd2ps")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -212,7 +212,11 @@ class diode_pd2nw(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_diode_pd2nw(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_diode_pd2nw,
+            "diode_pd2nw",
             la=self.la,
             wa=self.wa,
             cw=self.cw,
@@ -224,9 +228,6 @@ class diode_pd2nw(pya.PCellDeclarationHelper):
             n_lbl=self.n_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "diode_pd2nw")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -303,7 +304,11 @@ class diode_nw2ps(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_diode_nw2ps(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_diode_nw2ps,
+            "diode_nw2ps",
             la=self.la,
             wa=self.wa,
             cw=self.cw,
@@ -313,9 +318,6 @@ class diode_nw2ps(pya.PCellDeclarationHelper):
             n_lbl=self.n_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "diode_nw2ps")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -395,7 +397,11 @@ class diode_pw2dw(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_diode_pw2dw(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_diode_pw2dw,
+            "diode_pw2dw",
             la=self.la,
             wa=self.wa,
             cw=self.cw,
@@ -406,9 +412,6 @@ class diode_pw2dw(pya.PCellDeclarationHelper):
             n_lbl=self.n_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "diode_pw2dw")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -485,7 +488,11 @@ class diode_dw2ps(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_diode_dw2ps(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_diode_dw2ps,
+            "diode_dw2ps",
             la=self.la,
             wa=self.wa,
             cw=self.cw,
@@ -496,9 +503,6 @@ class diode_dw2ps(pya.PCellDeclarationHelper):
             n_lbl=self.n_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "diode_dw2ps")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -571,7 +575,11 @@ class sc_diode(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_sc_diode(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_sc_diode,
+            "sc_diode",
             la=self.la,
             wa=self.wa,
             cw=self.cw,
@@ -582,9 +590,6 @@ class sc_diode(pya.PCellDeclarationHelper):
             n_lbl=self.n_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "sc_diode")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
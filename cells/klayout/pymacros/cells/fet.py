@@ -18,8 +18,7 @@
 
 import pya
 from .draw_fet import draw_nfet, draw_nfet_06v0_nvt, draw_pfet
-from .pcell_utilities import gf_to_pya
-
+from .pcell_utilities import draw_to_pya
 
 fet_3p3_l = float(0.28)
 fet_3p3_w = float(0.22)
@@ -167,7 +166,11 @@ class nfet(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_nfet(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_nfet,
+            "nfet",
             l_gate=self.l_gate,
             w_gate=self.w_gate,
             sd_con_col=self.sd_con_col,
@@ -189,9 +192,6 @@ class nfet(pya.PCellDeclarationHelper):
             patt_lbl=self.patt_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "nfet")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -327,7 +327,11 @@ class pfet(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_pfet(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_pfet,
+            "pfet",
             l_gate=self.l_gate,
             w_gate=self.w_gate,
             sd_con_col=self.sd_con_col,
@@ -349,9 +353,6 @@ class pfet(pya.PCellDeclarationHelper):
             patt_lbl=self.patt_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "pfet")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -467,7 +468,11 @@ class nfet_06v0_nvt(pya.PCellDeclarationHelper):
         return pya.Trans(self.shape.bbox().center())
 
     def produce_impl(self):
-        instance = draw_nfet_06v0_nvt(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_nfet_06v0_nvt,
+            "nfet_nvt",
             l_gate=self.l_gate,
             w_gate=self.w_gate,
             sd_con_col=self.sd_con_col,
@@ -486,9 +491,6 @@ class nfet_06v0_nvt(pya.PCellDeclarationHelper):
             patt_lbl=self.patt_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "nfet_nvt")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
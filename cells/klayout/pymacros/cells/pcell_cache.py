@@ -0,0 +1,177 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# ============================================================================
+# ---------------- Pcells Geometry Cache for Klayout of GF180MCU ----------------
+# ============================================================================
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from importlib.metadata import version
+
+CELLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def sources_hash(cells_dir: str = CELLS_DIR) -> str:
+    """Returns a hash of the PCells python sources and the gdsfactory version.
+
+    Args:
+        cells_dir : directory of the PCells sources
+    """
+    h = hashlib.sha256(version("gdsfactory").encode())
+    for root, dirs, files in os.walk(cells_dir):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for file_name in sorted(files):
+            if file_name.endswith(".py"):
+                file_path = os.path.join(root, file_name)
+                h.update(os.path.relpath(file_path, cells_dir).encode())
+                with open(file_path, "rb") as f:
+                    h.update(f.read())
+    return h.hexdigest()
+
+
+def normalize_param(value):
+    """Returns a PCell parameter value in a canonical JSON serializable form.
+
+    Args:
+        value : PCell parameter value
+    """
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float):
+        return round(value, 9)
+    if isinstance(value, (list, tuple)):
+        return [normalize_param(v) for v in value]
+    return value
+
+
+class PCellCache:
+    """
+    LRU cache of PCells geometry, stored as pickled flat geometry bytes.
+
+    Entries are keyed by PCell, parameters, database unit and a hash of the
+    PCells sources, so any change in the generators invalidates them. When
+    cache_dir is given, entries are also persisted there and shared between
+    KLayout sessions and test runs.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, cache_dir: str = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._sources_hash = None
+
+    def key(self, pcell_name: str, params: dict, dbu: float) -> str:
+        """
+        Returns the cache key of a PCell variant
+
+        Args :
+            pcell_name : name of the PCell, or of its generator
+            params : PCell parameters
+            dbu : database unit of the target layout
+        """
+        if self._sources_hash is None:
+            self._sources_hash = sources_hash()
+
+        variant = {
+            "pcell": pcell_name,
+            "params": {k: normalize_param(v) for k, v in params.items()},
+            "dbu": normalize_param(dbu),
+            "sources": self._sources_hash,
+        }
+        return hashlib.sha256(json.dumps(variant, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")
+
+    def get(self, key: str) -> bytes:
+        """
+        Returns the cached geometry of key, or None if it isn't cached
+
+        Args :
+            key : cache key
+        """
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+        elif self.cache_dir:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                self._insert(key, data)
+            except OSError:
+                data = None
+
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """
+        Stores the geometry of key in memory, and on disk if enabled
+
+        Args :
+            key : cache key
+            data : pickled geometry, as returned by gf_to_geometry
+        """
+        self._insert(key, data)
+
+        if not self.cache_dir:
+            return
+
+        # Write then rename, so concurrent runs never read a partial entry
+        try:
+            os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self._path(key)))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            pass
+
+    def _insert(self, key: str, data: bytes):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        if len(data) > self.max_bytes:
+            return
+
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self):
+        """Drops all the in-memory entries, the on-disk store is kept."""
+        self._entries.clear()
+        self._size = 0
+
+
+# Shared cache of the GF180MCU PCells, configured from the environment:
+#   GF180MCU_PCELL_CACHE_MB  : in-memory cache size in MB (default 256, 0 disables it)
+#   GF180MCU_PCELL_CACHE_DIR : directory of the on-disk store (disabled if not set)
+pcell_cache = PCellCache(
+    max_bytes=int(float(os.environ.get("GF180MCU_PCELL_CACHE_MB", 256)) * 2**20),
+    cache_dir=os.environ.get("GF180MCU_PCELL_CACHE_DIR") or None,
+)
@@ -16,34 +16,248 @@
 # ---------------- Pcells Utilities for Klayout of GF180MCU ----------------
 # ============================================================================
 
+import math
+import pickle
+
 import gdsfactory as gf
+import gdstk
+import numpy as np
 import pya
-import os
+
+from .pcell_cache import pcell_cache
+
+# Max. distance from the grid, in grid steps, of vertices considered on grid
+GRID_TOLERANCE = 1e-6
+
+
+def gf_to_geometry(c: gf.Component, dbu: float = 0.001) -> tuple:
+    """Returns the flattened polygons and labels of a Component in database units.
+
+    The vertices of all polygons are converted to integer database units in
+    one NumPy operation, and axis-aligned rectangles, most of the PCells
+    shapes, are kept as boxes.
+
+    Args:
+        c : gdsfactory Component to be converted
+        dbu : database unit in um
+
+    Returns:
+        tuple of the layers, as (layer, datatype, boxes, sizes, points) with
+        boxes an int array of shape (k, 4) as left, bottom, right, top and the
+        other polygons as their point counts and concatenated points, and of
+        the labels, as (layer, texttype, text, x, y, halign, valign, rotation,
+        mirror, size) with rotation in multiples of 90 degrees.
+    """
+    # Step 1: collect polygons flattened through all references
+    specs, counts, polygons = [], [], []
+    for spec, spec_polygons in c.get_polygons(by_spec=True, as_array=False).items():
+        specs.append(spec)
+        counts.append(len(spec_polygons))
+        polygons += [poly.points for poly in spec_polygons]
+
+    # Step 2: convert all vertices at once, and find axis-aligned rectangles
+    layers = []
+    if polygons:
+        sizes = np.fromiter(map(len, polygons), dtype=np.int64, count=len(polygons))
+        points = np.rint(np.concatenate(polygons) / dbu).astype(np.int64)
+        offsets = np.cumsum(sizes) - sizes
+
+        # A quad is an axis-aligned rectangle if its edges alternate direction
+        is_box = sizes == 4
+        quads = points[(offsets[is_box][:, None] + np.arange(4)).ravel()]
+        quads = quads.reshape(-1, 4, 2)
+        x, y = quads[:, :, 0], quads[:, :, 1]
+        vertical_first = (x[:, 0] == x[:, 1]) & (y[:, 1] == y[:, 2])
+        vertical_first &= (x[:, 2] == x[:, 3]) & (y[:, 3] == y[:, 0])
+        horizontal_first = (y[:, 0] == y[:, 1]) & (x[:, 1] == x[:, 2])
+        horizontal_first &= (y[:, 2] == y[:, 3]) & (x[:, 3] == x[:, 0])
+        rect = vertical_first | horizontal_first
+        is_box[is_box] = rect
+        box_idx = np.nonzero(is_box)[0]
+        boxes = np.hstack([quads[rect].min(axis=1), quads[rect].max(axis=1)])
+
+        ends = np.cumsum(counts)
+        box_ends = np.searchsorted(box_idx, ends)
+        for i, spec in enumerate(specs):
+            first = ends[i] - counts[i]
+            others = np.nonzero(~is_box[first : ends[i]])[0] + first
+            gather = np.concatenate(
+                [np.arange(offsets[j], offsets[j] + sizes[j]) for j in others]
+                or [np.zeros(0, dtype=np.int64)]
+            )
+            layers.append(
+                (
+                    int(spec[0]),
+                    int(spec[1]),
+                    boxes[(box_ends[i - 1] if i else 0) : box_ends[i]].astype(np.int32),
+                    sizes[others],
+                    points[gather].astype(np.int32),
+                )
+            )
+
+    # Step 3: convert labels, as read from a GDS stream by KLayout
+    labels = []
+    for label in c.get_labels():
+        x, y = np.rint(np.array(label.origin) / dbu).astype(np.int64).tolist()
+        h_align = 0 if "w" in label.anchor else 2 if "e" in label.anchor else 1
+        v_align = 2 if "n" in label.anchor else 0 if "s" in label.anchor else 1
+        rotation = int(round(math.degrees(label.rotation) / 90.0)) % 4
+        size = 0 if label.magnification == 1 else int(round(label.magnification / dbu))
+        labels.append(
+            (
+                label.layer,
+                label.texttype,
+                label.text,
+                x,
+                y,
+                h_align,
+                v_align,
+                rotation,
+                bool(label.x_reflection),
+                size,
+            )
+        )
+
+    return layers, labels
+
+
+def geometry_to_pya(layout, geometry: tuple, device_name: str):
+    """Inserts flattened geometry into a new cell of layout.
+
+    Args:
+        layout : pya.Layout that receives the geometry
+        geometry : layers and labels, as returned by gf_to_geometry
+        device_name : base name of the new cell, made unique within layout
+    """
+    cell = layout.create_cell(layout.unique_cell_name(str(device_name)))
+    layers, labels = geometry
+
+    for layer, datatype, boxes, sizes, points in layers:
+        region = pya.Region(list(map(pya.Box, *boxes.T.tolist())))
+        if len(sizes):
+            x, y = points.T.tolist()
+            pts = list(map(pya.Point, x, y))
+            ends = np.cumsum(sizes).tolist()
+            region.insert(
+                [
+                    pya.Polygon(pts[end - n : end])
+                    for n, end in zip(sizes.tolist(), ends)
+                ]
+            )
+        cell.shapes(layout.layer(layer, datatype)).insert(region)
+
+    for layer, texttype, text, x, y, h_align, v_align, rot, mirror, size in labels:
+        label = pya.Text(text, pya.Trans(rot, mirror, x, y))
+        label.halign = h_align
+        label.valign = v_align
+        label.size = size
+        cell.shapes(layout.layer(layer, texttype)).insert(label)
+
+    return cell
 
 
 def gf_to_pya(layout, c: gf.Component, device_name: str):
-    c.write_gds(str(device_name) + "_temp.gds")
-    layout.read(str(device_name) + "_temp.gds")
-    os.remove(str(device_name) + "_temp.gds")
+    """Copies the polygons and labels of a Component into a new cell of layout.
+
+    Shapes are inserted through the pya API, so no temporary GDS file is
+    written and parallel PCell evaluations can't clash on file or cell names.
+
+    Args:
+        layout : pya.Layout that receives the geometry
+        c : gdsfactory Component to be transferred
+        device_name : device name, used as cell name if the Component has none
+    """
+    geometry = gf_to_geometry(c, layout.dbu)
+
+    return geometry_to_pya(layout, geometry, c.name or device_name)
+
+
+def draw_to_pya(pcell, draw_func, device_name: str, **params):
+    """Draws a PCell variant with gdsfactory into a new cell of the PCell layout.
+
+    The geometry is looked up in the PCells geometry cache first, so
+    draw_func only runs for parameter sets that weren't generated before,
+    in this session or, if the on-disk store is enabled, in a previous one.
+
+    Args:
+        pcell : pya.PCellDeclarationHelper being produced
+        draw_func : gdsfactory function drawing the device
+        device_name : device name, used as cell name
+        params : keyword arguments of draw_func
+    """
+    layout = pcell.layout
+    key = pcell_cache.key(
+        f"{type(pcell).__name__}.{draw_func.__name__}", params, layout.dbu
+    )
+
+    data = pcell_cache.get(key)
+    if data is None:
+        geometry = gf_to_geometry(draw_func(**params), layout.dbu)
+        pcell_cache.put(key, pickle.dumps(geometry, protocol=pickle.HIGHEST_PROTOCOL))
+    else:
+        geometry = pickle.loads(data)
 
-    return layout.cell(c.name)
+    return geometry_to_pya(layout, geometry, device_name)
 
 
-def snap_to_grid(component: gf.Component, dbu: float = 0.005) -> gf.Component:
-    """Returns a new Component with all polygons snapped to the nearest DBU grid (e.g. 5nm)."""
-    # Step 1: flatten the component
-    flat = component.copy()
-    flat.flatten()
+def _snap_polygons(polygons: list, dbu: float, layer: int, datatype: int) -> list:
+    """Returns polygons with all their vertices snapped to the grid at once.
 
-    # Step 2: create the cleaned component
+    Polygons are returned as they are if all their vertices are on grid.
+
+    Args:
+        polygons : gdstk.Polygon list of one layer
+        dbu : grid size in um
+        layer : GDS layer of the polygons
+        datatype : GDS datatype of the polygons
+    """
+    points = [poly.points for poly in polygons]
+    grid = np.concatenate(points) / dbu
+    snapped = np.rint(grid)
+    if np.abs(grid - snapped).max() <= GRID_TOLERANCE:
+        return polygons
+
+    sizes = np.fromiter(map(len, points), dtype=np.int64, count=len(points))
+    points = np.split(snapped * dbu, np.cumsum(sizes)[:-1])
+    return [gdstk.Polygon(p, layer, datatype) for p in points]
+
+
+def snap_to_grid(
+    component: gf.Component, dbu: float = 0.005, merge: bool = True
+) -> gf.Component:
+    """Returns a new flat Component with all polygons snapped to the nearest DBU grid (e.g. 5nm).
+
+    All the vertices of a layer are snapped in one NumPy array operation and
+    layers that are already on grid are kept as they are. Merging creates
+    vertices at the intersections of non-Manhattan edges, so merged polygons
+    are snapped again.
+
+    Args:
+        component : gdsfactory Component to be snapped
+        dbu : grid size in um
+        merge : merge the polygons of each layer into non-overlapping ones
+    """
     c_clean = gf.Component(name=f"{component.name}_snapped")
 
-    # Step 3: snap polygons
-    for layer, polygons in flat.get_polygons(by_spec=True).items():
-        for points in polygons:
-            if len(points) == 0:
-                continue
-            snapped = [(round(x / dbu) * dbu, round(y / dbu) * dbu) for x, y in points]
-            c_clean.add_polygon(snapped, layer=layer)
+    # get_polygons flattens the component through all references
+    for (lyr, dt), polygons in component.get_polygons(
+        by_spec=True, as_array=False
+    ).items():
+        if not polygons:
+            continue
+
+        # Step 1: snap all vertices of the layer at once
+        polygons = _snap_polygons(polygons, dbu, lyr, dt)
+
+        # Step 2: merge polygons of the layer, and snap the intersections
+        if merge:
+            polygons = gdstk.boolean(
+                polygons, [], "or", precision=dbu / 10, layer=lyr, datatype=dt
+            )
+            if polygons:
+                polygons = _snap_polygons(polygons, dbu, lyr, dt)
+
+        # Step 3: drop zero area polygons
+        c_clean.add([poly for poly in polygons if poly.area() > 0])
 
     return c_clean
@@ -27,8 +27,7 @@ from .draw_res import (
     draw_ppolyf_u_high_Rs_res,
     draw_well_res,
 )
-from .pcell_utilities import gf_to_pya
-
+from .pcell_utilities import draw_to_pya
 
 rm1_l = 0.23
 rm1_w = 0.23
@@ -199,7 +198,11 @@ class metal_resistor(pya.PCellDeclarationHelper):
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
 
-        instance = draw_metal_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_metal_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type=self.res_type,
@@ -209,9 +212,6 @@ class metal_resistor(pya.PCellDeclarationHelper):
             r1_lbl=self.r1_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -299,7 +299,11 @@ class nplus_s_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_nplus_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_nplus_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="nplus_s",
@@ -312,9 +316,6 @@ class nplus_s_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -401,7 +402,11 @@ class pplus_s_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_pplus_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_pplus_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="pplus_s",
@@ -413,9 +418,6 @@ class pplus_s_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -503,7 +505,11 @@ class nplus_u_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_nplus_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_nplus_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="nplus_u",
@@ -516,9 +522,6 @@ class nplus_u_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -605,7 +608,11 @@ class pplus_u_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_pplus_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_pplus_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="pplus_u",
@@ -617,9 +624,6 @@ class pplus_u_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -704,7 +708,11 @@ class nwell_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_well_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_well_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="nwell",
@@ -715,9 +723,6 @@ class nwell_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -803,7 +808,11 @@ class pwell_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_well_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_well_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="pwell",
@@ -814,9 +823,6 @@ class pwell_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -903,7 +909,11 @@ class npolyf_s_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_npolyf_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_npolyf_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="npolyf_s",
@@ -915,9 +925,6 @@ class npolyf_s_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -1004,7 +1011,11 @@ class ppolyf_s_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_ppolyf_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_ppolyf_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="ppolyf_s",
@@ -1016,9 +1027,6 @@ class ppolyf_s_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -1105,7 +1113,11 @@ class npolyf_u_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_npolyf_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_npolyf_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="npolyf_u",
@@ -1117,9 +1129,6 @@ class npolyf_u_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -1206,7 +1215,11 @@ class ppolyf_u_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_ppolyf_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_ppolyf_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             res_type="ppolyf_u",
@@ -1218,9 +1231,6 @@ class ppolyf_u_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -1315,7 +1325,11 @@ class ppolyf_u_high_Rs_resistor(pya.PCellDeclarationHelper):
 
     def produce_impl(self):
         dbu_PERCISION = 1 / self.layout.dbu
-        instance = draw_ppolyf_u_high_Rs_res(
+        # creating layout and cell in klayout
+        instance = draw_to_pya(
+            self,
+            draw_ppolyf_u_high_Rs_res,
+            "res",
             l_res=self.l_res,
             w_res=self.w_res,
             volt=self.volt,
@@ -1327,9 +1341,6 @@ class ppolyf_u_high_Rs_resistor(pya.PCellDeclarationHelper):
             sub_lbl=self.sub_lbl,
         )
 
-        # creating layout and cell in klayout
-        instance = gf_to_pya(self.layout, instance, "res")
-
         write_cells = pya.CellInstArray(
             instance.cell_index(),
             pya.Trans(pya.Point(0, 0)),
@@ -0,0 +1,170 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## gdsfactory to Klayout transfer benchmark for GF180MCU Pcells
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells gdsfactory to Klayout transfer benchmark.
+
+Compares the per-instance latency of the in-memory transfer done by
+gf_to_pya against the old temp GDS round trip, on the same Components
+generated from the testing patterns.
+
+Usage:
+    bench_gf_to_pya.py (--help| -h)
+    bench_gf_to_pya.py [--device=<device_name>]
+
+Options:
+    --help -h                   Print this help message.
+    --device=<device_name>      Patterns category to benchmark, all categories are used if not given.
+"""
+
+import os
+import glob
+import json
+import logging
+import tempfile
+import time
+from docopt import docopt
+import klayout.db as k
+import numpy as np
+
+from draw_pcell import draw_pcell
+from cells import gf180mcu, pcell_utilities
+from cells import cap_mim, cap_mos, diode, fet, res
+
+PCELL_MODULES = [cap_mim, cap_mos, diode, fet, res]
+
+
+def gds_round_trip(layout, c, device_name, tmp_dir):
+    """
+    Old gf_to_pya implementation, writing the Component to a temp GDS file
+
+    Args :
+        layout : layout object
+        c : gdsfactory Component
+        device_name : name used for the temp GDS file
+        tmp_dir : directory of the temp GDS file
+    """
+    gds_file = os.path.join(tmp_dir, f"{device_name}_temp.gds")
+    c.write_gds(gds_file)
+    layout.read(gds_file)
+    os.remove(gds_file)
+
+    return layout.cell(c.name)
+
+
+def timed_transfer(timings, tmp_dir):
+    """
+    Returns a draw_to_pya replacement timing both transfer paths on the same Component
+
+    Args :
+        timings : dict of lists to append timings to
+        tmp_dir : directory of the temp GDS files
+    """
+
+    def transfer(pcell, draw_func, device_name, **params):
+        c = draw_func(**params)
+
+        start = time.perf_counter()
+        gds_round_trip(k.Layout(), c, device_name, tmp_dir)
+        timings["gds"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        pcell_utilities.gf_to_pya(k.Layout(), c, device_name)
+        timings["memory"].append(time.perf_counter() - start)
+
+        return pcell_utilities.gf_to_pya(pcell.layout, c, device_name)
+
+    return transfer
+
+
+def run_benchmark(target_device):
+    """
+    Runs the transfer benchmark over the testing patterns
+
+    Args :
+        target_device : category of device under test, or None for all
+    """
+
+    file_path = os.path.dirname(os.path.abspath(__file__))
+    patt_dir = os.path.join(file_path, "patterns")
+
+    if target_device:
+        categories = [target_device]
+    else:
+        categories = sorted(
+            os.path.basename(p)[: -len(".json")]
+            for p in glob.glob(os.path.join(patt_dir, "*.json"))
+        )
+
+    lib = k.Library.library_by_name("gf180mcu")
+    timings = {"gds": [], "memory": []}
+
+    # Silence per-pattern generation logs while timing
+    log_level = logging.getLogger().level
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        transfer = timed_transfer(timings, tmp_dir)
+        for mod in PCELL_MODULES:
+            mod.draw_to_pya = transfer
+
+        for category in categories:
+            dev_setting = json.load(open(os.path.join(patt_dir, f"{category}.json")))
+            for p in sorted(glob.glob(os.path.join(patt_dir, category, "*.csv"))):
+                device = p.split("/")[-1].split("_patt")[0]
+                layout = k.Layout()
+                top = layout.create_cell(f"{device}_pcells")
+                draw_pcell(layout, top, lib, p, device, dev_setting["spacing"])
+
+    for mod in PCELL_MODULES:
+        mod.draw_to_pya = pcell_utilities.draw_to_pya
+    logging.getLogger().setLevel(log_level)
+
+    gds = np.array(timings["gds"]) * 1e3
+    memory = np.array(timings["memory"]) * 1e3
+
+    if len(gds) == 0:
+        logging.error("No pcell instances were generated")
+        return
+
+    logging.info(f"Instances transferred : {len(gds)}")
+    for name, t in (("temp GDS round trip", gds), ("in-memory transfer", memory)):
+        logging.info(
+            f"{name:<20} : mean {t.mean():.3f} ms, median {np.median(t):.3f} ms, "
+            f"p95 {np.percentile(t, 95):.3f} ms, total {t.sum() / 1e3:.2f} s"
+        )
+    logging.info(f"Speedup (total) : {gds.sum() / memory.sum():.2f}x")
+
+
+if __name__ == "__main__":
+
+    # logs format
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS Transfer Bench.: 0.1")
+
+    # Instantiate and register the library
+    gf180mcu()
+
+    # Calling main function
+    run_benchmark(arguments["--device"])
@@ -0,0 +1,141 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## snap_to_grid microbenchmark for GF180MCU Pcells
+########################################################################################################################
+
+"""
+Globalfoundries 180u PCells snap_to_grid microbenchmark.
+
+Compares the vectorized snap_to_grid against the old per-vertex loop on
+multi-finger nfet Components with nf=1...200.
+
+Usage:
+    bench_snap_to_grid.py (--help| -h)
+    bench_snap_to_grid.py [--nf=<nf>...] [--repeat=<repeat>]
+
+Options:
+    --help -h                   Print this help message.
+    --nf=<nf>                   Number of fingers to benchmark [default: 1 2 5 10 20 50 100 200].
+    --repeat=<repeat>           Number of timed runs per Component, the best one is reported [default: 5].
+"""
+
+import os
+import sys
+import logging
+import timeit
+from docopt import docopt
+import gdsfactory as gf
+
+pcell_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, pcell_path)
+
+from cells import draw_fet, pcell_utilities  # noqa E402
+
+
+def snap_to_grid_loop(component: gf.Component, dbu: float = 0.005) -> gf.Component:
+    """Old snap_to_grid implementation, snapping vertex by vertex."""
+    flat = component.copy()
+    flat.flatten()
+
+    c_clean = gf.Component(name=f"{component.name}_snapped")
+
+    for layer, polygons in flat.get_polygons(by_spec=True).items():
+        for points in polygons:
+            if len(points) == 0:
+                continue
+            snapped = [(round(x / dbu) * dbu, round(y / dbu) * dbu) for x, y in points]
+            c_clean.add_polygon(snapped, layer=layer)
+
+    return c_clean
+
+
+def unsnapped_nfet(nf):
+    """
+    Returns the nfet Component of nf fingers as passed to snap_to_grid
+
+    Args :
+        nf : number of fingers
+    """
+    captured = []
+
+    def capture(component, dbu=0.005):
+        captured.append(component)
+        return component
+
+    draw_fet.snap_to_grid = capture
+    try:
+        draw_fet.draw_nfet(
+            l_gate=0.28, w_gate=2, nf=nf, bulk="Guard Ring", gate_con_pos="alternating"
+        )
+    finally:
+        draw_fet.snap_to_grid = pcell_utilities.snap_to_grid
+
+    return captured[0]
+
+
+def run_benchmark(nf_list, repeat):
+    """
+    Runs the snap_to_grid microbenchmark
+
+    Args :
+        nf_list : list of number of fingers
+        repeat : number of timed runs per Component
+    """
+    logging.info(
+        f"{'nf':>4} | {'polygons':>8} | {'loop (ms)':>10} | {'numpy (ms)':>10} "
+        f"| {'merged (ms)':>11} | {'speedup':>7}"
+    )
+
+    for nf in nf_list:
+        c = unsnapped_nfet(nf)
+        n_polygons = sum(len(p) for p in c.get_polygons(by_spec=True).values())
+
+        # Component names must be unique per run to avoid gdsfactory cache hits
+        def best_of(func, **kwargs):
+            runs = []
+            for i in range(repeat):
+                c_run = gf.Component(f"bench_nf{nf}_{func.__name__}_{i}_{kwargs}")
+                c_run.add_ref(c)
+                runs.append(
+                    timeit.timeit(lambda: func(c_run, dbu=0.005, **kwargs), number=1)
+                )
+            return min(runs) * 1e3
+
+        t_loop = best_of(snap_to_grid_loop)
+        t_numpy = best_of(pcell_utilities.snap_to_grid, merge=False)
+        t_merged = best_of(pcell_utilities.snap_to_grid, merge=True)
+
+        logging.info(
+            f"{nf:>4} | {n_polygons:>8} | {t_loop:>10.2f} | {t_numpy:>10.2f} "
+            f"| {t_merged:>11.2f} | {t_loop / t_merged:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+
+    # logs format
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # arguments
+    arguments = docopt(__doc__, version="PCELLS Snap Bench.: 0.1")
+    nf_list = [int(nf) for arg in arguments["--nf"] for nf in arg.split()]
+
+    # Calling main function
+    run_benchmark(nf_list, int(arguments["--repeat"]))
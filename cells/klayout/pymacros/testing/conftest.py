@@ -32,6 +32,9 @@ def pytest_addoption(parser):
     parser.addoption(
         "--device", action="store", default="fet", help="device under test name"
     )
+    parser.addoption(
+        "--jobs", action="store", default="1", help="num. of pcells generation jobs"
+    )
 
 
 def pytest_generate_tests(metafunc):
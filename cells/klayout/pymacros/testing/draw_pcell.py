@@ -21,11 +21,12 @@ Globalfoundries 180u PCells Generator.
 
 Usage:
     draw_pcell.py (--help| -h)
-    draw_pcell.py (--device=<device_name>)
+    draw_pcell.py (--device=<device_name>) [--jobs=<jobs>]
 
 Options:
     --help -h                   Print this help message.
     --device=<device_name>      Select your device name. Allowed devices are (bjt , diode, MIM-A, MIM-B_gfB, MIM-B_gfC , fet, cap_mos, res)
+    --jobs=<jobs>               Number of worker processes generating the patterns [default: 1].
 """
 
 import os
@@ -37,6 +38,9 @@ import pandas as pd
 import math
 import glob
 import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 pcell_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, pcell_path)
@@ -48,7 +52,24 @@ from cells import gf180mcu  # noqa E402
 DB_PERC = 1000
 
 
-def draw_pcell(layout, top, lib, patt_file, device_name, device_space):
+def pattern_location(i, pcell_row_no, device_space):
+    """
+    Returns the location of the pattern instance i, column by column
+
+    Args :
+        i : pattern index in the patterns csv file
+        pcell_row_no : num. of instances per column
+        device_space : device instances spacing
+    """
+    x_shift = (i // pcell_row_no) * device_space * DB_PERC
+    y_shift = (i % pcell_row_no) * device_space * DB_PERC
+
+    return x_shift, y_shift
+
+
+def draw_pcell(
+    layout, top, lib, patt_file, device_name, device_space, rows=None, timings=None
+):
     """
     draws pcell using klayout pymacros
 
@@ -59,6 +80,8 @@ def draw_pcell(layout, top, lib, patt_file, device_name, device_space):
         patt_file : patterns csv file path
         device_name : name of the device under test
         device_space : device instances spacing
+        rows : range of patterns to draw, all patterns are drawn if not given
+        timings : list to append (pattern index, generation time) to
     """
 
     # Read csv file of patterns
@@ -68,21 +91,14 @@ def draw_pcell(layout, top, lib, patt_file, device_name, device_space):
     patterns_no = df.shape[0]
     pcell_row_no = int(math.sqrt(patterns_no))
 
-    # inital value for instances location
-    x_shift = 0
-    y_shift = 0
+    if rows is not None:
+        df = df.iloc[rows.start : rows.stop]
 
     # Insert instance for each row
     for i, row in df.iterrows():
 
         # Get isntance location
-        if (i % pcell_row_no) == 0:
-            x_shift = 0 if i == 0 else x_shift + device_space * DB_PERC
-
-        if (i % pcell_row_no) == 0:
-            y_shift = 0
-        else:
-            y_shift = 0 if i == 0 else y_shift + device_space * DB_PERC
+        x_shift, y_shift = pattern_location(i, pcell_row_no, device_space)
 
         pcell_name = row["pcell_name"]
 
@@ -104,6 +120,7 @@ def draw_pcell(layout, top, lib, patt_file, device_name, device_space):
 
             param = row.drop(labels=["pcell_name"]).to_dict()
 
+        start = time.perf_counter()
         try:
             logging.info(f"Generating pcell for {device_name} with params : {param}")
             pcell_id = lib.layout().pcell_id(pcell_name)
@@ -113,14 +130,131 @@ def draw_pcell(layout, top, lib, patt_file, device_name, device_space):
             logging.error(
                 f"Exception happened: {str(e)} for pattern {device_name} {param}"
             )
+        if timings is not None:
+            timings.append((i, time.perf_counter() - start))
 
 
-def run_generation(target_device):
+def init_worker(log_level):
+    """
+    Initializes a generation worker process
+
+    Args :
+        log_level : logging level of the worker
+    """
+    logging.basicConfig(
+        level=log_level,
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Instantiate and register the library
+    gf180mcu()
+
+
+def draw_shard(patt_file, device_name, device_space, rows):
+    """
+    Draws a range of patterns in a new flat layout
+
+    Args :
+        patt_file : patterns csv file path
+        device_name : name of the device under test
+        device_space : device instances spacing
+        rows : range of patterns to draw
+
+    Returns :
+        GDS stream of the shard layout and list of (pattern index, generation time)
+    """
+    lib = k.Library.library_by_name("gf180mcu")
+
+    layout = k.Layout()
+    top = layout.create_cell(f"{device_name}_pcells")
+
+    timings = []
+    draw_pcell(layout, top, lib, patt_file, device_name, device_space, rows, timings)
+    top.flatten(1)
+
+    options = k.SaveLayoutOptions()
+    options.format = "GDS2"
+    options.write_context_info = False
+
+    return layout.write_bytes(options), timings
+
+
+def shard_rows(patterns_no, jobs):
+    """
+    Returns the ranges of patterns drawn by each shard
+
+    Args :
+        patterns_no : num. of patterns
+        jobs : num. of worker processes
+    """
+    # A few shards per worker, so that slow patterns don't stall a single worker
+    shard_size = max(1, math.ceil(patterns_no / (jobs * 4)))
+
+    return [
+        range(start, min(start + shard_size, patterns_no))
+        for start in range(0, patterns_no, shard_size)
+    ]
+
+
+def log_timings(device_name, timings, elapsed=None):
+    """
+    Logs the generation timings of a patterns file
+
+    Args :
+        device_name : name of the device under test
+        timings : list of (pattern index, generation time)
+        elapsed : wall time of the patterns file generation, the summed patterns
+            generation time is logged instead if not given
+    """
+    if not timings:
+        logging.warning(f"No patterns generated for {device_name}")
+        return
+
+    slowest_i, slowest_t = max(timings, key=lambda t: t[1])
+    total = sum(t for _, t in timings)
+    spent = f"in {elapsed:.2f} s" if elapsed is not None else f"({total:.2f} s summed)"
+
+    logging.info(
+        f"Generated {len(timings)} patterns for {device_name} {spent} : "
+        f"mean {total / len(timings) * 1e3:.1f} ms, "
+        f"slowest pattern {slowest_i} {slowest_t * 1e3:.1f} ms"
+    )
+
+
+def write_timings(timings, out_file):
+    """
+    Writes the generation time of each pattern to a csv file
+
+    Args :
+        timings : list of (pattern index, generation time)
+        out_file : output csv file path
+    """
+    df = pd.DataFrame(timings, columns=["pattern", "time_ms"])
+    df["time_ms"] = (df["time_ms"] * 1e3).round(3)
+    df.sort_values("pattern").to_csv(out_file, index=False)
+
+
+def write_layout(layout, out_file):
+    """
+    Writes the generated layout without PCell context info
+
+    Args :
+        layout : layout object
+        out_file : output GDS file path
+    """
+    options = k.SaveLayoutOptions()
+    options.write_context_info = False
+    layout.write(out_file, options)
+
+
+def run_generation(target_device, jobs=1):
     """
     Runs generation of the device under test
 
     Args :
         target_device : category of device under test
+        jobs : num. of worker processes, patterns are drawn in this process if 1
     """
 
     file_path = os.path.dirname(os.path.abspath(__file__))
@@ -128,6 +262,16 @@ def run_generation(target_device):
         os.path.join(file_path, "patterns", target_device, "*.csv")
     )
 
+    # Create output dir
+    os.makedirs(f"{file_path}/testcases", exist_ok=True)
+
+    # Read device setting
+    dev_setting = json.load(open(f"{file_path}/patterns/{target_device}.json"))
+
+    if jobs > 1:
+        run_parallel_generation(list_patt_files, dev_setting["spacing"], jobs)
+        return
+
     # === Read gf180mcu pcells ===
     lib = k.Library.library_by_name("gf180mcu")
 
@@ -137,12 +281,8 @@ def run_generation(target_device):
         device = p.split("/")[-1].split("_patt")[0]
 
         # Create output file
-        os.makedirs(f"{file_path}/testcases", exist_ok=True)
         out_file = os.path.join(file_path, "testcases", f"{device}_pcells.gds")
 
-        # Read device setting
-        dev_setting = json.load(open(f"{file_path}/patterns/{target_device}.json"))
-
         # Create new layout
         layout = k.Layout()
 
@@ -150,15 +290,81 @@ def run_generation(target_device):
         top = layout.create_cell(f"{device}_pcells")
 
         # Call draww_pcell
-        draw_pcell(layout, top, lib, p, device, dev_setting["spacing"])
+        start = time.perf_counter()
+        timings = []
+        draw_pcell(layout, top, lib, p, device, dev_setting["spacing"], None, timings)
+        log_timings(device, timings, time.perf_counter() - start)
+        write_timings(timings, out_file.replace(".gds", "_timings.csv"))
 
         # Flatten cell
         top.flatten(1)
 
         # Save the file
-        options = k.SaveLayoutOptions()
-        options.write_context_info = False
-        layout.write(out_file, options)
+        write_layout(layout, out_file)
+
+
+def run_parallel_generation(list_patt_files, device_space, jobs):
+    """
+    Runs generation of the patterns files sharded across worker processes
+
+    Args :
+        list_patt_files : list of patterns csv files
+        device_space : device instances spacing
+        jobs : num. of worker processes
+    """
+
+    file_path = os.path.dirname(os.path.abspath(__file__))
+
+    # Fresh interpreters, so that workers don't inherit the parent Klayout state
+    mp_context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=mp_context,
+        initializer=init_worker,
+        initargs=(logging.getLogger().level,),
+    ) as executor:
+
+        start = time.perf_counter()
+
+        # Submit all shards first, so that workers are kept busy across files
+        submitted = []
+        for p in list_patt_files:
+            device = p.split("/")[-1].split("_patt")[0]
+            patterns_no = pd.read_csv(p).shape[0]
+            shards = [
+                executor.submit(draw_shard, p, device, device_space, rows)
+                for rows in shard_rows(patterns_no, jobs)
+            ]
+            submitted.append((device, shards))
+
+        for device, shards in submitted:
+
+            # Merge shards in patterns order
+            layout = k.Layout()
+            top = layout.create_cell(f"{device}_pcells")
+            timings = []
+
+            for shard in shards:
+                data, shard_timings = shard.result()
+                timings += shard_timings
+
+                shard_layout = k.Layout()
+                shard_layout.read_bytes(data)
+                if shard_layout.top_cell() is not None:
+                    top.copy_shapes(shard_layout.top_cell())
+
+            # Shards of all files run interleaved, so only the total wall time is known
+            log_timings(device, timings)
+
+            out_file = os.path.join(file_path, "testcases", f"{device}_pcells.gds")
+            write_layout(layout, out_file)
+            write_timings(timings, out_file.replace(".gds", "_timings.csv"))
+
+    logging.info(
+        f"Generated {len(submitted)} patterns files with {jobs} jobs "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
 
 
 if __name__ == "__main__":
@@ -173,9 +379,10 @@ if __name__ == "__main__":
     # arguments
     arguments = docopt(__doc__, version="PCELLS Gen.: 0.1")
     target_device = arguments["--device"]
+    jobs = int(arguments["--jobs"])
 
     # Instantiate and register the library
     gf180mcu()
 
     # Calling main function
-    run_generation(target_device)
+    run_generation(target_device, jobs)
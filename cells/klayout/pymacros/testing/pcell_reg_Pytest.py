@@ -12,18 +12,27 @@ def device(request):
     return request.config.getoption("--device")
 
 
+@pytest.fixture
+def jobs(request):
+    """
+    Returns num. of generation jobs read from command line
+    """
+    return request.config.getoption("--jobs")
+
+
 @pytest.mark.dependency()
-def test_gds_generation(device):
+def test_gds_generation(device, jobs):
     """
     generate gds files for device under test
 
     Args:
         device : name of the device under test
+        jobs : num. of generation worker processes
     """
 
     # gds generation command string
     call_str = f"""
-    python3 draw_pcell.py --device={device}
+    python3 draw_pcell.py --device={device} --jobs={jobs}
     """
 
     # assert whether generation is passed
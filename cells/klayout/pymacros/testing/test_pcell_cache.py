@@ -0,0 +1,129 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Pcells geometry cache tests for Klayout of GF180MCU
+########################################################################################################################
+
+import os
+import sys
+
+import numpy as np
+
+pcell_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, pcell_path)
+
+from cells.pcell_cache import PCellCache, sources_hash  # noqa E402
+
+DBU = 0.001
+
+
+def test_lru_eviction_by_size():
+    """Least recently used entries are dropped once max_bytes is exceeded"""
+    cache = PCellCache(max_bytes=30)
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    cache.put("c", b"c" * 10)
+
+    # Touch "a" so "b" becomes the least recently used entry
+    assert cache.get("a") == b"a" * 10
+    cache.put("d", b"d" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a" * 10
+    assert cache.get("c") == b"c" * 10
+    assert cache.get("d") == b"d" * 10
+    assert cache.hits == 4
+    assert cache.misses == 1
+
+
+def test_entry_larger_than_cache_is_skipped():
+    """An entry larger than max_bytes isn't kept and doesn't evict others"""
+    cache = PCellCache(max_bytes=30)
+    cache.put("a", b"a" * 10)
+    cache.put("big", b"x" * 31)
+
+    assert cache.get("big") is None
+    assert cache.get("a") == b"a" * 10
+
+
+def test_replacing_entry_keeps_size():
+    """Storing a key again replaces its entry instead of counting it twice"""
+    cache = PCellCache(max_bytes=30)
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    cache.put("a", b"A" * 20)
+
+    assert cache.get("a") == b"A" * 20
+    assert cache.get("b") == b"b" * 10
+
+
+def test_key_normalizes_params():
+    """Equal parameters give the same key whatever their float or numpy form"""
+    cache = PCellCache()
+    key = cache.key("nfet", {"w_gate": 0.3, "nf": 2, "lbl": True}, DBU)
+
+    assert key == cache.key("nfet", {"w_gate": 0.1 + 0.2, "nf": 2, "lbl": 1}, DBU)
+    assert key == cache.key(
+        "nfet", {"nf": np.int64(2), "w_gate": np.float64(0.3), "lbl": True}, DBU
+    )
+    assert key != cache.key("nfet", {"w_gate": 0.305, "nf": 2, "lbl": True}, DBU)
+    assert key != cache.key("pfet", {"w_gate": 0.3, "nf": 2, "lbl": True}, DBU)
+    assert key != cache.key("nfet", {"w_gate": 0.3, "nf": 2, "lbl": True}, 0.005)
+
+
+def test_key_depends_on_sources(tmp_path):
+    """Editing a PCell source changes the sources hash, and so the cache keys"""
+    source = tmp_path / "draw_fet.py"
+    source.write_text("def draw_nfet():\n    pass\n")
+    old_hash = sources_hash(str(tmp_path))
+    assert old_hash == sources_hash(str(tmp_path))
+
+    source.write_text("def draw_nfet():\n    return None\n")
+    new_hash = sources_hash(str(tmp_path))
+    assert new_hash != old_hash
+
+    params = {"w_gate": 0.3}
+    old_cache = PCellCache()
+    old_cache._sources_hash = old_hash
+    new_cache = PCellCache()
+    new_cache._sources_hash = new_hash
+    assert old_cache.key("nfet", params, DBU) != new_cache.key("nfet", params, DBU)
+
+
+def test_disk_store(tmp_path):
+    """Entries written on disk are read back by another cache instance"""
+    cache_dir = str(tmp_path / "cache")
+    writer = PCellCache(cache_dir=cache_dir)
+    key = writer.key("nfet", {"w_gate": 0.3}, DBU)
+    writer.put(key, b"geometry")
+
+    assert os.path.isfile(os.path.join(cache_dir, key[:2], f"{key}.pkl"))
+    assert os.listdir(os.path.join(cache_dir, key[:2])) == [f"{key}.pkl"]
+
+    reader = PCellCache(cache_dir=cache_dir)
+    assert reader.get(key) == b"geometry"
+    assert reader.get("0" * 64) is None
+
+    # Clearing the memory keeps the on-disk store
+    writer.clear()
+    assert writer.get(key) == b"geometry"
+
+
+def test_disk_store_without_memory(tmp_path):
+    """With no memory budget, entries are still served from the disk store"""
+    cache = PCellCache(max_bytes=0, cache_dir=str(tmp_path))
+    cache.put("ab" + "0" * 62, b"geometry")
+
+    assert cache.get("ab" + "0" * 62) == b"geometry"
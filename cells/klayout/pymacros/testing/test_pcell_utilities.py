@@ -0,0 +1,149 @@
+# Copyright 2022 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+########################################################################################################################
+## Pcells utilities tests for Klayout of GF180MCU
+########################################################################################################################
+
+import os
+import sys
+
+import gdsfactory as gf
+import numpy as np
+import pya
+import pytest
+
+pcell_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, pcell_path)
+
+from cells import pcell_utilities  # noqa E402
+from cells.draw_fet import draw_nfet  # noqa E402
+from cells.draw_res import draw_nplus_res  # noqa E402
+
+DBU = 0.005
+
+
+def off_grid_vertices(component, dbu=DBU):
+    """
+    Returns the vertices of a Component that aren't on the grid
+
+    Args :
+        component : gdsfactory Component
+        dbu : grid size in um
+    """
+    polygons = [
+        p
+        for layer_polygons in component.get_polygons(by_spec=True).values()
+        for p in layer_polygons
+    ]
+    if not polygons:
+        return np.zeros((0, 2))
+    points = np.concatenate(polygons) / dbu
+    off = np.abs(points - np.rint(points)) > pcell_utilities.GRID_TOLERANCE
+    return points[off.any(axis=1)] * dbu
+
+
+@pytest.mark.parametrize("merge", [True, False])
+def test_snap_to_grid_on_grid(merge):
+    """
+    Vertices are on grid after snapping, also at the intersections of
+    overlapping non-Manhattan edges created by the merge
+    """
+    c = gf.Component(f"snap_test_{merge}")
+    c.add_polygon([(0.0011, 0.0), (1.0023, 0.3017), (0.0, 0.7003)], layer=(22, 0))
+    c.add_polygon([(0.2, 0.6), (0.9013, 0.0021), (1.1, 0.9)], layer=(22, 0))
+    c.add_polygon([(0.0, 0.0), (0.5, 0.0), (0.5, 0.5), (0.0, 0.5)], layer=(34, 0))
+
+    snapped = pcell_utilities.snap_to_grid(c, dbu=DBU, merge=merge)
+
+    assert len(off_grid_vertices(snapped)) == 0
+    assert set(snapped.get_polygons(by_spec=True)) == {(22, 0), (34, 0)}
+
+
+def test_snap_to_grid_keeps_area():
+    """
+    Snapping and merging overlapping polygons keeps their union area within
+    the grid rounding
+    """
+    c = gf.Component("snap_test_area")
+    c.add_polygon([(0, 0), (1.0012, 0), (1.0012, 1.0012), (0, 1.0012)], layer=(22, 0))
+    c.add_polygon([(0.5, 0.5), (1.5, 0.5), (1.5, 1.5), (0.5, 1.5)], layer=(22, 0))
+
+    snapped = pcell_utilities.snap_to_grid(c, dbu=DBU)
+
+    polygons = snapped.get_polygons(by_spec=True, as_array=False)[(22, 0)]
+    assert len(polygons) == 1
+    assert polygons[0].area() == pytest.approx(1.0 + 1.0 - 0.25, abs=1e-9)
+
+
+def layer_shapes(layout, cell):
+    """
+    Returns the polygons count, region and texts of each layer of a cell
+
+    Args :
+        layout : pya.Layout holding the cell
+        cell : pya.Cell to be read
+    """
+    shapes = {}
+    for li in layout.layer_indexes():
+        info = layout.get_info(li)
+        texts = sorted(
+            (s.text.string, s.text.x, s.text.y)
+            for s in cell.shapes(li).each()
+            if s.is_text()
+        )
+        count = sum(1 for s in cell.shapes(li).each() if not s.is_text())
+        if count or texts:
+            region = pya.Region(cell.begin_shapes_rec(li))
+            shapes[(info.layer, info.datatype)] = (count, region, texts)
+    return shapes
+
+
+@pytest.mark.parametrize(
+    "draw_func, params",
+    [
+        (
+            draw_nfet,
+            dict(nf=2, bulk="Guard Ring", lbl=1, sd_lbl=["S", "D", "S"], g_lbl=["G"]),
+        ),
+        (
+            draw_nplus_res,
+            dict(l_res=1, w_res=0.42, sub=1, lbl=1, r0_lbl="R0", r1_lbl="R1"),
+        ),
+    ],
+)
+def test_gf_to_pya_matches_gds(draw_func, params, tmp_path):
+    """
+    Shapes transferred in memory match those read back from a GDS file, the
+    transfer used before, layer by layer
+    """
+    c = draw_func(**params)
+
+    gds_layout = pya.Layout()
+    gds_layout.dbu = 0.001
+    gds_file = str(tmp_path / "pcell.gds")
+    c.write_gds(gds_file)
+    gds_layout.read(gds_file)
+    expected = layer_shapes(gds_layout, gds_layout.cell(c.name))
+
+    layout = pya.Layout()
+    layout.dbu = 0.001
+    shapes = layer_shapes(layout, pcell_utilities.gf_to_pya(layout, c, "pcell"))
+
+    assert set(shapes) == set(expected)
+    for spec, (count, region, texts) in expected.items():
+        assert shapes[spec][0] == count, spec
+        assert shapes[spec][1].area() == region.area(), spec
+        assert (shapes[spec][1] ^ region).is_empty(), spec
+        assert shapes[spec][2] == texts, spec
@@ -0,0 +1,173 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of measured data loading from csv files and from the columnar store.
+
+Each load is done in a fresh process, to measure its run time and the growth of
+the process peak RSS, as paid by a regression run.
+
+Usage:
+  bench_meas_store.py [--group=<group>] [--repeat=<num>]
+
+  --group=<group>                 Device group to be loaded. [default: MOS_iv]
+  --repeat=<num>                  Number of loads per source. [default: 3]
+  -h, --help                      Show help text.
+"""
+
+from docopt import docopt
+import concurrent.futures
+import multiprocessing
+import resource
+import logging
+import glob
+import time
+import os
+
+from meas_store import MEAS_ROUND, read_data, store_path
+
+
+def load_group(csv_files, round_cols, use_store):
+    """
+    Function to load measured data of a group, as done by regression scripts.
+
+    Parameters
+    ----------
+    csv_files : list
+        Paths of measured data csv files.
+    round_cols : dict
+        Number of decimals per column to be rounded.
+    use_store : bool
+        Load from the columnar store if True, from csv files otherwise.
+    Returns
+    -------
+    tuple
+        Load time in seconds, peak RSS growth in MB and number of loaded rows.
+    """
+
+    import meas_store
+
+    if not use_store:
+        meas_store.pq = None
+
+    rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    rows = sum(len(read_data(f, round_cols=round_cols, dedup=True)) for f in csv_files)
+    elapsed = time.perf_counter() - start
+    rss_end = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return elapsed, (rss_end - rss_start) / 1024, rows
+
+
+def bench(csv_files, round_cols, use_store, repeat):
+    """
+    Function to run group loads, each in a new process.
+
+    Parameters
+    ----------
+    csv_files : list
+        Paths of measured data csv files.
+    round_cols : dict
+        Number of decimals per column to be rounded.
+    use_store : bool
+        Load from the columnar store if True, from csv files otherwise.
+    repeat : int
+        Number of loads.
+    Returns
+    -------
+    list
+        Result of load_group per load.
+    """
+
+    results = []
+    for _ in range(repeat):
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results.append(
+                executor.submit(load_group, csv_files, round_cols, use_store).result()
+            )
+
+    return results
+
+
+def main(args):
+    """
+    main function of measured data loading benchmark.
+
+    Parameters
+    ----------
+    arguments : dict
+        Dictionary that holds the arguments used by user in the run command. This is generated by docopt library.
+    Returns
+    -------
+        None
+    """
+
+    group = args["--group"]
+    repeat = int(args["--repeat"])
+    data_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gf180mcu_data"
+    )
+
+    csv_files = sorted(glob.glob(os.path.join(data_dir, group, "*_meas*.csv")))
+    if not csv_files:
+        logging.error(f"There is no measured data for {group} group, please recheck")
+        exit(1)
+
+    missing = [f for f in csv_files if not os.path.isfile(store_path(f))]
+    if missing:
+        logging.error(
+            f"{len(missing)} files of {group} group aren't stored, please run meas_store.py first"
+        )
+        exit(1)
+
+    round_cols = MEAS_ROUND.get(group, {})
+    size_csv = sum(os.path.getsize(f) for f in csv_files) / 1e6
+    size_store = sum(os.path.getsize(store_path(f)) for f in csv_files) / 1e6
+
+    logging.info(
+        f"{group}: {len(csv_files)} files, csv {size_csv:.1f} MB, store {size_store:.1f} MB"
+    )
+
+    timings = {}
+    for source, use_store in [("csv", False), ("store", True)]:
+        results = bench(csv_files, round_cols, use_store, repeat)
+        best_time = min(r[0] for r in results)
+        best_rss = min(r[1] for r in results)
+        timings[source] = best_time
+        logging.info(
+            f"{source:<5}: load {best_time:.3f} s, peak RSS growth {best_rss:.1f} MB, "
+            f"{results[0][2]} rows"
+        )
+
+    logging.info(f"Speedup: {timings['csv'] / timings['store']:.2f}x")
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="DATA STORE BENCH: 0.1")
+
+    # logging setup
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    main(arguments)
@@ -13,10 +13,11 @@
 # limitations under the License.
 """
 Usage:
-  convert_foundry_csv.py --excel_path=<path> --device_type=<device_type>
+  convert_foundry_csv.py --excel_path=<path> --device_type=<device_type> [--store_dir=<store_dir>]
 
   --excel_path=<path>             The input excel file for measured data you need to extract
   --device_type=<device_type>     Name of device need to extracted its data
+  --store_dir=<store_dir>         Columnar store directory, extracted data are also stored at <store_dir>/<device_group> if given.
   -h, --help                      Show help text.
   -v, --version                   Show version.
 """
@@ -26,6 +27,7 @@ import pandas as pd
 import os
 import logging
 import glob
+from meas_store import write_partition
 from fets_iv_extraction import fet_iv_meas_extraction
 from fets_cv_extraction import fet_cv_meas_extraction
 from cap_cv_extraction import cap_meas_extraction
@@ -35,44 +37,41 @@ from bjt_iv_extraction import bjt_iv_meas_extraction
 from bjt_beta_extraction import bjt_beta_meas_extraction
 
 
-def main(args):
+def extract_data(excel_path, dev_type):
     """
-    main function to extract measurement data for GF180MCU models.
+    Function to extract measurement data of a device from an excel sheet into csv files in current directory.
 
     Parameters
     ----------
-    arguments : dict
-        Dictionary that holds the arguments used by user in the run command. This is generated by docopt library.
+    excel_path : str
+        Path of the input excel file for measured data.
+    dev_type : str
+        Name of device need to extracted its data.
     Returns
     -------
-        None
+    group : str
+        Device group of the extracted data (e.g. MOS_iv), None if no data is extracted from the sheet.
     """
 
-    # Assign some args to variables to be used later
-    excel_path = args["--excel_path"]
-    excel_path = glob.glob(excel_path)[0]
-    dev_type = args["--device_type"]
-
-    # Verify the measurement data file is exist or no
-    if not os.path.exists(excel_path) or not os.path.isfile(excel_path):
-        logging.error(
-            f"Provided {excel_path} excel sheet doesn't exist, please recheck"
-        )
-        exit(1)
+    # Sheets are classified by their file name, out of their directories names
+    sheet_name = os.path.basename(excel_path)
 
     # Checking that selected device is supported.
+    group = None
     if "fet" in dev_type:
         df = pd.read_excel(excel_path)
         logging.info(
             f"Starting data extraction from {excel_path} sheet for {dev_type} device"
         )
 
-        if "iv" in excel_path:
+        if "iv" in sheet_name:
             # Extracting data for FETs-IV measurement
             fet_iv_meas_extraction(df, dev_type)
+            group = "MOS_iv"
         else:
             # Extracting data for FETs-CV measurement
             fet_cv_meas_extraction(df, dev_type)
+            group = "MOS_cv"
 
     elif "cap_mos" in dev_type or "cap_mim" in dev_type:
         df = pd.read_excel(excel_path)
@@ -81,6 +80,7 @@ def main(args):
         )
         # Extracting data for MOSCAP/MIMCAP devices for CV measurement
         cap_meas_extraction(df, dev_type)
+        group = "MOSCAP_cv" if "cap_mos" in dev_type else "MIMCAP_cv"
 
     elif "diode" in dev_type:
         df = pd.read_excel(excel_path)
@@ -88,41 +88,92 @@ def main(args):
             f"Starting data extraction from {excel_path} sheet for {dev_type} device"
         )
 
-        if "iv" in excel_path:
+        if "iv" in sheet_name:
             # Extracting data for FETs-IV measurement
             diode_iv_meas_extraction(df, dev_type)
+            group = "diode_iv"
 
-    elif "RES" in excel_path:
+    elif "RES" in sheet_name:
         df = pd.read_excel(excel_path)
         logging.info(
             f"Starting data extraction from {excel_path} sheet for {dev_type} device"
         )
 
-        if "temp" in excel_path:
+        if "temp" in sheet_name:
             # Extracting data for RES-R with temp variations measurement
             ext_temp_corners(df, dev_type)
         else:
             # Extracting data for RES-R with W&L variations measurement
             ext_const_temp_corners(df, dev_type)
+        group = "RES_r"
 
-    elif "bjt" in excel_path:
+    elif "bjt" in sheet_name:
         df = pd.read_excel(excel_path)
         logging.info(
             f"Starting data extraction from {excel_path} sheet for {dev_type} device"
         )
 
-        if "icvc" in excel_path:
+        if "icvc" in sheet_name:
             # Extracting data for RES-R with temp variations measurement
             bjt_iv_meas_extraction(df, dev_type)
+            group = "BJT_iv"
 
-        elif "beta" in excel_path:
+        elif "beta" in sheet_name:
             # Extracting data for RES-R with temp variations measurement
             bjt_beta_meas_extraction(df, dev_type)
+            group = "BJT_beta"
 
     else:
-        logging.error("Suported devices are: Fets, MOSCAP, MIMCAP, RES, BJT")
+        raise ValueError("Suported devices are: Fets, MOSCAP, MIMCAP, RES, BJT")
+
+    return group
+
+
+def main(args):
+    """
+    main function to extract measurement data for GF180MCU models.
+
+    Parameters
+    ----------
+    arguments : dict
+        Dictionary that holds the arguments used by user in the run command. This is generated by docopt library.
+    Returns
+    -------
+        None
+    """
+
+    # Assign some args to variables to be used later
+    excel_path = args["--excel_path"]
+    excel_path = glob.glob(excel_path)[0]
+    dev_type = args["--device_type"]
+    store_dir = args["--store_dir"]
+
+    # Verify the measurement data file is exist or no
+    if not os.path.exists(excel_path) or not os.path.isfile(excel_path):
+        logging.error(
+            f"Provided {excel_path} excel sheet doesn't exist, please recheck"
+        )
         exit(1)
 
+    # Modification times of csv files, to detect the extracted ones
+    csv_mtimes = {f: os.path.getmtime(f) for f in glob.glob("*.csv")}
+
+    try:
+        group = extract_data(excel_path, dev_type)
+    except ValueError as e:
+        logging.error(str(e))
+        exit(1)
+
+    if store_dir:
+        for csv_path in sorted(glob.glob("*.csv")):
+            if csv_mtimes.get(csv_path) == os.path.getmtime(csv_path):
+                continue
+
+            name = os.path.splitext(csv_path)[0]
+            out_path = os.path.join(store_dir, group, f"{name}.parquet")
+            rows = write_partition(csv_path, out_path, group)
+            logging.info(f"Stored {rows} rows of {csv_path} at {out_path}")
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,299 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Extracts measured data of all devices listed in a manifest, across a pool of worker processes.
+
+Each manifest row has the device group, the input excel file and the device name.
+Extracted data are written at <data_dir>/<group>, sheets are skipped if their content
+and the extraction scripts didn't change since the last run.
+
+Usage:
+  extract_all.py [--manifest=<manifest>] [--data_dir=<data_dir>] [--num_cores=<num>] [--store_dir=<store_dir>] [--force]
+
+  --manifest=<manifest>           csv file of group, excel_path and device_type columns, excel paths are relative to its directory. [default: extract_manifest.csv]
+  --data_dir=<data_dir>           Output directory of the extracted data. [default: gf180mcu_data]
+  --num_cores=<num>               Number of worker processes.
+  --store_dir=<store_dir>         Columnar store directory, extracted data are also stored at <store_dir>/<group> if given.
+  --force                         Extract all sheets, even if they didn't change.
+  -h, --help                      Show help text.
+  -v, --version                   Show version.
+"""
+
+from docopt import docopt
+import pandas as pd
+import concurrent.futures
+import multiprocessing as mp
+import hashlib
+import logging
+import tempfile
+import shutil
+import glob
+import json
+import os
+
+from convert_foundry_csv import extract_data
+from meas_store import write_partition
+
+# State of the last extraction of each manifest row, kept in data directory
+STATE_FILE = ".extract_state.json"
+
+
+def file_hash(path):
+    """
+    Function to get the sha256 digest of a file.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+    Returns
+    -------
+    str
+        Hex digest of the file content.
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def extractor_hash():
+    """
+    Function to get a digest of the extraction scripts, so that data are extracted again if they change.
+
+    Returns
+    -------
+    str
+        Hex digest of the extraction scripts.
+    """
+
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    scripts = sorted(glob.glob(os.path.join(scripts_dir, "*_extraction.py")))
+    scripts += [
+        os.path.join(scripts_dir, "utils.py"),
+        os.path.join(scripts_dir, "convert_foundry_csv.py"),
+    ]
+
+    digest = hashlib.sha256()
+    for script in scripts:
+        digest.update(file_hash(script).encode())
+
+    return digest.hexdigest()
+
+
+def load_state(data_dir):
+    """
+    Function to load the extraction state of a data directory.
+
+    Parameters
+    ----------
+    data_dir : str
+        Output directory of the extracted data.
+    Returns
+    -------
+    dict
+        Extraction state per manifest row.
+    """
+
+    state_path = os.path.join(data_dir, STATE_FILE)
+    if not os.path.isfile(state_path):
+        return {}
+
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def save_state(data_dir, state):
+    """
+    Function to save the extraction state of a data directory.
+
+    Parameters
+    ----------
+    data_dir : str
+        Output directory of the extracted data.
+    state : dict
+        Extraction state per manifest row.
+    """
+
+    state_path = os.path.join(data_dir, STATE_FILE)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def extract_sheet(excel_path, dev_type, group, out_dir, store_dir):
+    """
+    Function to extract data of an excel sheet into the output directory.
+
+    Data are extracted in a private directory and then moved to the output directory,
+    so that sheets extracted at the same time don't mix their outputs.
+
+    Parameters
+    ----------
+    excel_path : str
+        Absolute path of the input excel file.
+    dev_type : str
+        Name of device need to extracted its data.
+    group : str
+        Device group of the data (e.g. MOS_iv).
+    out_dir : str
+        Output directory of the extracted csv files.
+    store_dir : str
+        Columnar store directory, data aren't stored if None.
+    Returns
+    -------
+    list
+        Names of the extracted csv files.
+    """
+
+    work_dir = tempfile.mkdtemp(prefix=".extract_", dir=out_dir)
+    cwd = os.getcwd()
+
+    try:
+        os.chdir(work_dir)
+        extract_data(excel_path, dev_type)
+        os.chdir(cwd)
+
+        outputs = sorted(os.listdir(work_dir))
+        for name in outputs:
+            os.replace(os.path.join(work_dir, name), os.path.join(out_dir, name))
+
+            if store_dir:
+                out_path = os.path.join(
+                    store_dir, group, f"{os.path.splitext(name)[0]}.parquet"
+                )
+                write_partition(os.path.join(out_dir, name), out_path, group)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return outputs
+
+
+def main(args):
+    """
+    main function to extract measured data of all devices in a manifest.
+
+    Parameters
+    ----------
+    arguments : dict
+        Dictionary that holds the arguments used by user in the run command. This is generated by docopt library.
+    Returns
+    -------
+        None
+    """
+
+    manifest_path = args["--manifest"]
+    data_dir = args["--data_dir"]
+    store_dir = args["--store_dir"]
+    workers_count = (
+        mp.cpu_count() if args["--num_cores"] is None else int(args["--num_cores"])
+    )
+
+    manifest = pd.read_csv(manifest_path)
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    state = {} if args["--force"] else load_state(data_dir)
+    extractor = extractor_hash()
+
+    failed = []
+    jobs = []
+    for _, row in manifest.iterrows():
+        key = (
+            f"{row['group']}/{row['device_type']}/{os.path.basename(row['excel_path'])}"
+        )
+
+        excel_paths = glob.glob(os.path.join(manifest_dir, row["excel_path"]))
+        if not excel_paths:
+            logging.error(f"Provided {row['excel_path']} excel sheet doesn't exist")
+            failed.append(key)
+            continue
+
+        excel_path = excel_paths[0]
+        out_dir = os.path.join(data_dir, row["group"])
+        sheet_hash = file_hash(excel_path)
+
+        last = state.get(key, {})
+        if (
+            last.get("excel_hash") == sheet_hash
+            and last.get("extractor_hash") == extractor
+            and all(os.path.isfile(os.path.join(out_dir, f)) for f in last["outputs"])
+        ):
+            logging.info(f"Skipping {key}, sheet didn't change since last extraction")
+            continue
+
+        os.makedirs(out_dir, exist_ok=True)
+        jobs.append(
+            (key, excel_path, row["device_type"], row["group"], out_dir, sheet_hash)
+        )
+
+    logging.info(
+        f"Extracting {len(jobs)} sheets of {len(manifest)} using {workers_count} workers"
+    )
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers_count) as executor:
+        futures = {
+            executor.submit(
+                extract_sheet, excel_path, dev_type, group, out_dir, store_dir
+            ): (key, sheet_hash)
+            for key, excel_path, dev_type, group, out_dir, sheet_hash in jobs
+        }
+
+        for future in concurrent.futures.as_completed(futures):
+            key, sheet_hash = futures[future]
+            try:
+                outputs = future.result()
+            except Exception as exc:
+                logging.error(f"Extraction of {key} failed: {exc}")
+                failed.append(key)
+                continue
+
+            logging.info(f"Extracted {key} into {', '.join(outputs)}")
+
+            # Saved per sheet, so that an interrupted run keeps extracted sheets
+            state[key] = {
+                "excel_hash": sheet_hash,
+                "extractor_hash": extractor,
+                "outputs": outputs,
+            }
+            save_state(data_dir, state)
+
+    if failed:
+        logging.error(
+            f"Extraction failed for {len(failed)} sheets: {', '.join(failed)}"
+        )
+        exit(1)
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="DATA EXTRACTOR: 0.1")
+
+    # logging setup
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    main(arguments)
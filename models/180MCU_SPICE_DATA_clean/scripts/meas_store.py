@@ -0,0 +1,253 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Columnar store of GF180MCU cleaned measurement data.
+
+Each `gf180mcu_data/<device_group>/<name>.csv` file holds the measured data or sweeps
+of one device and one measurement. It's stored as a typed Parquet partition at
+`gf180mcu_store/<device_group>/<name>.parquet`, measured data is stored with voltages
+rounded and duplicates dropped, as done by the regression scripts.
+
+Usage:
+  meas_store.py [--data_dir=<data_dir>] [--store_dir=<store_dir>] [--group=<group>...]
+
+  --data_dir=<data_dir>           Directory of cleaned data csv files. [default: gf180mcu_data]
+  --store_dir=<store_dir>         Directory of the columnar store. [default: gf180mcu_store]
+  --group=<group>                 Device group to be stored (e.g. MOS_iv), all groups are stored if not given.
+  -h, --help                      Show help text.
+  -v, --version                   Show version.
+"""
+
+from docopt import docopt
+import pandas as pd
+import glob
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_DIR_NAME = "gf180mcu_data"
+STORE_DIR_NAME = "gf180mcu_store"
+
+# Schema metadata key holding the cleaning applied to a partition
+META_KEY = b"gf180mcu"
+
+# Voltages are rounded to eliminate long digits that could cause mismatch
+## between measured and simulated data, as done by FETs regression scripts.
+MEAS_ROUND = {
+    "MOS_iv": {"vbs": 2, "vgs": 2, "vds": 2},
+    "MOS_cv": {"vbs": 2, "vgs": 2, "vds": 2},
+}
+
+
+def store_path(csv_path):
+    """
+    Function to get the store partition path of a cleaned data csv file.
+
+    Parameters
+    ----------
+    csv_path : str
+        Path of csv file in gf180mcu_data directory.
+    Returns
+    -------
+    str
+        Path of Parquet partition in gf180mcu_store directory, None if csv file isn't in gf180mcu_data.
+    """
+
+    csv_path = os.path.normpath(csv_path)
+    group_dir, file_name = os.path.split(csv_path)
+    data_dir, group = os.path.split(group_dir)
+
+    if os.path.basename(data_dir) != DATA_DIR_NAME:
+        return None
+
+    return os.path.join(
+        os.path.dirname(data_dir),
+        STORE_DIR_NAME,
+        group,
+        f"{os.path.splitext(file_name)[0]}.parquet",
+    )
+
+
+def clean_data(df, round_cols=None, dedup=False):
+    """
+    Function to round and drop duplicates of a data frame.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to be cleaned.
+    round_cols : dict
+        Number of decimals per column to be rounded.
+    dedup : bool
+        Drop duplicated rows if True.
+    Returns
+    -------
+    df : pd.DataFrame
+        Cleaned DataFrame.
+    """
+
+    if round_cols:
+        df = df.round(round_cols)
+
+    if dedup:
+        df = df.drop_duplicates()
+
+    return df
+
+
+def write_partition(csv_path, out_path, group):
+    """
+    Function to store a cleaned data csv file as a Parquet partition.
+
+    Parameters
+    ----------
+    csv_path : str
+        Path of csv file to be stored.
+    out_path : str
+        Path of output Parquet file.
+    group : str
+        Device group of the data (e.g. MOS_iv).
+    Returns
+    -------
+    int
+        Number of stored rows.
+    """
+
+    df = pd.read_csv(csv_path)
+
+    # Sweeps are used as is, only measured data are cleaned
+    is_meas = "_meas" in os.path.basename(csv_path)
+    round_cols = MEAS_ROUND.get(group, {}) if is_meas else {}
+    round_cols = {col: dec for col, dec in round_cols.items() if col in df.columns}
+    df = clean_data(df, round_cols, dedup=is_meas)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = {"source": os.path.basename(csv_path), "round": round_cols, "dedup": is_meas}
+    table = table.replace_schema_metadata(
+        {**table.schema.metadata, META_KEY: json.dumps(meta).encode()}
+    )
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = f"{out_path}.tmp{os.getpid()}"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, out_path)
+
+    return len(df)
+
+
+def read_data(csv_path, columns=None, round_cols=None, dedup=False):
+    """
+    Function to read a cleaned data csv file, from its store partition if it's up to date.
+
+    The partition is memory mapped and only the selected columns are decoded.
+    Cleaning already applied while storing isn't repeated.
+
+    Parameters
+    ----------
+    csv_path : str
+        Path of csv file in gf180mcu_data directory.
+    columns : list
+        Columns to be read, all columns are read if not given.
+    round_cols : dict
+        Number of decimals per column to be rounded.
+    dedup : bool
+        Drop duplicated rows if True.
+    Returns
+    -------
+    df : pd.DataFrame
+        DataFrame of the data.
+    """
+
+    round_cols = round_cols or {}
+    part_path = store_path(csv_path)
+
+    if (
+        part_path is None
+        or not os.path.isfile(part_path)
+        or os.path.getmtime(part_path) < os.path.getmtime(csv_path)
+    ):
+        df = pd.read_csv(csv_path, usecols=columns)
+        if columns is not None:
+            df = df[columns]
+        return clean_data(df, round_cols, dedup)
+
+    table = pq.read_table(part_path, columns=columns, memory_map=True)
+    meta = json.loads(table.schema.metadata.get(META_KEY, b"{}"))
+    df = table.to_pandas()
+
+    stored_round = meta.get("round", {})
+    round_cols = {
+        col: dec
+        for col, dec in round_cols.items()
+        if col in df.columns and stored_round.get(col) != dec
+    }
+
+    # Rows of a selected columns subset could be duplicated, even if all columns aren't
+    dedup = dedup and not (meta.get("dedup") and columns is None)
+
+    return clean_data(df, round_cols, dedup)
+
+
+def main(args):
+    """
+    main function to store cleaned measurement data for GF180MCU models.
+
+    Parameters
+    ----------
+    arguments : dict
+        Dictionary that holds the arguments used by user in the run command. This is generated by docopt library.
+    Returns
+    -------
+        None
+    """
+
+    data_dir = args["--data_dir"]
+    store_dir = args["--store_dir"]
+    groups = args["--group"] or sorted(
+        d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))
+    )
+
+    for group in groups:
+        csv_files = sorted(glob.glob(os.path.join(data_dir, group, "*.csv")))
+        if not csv_files:
+            logging.error(f"There is no csv files for {group} group, please recheck")
+            exit(1)
+
+        for csv_path in csv_files:
+            name = os.path.splitext(os.path.basename(csv_path))[0]
+            out_path = os.path.join(store_dir, group, f"{name}.parquet")
+            rows = write_partition(csv_path, out_path, group)
+            logging.info(f"Stored {rows} rows of {csv_path} at {out_path}")
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="DATA STORE: 0.1")
+
+    # logging setup
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    main(arguments)
@@ -0,0 +1,196 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of ngspice backends on mos_id regression netlists.
+
+Renders mos_id netlists for a grid of nfet_03v3 sizes and temperatures, then
+simulates them with `ngspice -b` processes (batch backend) and with the
+shared library worker pool (shared backend), and compares run times and results.
+
+Usage:
+  bench_ngspice_pool.py [--num_cores=<num>] [--netlists=<num>]
+
+  -h, --help                     Show help text.
+  --num_cores=<num>              Number of cores to be used by simulator
+  --netlists=<num>               Number of netlists to be simulated per backend. [default: 64]
+"""
+
+from docopt import docopt
+import pandas as pd
+import numpy as np
+from jinja2 import Template
+import concurrent.futures
+import itertools
+import tempfile
+import time
+import os
+import logging
+import sys
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from regress.backends import NgspiceBackend  # noqa E402
+from regress.ngspice_pool import NgspicePool  # noqa E402
+from regress.runner import ProcessRunner  # noqa E402
+
+WIDTHS = [0.22, 0.5, 1.0, 2.0, 5.0, 10.0, 50.0, 100.0]
+LENGTHS = [0.28, 0.5, 1.0, 3.0, 10.0, 50.0]
+TEMPS = [-40, 25, 125]
+SWEEPS = "vds 0 3.3 0.05 vgs 0 3.3 0.825"
+
+
+def render_netlists(out_dir: str, count: int) -> list:
+    """
+    Renders mos_id netlists for nfet_03v3.
+    Args:
+        out_dir (str): Directory of the netlists and their results.
+        count (int): Number of netlists.
+    Returns:
+        list: Paths of rendered netlists.
+    """
+    testing_dir = os.path.dirname(os.path.abspath(__file__))
+    models_dir = os.path.dirname(testing_dir)
+    netlist_tmp = os.path.join(
+        testing_dir, "regression", "mos_id", "device_netlists_id", "nfet.spice"
+    )
+
+    with open(netlist_tmp) as f:
+        tmpl = Template(f.read())
+
+    netlists = []
+    variations = itertools.cycle(itertools.product(WIDTHS, LENGTHS, TEMPS))
+    for i, (width, length, temp) in zip(range(count), variations):
+        netlist_path = os.path.join(out_dir, f"netlist_{i}.spice")
+        with open(netlist_path, "w") as netlist:
+            netlist.write(
+                tmpl.render(
+                    device="nfet_03v3",
+                    width=width,
+                    length=length,
+                    temp=temp,
+                    corner="typical",
+                    sweeps=SWEEPS,
+                    vds_val=0,
+                    vbs_val=0,
+                    result_path=os.path.join(out_dir, f"simulated_{i}.csv"),
+                    model_card_path=os.path.join(models_dir, "sm141064.ngspice"),
+                    model_design_path=os.path.join(models_dir, "design.ngspice"),
+                )
+            )
+        netlists.append(netlist_path)
+
+    return netlists
+
+
+def run_backend(simulate, netlists: list, workers: int) -> np.ndarray:
+    """
+    Simulates all netlists concurrently, as done by the regression scripts.
+    Args:
+        simulate (callable): Function simulating a netlist.
+        netlists (list): Paths of netlists.
+        workers (int): Number of concurrent simulations.
+    Returns:
+        np.ndarray: Run time of each netlist in seconds.
+    """
+
+    def timed(netlist_path):
+        start = time.perf_counter()
+        simulate(netlist_path)
+        return time.perf_counter() - start
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return np.array(list(executor.map(timed, netlists)))
+
+
+def read_results(out_dir: str, count: int) -> pd.DataFrame:
+    return pd.concat(
+        [
+            pd.read_csv(os.path.join(out_dir, f"simulated_{i}.csv"), delimiter=r"\s+")
+            for i in range(count)
+        ],
+        ignore_index=True,
+    )
+
+
+def main(workers: int, count: int):
+    """
+    Main function of ngspice backends benchmark.
+    Args:
+        workers (int): Number of concurrent simulations.
+        count (int): Number of netlists.
+    """
+    timings = {}
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        netlists = render_netlists(tmp_dir, count)
+
+        start = time.perf_counter()
+        batch = NgspiceBackend(runner=ProcessRunner(workers))
+        per_netlist = run_backend(batch.simulate, netlists, workers)
+        timings["batch"] = (time.perf_counter() - start, per_netlist)
+        results["batch"] = read_results(tmp_dir, count)
+
+        for i in range(count):
+            os.remove(os.path.join(tmp_dir, f"simulated_{i}.csv"))
+
+        # Pool start-up is included, as the regression pays it once per run
+        start = time.perf_counter()
+        with NgspicePool(workers) as pool:
+            per_netlist = run_backend(pool.simulate, netlists, workers)
+        timings["shared"] = (time.perf_counter() - start, per_netlist)
+        results["shared"] = read_results(tmp_dir, count)
+
+    for backend, (total, per_netlist) in timings.items():
+        logging.info(
+            f"{backend:<6} backend: total {total:.2f} s, per netlist mean {per_netlist.mean() * 1e3:.1f} ms, "
+            f"median {np.median(per_netlist) * 1e3:.1f} ms"
+        )
+    logging.info(f"Speedup: {timings['batch'][0] / timings['shared'][0]:.2f}x")
+
+    if np.allclose(results["batch"].values, results["shared"].values, rtol=1e-9):
+        logging.info("Both backends gave the same results")
+    else:
+        logging.error("Backends results mismatch, please recheck")
+        exit(1)
+
+
+# ================================================================
+# -------------------------- MAIN --------------------------------
+# ================================================================
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="NGSPICE-POOL-BENCH: 0.1")
+    workers_count = (
+        os.cpu_count()
+        if arguments["--num_cores"] is None
+        else int(arguments["--num_cores"])
+    )
+
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    main(workers_count, int(arguments["--netlists"]))
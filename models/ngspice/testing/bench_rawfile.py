@@ -0,0 +1,264 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of MOS id/rds regression results parsing, from ascii wrdata files and
+from binary rawfiles.
+
+Result files of all sweeps of the mos_id and mos_rds suites are generated in
+both formats, with the sweep points of each netlist and random currents, so it
+doesn't need ngspice. Parsing is timed as done by the regression: ascii results
+are parsed, rewritten as csv files and merged, binary results are memory mapped.
+
+Usage:
+  bench_rawfile.py [--meas_result=<meas_result>...] [--repeat=<num>] [--work_dir=<dir>]
+
+  --meas_result=<meas_result>    Suites to be benchmarked (Allowed values are id, rds), all suites if not given.
+  --repeat=<num>                 Number of parses per format. [default: 3]
+  --work_dir=<dir>               Directory of generated result files, a temporary directory is used if not given.
+  -h, --help                     Show help text.
+"""
+
+from docopt import docopt
+import pandas as pd
+import numpy as np
+import tempfile
+import logging
+import shutil
+import glob
+import time
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from regress.rawfile import read_rawfile  # noqa E402
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "180MCU_SPICE_DATA_clean",
+    "gf180mcu_data",
+    "MOS_iv",
+)
+
+
+def sweep_points(sweeps: str, const_var: str, const_var_val: float) -> np.ndarray:
+    """
+    Returns vds, vgs and vbs of all points of a nested dc sweep.
+    Args:
+        sweeps (str): dc sweeps, e.g. vds 0.0 3.3 0.05 vgs 0.8 3.3 0.5.
+        const_var (str): Name of the constant voltage.
+        const_var_val (float): Value of the constant voltage.
+    """
+    fields = sweeps.split()
+    axes = {}
+    for i in range(0, len(fields), 4):
+        name, start, stop, step = fields[i], *map(float, fields[i + 1 : i + 4])
+        axes[name] = np.arange(start, stop + step / 2, step)
+
+    # First sweep is the inner loop of ngspice dc analysis
+    names = list(axes)
+    grid = np.meshgrid(*[axes[n] for n in reversed(names)], indexing="ij")
+    values = {n: g.ravel() for n, g in zip(reversed(names), grid)}
+
+    n_points = len(next(iter(values.values())))
+    return np.column_stack(
+        [
+            values.get(v, np.full(n_points, const_var_val if v == const_var else 0.0))
+            for v in ["vds", "vgs", "vbs"]
+        ]
+    )
+
+
+def write_results(path: str, names: list, data: np.ndarray, binary: bool):
+    """
+    Writes results as ngspice does, with its scale vector first.
+    Args:
+        path (str): Output path.
+        names (list): Vectors names, without the scale.
+        data (np.ndarray): Vectors values, one row per point.
+        binary (bool): Writes a binary rawfile if True, wrdata text otherwise.
+    """
+    data = np.column_stack([np.arange(len(data), dtype=float), data])
+    names = ["v-sweep"] + names
+
+    if not binary:
+        np.savetxt(path, data, fmt="% .15e", header=" ".join(names), comments="")
+        return
+
+    header = [
+        "Title: benchmark",
+        "Date: -",
+        "Plotname: DC transfer characteristic",
+        "Flags: real",
+        f"No. Variables: {len(names)}",
+        f"No. Points: {len(data)}",
+        "Variables:",
+    ]
+    header += [f"\t{i}\t{name}\tvoltage" for i, name in enumerate(names)]
+    header += ["Binary:", ""]
+
+    with open(path, "wb") as f:
+        f.write("\n".join(header).encode())
+        f.write(np.ascontiguousarray(data, dtype=np.float64).tobytes())
+
+
+def generate_suite(meas_out_result: str, out_dir: str) -> int:
+    """
+    Generates result files of all sweeps of a suite in both formats.
+    Args:
+        meas_out_result (str): Measurement of the suite, id or rds.
+        out_dir (str): Output directory, holding ascii and binary subdirectories.
+    Returns:
+        int: Number of generated points.
+    """
+    rng = np.random.default_rng(0)
+    n_points = 0
+    names = ["vds", "vgs", "vbs", meas_out_result]
+
+    for sweeps_file in sorted(glob.glob(f"{DATA_DIR}/*_sweeps_{meas_out_result}.csv")):
+        dev = os.path.basename(sweeps_file).split("_sweeps_")[0]
+        for j, row in pd.read_csv(sweeps_file).iterrows():
+            points = sweep_points(row["sweeps"], row["const_var"], row["const_var_val"])
+            data = np.column_stack([points, rng.random(len(points))])
+            n_points += len(points)
+
+            name = f"{dev}_{j}_{meas_out_result}"
+            write_results(f"{out_dir}/ascii/{name}.txt", names, data, False)
+            write_results(f"{out_dir}/binary/{name}.raw", names, data, True)
+
+    return n_points
+
+
+def parse_ascii(out_dir: str, meas_out_result: str) -> pd.DataFrame:
+    """
+    Parses ascii results as done by run_sim and run_sims.
+    Args:
+        out_dir (str): Directory of generated results.
+        meas_out_result (str): Measurement of the suite, id or rds.
+    """
+    csv_dir = f"{out_dir}/csv"
+    os.makedirs(csv_dir, exist_ok=True)
+
+    for result_path in glob.glob(f"{out_dir}/ascii/*_{meas_out_result}.txt"):
+        result_df = pd.read_csv(result_path, delimiter=r"\s+")
+        result_df.drop("v-sweep", axis=1, inplace=True)
+        result_df["W (um)"] = 10.0
+        result_df["L (um)"] = 10.0
+        result_df["corner"] = "typical"
+        result_df["temp"] = 25
+        result_df.to_csv(
+            f"{csv_dir}/{os.path.basename(result_path)}.csv",
+            index=False,
+            header=True,
+            sep=",",
+        )
+
+    run_results_csv = glob.glob(f"{csv_dir}/*_{meas_out_result}.txt.csv")
+    return pd.concat([pd.read_csv(f) for f in run_results_csv], ignore_index=True)
+
+
+def parse_binary(out_dir: str, meas_out_result: str) -> pd.DataFrame:
+    """
+    Parses binary rawfiles as done by run_sim and run_sims.
+    Args:
+        out_dir (str): Directory of generated results.
+        meas_out_result (str): Measurement of the suite, id or rds.
+    """
+    results = []
+    for result_path in glob.glob(f"{out_dir}/binary/*_{meas_out_result}.raw"):
+        plot = read_rawfile(result_path)[0]
+        result_df = pd.DataFrame(
+            {col: plot[col] for col in ["vds", "vgs", "vbs", meas_out_result]}
+        )
+        result_df["W (um)"] = 10.0
+        result_df["L (um)"] = 10.0
+        result_df["corner"] = "typical"
+        result_df["temp"] = 25
+        results.append(result_df)
+
+    return pd.concat(results, ignore_index=True)
+
+
+def dir_size(pattern: str) -> float:
+    """Returns the size of all files matching a pattern, in MB."""
+    return sum(os.path.getsize(f) for f in glob.glob(pattern)) / 1e6
+
+
+def main(args):
+    """
+    Main function of results parsing benchmark.
+    Args:
+        args (dict): Arguments used by user in the run command, generated by docopt.
+    """
+    suites = args["--meas_result"] or ["id", "rds"]
+    repeat = int(args["--repeat"])
+    work_dir = args["--work_dir"] or tempfile.mkdtemp(prefix="bench_rawfile_")
+
+    for sub_dir in ["ascii", "binary"]:
+        os.makedirs(os.path.join(work_dir, sub_dir), exist_ok=True)
+
+    try:
+        for meas_out_result in suites:
+            n_points = generate_suite(meas_out_result, work_dir)
+
+            timings = {}
+            for fmt, parse in [("ascii", parse_ascii), ("binary", parse_binary)]:
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    df = parse(work_dir, meas_out_result)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[fmt] = (best, len(df))
+
+            size_txt = dir_size(f"{work_dir}/ascii/*_{meas_out_result}.txt")
+            size_csv = dir_size(f"{work_dir}/csv/*_{meas_out_result}.txt.csv")
+            size_raw = dir_size(f"{work_dir}/binary/*_{meas_out_result}.raw")
+
+            logging.info(f"mos_{meas_out_result}: {n_points} simulated points")
+            logging.info(
+                f"ascii : parse {timings['ascii'][0]:.3f} s, "
+                f"wrdata {size_txt:.1f} MB + csv {size_csv:.1f} MB"
+            )
+            logging.info(
+                f"binary: parse {timings['binary'][0]:.3f} s, rawfile {size_raw:.1f} MB"
+            )
+            logging.info(
+                f"Speedup: {timings['ascii'][0] / timings['binary'][0]:.2f}x, "
+                f"disk: {(size_txt + size_csv) / size_raw:.2f}x smaller"
+            )
+    finally:
+        if not args["--work_dir"]:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="RAWFILE BENCH: 0.1")
+
+    # logging setup
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    main(arguments)
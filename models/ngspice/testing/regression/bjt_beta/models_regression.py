@@ -13,355 +13,57 @@
 # limitations under the License.
 """
 Usage:
-  models_regression.py [--num_cores=<num>]
+  models_regression.py [--num_cores=<num>] [--backend=<backend>] [--lib_cache=<dir>] [--sim_cache=<dir>] [--fast] [--nice=<num>] [--pin] [--timeout=<sec>]
 
   -h, --help                     Show help text.
   -v, --version                  Show version.
   --num_cores=<num>              Number of cores to be used by simulator
+  --backend=<backend>            Simulation backend (Allowed: batch, shared). batch runs an ngspice process per netlist, shared runs netlists on a pool of ngspice shared library workers. [default: batch]
+  --lib_cache=<dir>              Directory of minimal model card include files, generated per corner and device to replace full model card .lib calls.
+  --sim_cache=<dir>              Directory of simulation outputs stored by hash of netlist, used model card statements and ngspice version. Outputs of unchanged netlists are restored instead of simulated.
+  --fast                         Simulate stratified random samples of the jobs of each device, by corner and temp, until the error quantile is below or above the pass threshold with 95% confidence.
+  --nice=<num>                   Niceness increment of simulator processes. [default: 0]
+  --pin                          Pin each simulator process to its own core.
+  --timeout=<sec>                Time limit of a simulator process, it's killed and its job fails once reached.
 """
 
 from docopt import docopt
-import pandas as pd
-import numpy as np
-from subprocess import check_call, Popen, PIPE
-from jinja2 import Template
-import concurrent.futures
-import shutil
-import glob
-import os
 import logging
-import re
-
-# CONSTANT VALUES
-PASS_THRESH = 5.0
-# === BJT-IV ===
-CLIP_CURR = 10e-9
-MAX_VAL_DETECT = 10e-6  # Max value to detect bad errors above it
-QUANTILE_RATIO = 0.98
-
-
-def check_ngspice_version():
-    """
-    check_ngspice_version checks ngspice version and makes sure it would work with the models.
-    """
-    # ======= Checking ngspice  =======
-    ngspice_v_ = os.popen("ngspice -v").read()
-
-    if "ngspice-" not in ngspice_v_:
-        logging.error("ngspice is not found. Please make sure ngspice is installed.")
-        exit(1)
-    else:
-        version = int(re.search(r"ngspice-([0-9]+)", ngspice_v_).group(1))
-        logging.info(f"Your ngspice version is: ngspice {version}")
-
-        if version <= 37:
-            logging.error(
-                "ngspice version is not supported. Please use ngspice version 38 or newer."
-            )
-            exit(1)
-
-
-def simulate_device(netlist_path: str):
-    """
-    Call simulation commands to perform simulation.
-    Args:
-        file_name (str): Netlist cir for run.
-    Returns:
-        int: Return code of the simulation. 0 if success.  Non-zero if failed.
-    """
-    return os.system(
-        f"ngspice -b {netlist_path} -o {netlist_path}.log > {netlist_path}.log 2>&1"
-    )
-
-
-def run_sim(dirpath: str, device: str, corner: float, temp: float, sweep: str) -> dict:
-    """
-    Function to run simulation for all data points per each variation.
-
-    Parameters
-    ----------
-    dirpath : str or Path
-        Path to the run results directory
-    device : str
-        Device used in regression test
-    temp: float
-        temp value for the current run
-    sweep: float
-        voltage and current sweep used for the current run
-    Returns
-    -------
-    result_df: dict
-        Dataframe contains results for the current run
-    """
-
-    # Get model card path
-    regression_dir = os.path.dirname(os.path.abspath(__file__))
-    models_dir = os.path.dirname(os.path.dirname(os.path.dirname(regression_dir)))
-    model_card_path = os.path.join(models_dir, "sm141064.ngspice")
-    model_design_path = os.path.join(models_dir, "design.ngspice")
-
-    # Select desired nelist templete to be used in the current run
-    netlist_tmp = os.path.join("device_netlists", "bjt_beta.spice")
-
-    # Preparing output directory at which results will be added
-    dev_netlists_path = os.path.join(dirpath, f"{device}_netlists")
-    os.makedirs(dev_netlists_path, exist_ok=True)
-
-    sp_file_name = f"netlist_t{temp}_{corner}.spice"
-    netlist_path = os.path.join(dev_netlists_path, sp_file_name)
-
-    sim_file_name = f"simulated_t{temp}_{corner}.csv"
-    result_path = os.path.join(dev_netlists_path, sim_file_name)
-
-    info = {}
-    info["device"] = device
-    info["temp"] = temp
-    info["corner"] = corner
-
-    # Differientiate between 2 or 3 terminal res
-    if "npn" in device:
-        terminals = "c b 0 0"
-    else:
-        terminals = "c b 0"
-
-    # Generating netlist templates for all variations
-    with open(netlist_tmp) as f:
-        tmpl = Template(f.read())
-        with open(netlist_path, "w") as netlist:
-            netlist.write(
-                tmpl.render(
-                    device=device,
-                    terminals=terminals,
-                    corner=corner,
-                    temp=temp,
-                    sweep=sweep,
-                    result_path=result_path,
-                    model_card_path=model_card_path,
-                    model_design_path=model_design_path,
-                )
-            )
-
-    # Running ngspice for each netlist
-    logging.info(f"Running simulation for {device}-iv at temp={temp}, corner={corner}")
-
-    # calling simulator to run netlist and write its results
-    try:
-        simulate_device(netlist_path)
-        bjt_iv = result_path if os.path.exists(result_path) else np.nan
-    except Exception:
-        bjt_iv = np.nan
-
-    # Cleaning output csv files from simulation results and
-    ## fromating columns to match what we have in measurement
-    if os.path.exists(result_path) and os.path.isfile(result_path):
-        result_df = pd.read_csv(result_path, delimiter=r"\s+")
-        # Drop unwanted columns for simplicity
-        result_df.drop("v-sweep", axis=1, inplace=True)
-
-        # Adding columns for all variations per each run
-        result_df["device_name"] = device
-        result_df["corner"] = corner
-        result_df["temp"] = temp
-
-        # Writing output in clean format in same csv path of resutls
-        result_df.to_csv(result_path, index=False, header=True, sep=",")
+import os
+import sys
 
-    info["ic"] = bjt_iv
+regression_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(
+    0,
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(regression_dir)))),
+)
 
-    return info
+from regress import Engine  # noqa E402
+from regress.families import BjtBetaAdapter  # noqa E402
 
 
-def run_sims(df: pd.DataFrame, dirpath: str) -> pd.DataFrame:
+def main(arguments):
     """
-    Function to run all simulations for all data points and generating results in proper format.
+    Main function for BJT beta regression for GF180MCU models, run by the
+    shared regression engine.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        Data frame contains all points will be used in simulation
-    dirpath : str or Path
-        Output directory for the regresion results
-    Returns
-    -------
-    df: Pd.DataFrame
-        Dataframe contains all simulation results
-    """
-
-    results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers_count) as executor:
-        futures_list = []
-        for j, row in df.iterrows():
-            futures_list.append(
-                executor.submit(
-                    run_sim,
-                    dirpath,
-                    row["device_name"],
-                    row["corner"],
-                    row["temp"],
-                    row["sweep"],
-                )
-            )
-
-        for future in concurrent.futures.as_completed(futures_list):
-            try:
-                data = future.result()
-                results.append(data)
-            except Exception as exc:
-                logging.info("Test case generated an exception: %s" % (exc))
-
-    # Get all simulation generated csv files
-    results_path = os.path.join(dirpath, "*_netlists")
-    run_results_csv = glob.glob(f"{results_path}/*.csv")
-
-    # Merging all simulation results in one dataframe
-    df = pd.concat([pd.read_csv(f) for f in run_results_csv], ignore_index=True)
-
-    return df
-
-
-def main():
-    """
-    Main function for Fets regression for GF180MCU models
+    arguments : dict
+        Arguments used by user in the run command, generated by docopt.
     """
+    engine = Engine.from_args(arguments)
 
     ## Check ngspice version
-    check_ngspice_version()
-
-    # pandas setup
-    pd.set_option("display.max_columns", None)
-    pd.set_option("display.max_rows", None)
-    pd.set_option("max_colwidth", None)
-    pd.set_option("display.width", 1000)
-    pd.options.mode.chained_assignment = None
-
-    main_regr_dir = "run_bjt_beta_regr"
-
-    devices = [
-        # All npn devices [10p00x10p00, 05p00x05p00, 00p54x16p00, 00p54x08p00, 00p54x04p00, 00p54x02p00]
-        "npn",
-        # All pnp devices [10p00x00p42, 05p00x00p42, 10p00x10p00, 05p00x05p00]
-        "pnp",
-    ]
-
-    # Simulate all data points for each device
-    for dev in devices:
-        dev_path = os.path.join(main_regr_dir, dev)
-
-        # Making sure to remove old runs
-        if os.path.exists(dev_path) and os.path.isdir(dev_path):
-            shutil.rmtree(dev_path)
-
-        os.makedirs(dev_path, exist_ok=False)
-
-        logging.info("######" * 10)
-        logging.info(f"# Checking Device {dev}")
-
-        # Loading measured data to be compared
-        meas_data_path = f"../../../../180MCU_SPICE_DATA_clean/gf180mcu_data/BJT_beta/bjt_{dev}_beta_meas.csv"
-
-        if not os.path.exists(meas_data_path) or not os.path.isfile(meas_data_path):
-            logging.error(
-                "There is no measured data to be used in simulation, please recheck"
-            )
-            logging.error(f"{meas_data_path} file doesn't exist, please recheck")
-            exit(1)
+    engine.backend.check_version()
 
-        meas_df = pd.read_csv(meas_data_path)
-        meas_df.drop_duplicates(inplace=True)
-
-        logging.info(
-            f"# Device BJT {dev}-beta number of measured datapoints : {len(meas_df)} "
-        )
-
-        # Loading sweep file used in measurements to be used in simulation for regression
-        sweeps_file = f"../../../../180MCU_SPICE_DATA_clean/gf180mcu_data/BJT_beta/bjt_{dev}_beta_sweeps.csv"
-
-        if not os.path.exists(sweeps_file) or not os.path.isfile(sweeps_file):
-            logging.error(
-                "There is no measured data to be used in simulation, please recheck"
-            )
-            logging.error(f"{sweeps_file} file doesn't exist, please recheck")
-            exit(1)
-
-        df_sweeps = pd.read_csv(sweeps_file)
-        logging.info(f"Data points used in simulation for {dev}:\n {df_sweeps}")
-
-        # Simulating all data points
-        sim_df = run_sims(df_sweeps, dev_path)
-        sim_df.drop_duplicates(inplace=True)
-
-        logging.info(f"# Device {dev} number of simulated datapoints: {len(sim_df)} ")
-
-        # Merging meas and sim dataframe in one
-        full_df = meas_df.merge(
-            sim_df,
-            on=["device_name", "corner", "temp", "vbp", "vcp"],
-            how="left",
-            suffixes=("_meas", "_sim"),
-        )
-
-        # Clipping current values to lowest curr
-        ## We found that most of the curr are in the range of milli-Amps and most of the
-        ## error happens in the off mode of the BJT. And it causes large rmse for the values.
-        ## We will clip at 10nA for all currents to make sure that for small signal it works as expected.
-        full_df["ic_meas"] = full_df["ic_meas"].clip(lower=CLIP_CURR)
-        full_df["ic_sim"] = full_df["ic_sim"].clip(lower=CLIP_CURR)
-        full_df["ib_meas"] = full_df["ib_meas"].clip(lower=CLIP_CURR)
-        full_df["ib_sim"] = full_df["ib_sim"].clip(lower=CLIP_CURR)
-
-        # calc beta for both measured and simulated data
-        ## Beta of BJT is defined as ic/ib
-        full_df["beta_meas"] = full_df["ic_meas"] / full_df["ib_meas"]
-        full_df["beta_sim"] = full_df["ic_sim"] / full_df["ib_sim"]
-
-        # Error calculation and report
-        ## Relative error calculation for BJT-iv
-        full_df["beta_err"] = np.abs(
-            (full_df["beta_meas"] - full_df["beta_sim"])
-            * 100.0
-            / (full_df["beta_meas"])
-        )
-        full_df.to_csv(f"{dev_path}/{dev}_full_merged_data.csv", index=False)
-
-        # Calculate Q [quantile] to verify matching between measured and simulated data
-        ## Refer to https://builtin.com/data-science/boxplot for more details.
-        q_target = full_df["beta_err"].quantile(QUANTILE_RATIO)
-        logging.info(f"Quantile target for {dev} device is: {q_target} %")
-
-        bad_err_full_df_loc = full_df[full_df["beta_err"] > PASS_THRESH]
-        bad_err_full_df = bad_err_full_df_loc[
-            (bad_err_full_df_loc["ic_sim"] >= MAX_VAL_DETECT)
-            | (bad_err_full_df_loc["beta_err"] >= MAX_VAL_DETECT)
-        ]
-        bad_err_full_df.to_csv(f"{dev_path}/{dev}_ic_bad_err.csv", index=False)
-        logging.info(
-            f"Bad relative errors between measured and simulated data at {dev}_ic_bad_err.csv"
-        )
-
-        # calculating the relative error of each device and reporting it
-        min_error_total = float(full_df["beta_err"].min())
-        max_error_total = float(full_df["beta_err"].max())
-        mean_error_total = float(full_df["beta_err"].mean())
-
-        # Cliping relative error at 100%
-        min_error_total = 100 if min_error_total > 100 else min_error_total
-        max_error_total = 100 if max_error_total > 100 else max_error_total
-        mean_error_total = 100 if mean_error_total > 100 else mean_error_total
-
-        # logging relative error
-        logging.info(
-            f"# Device {dev}-beta min error: {min_error_total:.2f} %, max error: {max_error_total:.2f} %, mean error {mean_error_total:.2f} %"
-        )
+    try:
+        passed = BjtBetaAdapter(engine, template_dir=regression_dir).run()
+    finally:
+        engine.close()
 
-        # Verify regression results
-        if q_target <= PASS_THRESH:
-            logging.info(f"# Device {dev}-beta for simulation has passed regression.")
-        else:
-            logging.error(
-                f"# Device {dev}-beta simulation has failed regression. Needs more analysis."
-            )
-            logging.error(f"#Failed regression for {dev}-beta analysis.")
-            # exit(1)
+    if not passed:
+        exit(1)
 
 
 # ================================================================
@@ -372,12 +74,7 @@ def main():
 if __name__ == "__main__":
 
     # Args
-    arguments = docopt(__doc__, version="MODELS-REGRESSION: 0.2")
-    workers_count = (
-        os.cpu_count() * 2
-        if arguments["--num_cores"] is None
-        else int(arguments["--num_cores"])
-    )
+    arguments = docopt(__doc__, version="MODELS-REGRESSION: 0.3")
 
     logging.basicConfig(
         level=logging.DEBUG,
@@ -389,4 +86,4 @@ if __name__ == "__main__":
     )
 
     # Calling main function
-    main()
+    main(arguments)
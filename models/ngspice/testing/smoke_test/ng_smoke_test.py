@@ -29,7 +29,16 @@ from jinja2 import Template
 import concurrent.futures
 import itertools
 from datetime import datetime
-import subprocess
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    ),
+)
+
+from regress import ProcessRunner  # noqa E402
 
 
 def call_simulator(file_name):
@@ -37,12 +46,7 @@ def call_simulator(file_name):
     Args:
         file_name (str): Netlist file name.
     """
-    p = subprocess.Popen(
-        f"ngspice -b -a {file_name} > {file_name}.log 2>&1",
-        shell=True,
-        executable="/bin/bash",
-    )
-    p.wait()
+    runner.run(["ngspice", "-b", "-a", file_name], log_path=f"{file_name}.log")
 
 
 def get_sizes(models_path):
@@ -146,5 +150,8 @@ if __name__ == "__main__":
         else int(arguments["--num_cores"])
     )
 
+    # Simulator processes are capped at the physical cores count
+    runner = ProcessRunner(workers_count)
+
     # Calling main function
     main()
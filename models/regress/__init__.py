@@ -0,0 +1,39 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Regression framework of GF180MCU models.
+
+Device families are adapters of a shared regression flow, their simulations
+are run by one engine owning the simulator backend, the simulation outputs
+cache, the minimal model card include files and the streaming merge of results.
+
+Only the ngspice regression scripts run family adapters. The Xyce regression
+scripts keep their own netlist rendering, merge and analysis, they only use
+XyceBackend to check the Xyce version and run netlists, with the process
+runner, telemetry and data helpers of this package.
+"""
+
+from .adapter import DeviceAdapter, PASS_THRESH
+from .adaptive import coarse_sweep, refine_ranges
+from .backends import NgspiceBackend, SimResult, XyceBackend
+from .curve_align import align_dc_sweeps, interp_curves
+from .engine import Engine
+from .excel_cache import read_excel_cached
+from .xyce_step import split_steps, step_temps
+from .runner import ProcessRunner
+from .families import FAMILIES
+from .montecarlo import RunningStats
+from .sampling import JobSampler
+from .scheduler import Scheduler
+from .telemetry import Telemetry
@@ -0,0 +1,131 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Runs GF180MCU models regression of many device families on one engine, sharing
+its simulator backend and caches. Jobs of all families are scheduled together,
+longest first using the job durations of previous runs. Run it from the models
+directory.
+
+Usage:
+  regress (--all | --family=<family>...) [--run_dir=<dir>] [--num_cores=<num>] [--backend=<backend>] [--lib_cache=<dir>] [--sim_cache=<dir>] [--pack_size=<num>] [--output_format=<fmt>] [--adaptive] [--fast] [--schedule=<mode>] [--history=<file>] [--nice=<num>] [--pin] [--timeout=<sec>]
+  regress --list
+
+  -h, --help                     Show help text.
+  -v, --version                  Show version.
+  --all                          Run all device families.
+  --family=<family>              Device family to be run, use --list to get allowed families.
+  --list                         List device families.
+  --run_dir=<dir>                Directory of regression results, a directory per family is created in it. [default: regress_run]
+  --num_cores=<num>              Max number of concurrent simulator processes, capped at the physical cores count which is used by default.
+  --backend=<backend>            Simulation backend (Allowed: batch, shared). batch runs an ngspice process per netlist, shared runs netlists on a pool of ngspice shared library workers. [default: batch]
+  --lib_cache=<dir>              Directory of minimal model card include files, generated per corner and device to replace full model card .lib calls.
+  --sim_cache=<dir>              Directory of simulation outputs stored by hash of netlist, used model card statements and ngspice version. Outputs of unchanged netlists are restored instead of simulated.
+  --pack_size=<num>              Max number of W/L variations sharing corner, temp and sweeps that are packed in one netlist, used by mos_id and mos_rds. [default: 1]
+  --output_format=<fmt>          Format of simulation results (Allowed: ascii, binary), used by mos_id and mos_rds. [default: ascii]
+  --adaptive                     Simulate sweeps on a coarse grid and refine them where curves bend or errors are near the pass threshold, used by mos_id.
+  --fast                         Simulate stratified random samples of the jobs of each device, by corner and temp, until the error quantile is below or above the pass threshold with 95% confidence.
+  --schedule=<mode>              Jobs scheduling (Allowed: global, family). global runs jobs of all families together, family runs families one after the other and records their run times as reference of the global schedule. [default: global]
+  --history=<file>               JSON file of job and family durations of previous runs, used to run longest jobs first. [default: <run_dir>/durations.json]
+  --nice=<num>                   Niceness increment of simulator processes. [default: 0]
+  --pin                          Pin each simulator process to its own core.
+  --timeout=<sec>                Time limit of a simulator process, it's killed and its job fails once reached.
+"""
+
+from docopt import docopt
+import logging
+import os
+
+from .engine import Engine
+from .families import FAMILIES
+from .scheduler import Scheduler
+
+
+def main(arguments: dict) -> int:
+    """
+    Main function of the regress command.
+    Args:
+        arguments (dict): Arguments used by user in the run command, generated by docopt.
+    Returns:
+        int: Exit code, 1 if any family failed regression.
+    """
+    if arguments["--list"]:
+        for name, adapter in FAMILIES.items():
+            logging.info(f"{name:<12} {len(adapter.devices)} devices")
+        return 0
+
+    families = list(FAMILIES) if arguments["--all"] else arguments["--family"]
+    unknown = [name for name in families if name not in FAMILIES]
+    if unknown:
+        logging.error(
+            f"{', '.join(unknown)} families are not supported, allowed families are [{', '.join(FAMILIES)}], please recheck"
+        )
+        return 1
+
+    if arguments["--schedule"] not in ["global", "family"]:
+        logging.error(
+            f"{arguments['--schedule']} scheduling is not supported, allowed modes are [global, family], please recheck"
+        )
+        return 1
+
+    history_path = arguments["--history"]
+    if history_path == "<run_dir>/durations.json":
+        history_path = os.path.join(arguments["--run_dir"], "durations.json")
+    os.makedirs(os.path.dirname(os.path.abspath(history_path)), exist_ok=True)
+
+    engine = Engine.from_args(arguments)
+    engine.backend.check_version()
+
+    try:
+        adapters = [
+            FAMILIES[name](engine, run_dir=os.path.join(arguments["--run_dir"], name))
+            for name in families
+        ]
+        results = Scheduler(engine, history_path).run(
+            adapters, per_family=arguments["--schedule"] == "family"
+        )
+    finally:
+        engine.close()
+        engine.telemetry.write(os.path.join(arguments["--run_dir"], "telemetry.json"))
+
+    failed = [name for name, passed in results.items() if not passed]
+
+    if failed:
+        logging.error(f"Failed regression for families: {', '.join(failed)}")
+        return 1
+
+    logging.info(f"All {len(families)} families have passed regression.")
+    return 0
+
+
+# ================================================================
+# -------------------------- MAIN --------------------------------
+# ================================================================
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="REGRESS: 0.1")
+
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    exit(main(arguments))
@@ -0,0 +1,539 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Device adapters of GF180MCU models regression.
+
+An adapter holds what is specific to a device family: its devices, measured
+data, netlist templates and how simulated results are compared to measured
+ones. The regression flow shared by all families is implemented once by
+DeviceAdapter, each family overrides the steps it needs.
+"""
+
+from abc import ABC, abstractmethod
+from functools import partial
+from jinja2 import Template
+import json
+import pandas as pd
+import numpy as np
+import logging
+import shutil
+import sys
+import os
+
+from .model_lib_index import write_atomic
+from .sampling import JobSampler
+
+MODELS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(MODELS_DIR, "180MCU_SPICE_DATA_clean", "gf180mcu_data")
+NGSPICE_DIR = os.path.join(MODELS_DIR, "ngspice")
+
+sys.path.append(os.path.join(MODELS_DIR, "180MCU_SPICE_DATA_clean", "scripts"))
+
+from meas_store import read_data  # noqa E402
+
+# CONSTANT VALUES
+PASS_THRESH = 5.0
+
+
+def setup_pandas():
+    """Sets pandas options used by regression logs."""
+    pd.set_option("display.max_columns", None)
+    pd.set_option("display.max_rows", None)
+    pd.set_option("max_colwidth", None)
+    pd.set_option("display.width", 1000)
+    pd.options.mode.chained_assignment = None
+
+
+def read_wrdata(result_path: str) -> pd.DataFrame:
+    """
+    Reads results written by ngspice `wrdata` with `set wr_vecnames`.
+    Args:
+        result_path (str): Path of the results file.
+    Returns:
+        pd.DataFrame: Results without the sweep scale column.
+    """
+    result_df = pd.read_csv(result_path, delimiter=r"\s+")
+    # Drop unwanted columns for simplicity
+    result_df.drop("v-sweep", axis=1, inplace=True)
+    return result_df
+
+
+class DeviceAdapter(ABC):
+    """
+    Regression of a device family against its measured data.
+
+    Args:
+        engine (Engine): Engine running the simulations.
+        template_dir (str): Directory of the family netlist templates, the family
+            regression directory if not given.
+        run_dir (str): Directory of the regression results.
+    """
+
+    # Name of the family, used by the regress command
+    name = ""
+    # Regression directory of the family, holding its netlist templates
+    group = ""
+    # Results directory of the family, in the run directory
+    main_regr_dir = ""
+    devices = []
+    # Measured data directory, in gf180mcu_data
+    data_dir = ""
+    model_card = "sm141064.ngspice"
+
+    # Compared column and columns identifying a data point
+    column = ""
+    keys = []
+    # Columns of the measured points of a simulated curve, the keys if not set
+    curve_keys = None
+    # Columns rounded in simulated results, to match measured data
+    round_cols = None
+    # Lowest value of the compared column, not clipped if not set
+    clip = None
+    quantile = 0.98
+    # Max value to detect bad errors above it
+    max_val_detect = 0.0
+    # Columns checked against max_val_detect in bad errors
+    bad_err_cols = None
+    bad_err_file = "{device}_bad_err.csv"
+    full_data_file = "{device}_full_merged_data.csv"
+    telemetry_file = "{device}_telemetry.json"
+    fast_file = "{device}_fast.json"
+    # Job keys of the strata sampled in fast mode
+    strata = ["corner", "temp"]
+    # Failed regressions stop the family and fail the run
+    exit_on_fail = True
+
+    def __init__(self, engine, template_dir: str = None, run_dir: str = "."):
+        self.engine = engine
+        self.template_dir = template_dir or os.path.join(
+            NGSPICE_DIR, "testing", "regression", self.group
+        )
+        self.run_dir = run_dir
+
+    # ------------------------------------------------------------------
+    # Paths and netlists
+    # ------------------------------------------------------------------
+
+    def cases(self) -> list:
+        """
+        Returns the regression cases of the family, one per device by default.
+        Each case is a dict holding at least device, label and dev_path, and the
+        compared column if it isn't the family one.
+        """
+        return [
+            {
+                "device": dev,
+                "label": dev,
+                "dev_path": os.path.normpath(
+                    os.path.join(self.run_dir, self.main_regr_dir, dev)
+                ),
+            }
+            for dev in self.devices
+        ]
+
+    def data_path(self, file_name: str) -> str:
+        """
+        Returns the path of a measured data file, exits if it doesn't exist.
+        Args:
+            file_name (str): File name in the family data directory.
+        """
+        path = os.path.join(DATA_DIR, self.data_dir, file_name)
+
+        if not os.path.exists(path) or not os.path.isfile(path):
+            logging.error(
+                "There is no measured data to be used in simulation, please recheck"
+            )
+            logging.error(f"{path} file doesn't exist, please recheck")
+            exit(1)
+
+        return path
+
+    def netlists_dir(self, case: dict, device: str = None) -> str:
+        """
+        Returns the directory of netlists and results of a device, created if needed.
+        Args:
+            case (dict): Regression case.
+            device (str): Simulated device, the case device if not given.
+        """
+        device = device or case["device"]
+        dev_netlists_path = os.path.join(case["dev_path"], f"{device}_netlists")
+        os.makedirs(dev_netlists_path, exist_ok=True)
+        return dev_netlists_path
+
+    def render(self, template: str, netlist_path: str, **params):
+        """
+        Renders a netlist template of the family.
+        Args:
+            template (str): Template path, relative to the template directory.
+            netlist_path (str): Path of the rendered netlist.
+            params: Template parameters, model card paths are added.
+        """
+        with self.engine.telemetry.phase("render"):
+            with open(os.path.join(self.template_dir, template)) as f:
+                tmpl = Template(f.read())
+
+            with open(netlist_path, "w") as netlist:
+                netlist.write(
+                    tmpl.render(
+                        model_card_path=os.path.join(NGSPICE_DIR, self.model_card),
+                        model_design_path=os.path.join(NGSPICE_DIR, "design.ngspice"),
+                        **params,
+                    )
+                )
+
+    # ------------------------------------------------------------------
+    # Regression steps, overridden by device families
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        """Returns measured data of a case."""
+
+    def load_sweeps(self, case: dict, meas_df: pd.DataFrame) -> pd.DataFrame:
+        """Returns the sweeps of a case, each row is simulated by a job."""
+        return meas_df
+
+    def jobs(self, case: dict, sweeps_df: pd.DataFrame) -> list:
+        """Returns the simulation jobs of a case, one per sweeps row by default."""
+        return sweeps_df.to_dict("records")
+
+    @abstractmethod
+    def run_sim(self, case: dict, job: dict):
+        """
+        Runs the simulation of a job.
+        Returns:
+            pd.DataFrame: Results of the job, None if it failed. Jobs simulating many
+                variations return a list of frames.
+        """
+
+    def error_fn(self, case: dict, meas_df: pd.DataFrame):
+        """
+        Returns the function of results to their relative error, for progress logs
+        and fast mode. Results are merged with the measured points of their curves
+        by the family merge, so errors are the ones evaluated at the end.
+        """
+        col = case.get("column", self.column)
+        curve_keys = self.curve_keys or self.keys
+
+        def errors(sim_df: pd.DataFrame) -> np.ndarray:
+            sim_df = self.post_sim(case, sim_df.copy())
+            points = meas_df.merge(sim_df[curve_keys].drop_duplicates(), on=curve_keys)
+            full_df = self.merge(case, points, sim_df)
+            return full_df[f"{col}_err"].to_numpy(dtype=float)
+
+        return errors
+
+    def job_points(self, case: dict, meas_df: pd.DataFrame, jobs: list) -> pd.DataFrame:
+        """
+        Returns the measured points simulated by jobs, matched on the family keys
+        held by all jobs. All points are returned if jobs hold none of the keys.
+        Args:
+            case (dict): Regression case.
+            meas_df (pd.DataFrame): Measured data of the case.
+            jobs (list): Simulated jobs of the case.
+        """
+        cols = [
+            k
+            for k in self.keys
+            if k in meas_df.columns
+            and all(isinstance(job, dict) and k in job for job in jobs)
+        ]
+        if not jobs or not cols:
+            return meas_df
+
+        jobs_df = pd.DataFrame([[job[k] for k in cols] for job in jobs], columns=cols)
+        return meas_df.merge(jobs_df.drop_duplicates(), on=cols)
+
+    def post_sim(self, case: dict, sim_df: pd.DataFrame) -> pd.DataFrame:
+        """Formats merged simulation results to be compared with measured data."""
+        if self.round_cols:
+            # Simulator uses small values instead of 0 [10e-16 for example]
+            sim_df = sim_df.round(self.round_cols)
+        sim_df.drop_duplicates(inplace=True)
+        return sim_df
+
+    def merge(
+        self, case: dict, meas_df: pd.DataFrame, sim_df: pd.DataFrame
+    ) -> pd.DataFrame:
+        """Merges measured and simulated data, with the relative error of each point."""
+        full_df = meas_df.merge(
+            sim_df, on=self.keys, how="left", suffixes=("_meas", "_sim")
+        )
+        return self.add_error(case, full_df)
+
+    def add_error(self, case: dict, full_df: pd.DataFrame) -> pd.DataFrame:
+        """Clips merged measured and simulated data and adds the relative error of each point."""
+        col = case.get("column", self.column)
+
+        # Clipping values to lowest value
+        if self.clip is not None:
+            full_df[f"{col}_meas"] = full_df[f"{col}_meas"].clip(lower=self.clip)
+            full_df[f"{col}_sim"] = full_df[f"{col}_sim"].clip(lower=self.clip)
+
+        full_df[f"{col}_err"] = np.abs(
+            (full_df[f"{col}_meas"] - full_df[f"{col}_sim"])
+            * 100.0
+            / full_df[f"{col}_meas"]
+        )
+        return full_df
+
+    def evaluate(self, case: dict, meas_df: pd.DataFrame, sim_df: pd.DataFrame) -> bool:
+        """
+        Compares simulated data to measured data and reports errors of a case.
+        Returns:
+            bool: True if the case passed regression.
+        """
+        dev = case["device"]
+        label = case["label"]
+        dev_path = case["dev_path"]
+        col = case.get("column", self.column)
+
+        full_df = self.merge(case, meas_df, sim_df)
+        full_df.to_csv(
+            os.path.join(dev_path, self.full_data_file.format(**case)), index=False
+        )
+
+        missing = int(full_df[f"{col}_sim"].isna().sum())
+        if missing:
+            logging.warning(
+                f"# Device {label} {missing} measured points out of simulated data"
+            )
+
+        # Calculate Q [quantile] to verify matching between measured and simulated data
+        ## Refer to https://builtin.com/data-science/boxplot for more details.
+        q_target = full_df[f"{col}_err"].quantile(self.quantile)
+        logging.info(f"Quantile target for {dev} device is: {q_target} %")
+
+        bad_err_cols = self.bad_err_cols or [f"{col}_sim", f"{col}_meas"]
+        bad_err_full_df_loc = full_df[full_df[f"{col}_err"] > PASS_THRESH]
+        bad_err_full_df = bad_err_full_df_loc[
+            (bad_err_full_df_loc[bad_err_cols[0]] >= self.max_val_detect)
+            | (bad_err_full_df_loc[bad_err_cols[1]] >= self.max_val_detect)
+        ]
+        bad_err_file = self.bad_err_file.format(**case)
+        bad_err_full_df.to_csv(os.path.join(dev_path, bad_err_file), index=False)
+        logging.info(
+            f"Bad relative errors between measured and simulated data at {bad_err_file}"
+        )
+
+        # calculating the relative error of each device and reporting it
+        min_error_total = float(full_df[f"{col}_err"].min())
+        max_error_total = float(full_df[f"{col}_err"].max())
+        mean_error_total = float(full_df[f"{col}_err"].mean())
+
+        # Cliping relative error at 100%
+        min_error_total = 100 if min_error_total > 100 else min_error_total
+        max_error_total = 100 if max_error_total > 100 else max_error_total
+        mean_error_total = 100 if mean_error_total > 100 else mean_error_total
+
+        # logging relative error
+        logging.info(
+            f"# Device {label} min error: {min_error_total:.2f} %, max error: {max_error_total:.2f} %, mean error {mean_error_total:.2f} %"
+        )
+
+        # Verify regression results
+        if q_target <= PASS_THRESH:
+            logging.info(f"# Device {label} simulation has passed regression.")
+            return True
+
+        logging.error(
+            f"# Device {label} simulation has failed regression. Needs more analysis."
+        )
+        logging.error(f"#Failed regression for {label} analysis.")
+        return False
+
+    # ------------------------------------------------------------------
+    # Regression flow
+    # ------------------------------------------------------------------
+
+    def prepare_case(self, case: dict):
+        """
+        Cleans the case results directory and loads its measured data and jobs.
+        Args:
+            case (dict): Regression case, as returned by cases.
+        Returns:
+            tuple: Measured data, jobs to be run and their relative error function.
+        """
+        dev_path = case["dev_path"]
+
+        # Making sure to remove old runs
+        if os.path.exists(dev_path) and os.path.isdir(dev_path):
+            shutil.rmtree(dev_path)
+
+        os.makedirs(dev_path, exist_ok=False)
+
+        logging.info("######" * 10)
+        logging.info(f"# Checking Device {case['label']}")
+
+        meas_df = self.load_meas(case)
+        if meas_df is not None:
+            logging.info(
+                f"# Device {case['label']} number of measured datapoints : {len(meas_df)} "
+            )
+
+        sweeps_df = self.load_sweeps(case, meas_df)
+        logging.info(
+            f"# Device {case['label']} number of sweeps (runs) : {len(sweeps_df)} "
+        )
+
+        # Relative error of simulated points, reported while simulations complete
+        error_fn = None if meas_df is None else self.error_fn(case, meas_df)
+
+        return meas_df, self.jobs(case, sweeps_df), error_fn
+
+    def sampler(self, case: dict, jobs: list, error_fn) -> JobSampler:
+        """
+        Returns the sampler of the case jobs in fast mode.
+        Args:
+            case (dict): Regression case, as returned by cases.
+            jobs (list): Jobs of the case.
+            error_fn (callable): Function of results to their relative error.
+        Returns:
+            JobSampler: Sampler of the jobs, None if all jobs are run.
+        """
+        if not self.engine.fast or error_fn is None:
+            return None
+        return JobSampler(
+            jobs,
+            error_fn,
+            self.quantile,
+            PASS_THRESH,
+            strata=self.strata,
+            seed=case["label"],
+        )
+
+    def finish_case(
+        self,
+        case: dict,
+        meas_df: pd.DataFrame,
+        sim_df: pd.DataFrame,
+        sampler: JobSampler = None,
+    ) -> bool:
+        """
+        Evaluates the merged simulation results of a case and writes its
+        performance telemetry.
+        Args:
+            case (dict): Regression case, as returned by cases.
+            meas_df (pd.DataFrame): Measured data of the case.
+            sim_df (pd.DataFrame): Merged results of all the case jobs.
+            sampler (JobSampler): Sampler of the case jobs in fast mode, only the
+                measured points of its sampled jobs are evaluated.
+        Returns:
+            bool: True if the case passed regression, the sampler verdict once it
+                is known in fast mode.
+        """
+        if sampler is not None:
+            # Points of jobs that weren't sampled have no simulated data
+            meas_df = self.job_points(case, meas_df, sampler.run_jobs)
+
+        telemetry = self.engine.telemetry
+        with telemetry.case(case["dev_path"]), telemetry.phase("analysis"):
+            sim_df = self.post_sim(case, sim_df)
+
+            logging.info(
+                f"# Device {case['label']} number of simulated datapoints : {len(sim_df)} "
+            )
+
+            passed = evaluated = self.evaluate(case, meas_df, sim_df)
+
+            if sampler is not None:
+                # Verdict of the error quantile interval, weighted by strata
+                verdict = sampler.verdict()
+                if verdict is not None:
+                    passed = verdict
+                if passed != evaluated:
+                    logging.info(
+                        f"# Device {case['label']} fast mode verdict: {'passed' if passed else 'failed'} regression"
+                    )
+                write_atomic(
+                    os.path.join(case["dev_path"], self.fast_file.format(**case)),
+                    json.dumps(
+                        {
+                            **sampler.report(),
+                            "sampled_points_passed": bool(evaluated),
+                            "passed": bool(passed),
+                        },
+                        indent=2,
+                    ).encode(),
+                )
+
+        telemetry.write(
+            os.path.join(case["dev_path"], self.telemetry_file.format(**case)),
+            case["dev_path"],
+        )
+        return passed
+
+    def run_case(self, case: dict) -> bool:
+        """
+        Runs the regression of a case.
+        Args:
+            case (dict): Regression case, as returned by cases.
+        Returns:
+            bool: True if the case passed regression.
+        """
+        meas_df, jobs, error_fn = self.prepare_case(case)
+
+        sampler = self.sampler(case, jobs, error_fn)
+        if sampler is None:
+            sim_df = self.engine.run(
+                partial(self.run_sim, case),
+                jobs,
+                case["label"],
+                error_fn,
+                self.quantile,
+                case["dev_path"],
+            )
+            return self.finish_case(case, meas_df, sim_df)
+
+        # Rounds of sampled jobs are run until the verdict is known
+        sim_dfs = []
+        run_sim = partial(sampler.wrap(self.run_sim), case)
+        for round_jobs in iter(sampler.next_round, []):
+            sim_dfs.append(
+                self.engine.run(
+                    run_sim,
+                    round_jobs,
+                    case["label"],
+                    sampler.frame_errors,
+                    self.quantile,
+                    case["dev_path"],
+                )
+            )
+            sampler.log(case["label"])
+
+        sim_dfs = [df for df in sim_dfs if len(df)]
+        sim_df = pd.concat(sim_dfs, ignore_index=True) if sim_dfs else pd.DataFrame()
+        return self.finish_case(case, meas_df, sim_df, sampler)
+
+    def run(self) -> bool:
+        """
+        Runs the regression of all cases of the family.
+        Returns:
+            bool: True if all cases passed regression.
+        """
+        setup_pandas()
+
+        passed = True
+        for case in self.cases():
+            if self.run_case(case):
+                continue
+
+            passed = passed and not self.exit_on_fail
+            if self.exit_on_fail:
+                break
+
+        self.engine.telemetry.write(
+            os.path.join(self.run_dir, self.main_regr_dir, "telemetry.json")
+        )
+        return passed
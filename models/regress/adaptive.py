@@ -0,0 +1,158 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Adaptive DC sweeps of GF180MCU models regression.
+
+Measured sweeps are dense everywhere, while most of a device curve is smooth
+enough to be interpolated from a few points. A sweep is first simulated on a
+coarse grid of its inner swept bias, then only the coarse intervals where the
+curve bends or where the error against measured data is near the pass
+threshold are simulated again on the measured grid. Elsewhere the linear
+interpolation error of the coarse curve is below the refine tolerance, so it
+can't move a point error across the threshold.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def sweep_axes(sweeps: str) -> list:
+    """
+    Returns the axes of a DC sweep, as `<name> <start> <stop> <step>` groups.
+    Args:
+        sweeps (str): DC sweep, inner axis first.
+    Returns:
+        list: Name, start, stop and step of each axis.
+    """
+    fields = sweeps.split()
+    return [
+        (fields[i].lower(), *[float(v) for v in fields[i + 1 : i + 4]])
+        for i in range(0, len(fields) - 3, 4)
+    ]
+
+
+def format_sweeps(axes: list) -> str:
+    """
+    Returns a DC sweep of axes, as returned by sweep_axes.
+    Args:
+        axes (list): Name, start, stop and step of each axis.
+    """
+    return " ".join(
+        f"{name} {start:.10g} {stop:.10g} {step:.10g}"
+        for name, start, stop, step in axes
+    )
+
+
+def grid_size(start: float, stop: float, step: float) -> int:
+    """Returns the number of intervals of a swept axis."""
+    return max(int(round((stop - start) / step)), 0)
+
+
+def coarse_sweep(sweeps: str, factor: int) -> tuple:
+    """
+    Returns a DC sweep whose inner axis is coarser, with the same end points.
+    Args:
+        sweeps (str): DC sweep, inner axis first.
+        factor (int): Max ratio of the coarse step to the sweep step, the
+            largest divisor of the intervals count below it is used.
+    Returns:
+        tuple: Coarse DC sweep and its step ratio.
+    """
+    axes = sweep_axes(sweeps)
+    name, start, stop, step = axes[0]
+    n = grid_size(start, stop, step)
+    ratio = max([f for f in range(1, max(factor, 1) + 1) if n and n % f == 0] or [1])
+    axes[0] = (name, start, stop, step * ratio)
+    return format_sweeps(axes), ratio
+
+
+def sub_sweep(sweeps: str, start: float, stop: float) -> str:
+    """
+    Returns a DC sweep whose inner axis is limited to a range.
+    Args:
+        sweeps (str): DC sweep, inner axis first.
+        start (float): Start of the range.
+        stop (float): Stop of the range.
+    """
+    axes = sweep_axes(sweeps)
+    axes[0] = (axes[0][0], start, stop, axes[0][3])
+    return format_sweeps(axes)
+
+
+def refine_ranges(
+    sim_df: pd.DataFrame,
+    sweeps: str,
+    column: str,
+    tol: float,
+    floor: float = 0.0,
+    err_x: np.ndarray = None,
+) -> list:
+    """
+    Returns the ranges of a coarse sweep to be simulated on the measured grid.
+    A coarse interval is refined if the linear interpolation error estimated
+    from the second difference of any curve around it is above tol, or if it
+    holds points whose error against measured data is near the pass threshold.
+    Args:
+        sim_df (pd.DataFrame): Results of the coarse sweep.
+        sweeps (str): Coarse DC sweep, inner axis first.
+        column (str): Simulated column.
+        tol (float): Max interpolation error (%) of a coarse interval.
+        floor (float): Lowest magnitude of values the error is relative to.
+        err_x (np.ndarray): Inner bias of measured points whose error is near the
+            pass threshold.
+    Returns:
+        list: Start and stop of each range, in sweep direction.
+    """
+    axes = sweep_axes(sweeps)
+    name, start, stop, step = axes[0]
+    n = grid_size(start, stop, step)
+    if n == 0:
+        return []
+    flags = np.zeros(n, dtype=bool)
+
+    if len(axes) > 1:
+        curves = [curve for _, curve in sim_df.groupby(sim_df[axes[1][0]].round(6))]
+    else:
+        curves = [sim_df]
+
+    for curve in curves:
+        idx = np.round((curve[name].to_numpy(dtype=float) - start) / step).astype(int)
+        y = np.full(n + 1, np.nan)
+        ok = (idx >= 0) & (idx <= n)
+        y[idx[ok]] = curve[column].to_numpy(dtype=float)[ok]
+
+        # Max error of linear interpolation is about an eighth of the second difference
+        bend = np.abs(y[:-2] - 2 * y[1:-1] + y[2:]) / 8.0
+        with np.errstate(invalid="ignore"):
+            bent = bend > tol / 100.0 * np.maximum(np.abs(y[1:-1]), floor)
+        bent = np.nonzero(bent)[0]
+        flags[bent] = True
+        flags[bent + 1] = True
+
+        # Points missing in the coarse results are simulated again
+        missing = np.nonzero(np.isnan(y))[0]
+        flags[np.clip(missing - 1, 0, n - 1)] = True
+        flags[np.clip(missing, 0, n - 1)] = True
+
+    if err_x is not None and len(err_x):
+        pos = np.floor((np.asarray(err_x, dtype=float) - start) / step + 1e-9)
+        flags[np.clip(pos.astype(int), 0, n - 1)] = True
+
+    ranges = []
+    for i in np.nonzero(flags)[0]:
+        if ranges and ranges[-1][1] == i:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+    return [(start + a * step, start + b * step) for a, b in ranges]
@@ -0,0 +1,379 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Simulator backends of GF180MCU models regression.
+
+A backend checks its simulator version and runs one netlist at a time, its
+simulate method is called concurrently by the regression engine threads.
+Simulator processes are run by a ProcessRunner, which bounds how many of them
+run at a time.
+"""
+
+from subprocess import CalledProcessError
+import contextlib
+import csv
+import logging
+import re
+import shutil
+import threading
+
+from .ngspice_pool import NgspicePool
+from .runner import ProcessRunner
+
+ERROR_RE = re.compile(r"\berror\b|\babort", re.IGNORECASE)
+
+
+def version_output(args: list) -> str:
+    """
+    Returns the output of a simulator version command, empty if it isn't found.
+    Args:
+        args (list): Version command of the simulator.
+    """
+    result = ProcessRunner(1).run(args)
+    return "" if result.returncode is None else result.stdout
+
+
+class NgspiceBackend:
+    """
+    ngspice simulator, running an `ngspice -b` process per netlist or a pool of
+    ngspice shared library workers.
+
+    Args:
+        shared_workers (int): Number of ngspice shared library workers, netlists
+            are run in batch mode if not given.
+        runner (ProcessRunner): Runner of ngspice batch processes, bounded by the
+            physical cores count if not given.
+    """
+
+    name = "ngspice"
+    min_version = 38
+
+    def __init__(self, shared_workers: int = None, runner: ProcessRunner = None):
+        self.pool = NgspicePool(shared_workers) if shared_workers else None
+        self.runner = runner or ProcessRunner()
+
+    @staticmethod
+    def version_text() -> str:
+        """Returns the output of `ngspice -v`, empty if ngspice isn't found."""
+        return version_output(["ngspice", "-v"])
+
+    def check_version(self):
+        """
+        Checks ngspice version and makes sure it would work with the models.
+        """
+        ngspice_v_ = self.version_text()
+
+        if "ngspice-" not in ngspice_v_:
+            logging.error(
+                "ngspice is not found. Please make sure ngspice is installed."
+            )
+            exit(1)
+
+        version = int(re.search(r"ngspice-([0-9]+)", ngspice_v_).group(1))
+        logging.info(f"Your ngspice version is: ngspice {version}")
+
+        if version < self.min_version:
+            logging.error(
+                f"ngspice version is not supported. Please use ngspice version {self.min_version} or newer."
+            )
+            exit(1)
+
+    def simulate(self, netlist_path: str) -> int:
+        """
+        Runs a netlist, its output is logged to `<netlist>.log`.
+        Args:
+            netlist_path (str): Netlist to be simulated.
+        Returns:
+            int: Return code of the simulation. 0 if success.  Non-zero if failed.
+        """
+        if self.pool is not None:
+            return self.pool.simulate(netlist_path)
+
+        result = self.runner.run(
+            ["ngspice", "-b", netlist_path, "-o", f"{netlist_path}.log"]
+        )
+
+        # Errors printed out of the ngspice log are kept next to it
+        if result.stderr:
+            with open(f"{netlist_path}.log", "a") as f:
+                f.write(result.stderr)
+
+        result.check()
+        return result.returncode
+
+    def close(self):
+        """Stops shared library workers if any."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+class SimResult:
+    """
+    Outcome of a simulation.
+
+    Args:
+        netlist_path (str): Simulated netlist.
+        log_path (str): Simulator log of the netlist.
+        mode (str): serial, or mpi if run by parallel processes.
+        procs (int): Number of simulator processes.
+        returncode (int): Exit status, None if the simulation timed out.
+        duration (float): Run time (s) of the simulation.
+        error (str): Error messages of the simulator, empty if it passed.
+    """
+
+    fields = ["netlist_path", "mode", "procs", "returncode", "duration", "error"]
+
+    def __init__(
+        self,
+        netlist_path: str,
+        log_path: str,
+        mode: str,
+        procs: int,
+        returncode: int,
+        duration: float,
+        error: str = "",
+    ):
+        self.netlist_path = netlist_path
+        self.log_path = log_path
+        self.mode = mode
+        self.procs = procs
+        self.returncode = returncode
+        self.duration = duration
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+def circuit_size(netlist_path: str) -> int:
+    """
+    Returns the number of instance statements of a netlist, included files and
+    libraries aren't followed as they hold models.
+    Args:
+        netlist_path (str): Path of the netlist.
+    """
+    count = 0
+    with open(netlist_path, errors="replace") as f:
+        for line in f:
+            line = line.lstrip()
+            if line[:1].isalpha():
+                count += 1
+    return count
+
+
+def log_errors(log_path: str, max_lines: int = 5) -> str:
+    """
+    Returns the error messages of a simulator log.
+    Args:
+        log_path (str): Path of the simulator log.
+        max_lines (int): Max number of returned messages, the last ones are kept.
+    """
+    try:
+        with open(log_path, errors="replace") as f:
+            lines = [line.strip() for line in f if ERROR_RE.search(line)]
+    except OSError:
+        return ""
+    return " | ".join(lines[-max_lines:])
+
+
+class XyceBackend:
+    """
+    Xyce simulator, running netlists as serial Xyce processes fanned out over the
+    cores, or running large netlists as one parallel Xyce run of many processes
+    (`mpirun -np`) if Xyce is built with MPI.
+
+    Args:
+        hspice_ext (bool): Runs netlists with HSPICE compatibility extensions.
+        runner (ProcessRunner): Runner of Xyce processes, bounded by the physical
+            cores count if not given.
+        mpi_procs (int): Number of processes of parallel runs, the runner
+            max_procs if not given. Netlists are only run serially if it's 1.
+        mpi_min_size (int): Min number of instance statements of a netlist run in
+            parallel. Smaller netlists run faster as serial runs on many cores,
+            as parallel runs spend time distributing the circuit. Regression
+            netlists have less than 100 instances, packed MOS netlists of 50
+            variations being the largest, and simulate serially in less time
+            than starting an MPI run takes, so they're only run in parallel if
+            it's lowered.
+        telemetry (Telemetry): Records the time of simulations, waiting for a
+            simulator slot and launching processes, if given.
+    """
+
+    name = "Xyce"
+    required_version = "7.5"
+    mpirun = "mpirun"
+
+    def __init__(
+        self,
+        hspice_ext: bool = True,
+        runner: ProcessRunner = None,
+        mpi_procs: int = None,
+        mpi_min_size: int = 5000,
+        telemetry=None,
+    ):
+        self.hspice_ext = hspice_ext
+        self.runner = runner or ProcessRunner(telemetry=telemetry)
+        self.telemetry = telemetry
+        self.mpi_procs = mpi_procs
+        self.mpi_min_size = mpi_min_size
+        self.results = []
+        self._mpi = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version_text() -> str:
+        """Returns the output of `Xyce -v`, empty if Xyce isn't found."""
+        return version_output(["Xyce", "-v"]).replace("\n", "")
+
+    def check_version(self):
+        """
+        Checks Xyce version and makes sure it would work with the models.
+        """
+        xyce_v_ = self.version_text()
+
+        if xyce_v_ == "":
+            logging.error("Xyce is not found. Please make sure Xyce is installed.")
+            exit(1)
+        elif self.required_version not in xyce_v_:
+            logging.error(f"Xyce version {self.required_version} is required.")
+            exit(1)
+
+        logging.info(f"Your Xyce version is: {xyce_v_}")
+
+    def mpi_available(self) -> bool:
+        """Returns True if Xyce is built with MPI and mpirun is found."""
+        with self._lock:
+            if self._mpi is None:
+                self._mpi = shutil.which(self.mpirun) is not None and (
+                    "Parallel with MPI" in version_output(["Xyce", "-capabilities"])
+                )
+                if self._mpi:
+                    logging.info(
+                        "Xyce is built with MPI, large netlists run in parallel"
+                    )
+            return self._mpi
+
+    def _phase(self, name: str):
+        if self.telemetry is None:
+            return contextlib.nullcontext()
+        return self.telemetry.phase(name)
+
+    def procs_of(self, netlist_path: str) -> int:
+        """
+        Returns the number of Xyce processes a netlist is run by.
+        Args:
+            netlist_path (str): Netlist to be simulated.
+        """
+        procs = self.mpi_procs or self.runner.max_procs
+        if procs <= 1 or circuit_size(netlist_path) < self.mpi_min_size:
+            return 1
+        return procs if self.mpi_available() else 1
+
+    def run(self, netlist_path: str, hspice_ext: bool = None) -> SimResult:
+        """
+        Runs a netlist, its output is logged to `<netlist>.log`.
+        Args:
+            netlist_path (str): Netlist to be simulated.
+            hspice_ext (bool): Overrides the backend HSPICE extensions option.
+        Returns:
+            SimResult: Outcome of the simulation, failures included.
+        """
+        hspice_ext = self.hspice_ext if hspice_ext is None else hspice_ext
+        ext_opt = ["-hspice-ext", "all"] if hspice_ext else []
+        log_path = f"{netlist_path}.log"
+
+        procs = self.procs_of(netlist_path)
+        args = ["Xyce", *ext_opt, netlist_path, "-l", log_path]
+        if procs > 1:
+            args = [self.mpirun, "-np", str(procs), *args]
+
+        with self._phase("simulate"):
+            run = self.runner.run(args, procs=procs)
+
+        error = ""
+        if run.timed_out:
+            error = f"Timed out after {run.duration:.1f} s"
+        elif run.returncode != 0:
+            error = log_errors(log_path) or run.stderr.strip()[-500:]
+            error = error or f"Exited with {run.returncode}"
+
+        result = SimResult(
+            netlist_path,
+            log_path,
+            "mpi" if procs > 1 else "serial",
+            procs,
+            run.returncode,
+            run.duration,
+            error,
+        )
+        with self._lock:
+            self.results.append(result)
+
+        if not result.ok:
+            logging.error(f"Xyce failed on {netlist_path}: {error}")
+        return result
+
+    def simulate(
+        self, netlist_path: str, hspice_ext: bool = None, check: bool = False
+    ) -> int:
+        """
+        Runs a netlist, its output is logged to `<netlist>.log`.
+        Args:
+            netlist_path (str): Netlist to be simulated.
+            hspice_ext (bool): Overrides the backend HSPICE extensions option.
+            check (bool): Raises CalledProcessError if the simulation fails.
+        Returns:
+            int: Return code of the simulation. 0 if success.  Non-zero if failed.
+        """
+        result = self.run(netlist_path, hspice_ext)
+        returncode = -1 if result.returncode is None else result.returncode
+
+        if check and returncode != 0:
+            raise CalledProcessError(returncode, netlist_path, stderr=result.error)
+        return returncode
+
+    def summary(self, report_path: str = None):
+        """
+        Logs the number, run time and failures of simulations run so far.
+        Args:
+            report_path (str): csv file to write the outcome of each simulation to.
+        """
+        with self._lock:
+            results = list(self.results)
+        if not results:
+            return
+
+        failed = [result for result in results if not result.ok]
+        mpi = sum(result.mode == "mpi" for result in results)
+        logging.info(
+            f"Xyce runs: {len(results)} ({len(results) - mpi} serial, {mpi} mpi), "
+            f"failed: {len(failed)}, run time: {sum(r.duration for r in results):.1f} s"
+        )
+        for result in failed[:10]:
+            logging.error(f"Failed Xyce run {result.netlist_path}: {result.error}")
+
+        if report_path:
+            with open(report_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(SimResult.fields)
+                for result in results:
+                    writer.writerow(
+                        [getattr(result, field) for field in SimResult.fields]
+                    )
+            logging.info(f"Outcome of each Xyce run is written to {report_path}")
+
+    def close(self):
+        """Nothing to be stopped, for the same interface as NgspiceBackend."""
@@ -0,0 +1,166 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Alignment of simulated curves on measured points for GF180MCU models regression.
+
+Instead of joining measured and simulated data on rounded bias values, each
+simulated curve (a DC sweep at fixed geometry, corner, temp and other biases)
+is linearly interpolated at the swept bias of the measured points of the same
+curve. Points simulated at the measured bias get their simulated value, and the
+simulator could sweep a coarser grid than the measurement.
+
+All curves are interpolated at once: simulated points are sorted by curve and
+swept bias, and measured points are located among them by one searchsorted.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def curve_ids(meas_df: pd.DataFrame, sim_df: pd.DataFrame, keys: list) -> tuple:
+    """
+    Returns the curve id of measured and simulated points, shared by both.
+    Args:
+        meas_df (pd.DataFrame): Measured points.
+        sim_df (pd.DataFrame): Simulated points.
+        keys (list): Columns identifying a curve.
+    Returns:
+        tuple: Curve id arrays of measured and simulated points.
+    """
+    if not keys:
+        return np.zeros(len(meas_df), dtype=np.int64), np.zeros(
+            len(sim_df), dtype=np.int64
+        )
+    both = pd.concat([meas_df[keys], sim_df[keys]], ignore_index=True)
+    ids = both.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+    return ids[: len(meas_df)], ids[len(meas_df) :]
+
+
+def interp_curves(
+    meas_df: pd.DataFrame,
+    sim_df: pd.DataFrame,
+    keys: list,
+    x: str,
+    column: str,
+    tol: float = 0.0,
+) -> np.ndarray:
+    """
+    Interpolates simulated curves at the measured points.
+    Args:
+        meas_df (pd.DataFrame): Measured points.
+        sim_df (pd.DataFrame): Simulated points.
+        keys (list): Columns identifying a curve, shared by both frames.
+        x (str): Swept column of the curves.
+        column (str): Interpolated column of simulated points.
+        tol (float): Distance out of the simulated range of a curve at which
+            measured points get the value of the nearest end.
+    Returns:
+        np.ndarray: Simulated value at each measured point, NaN for points
+            whose curve isn't simulated or out of its range.
+    """
+    values = np.full(len(meas_df), np.nan)
+    if not len(meas_df) or not len(sim_df):
+        return values
+
+    meas_id, sim_id = curve_ids(meas_df, sim_df, keys)
+    mx = meas_df[x].to_numpy(dtype=float)
+    sx = sim_df[x].to_numpy(dtype=float)
+    sy = sim_df[column].to_numpy(dtype=float)
+
+    keep = ~np.isnan(sx) & ~np.isnan(sy)
+    order = np.lexsort((sx[keep], sim_id[keep]))
+    sim_id, sx, sy = sim_id[keep][order], sx[keep][order], sy[keep][order]
+    if not len(sx):
+        return values
+
+    # Curves are laid one after the other on one axis, so one search locates all points
+    x0 = min(sx.min(), np.nanmin(mx) if len(mx) else 0.0)
+    span = max(sx.max(), np.nanmax(mx) if len(mx) else 0.0) - x0 + 2 * tol + 1.0
+    pos = np.searchsorted(sim_id * span + (sx - x0), meas_id * span + (mx - x0))
+
+    start = np.searchsorted(sim_id, meas_id, side="left")
+    end = np.searchsorted(sim_id, meas_id, side="right")
+    found = end > start
+
+    lo = np.clip(pos - 1, start, np.maximum(end - 1, start))
+    hi = np.clip(pos, start, np.maximum(end - 1, start))
+    lo, hi = np.where(found, lo, 0), np.where(found, hi, 0)
+
+    x_lo, x_hi = sx[lo], sx[hi]
+    inside = found & (mx >= x_lo - tol) & (mx <= x_hi + tol)
+
+    dx = x_hi - x_lo
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(dx > 0, (mx - x_lo) / dx, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    values[inside] = (sy[lo] + t * (sy[hi] - sy[lo]))[inside]
+    return values
+
+
+def align_dc_sweeps(
+    meas_df: pd.DataFrame,
+    sim_df: pd.DataFrame,
+    sweeps_df: pd.DataFrame,
+    keys: list,
+    column: str,
+    volts: list = ("vds", "vgs", "vbs"),
+    decimals: int = 2,
+) -> np.ndarray:
+    """
+    Interpolates simulated DC sweeps at the measured points.
+    Each sweeps row holds a constant bias (`const_var` at `const_var_val`) and
+    a DC sweep of two other biases (`<inner> start stop step <outer> ...`),
+    simulated curves are swept along the inner bias.
+    Args:
+        meas_df (pd.DataFrame): Measured points, its biases rounded to decimals.
+        sim_df (pd.DataFrame): Simulated points.
+        sweeps_df (pd.DataFrame): Sweeps of the simulations.
+        keys (list): Columns identifying a simulation out of biases, as geometry,
+            corner and temp.
+        column (str): Interpolated column of simulated points.
+        volts (list): Bias columns.
+        decimals (int): Decimals of fixed biases matched between measured and
+            simulated curves.
+    Returns:
+        np.ndarray: Simulated value at each measured point, NaN for points out
+            of all simulated curves.
+    """
+    values = np.full(len(meas_df), np.nan)
+    meas_volts = meas_df[list(volts)].round(decimals)
+    sim_volts = sim_df[list(volts)].round(decimals)
+    tol = 0.5 * 10.0**-decimals
+
+    families = sweeps_df[["const_var", "const_var_val", "sweeps"]].drop_duplicates()
+    for const_var, const_val, sweeps in families.itertuples(index=False):
+        x = sweeps.split()[0].lower()
+        outer = [v for v in volts if v not in (const_var, x)]
+        const_val = np.round(float(const_val), decimals)
+
+        # Points of other sweeps at the constant bias are points of the same curves
+        meas_sel = np.isnan(values) & (meas_volts[const_var].to_numpy() == const_val)
+        sim_sel = sim_volts[const_var].to_numpy() == const_val
+        if not meas_sel.any() or not sim_sel.any():
+            continue
+
+        meas_part = meas_df.loc[meas_sel, list(keys) + [x]].assign(
+            **{v: meas_volts[v].to_numpy()[meas_sel] for v in outer}
+        )
+        sim_part = sim_df.loc[sim_sel, list(keys) + [x, column]].assign(
+            **{v: sim_volts[v].to_numpy()[sim_sel] for v in outer}
+        )
+        values[meas_sel] = interp_curves(
+            meas_part, sim_part, list(keys) + outer, x, column, tol
+        )
+
+    return values
@@ -0,0 +1,254 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Execution engine of GF180MCU models regression.
+
+The engine owns the simulator backend and the caches shared by all device
+families: each netlist goes through the simulation outputs cache, the minimal
+model card include files and then the backend. Jobs of a device are run on a
+thread pool and their results are merged as they complete. The engine records
+the time of each regression phase in its telemetry.
+"""
+
+import concurrent.futures
+import contextlib
+import logging
+
+import pandas as pd
+
+from .backends import NgspiceBackend
+from .model_lib_index import ModelLibCache
+from .result_accumulator import ResultAccumulator
+from .runner import ProcessRunner
+from .sim_cache import SimCache
+from .telemetry import Telemetry, describe_job
+
+
+def add_result(
+    sim_results: ResultAccumulator,
+    future: concurrent.futures.Future,
+    telemetry: Telemetry = None,
+):
+    """
+    Adds the results of a completed job to the merged results.
+    Args:
+        sim_results (ResultAccumulator): Merged results of the device.
+        future (concurrent.futures.Future): Completed job, its result is a frame, a
+            list of frames or None.
+        telemetry (Telemetry): Records the merge time, if given.
+    """
+    try:
+        data = future.result()
+    except Exception as exc:
+        data = None
+        logging.info("Test case generated an exception: %s" % (exc))
+    data = data if isinstance(data, list) else [data]
+    with telemetry.phase("merge") if telemetry else contextlib.nullcontext():
+        sim_results.add(*data)
+
+
+class Engine:
+    """
+    Runs simulation jobs of the regression.
+
+    Args:
+        backend (NgspiceBackend): Simulator backend.
+        workers (int): Number of concurrent jobs, their simulator processes are
+            bounded by the backend runner.
+        lib_cache (ModelLibCache): Minimal model card include files, netlists use
+            the full model card if not given.
+        sim_cache (SimCache): Cache of simulation outputs, all netlists are
+            simulated if not given.
+        pack_size (int): Max number of variations packed in one netlist, by
+            device families that support it.
+        raw_output (bool): Results are written as binary rawfiles, by device
+            families that support it.
+        adaptive (bool): Sweeps are simulated on a coarse grid and refined where
+            needed, by device families that support it.
+        fast (bool): Jobs of each case are sampled until its verdict is known
+            with confidence, for cases with measured data.
+        telemetry (Telemetry): Records the time of regression phases, a new one if
+            not given.
+    """
+
+    def __init__(
+        self,
+        backend,
+        workers: int = None,
+        lib_cache: ModelLibCache = None,
+        sim_cache: SimCache = None,
+        pack_size: int = 1,
+        raw_output: bool = False,
+        telemetry: Telemetry = None,
+        adaptive: bool = False,
+        fast: bool = False,
+    ):
+        self.backend = backend
+        self.workers = workers or 2 * backend.runner.max_procs
+        self.lib_cache = lib_cache
+        self.sim_cache = sim_cache
+        self.pack_size = pack_size
+        self.raw_output = raw_output
+        self.adaptive = adaptive
+        self.fast = fast
+        self.telemetry = telemetry or Telemetry()
+        self.backend.runner.telemetry = self.telemetry
+
+    @classmethod
+    def from_args(cls, arguments: dict):
+        """
+        Creates an engine from regression command line options, exits if an
+        option isn't valid.
+        Args:
+            arguments (dict): Arguments used by user in the run command, generated by docopt.
+        """
+        # Simulator processes are bounded by the physical cores, twice as many
+        # threads prepare netlists and parse results around them
+        runner = ProcessRunner(
+            None if arguments["--num_cores"] is None else int(arguments["--num_cores"]),
+            nice=int(arguments.get("--nice") or 0),
+            pin=bool(arguments.get("--pin")),
+            timeout=(
+                float(arguments["--timeout"]) if arguments.get("--timeout") else None
+            ),
+        )
+        workers = 2 * runner.max_procs
+
+        if arguments["--backend"] not in ["batch", "shared"]:
+            logging.error(
+                f"{arguments['--backend']} backend is not supported, allowed backends are [batch, shared], please recheck"
+            )
+            exit(1)
+
+        output_format = arguments.get("--output_format") or "ascii"
+        if output_format not in ["ascii", "binary"]:
+            logging.error(
+                f"{output_format} output format is not supported, allowed formats are [ascii, binary], please recheck"
+            )
+            exit(1)
+
+        lib_cache = None
+        if arguments["--lib_cache"]:
+            lib_cache = ModelLibCache(arguments["--lib_cache"])
+
+        sim_cache = None
+        if arguments["--sim_cache"]:
+            sim_cache = SimCache(
+                arguments["--sim_cache"], NgspiceBackend.version_text(), lib_cache
+            )
+
+        # Starting ngspice shared library workers
+        shared_workers = None
+        if arguments["--backend"] == "shared":
+            shared_workers = runner.max_procs
+
+        return cls(
+            NgspiceBackend(shared_workers, runner),
+            workers,
+            lib_cache,
+            sim_cache,
+            int(arguments.get("--pack_size") or 1),
+            output_format == "binary",
+            adaptive=bool(arguments.get("--adaptive")),
+            fast=bool(arguments.get("--fast")),
+        )
+
+    def simulate(self, netlist_path: str) -> int:
+        """
+        Call simulation commands to perform simulation.
+        Args:
+            netlist_path (str): Netlist to be simulated.
+        Returns:
+            int: Return code of the simulation. 0 if success.  Non-zero if failed.
+        """
+        digest = None
+        with self.telemetry.phase("cache"):
+            if self.sim_cache is not None:
+                # Hashed before rewriting .lib calls, as it hashes used model card statements
+                digest = self.sim_cache.netlist_digest(netlist_path)
+                if self.sim_cache.restore(netlist_path, digest):
+                    return 0
+
+            if self.lib_cache is not None:
+                self.lib_cache.rewrite_netlist(netlist_path)
+
+        with self.telemetry.phase("simulate"):
+            status = self.backend.simulate(netlist_path)
+
+        if digest is not None and status == 0:
+            with self.telemetry.phase("cache"):
+                self.sim_cache.store(netlist_path, digest)
+
+        return status
+
+    def run_job(self, run_sim, job, name: str, case_key: str = None):
+        """
+        Runs a job, timed by the engine telemetry.
+        Args:
+            run_sim (callable): Function of a job to its results.
+            job: Job to be run.
+            name (str): Name of the job in slowest jobs.
+            case_key (str): Key of the job case in telemetry.
+        """
+        with self.telemetry.job(name, case_key):
+            return run_sim(job)
+
+    def run(
+        self,
+        run_sim,
+        jobs: list,
+        name: str,
+        error_fn=None,
+        quantile: float = 0.98,
+        case_key: str = None,
+    ) -> pd.DataFrame:
+        """
+        Runs all jobs of a device and merges their results as they complete.
+        Args:
+            run_sim (callable): Function of a job to its results frame, or a list of
+                frames for jobs simulating many variations, None if it failed.
+            jobs (list): Jobs to be run.
+            name (str): Name of the run, used in progress logs.
+            error_fn (callable): Function of results to their relative error against
+                measured data, used for progress logs.
+            quantile (float): Error quantile reported in progress logs.
+            case_key (str): Key of the jobs case in telemetry, the run name if not
+                given.
+        Returns:
+            pd.DataFrame: Merged results of all jobs.
+        """
+        case_key = case_key or name
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers
+        ) as executor:
+            futures_list = [
+                executor.submit(
+                    self.run_job, run_sim, job, f"{name} {describe_job(job)}", case_key
+                )
+                for job in jobs
+            ]
+
+            sim_results = ResultAccumulator(len(futures_list), name, error_fn, quantile)
+            with self.telemetry.case(case_key):
+                for future in concurrent.futures.as_completed(futures_list):
+                    add_result(sim_results, future, self.telemetry)
+
+        with self.telemetry.case(case_key), self.telemetry.phase("merge"):
+            return sim_results.frame()
+
+    def close(self):
+        """Stops the backend and logs cache statistics."""
+        self.backend.close()
+        if self.sim_cache is not None:
+            self.sim_cache.log_stats()
@@ -0,0 +1,124 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Cache of parsed measurement sheets for GF180MCU models regression.
+
+Parsing foundry xlsx sheets with openpyxl takes longer than most of the
+regression steps using them. Parsed tables are stored as pickles named by the
+sha256 digest of the sheet, so that a changed sheet is parsed again and its
+outdated tables are removed. Pickles keep the exact dtypes of the parsed
+tables, including the mixed type columns of foundry sheets which can't be
+stored as Parquet.
+
+The cache is at `.excel_cache` next to the sheets, or at the directory given by
+the `GF180MCU_EXCEL_CACHE` environment variable.
+"""
+
+import contextlib
+import glob
+import io
+import logging
+import os
+import pickle
+import threading
+
+import pandas as pd
+
+from .model_lib_index import write_atomic
+from .sim_cache import file_digest
+
+CACHE_ENV = "GF180MCU_EXCEL_CACHE"
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def excel_cache_dir(path: str) -> str:
+    """
+    Returns the cache directory of parsed tables of a sheet.
+    Args:
+        path (str): Path of the xlsx sheet.
+    """
+    return os.environ.get(CACHE_ENV) or os.path.join(
+        os.path.dirname(os.path.abspath(path)), ".excel_cache"
+    )
+
+
+def parse_excel(path: str, as_csv: bool = False) -> pd.DataFrame:
+    """
+    Parses the first sheet of an xlsx file.
+    Args:
+        path (str): Path of the xlsx file.
+        as_csv (bool): Returns the table as read back from a csv copy of the
+            sheet, mixed type columns are read as strings.
+    Returns:
+        pd.DataFrame: Table of the sheet.
+    """
+    df = pd.read_excel(path)
+    if as_csv:
+        csv = io.StringIO()
+        df.to_csv(csv, index=False, header=True)
+        csv.seek(0)
+        df = pd.read_csv(csv)
+    return df
+
+
+def read_excel_cached(path: str, as_csv: bool = False) -> pd.DataFrame:
+    """
+    Reads the first sheet of an xlsx file, from the cache if the file didn't change.
+    Args:
+        path (str): Path of the xlsx file.
+        as_csv (bool): Returns the table as read back from a csv copy of the
+            sheet, mixed type columns are read as strings.
+    Returns:
+        pd.DataFrame: Table of the sheet, a copy owned by the caller.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    memo_key = (path, stat.st_mtime_ns, stat.st_size, as_csv)
+
+    with _lock:
+        df = _tables.get(memo_key)
+    if df is not None:
+        return df.copy()
+
+    cache_dir = excel_cache_dir(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    kind = "csv" if as_csv else "xlsx"
+    cache_path = os.path.join(
+        cache_dir, f"{stem}_{kind}_{file_digest(path)[:16]}_pd{pd.__version__}.pkl"
+    )
+
+    df = None
+    if os.path.isfile(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                df = pickle.load(f)
+        except Exception as exc:
+            logging.warning(f"Couldn't read cached table {cache_path}: {exc}")
+
+    if df is None:
+        df = parse_excel(path, as_csv)
+        try:
+            # Tables of previous versions of the sheet are outdated
+            for old_path in glob.glob(os.path.join(cache_dir, f"{stem}_{kind}_*.pkl")):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(old_path)
+            write_atomic(cache_path, pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as exc:
+            logging.warning(f"Couldn't cache parsed table of {path}: {exc}")
+
+    with _lock:
+        _tables[memo_key] = df
+    return df.copy()
@@ -0,0 +1,39 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Device families of GF180MCU models regression.
+"""
+
+from .bjt import BjtBetaAdapter, BjtIvAdapter
+from .cap import CapMimAdapter, CapMosAdapter
+from .diode import DiodeIvAdapter
+from .mos import MosCvAdapter, MosHvIdAdapter, MosIdAdapter, MosRdsAdapter
+from .resistor import ResistorAdapter
+
+# Adapter of each family, by name in the order they are run
+FAMILIES = {
+    adapter.name: adapter
+    for adapter in [
+        MosIdAdapter,
+        MosRdsAdapter,
+        MosCvAdapter,
+        MosHvIdAdapter,
+        BjtIvAdapter,
+        BjtBetaAdapter,
+        DiodeIvAdapter,
+        CapMosAdapter,
+        CapMimAdapter,
+        ResistorAdapter,
+    ]
+}
@@ -0,0 +1,155 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+BJT iv and beta regression of GF180MCU models.
+"""
+
+import pandas as pd
+import logging
+import os
+
+from ..adapter import DeviceAdapter, read_data, read_wrdata
+
+
+class BjtIvAdapter(DeviceAdapter):
+    """
+    Regression of npn and pnp collector current against measured iv data.
+    """
+
+    name = "bjt_iv"
+    group = "bjt_iv"
+    main_regr_dir = "run_bjt_iv_regr"
+    devices = [
+        # All npn devices [10p00x10p00, 05p00x05p00, 00p54x16p00, 00p54x08p00, 00p54x04p00, 00p54x02p00]
+        "npn",
+        # All pnp devices [10p00x00p42, 05p00x00p42, 10p00x10p00, 05p00x05p00]
+        "pnp",
+    ]
+    data_dir = "BJT_iv"
+    meas = "iv"
+    template = os.path.join("device_netlists", "bjt_iv.spice")
+
+    column = "ic"
+    keys = ["device_name", "corner", "temp", "ibp", "vcp"]
+    quantile = 0.98
+    max_val_detect = 10e-6
+    bad_err_cols = ["ic_sim", "ic_err"]
+    bad_err_file = "{device}_ic_bad_err.csv"
+
+    def cases(self) -> list:
+        cases = super().cases()
+        for case in cases:
+            case["label"] = f"{case['device']}-{self.meas}"
+        return cases
+
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        return read_data(
+            self.data_path(f"bjt_{case['device']}_{self.meas}_meas.csv"), dedup=True
+        )
+
+    def load_sweeps(self, case: dict, meas_df: pd.DataFrame) -> pd.DataFrame:
+        return read_data(self.data_path(f"bjt_{case['device']}_{self.meas}_sweeps.csv"))
+
+    def run_sim(self, case: dict, job: dict) -> pd.DataFrame:
+        device = job["device_name"]
+        corner = job["corner"]
+        temp = job["temp"]
+
+        dev_netlists_path = self.netlists_dir(case, device)
+        netlist_path = os.path.join(
+            dev_netlists_path, f"netlist_t{temp}_{corner}.spice"
+        )
+        result_path = os.path.join(dev_netlists_path, f"simulated_t{temp}_{corner}.csv")
+
+        # Differientiate between 3 or 4 terminal bjt
+        terminals = "c b 0 0" if "npn" in device else "c b 0"
+
+        self.render(
+            self.template,
+            netlist_path,
+            device=device,
+            terminals=terminals,
+            corner=corner,
+            temp=temp,
+            sweep=job["sweep"],
+            result_path=result_path,
+        )
+
+        logging.info(
+            f"Running simulation for {device}-{self.meas} at temp={temp}, corner={corner}"
+        )
+
+        # calling simulator to run netlist and write its results
+        try:
+            self.engine.simulate(netlist_path)
+        except Exception:
+            pass
+
+        if not os.path.isfile(result_path):
+            return None
+
+        # Fromating columns to match what we have in measurement
+        result_df = read_wrdata(result_path)
+        result_df["device_name"] = device
+        result_df["corner"] = corner
+        result_df["temp"] = temp
+
+        # Writing output in clean format in same csv path of resutls
+        result_df.to_csv(result_path, index=False, header=True, sep=",")
+        return result_df
+
+
+class BjtBetaAdapter(BjtIvAdapter):
+    """
+    Regression of npn and pnp current gain against measured beta data.
+    """
+
+    name = "bjt_beta"
+    group = "bjt_beta"
+    main_regr_dir = "run_bjt_beta_regr"
+    data_dir = "BJT_beta"
+    meas = "beta"
+    template = os.path.join("device_netlists", "bjt_beta.spice")
+
+    # Currents are compared through beta, which isn't simulated
+    keys = ["device_name", "corner", "temp", "vbp", "vcp"]
+    clip_curr = 10e-9
+    column = "beta"
+    bad_err_cols = ["ic_sim", "beta_err"]
+    # TODO: Check high errors for beta measurements
+    exit_on_fail = False
+
+    def merge(
+        self, case: dict, meas_df: pd.DataFrame, sim_df: pd.DataFrame
+    ) -> pd.DataFrame:
+        full_df = meas_df.merge(
+            sim_df, on=self.keys, how="left", suffixes=("_meas", "_sim")
+        )
+
+        # Clipping current values to lowest curr
+        ## We found that most of the curr are in the range of milli-Amps and most of the
+        ## error happens in the off mode of the BJT. And it causes large rmse for the values.
+        ## We will clip at 10nA for all currents to make sure that for small signal it works as expected.
+        for col in ["ic_meas", "ic_sim", "ib_meas", "ib_sim"]:
+            full_df[col] = full_df[col].clip(lower=self.clip_curr)
+
+        # calc beta for both measured and simulated data
+        ## Beta of BJT is defined as ic/ib
+        full_df["beta_meas"] = full_df["ic_meas"] / full_df["ib_meas"]
+        full_df["beta_sim"] = full_df["ic_sim"] / full_df["ib_sim"]
+
+        full_df["beta_err"] = (
+            (full_df["beta_meas"] - full_df["beta_sim"]) * 100.0 / full_df["beta_meas"]
+        ).abs()
+        return full_df
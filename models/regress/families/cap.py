@@ -0,0 +1,261 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+MIM and MOS capacitors cv regression of GF180MCU models.
+"""
+
+import pandas as pd
+import numpy as np
+import logging
+import os
+
+from ..adapter import DeviceAdapter, read_data
+
+
+def find_mimcap(log_file: str) -> float:
+    """
+    Function to parse capacitance value from simulation run log.
+
+    Parameters
+    ----------
+    log_file : str or Path
+        Path to the simulation run log file.
+    Returns
+    -------
+        Parsed capacitance value measured in simulation run.
+    """
+    with open(log_file, errors="replace") as f:
+        line = next(line for line in f if "cj" in line)
+    return float(line.split("=")[1])
+
+
+class CapMimAdapter(DeviceAdapter):
+    """
+    Regression of MIM capacitors, simulated capacitance is a single value per
+    geometry as it's almost the same for all voltages.
+    """
+
+    name = "cap_mim_cv"
+    group = "cap_mim_cv"
+    main_regr_dir = "run_cap_mim_cv_regr"
+    devices = [
+        "m2m3_noshield",  # All types [cap_mim_1f5, cap_mim_1f0, cap_mim_2f0]
+        "m3m4_noshield",  # All types [cap_mim_1f5, cap_mim_1f0, cap_mim_2f0]
+        "m4m5_noshield",  # All types [cap_mim_1f5, cap_mim_1f0, cap_mim_2f0]
+        "m5m6_noshield",  # All types [cap_mim_1f5, cap_mim_1f0, cap_mim_2f0]
+    ]
+    data_dir = "MIMCAP_cv"
+
+    column = "Cj"
+    keys = ["device_name", "W (um)", "L (um)", "corner", "temp"]
+    quantile = 0.98
+    max_val_detect = 0.1e-15  # Max value to detect bad errors 0.1fF
+    bad_err_file = "{device}_bad_err_cv.csv"
+
+    def cases(self) -> list:
+        cases = super().cases()
+        for case in cases:
+            case["label"] = f"cap_mim {case['device']}-cv"
+        return cases
+
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        # For MIMCAP [Metal cap], the cap value is almost same for all voltages.
+        ## We will drop voltage column and round cap value (fF) to 2 numbers after digits.
+        ## To optimize run time and ignore redundant runs.
+        meas_df = read_data(
+            self.data_path("cap_mim_meas_cv.csv"),
+            columns=["device_name", "W (um)", "L (um)", "corner", "temp", "Cj"],
+            round_cols={"Cj": 2},
+        )
+        meas_df.drop_duplicates(
+            subset=["device_name", "W (um)", "L (um)", "corner", "temp"], inplace=True
+        )
+
+        # We have 4 types for MIMCAP, all have same data points
+        meas_df["device_name"] = meas_df["device_name"] + f"_{case['device']}"
+        return meas_df
+
+    def run_sim(self, case: dict, job: dict) -> pd.DataFrame:
+        device_name = job["device_name"]
+        width = job["W (um)"]
+        length = job["L (um)"]
+        corner = job["corner"]
+        temp = job["temp"]
+
+        netlist_path = os.path.join(
+            self.netlists_dir(case, device_name),
+            f"netlist_w{width}_l{length}_t{temp}_{corner}.spice",
+        )
+
+        self.render(
+            os.path.join("device_netlists", "cap_mim.spice"),
+            netlist_path,
+            device=device_name,
+            width=width,
+            length=length,
+            temp=temp,
+            corner=corner,
+        )
+
+        logging.info(
+            f"Running simulation for {device_name}-cv at w={width}, l={length}, temp={temp}, corner={corner}"
+        )
+
+        # calling simulator to run netlist and get Cj value from run log
+        try:
+            self.engine.simulate(netlist_path)
+            cj_val = find_mimcap(f"{netlist_path}.log")
+        except Exception:
+            cj_val = np.nan
+            logging.error(
+                f"Running simulation at w={width}, l={length}, temp={temp}, corner={corner} got an exception"
+            )
+            logging.error(f"Regression couldn't get the output from {netlist_path}.log")
+
+        return pd.DataFrame(
+            {
+                "device_name": [device_name],
+                "W (um)": [width],
+                "L (um)": [length],
+                "corner": [corner],
+                "temp": [temp],
+                "Cj": [cj_val],
+            }
+        )
+
+
+class CapMosAdapter(DeviceAdapter):
+    """
+    Regression of MOS capacitors, capacitance is calculated from the charge of
+    the capacitor in a RC circuit.
+    """
+
+    name = "cap_mos_cv"
+    group = "cap_mos_cv"
+    main_regr_dir = "run_cap_mos_cv_regr"
+    devices = [
+        "cap_mos_03v3",  # All types [cap_nmos, cap_pmos, cap_nmos_b, cap_pmos_b]
+        "cap_mos_06v0",  # All types [cap_nmos, cap_pmos, cap_nmos_b, cap_pmos_b]
+    ]
+    data_dir = "MOSCAP_cv"
+    # We will use this res (kohm) in RC circuit for MOSCAP measurement
+    res_moscap = 100
+
+    column = "Cj"
+    keys = ["device_name", "W (um)", "L (um)", "corner", "temp", "Vj"]
+    quantile = 0.95
+    max_val_detect = 10.0e-15
+    bad_err_file = "{device}_bad_err_cv.csv"
+
+    def cases(self) -> list:
+        cases = super().cases()
+        for case in cases:
+            case["label"] = f"{case['device']}-cv"
+        return cases
+
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        return read_data(self.data_path(f"{case['device']}_meas_cv.csv"), dedup=True)
+
+    def load_sweeps(self, case: dict, meas_df: pd.DataFrame) -> pd.DataFrame:
+        return read_data(self.data_path(f"{case['device']}_sweeps_cv.csv"), dedup=True)
+
+    def run_sim(self, case: dict, job: dict) -> pd.DataFrame:
+        device_name = job["device_name"]
+        width = job["W (um)"]
+        length = job["L (um)"]
+        corner = job["corner"]
+        temp = job["temp"]
+
+        dev_netlists_path = self.netlists_dir(case, device_name)
+        name = f"w{width}_l{length}_t{temp}_{corner}"
+        netlist_path = os.path.join(dev_netlists_path, f"netlist_{name}.spice")
+        result_path_pos = os.path.join(dev_netlists_path, f"simulated_{name}_pos.tsv")
+        result_path_neg = os.path.join(dev_netlists_path, f"simulated_{name}_neg.tsv")
+        result_path = os.path.join(dev_netlists_path, f"simulated_{name}.csv")
+
+        # Extactng main values used in all sim for same device
+        ## Sweep variable in this format: Vj {min} {max} {step}
+        ## We will use supply voltage with double max voltage value,
+        ## to make sure that the cap is fully charged.
+        min_volt_sweep, max_volt_sweep, step_volt_sweep = [
+            float(v) for v in job["sweep"].split(" ")[1:4]
+        ]
+
+        # We will get our cap value at 4*time_const [4*R*C]
+        ## R * C = kohm * fF = ps
+        sim_run_time = round(4 * float(self.res_moscap * job["cj_max"]))
+
+        self.render(
+            os.path.join("device_netlists", "cap_mos.spice"),
+            netlist_path,
+            device=device_name,
+            width=width,
+            length=length,
+            temp=temp,
+            corner=corner,
+            supp_val=max_volt_sweep,
+            res_val=self.res_moscap,
+            sim_run_time=sim_run_time,
+            result_path_pos=result_path_pos,
+            result_path_neg=result_path_neg,
+        )
+
+        logging.info(
+            f"Running simulation for {device_name}-cv at w={width}, l={length}, temp={temp}, corner={corner}"
+        )
+
+        # calling simulator to run netlist and write its results
+        self.engine.simulate(netlist_path)
+
+        # check if pos and neg sim data are generated
+        if not os.path.isfile(result_path_pos) or not os.path.isfile(result_path_neg):
+            logging.error(
+                f"Running simulation for {device_name}-cv at w={width}, l={length}, temp={temp}, corner={corner} got an exception"
+            )
+            logging.error("Simulation is not completed for this run")
+            return None
+
+        # Cleaning simulated data and handling its format to be like measured one
+        full_df = pd.concat(
+            [
+                pd.read_table(
+                    path, sep=r"\s+", names=["time", "Vj", "time_1", "q_t"]
+                ).drop(columns=["time_1"])
+                for path in [result_path_pos, result_path_neg]
+            ]
+        )
+
+        # Calc. cap value (fF) form given Q (charge) and V (voltage)
+        full_df["Cj"] = np.abs(np.gradient(full_df["q_t"], full_df["Vj"]) / 1.0e-15)
+        full_df = full_df[full_df["Vj"] <= max_volt_sweep]
+        full_df = full_df[full_df["Vj"] >= min_volt_sweep]
+        full_df.sort_values(by="Vj", inplace=True)
+        full_df.drop(columns=["time", "q_t"], inplace=True)
+
+        # Construct final simulated data frame
+        sim_df = pd.DataFrame()
+        sim_df["Vj"] = np.arange(
+            min_volt_sweep, max_volt_sweep + step_volt_sweep, step_volt_sweep
+        )
+        sim_df = pd.merge_asof(sim_df, full_df, on="Vj", direction="nearest")
+        sim_df["device_name"] = device_name
+        sim_df["W (um)"] = width
+        sim_df["L (um)"] = length
+        sim_df["corner"] = corner
+        sim_df["temp"] = temp
+        sim_df = sim_df.round({"Vj": 2})
+
+        sim_df.to_csv(result_path, index=False)
+
+        return sim_df
@@ -0,0 +1,125 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Diodes iv regression of GF180MCU models.
+"""
+
+import pandas as pd
+import numpy as np
+import logging
+import os
+
+from ..adapter import DeviceAdapter, read_data, read_wrdata
+
+
+class DiodeIvAdapter(DeviceAdapter):
+    """
+    Regression of diodes current against measured iv data.
+    """
+
+    name = "diode_iv"
+    group = "diode_iv"
+    main_regr_dir = "run_diode_iv_regr"
+    devices = [
+        "diode_dw2ps",
+        "diode_pw2dw",
+        "diode_nd2ps_03v3",
+        "diode_nd2ps_06v0",
+        "diode_nw2ps_03v3",
+        "diode_nw2ps_06v0",
+        "diode_pd2nw_03v3",
+        "diode_pd2nw_06v0",
+    ]
+    data_dir = "diode_iv"
+
+    column = "In"
+    keys = ["Area (pm^2)", "Pj (um)", "corner", "temp", "Vn"]
+    quantile = 0.95
+    max_val_detect = 1e-15
+    bad_err_file = "{device}_iv_bad_err.csv"
+    # TODO: Investigate for high errors for diode-iv
+    exit_on_fail = False
+
+    def cases(self) -> list:
+        cases = super().cases()
+        for case in cases:
+            case["label"] = f"{case['device']}-IV"
+        return cases
+
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        return read_data(self.data_path(f"{case['device']}_iv_meas.csv"), dedup=True)
+
+    def load_sweeps(self, case: dict, meas_df: pd.DataFrame) -> pd.DataFrame:
+        return read_data(self.data_path(f"{case['device']}_iv_sweeps.csv"), dedup=True)
+
+    def run_sim(self, case: dict, job: dict) -> pd.DataFrame:
+        device_name = case["device"]
+        area = job["Area (pm^2)"]
+        perim = job["Pj (um)"]
+        corner = job["corner"]
+        temp = job["temp"]
+
+        dev_netlists_path = self.netlists_dir(case)
+        name = f"A{area}_P{perim}_t{temp}_{corner}"
+        netlist_path = os.path.join(dev_netlists_path, f"netlist_{name}.spice")
+        result_path = os.path.join(dev_netlists_path, f"simulated_{name}.csv")
+
+        self.render(
+            os.path.join("device_netlists", "diode_iv.spice"),
+            netlist_path,
+            device=device_name,
+            area=area,
+            perim=perim,
+            temp=temp,
+            corner=corner,
+            result_path=result_path,
+            sweep=job["sweep"],
+        )
+
+        logging.info(
+            f"Running simulation for {device_name}-iv at A={area}p, P={perim}u, temp={temp}, corner={corner}"
+        )
+
+        # calling simulator to run netlist and write its results
+        try:
+            self.engine.simulate(netlist_path)
+        except Exception:
+            pass
+
+        if not os.path.isfile(result_path):
+            return None
+
+        # Fromating columns to match what we have in measurement
+        result_df = read_wrdata(result_path)
+        result_df["Area (pm^2)"] = area
+        result_df["Pj (um)"] = perim
+        result_df["corner"] = corner
+        result_df["temp"] = temp
+
+        # Writing output in clean format in same csv path of resutls
+        result_df.to_csv(result_path, index=False, header=True, sep=",")
+        return result_df
+
+    def merge(
+        self, case: dict, meas_df: pd.DataFrame, sim_df: pd.DataFrame
+    ) -> pd.DataFrame:
+        full_df = meas_df.merge(
+            sim_df, on=self.keys, how="left", suffixes=("_meas", "_sim")
+        )
+
+        # Relative error is signed by the measured current
+        full_df["In_err"] = (
+            np.abs(full_df["In_meas"] - full_df["In_sim"]) * 100.0 / full_df["In_meas"]
+        )
+        return full_df
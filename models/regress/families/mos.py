@@ -0,0 +1,810 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+MOSFETs iv and cv regression of GF180MCU models.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+import logging
+import os
+import threading
+
+from ..adapter import PASS_THRESH, DeviceAdapter, read_data, read_wrdata
+from ..adaptive import coarse_sweep, grid_size, refine_ranges, sub_sweep, sweep_axes
+from ..curve_align import align_dc_sweeps
+from ..model_lib_index import write_atomic
+from ..rawfile import read_rawfile
+
+# Voltages are rounded in simulated data, to match measured data
+ROUND_VOLTS = {"vbs": 2, "vgs": 2, "vds": 2}
+
+
+class MosIdAdapter(DeviceAdapter):
+    """
+    Regression of MOSFETs drain current against measured iv data. W/L
+    variations sharing corner, temp and sweeps could be packed in one netlist,
+    results are read from wrdata text files or binary rawfiles. Simulated
+    curves are interpolated at the measured biases, so sweeps could be
+    simulated on a coarse grid refined where needed in adaptive mode.
+    """
+
+    name = "mos_id"
+    group = "mos_id"
+    main_regr_dir = "run_mos_id_rds_regr"
+    devices = [
+        "nfet_03v3",
+        "pfet_03v3",
+        "nfet_06v0",
+        "pfet_06v0",
+        "nfet_06v0_nvt",
+        "nfet_03v3_dss",
+        "pfet_03v3_dss",
+        "nfet_06v0_dss",
+        "pfet_06v0_dss",
+    ]
+    data_dir = "MOS_iv"
+    meas_out_result = "id"
+    # Drain voltage if it isn't swept
+    vds_default = 6
+
+    keys = ["W (um)", "L (um)", "corner", "temp", "vds", "vgs", "vbs"]
+    curve_keys = ["W (um)", "L (um)", "corner", "temp"]
+    round_cols = ROUND_VOLTS
+    column = "id"
+    clip = 10e-12  # lowest curr to clip on
+    quantile = 0.98
+    max_val_detect = 20.0e-6
+    bad_err_file = "{device}_bad_err_{meas_out_result}.csv"
+    adaptive_file = "{device}_adaptive_{meas_out_result}.json"
+    # Verdicts of the last full sweeps run by case label, in the results directory
+    full_verdicts_file = "full_sweep_verdicts.json"
+
+    # Sweeps are simulated adaptively in adaptive mode
+    adaptive = True
+    # Max ratio of coarse to measured sweep step, in adaptive mode
+    coarse_factor = 4
+    # Max interpolation error (%) of coarse intervals that aren't refined
+    refine_tol = 0.5
+    # Coarse intervals holding errors (%) this close to PASS_THRESH are refined
+    refine_band = 1.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Measured data, sweeps and adaptive sweeps counts, by case results directory
+        self.meas = {}
+        self.sweeps = {}
+        self.adaptive_stats = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def adaptive_sweeps(self) -> bool:
+        """True if sweeps are simulated adaptively."""
+        return self.engine.adaptive and self.adaptive
+
+    def cases(self) -> list:
+        cases = super().cases()
+        for case in cases:
+            case["meas_out_result"] = self.meas_out_result
+            case["label"] = f"{case['device']} {self.meas_out_result}"
+        if self.engine.adaptive and not self.adaptive:
+            logging.warning(
+                f"Adaptive sweeps aren't supported by {self.name}, full sweeps are simulated"
+            )
+        return cases
+
+    def netlist_template(self, device: str) -> str:
+        """
+        Returns the netlist template of a device, rendered with `packed` to
+        simulate many W/L variations in one netlist.
+        Args:
+            device (str): Device used in regression test.
+        """
+        device_group_netlist = "nfet" if "nfet" in device else "pfet"
+        return os.path.join(
+            f"device_netlists_{self.meas_out_result}", f"{device_group_netlist}.spice"
+        )
+
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        meas_df = read_data(
+            self.data_path(f"{case['device']}_meas_{self.meas_out_result}.csv"),
+            round_cols=ROUND_VOLTS,
+            dedup=True,
+        )
+        # Adaptive sweeps are refined around errors near the pass threshold
+        self.meas[case["dev_path"]] = meas_df
+        return meas_df
+
+    def load_sweeps(self, case: dict, meas_df: pd.DataFrame) -> pd.DataFrame:
+        sweeps_df = self.sweeps.get(case["dev_path"])
+        if sweeps_df is None:
+            # Results of each job are merged on the sweeps, read once per case
+            sweeps_df = read_data(
+                self.data_path(f"{case['device']}_sweeps_{self.meas_out_result}.csv")
+            )
+            self.sweeps[case["dev_path"]] = sweeps_df
+        return sweeps_df
+
+    def jobs(self, case: dict, sweeps_df: pd.DataFrame) -> list:
+        pack_size = self.engine.pack_size
+        if pack_size <= 1 or self.adaptive_sweeps:
+            return super().jobs(case, sweeps_df)
+
+        # Packing W/L variations that share the same sources in one netlist
+        jobs = []
+        group_cols = ["corner", "temp", "const_var", "const_var_val", "sweeps"]
+        for group, group_df in sweeps_df.groupby(group_cols, sort=False):
+            variations = group_df[["W (um)", "L (um)"]].drop_duplicates()
+            for start in range(0, len(variations), pack_size):
+                job = dict(zip(group_cols, group))
+                job["pack_id"] = len(jobs)
+                job["variations"] = variations.iloc[start : start + pack_size]
+                jobs.append(job)
+
+        return jobs
+
+    def job_points(self, case: dict, meas_df: pd.DataFrame, jobs: list) -> pd.DataFrame:
+        # Points of a job share its geometry, corner, temp and constant bias
+        geom = self.curve_keys
+        rows = []
+        for job in jobs:
+            variations = job.get("variations")
+            if variations is None:
+                variations = pd.DataFrame([[job["W (um)"], job["L (um)"]]])
+            const_val = np.round(float(job["const_var_val"]), ROUND_VOLTS["vds"])
+            sources = (job["corner"], job["temp"], job["const_var"], const_val)
+            rows.extend((*wl, *sources) for wl in variations.itertuples(index=False))
+        if not rows:
+            return meas_df.iloc[:0]
+
+        jobs_df = pd.DataFrame(rows, columns=geom + ["const_var", "const_val"])
+        keep = np.zeros(len(meas_df), dtype=bool)
+        for const_var, const_df in jobs_df.groupby("const_var"):
+            points = meas_df[geom].assign(
+                const_val=meas_df[const_var].round(ROUND_VOLTS["vds"])
+            )
+            matched = points.merge(
+                const_df.drop(columns="const_var").drop_duplicates(),
+                how="left",
+                indicator=True,
+            )
+            keep |= (matched["_merge"] == "both").to_numpy()
+        return meas_df[keep]
+
+    def post_sim(self, case: dict, sim_df: pd.DataFrame) -> pd.DataFrame:
+        # Simulated biases aren't rounded, curves are interpolated at measured biases
+        return sim_df
+
+    def merge(
+        self, case: dict, meas_df: pd.DataFrame, sim_df: pd.DataFrame
+    ) -> pd.DataFrame:
+        col = case.get("column", self.column)
+        full_df = meas_df.rename(columns={col: f"{col}_meas"})
+        full_df[f"{col}_sim"] = align_dc_sweeps(
+            meas_df,
+            sim_df,
+            self.load_sweeps(case, meas_df),
+            self.curve_keys,
+            col,
+            decimals=ROUND_VOLTS["vds"],
+        )
+
+        return self.add_error(case, full_df)
+
+    def render_job(self, job: dict, netlist_path: str, result_path: str, **params):
+        """
+        Renders the netlist of a job with its sources and sweeps.
+        Args:
+            job (dict): Simulation job.
+            netlist_path (str): Path of the rendered netlist.
+            result_path (str): Path of the simulation results.
+            params: Template parameters of the simulated variations.
+        """
+        const_var = job["const_var"]
+        const_var_val = job["const_var_val"]
+
+        # Check constant voltage values
+        vbs_val = const_var_val if const_var == "vbs" else 0
+        vds_val = const_var_val if const_var == "vds" else self.vds_default
+
+        self.render(
+            params.pop("template"),
+            netlist_path,
+            meas_out_result=self.meas_out_result,
+            temp=job["temp"],
+            corner=job["corner"],
+            sweeps=job["sweeps"],
+            vds_val=vds_val,
+            vbs_val=vbs_val,
+            const_var=const_var,
+            const_var_val=const_var_val,
+            result_path=result_path,
+            raw_output=self.engine.raw_output,
+            **params,
+        )
+
+    def result_frame(
+        self, job: dict, width: float, length: float, data
+    ) -> pd.DataFrame:
+        """
+        Returns results of a variation, formatted as measured data.
+        Args:
+            job (dict): Simulation job.
+            width (float): Width of the variation.
+            length (float): Length of the variation.
+            data (dict): Vectors of the variation, by name.
+        """
+        result_df = pd.DataFrame(
+            {col: data[col] for col in ["vds", "vgs", "vbs", self.meas_out_result]}
+        )
+        result_df["W (um)"] = width
+        result_df["L (um)"] = length
+        result_df["corner"] = job["corner"]
+        result_df["temp"] = job["temp"]
+        return result_df
+
+    def run_sim(self, case: dict, job: dict):
+        if "variations" in job:
+            return self.run_packed_sim(case, job)
+        if self.adaptive_sweeps:
+            return self.run_adaptive_sim(case, job)
+        return self.simulate_sweep(case, job)
+
+    def simulate_sweep(self, case: dict, job: dict, suffix: str = ""):
+        """
+        Runs the simulation of a W/L variation.
+        Args:
+            case (dict): Regression case.
+            job (dict): Simulation job.
+            suffix (str): Suffix of the netlist and results names.
+        Returns:
+            pd.DataFrame: Results of the variation, None if the simulation failed.
+        """
+        device = case["device"]
+        meas_out_result = self.meas_out_result
+        width = job["W (um)"]
+        length = job["L (um)"]
+        temp = job["temp"]
+        sweeps = job["sweeps"]
+
+        dev_netlists_path = self.netlists_dir(case)
+        name = f"w{width}_l{length}_t{temp}_{job['corner']}_{job['const_var']}{job['const_var_val']}_{meas_out_result}{suffix}"
+        netlist_path = os.path.join(dev_netlists_path, f"netlist_{name}.spice")
+
+        result_ext = "raw" if self.engine.raw_output else "csv"
+        result_path = os.path.join(dev_netlists_path, f"simulated_{name}.{result_ext}")
+
+        self.render_job(
+            job,
+            netlist_path,
+            result_path,
+            template=self.netlist_template(device),
+            device=device,
+            width=width,
+            length=length,
+        )
+
+        logging.info(
+            f"Running simulation for {device} at w={width}, l={length}, temp={temp}, sweeps={sweeps}, out={meas_out_result}"
+        )
+
+        # calling simulator to run netlist and write its results
+        try:
+            self.engine.simulate(netlist_path)
+        except Exception:
+            pass
+
+        if not os.path.isfile(result_path):
+            return None
+
+        if self.engine.raw_output:
+            # Vectors are memory mapped from the rawfile, no text is parsed
+            return self.result_frame(job, width, length, read_rawfile(result_path)[0])
+
+        result_df = self.result_frame(job, width, length, read_wrdata(result_path))
+
+        # Writing output in clean format in same csv path of resutls
+        result_df.to_csv(result_path, index=False, header=True, sep=",")
+        return result_df
+
+    def near_threshold(self, case: dict, job: dict, sim_df: pd.DataFrame):
+        """
+        Returns the swept bias of measured points of a job whose error against
+        simulated data is near the pass threshold.
+        Args:
+            case (dict): Regression case.
+            job (dict): Simulation job.
+            sim_df (pd.DataFrame): Simulated data of the job.
+        Returns:
+            np.ndarray: Swept bias of the points, None without measured data.
+        """
+        meas_df = self.meas.get(case["dev_path"])
+        if meas_df is None:
+            return None
+
+        col = case.get("column", self.column)
+        x = job["sweeps"].split()[0].lower()
+        const_val = np.round(float(job["const_var_val"]), ROUND_VOLTS["vds"])
+        meas_df = meas_df[
+            (meas_df["W (um)"] == job["W (um)"])
+            & (meas_df["L (um)"] == job["L (um)"])
+            & (meas_df["corner"] == job["corner"])
+            & (meas_df["temp"] == job["temp"])
+            & (meas_df[job["const_var"]].round(ROUND_VOLTS["vds"]) == const_val)
+        ]
+
+        sweeps_df = pd.DataFrame(
+            [[job["const_var"], job["const_var_val"], job["sweeps"]]],
+            columns=["const_var", "const_var_val", "sweeps"],
+        )
+        meas = meas_df[col].to_numpy(dtype=float)
+        sim = align_dc_sweeps(
+            meas_df,
+            sim_df,
+            sweeps_df,
+            self.curve_keys,
+            col,
+            decimals=ROUND_VOLTS["vds"],
+        )
+        if self.clip is not None:
+            meas = np.maximum(meas, self.clip)
+            sim = np.maximum(sim, self.clip)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            err = np.abs((meas - sim) * 100.0 / meas)
+        near = np.abs(err - PASS_THRESH) < self.refine_band
+        return meas_df[x].to_numpy(dtype=float)[near]
+
+    def run_adaptive_sim(self, case: dict, job: dict):
+        """
+        Runs a W/L variation on a coarse grid of its inner swept bias, then on
+        the measured grid only in the coarse intervals where curves bend or
+        errors are near the pass threshold.
+        Returns:
+            pd.DataFrame: Results of the variation, None if the coarse simulation failed.
+        """
+        col = case.get("column", self.column)
+        coarse, ratio = coarse_sweep(job["sweeps"], self.coarse_factor)
+        if ratio == 1:
+            return self.simulate_sweep(case, job)
+
+        coarse_df = self.simulate_sweep(case, {**job, "sweeps": coarse}, "_coarse")
+        if coarse_df is None:
+            return None
+
+        ranges = refine_ranges(
+            coarse_df,
+            coarse,
+            col,
+            self.refine_tol,
+            floor=self.clip or 0.0,
+            err_x=self.near_threshold(case, job, coarse_df),
+        )
+
+        x = coarse.split()[0].lower()
+        coarse_x = coarse_df[x].to_numpy(dtype=float)
+        keep = np.ones(len(coarse_df), dtype=bool)
+        results = []
+        for k, (start, stop) in enumerate(ranges):
+            refined_df = self.simulate_sweep(
+                case,
+                {**job, "sweeps": sub_sweep(job["sweeps"], start, stop)},
+                f"_refine{k}",
+            )
+            if refined_df is None:
+                continue
+            # Refined points replace the coarse points of their range
+            low, high = min(start, stop) - 1e-9, max(start, stop) + 1e-9
+            keep &= (coarse_x < low) | (coarse_x > high)
+            results.append(refined_df)
+
+        axes = sweep_axes(job["sweeps"])
+        full_points = 1
+        for _, start, stop, step in axes:
+            full_points *= grid_size(start, stop, step) + 1
+
+        with self._stats_lock:
+            stats = self.adaptive_stats.setdefault(
+                case["dev_path"],
+                {"jobs": 0, "simulations": 0, "points": 0, "full_points": 0},
+            )
+            stats["jobs"] += 1
+            stats["simulations"] += 1 + len(results)
+            stats["points"] += len(coarse_df) + sum(len(df) for df in results)
+            stats["full_points"] += full_points
+
+        return pd.concat([coarse_df[keep]] + results, ignore_index=True)
+
+    def finish_case(
+        self,
+        case: dict,
+        meas_df: pd.DataFrame,
+        sim_df: pd.DataFrame,
+        sampler=None,
+    ) -> bool:
+        passed = super().finish_case(case, meas_df, sim_df, sampler)
+        self.meas.pop(case["dev_path"], None)
+        self.sweeps.pop(case["dev_path"], None)
+
+        # Verdicts of full sweeps are the reference of adaptive runs
+        verdicts_path = os.path.join(
+            self.run_dir, self.main_regr_dir, self.full_verdicts_file
+        )
+        verdicts = {}
+        if os.path.isfile(verdicts_path):
+            with open(verdicts_path) as f:
+                verdicts = json.load(f)
+        if not self.adaptive_sweeps and sampler is None and meas_df is not None:
+            verdicts[case["label"]] = bool(passed)
+            write_atomic(verdicts_path, json.dumps(verdicts, indent=2).encode())
+
+        stats = self.adaptive_stats.pop(case["dev_path"], None)
+        if stats:
+            saved = 100.0 * (1.0 - stats["points"] / max(stats["full_points"], 1))
+            full_passed = verdicts.get(case["label"])
+            report = {
+                **stats,
+                "saved_pct": round(saved, 2),
+                "passed": bool(passed),
+                "full_sweep_passed": full_passed,
+            }
+            logging.info(
+                f"# Device {case['label']} adaptive sweeps simulated {stats['points']} of {stats['full_points']} points ({saved:.1f}% saved) in {stats['simulations']} simulations"
+            )
+            if full_passed is None:
+                logging.info(
+                    f"# Device {case['label']} has no full sweeps verdict to check the adaptive one, run without --adaptive to record it"
+                )
+            elif full_passed != passed:
+                logging.warning(
+                    f"# Device {case['label']} adaptive verdict differs from the last full sweeps run, which {'passed' if full_passed else 'failed'}"
+                )
+            write_atomic(
+                os.path.join(case["dev_path"], self.adaptive_file.format(**case)),
+                json.dumps(report, indent=2).encode(),
+            )
+        return passed
+
+    def run_packed_sim(self, case: dict, job: dict) -> list:
+        """
+        Runs one simulation for many W/L variations sharing the same corner, temp and sweeps.
+        Each variation is an instance with its own drain ammeter, results are split back per
+        variation in the same csv files written by run_sim.
+        Returns:
+            list: Results frame of each variation, None for failed ones.
+        """
+        device = case["device"]
+        meas_out_result = self.meas_out_result
+        raw_output = self.engine.raw_output
+        temp = job["temp"]
+        corner = job["corner"]
+        const_var = job["const_var"]
+        const_var_val = job["const_var_val"]
+
+        dev_netlists_path = self.netlists_dir(case)
+        netlist_path = os.path.join(
+            dev_netlists_path,
+            f"netlist_pack{job['pack_id']}_t{temp}_{corner}_{const_var}{const_var_val}_{meas_out_result}.spice",
+        )
+
+        # Raw results use another extension, as all csv files are merged later
+        pack_result_path = netlist_path.replace(
+            ".spice", ".raw" if raw_output else ".txt"
+        )
+
+        widths = job["variations"]["W (um)"].tolist()
+        lengths = job["variations"]["L (um)"].tolist()
+
+        self.render_job(
+            job,
+            netlist_path,
+            pack_result_path,
+            template=self.netlist_template(device),
+            packed=True,
+            device=device,
+            variations=[{"width": w, "length": l} for w, l in zip(widths, lengths)],
+        )
+
+        logging.info(
+            f"Running simulation for {device} at {len(widths)} variations, temp={temp}, sweeps={job['sweeps']}, out={meas_out_result}"
+        )
+
+        # calling simulator to run netlist and write its results
+        try:
+            self.engine.simulate(netlist_path)
+        except Exception:
+            pass
+
+        if not os.path.isfile(pack_result_path):
+            return [None] * len(widths)
+
+        if raw_output:
+            # Vectors are memory mapped from the rawfile, no text is parsed
+            pack_df = read_rawfile(pack_result_path)[0]
+        else:
+            pack_df = pd.read_csv(pack_result_path, delimiter=r"\s+")
+
+        results = []
+        for k, (width, length) in enumerate(zip(widths, lengths)):
+            # Splitting results of current variation in same format of run_sim
+            data = {col: pack_df[col] for col in ["vds", "vgs", "vbs"]}
+            data[meas_out_result] = pack_df[f"{meas_out_result}{k}"]
+            result_df = self.result_frame(job, width, length, data)
+
+            if not raw_output:
+                # Named as the results of simulate_sweep, variations of all corners share the directory
+                sim_file_name = f"simulated_w{width}_l{length}_t{temp}_{corner}_{const_var}{const_var_val}_{meas_out_result}.csv"
+                result_df.to_csv(
+                    os.path.join(dev_netlists_path, sim_file_name),
+                    index=False,
+                    header=True,
+                    sep=",",
+                )
+            results.append(result_df)
+
+        return results
+
+
+class MosRdsAdapter(MosIdAdapter):
+    """
+    Regression of MOSFETs drain-source resistance against measured rds data.
+    """
+
+    name = "mos_rds"
+    group = "mos_rds"
+    meas_out_result = "rds"
+
+    column = "rds"
+    clip = None
+    # rds is the derivative of the simulated id, which is wrong at the ends of
+    # coarse and refined sweeps
+    adaptive = False
+    quantile = 0.95
+    max_val_detect = 10e3
+
+    def netlist_template(self, device: str) -> str:
+        if "03v3" in device:
+            device_group_netlist = "nfet_03v3" if "nfet" in device else "pfet_03v3"
+        elif "06v0_nvt" in device:
+            device_group_netlist = "nfet_06v0_nvt"
+        else:
+            device_group_netlist = "nfet_06v0" if "nfet" in device else "pfet_06v0"
+
+        return os.path.join("device_netlists_rds", f"{device_group_netlist}.spice")
+
+    def merge(
+        self, case: dict, meas_df: pd.DataFrame, sim_df: pd.DataFrame
+    ) -> pd.DataFrame:
+        full_df = super().merge(case, meas_df, sim_df)
+
+        # Droping first/last row for Rds measurement [first/last simulation point]
+        ## as we have measured Rds as a partial derivative of vds to ids.
+        ## As each point is related to next point, so last point have no next point so its calculated value isn't correct.
+        ## Last simlulation points are at Vds = 3.3V for 03v3 devices, 6.6V for others.
+        vds_last = 3.3 if "03v3" in case["device"] else 6.6
+        return full_df[~full_df["vds"].isin([0.0, -0.0, vds_last, -vds_last])]
+
+
+class MosHvIdAdapter(MosIdAdapter):
+    """
+    Simulation of 10V MOSFETs drain current, as there is no measured data it
+    only checks that all points are simulated.
+    """
+
+    name = "mos_hv_id"
+    group = "mos_hv_id"
+    main_regr_dir = "run_mos_id_regr"
+    devices = [
+        "nfet_10v0_asym",
+        "pfet_10v0_asym",
+    ]
+    model_card = "smbb000149.ngspice"
+    vds_default = 10
+
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        return None
+
+    def jobs(self, case: dict, sweeps_df: pd.DataFrame) -> list:
+        # Templates of 10V devices don't pack variations
+        return sweeps_df.to_dict("records")
+
+    def post_sim(self, case: dict, sim_df: pd.DataFrame) -> pd.DataFrame:
+        # Simulated results are written as is, rounded as measured data
+        return DeviceAdapter.post_sim(self, case, sim_df)
+
+    def evaluate(self, case: dict, meas_df: pd.DataFrame, sim_df: pd.DataFrame) -> bool:
+        dev = case["device"]
+        meas_out_result = self.meas_out_result
+
+        sim_df = sim_df.reindex(
+            columns=[
+                "W (um)",
+                "L (um)",
+                "corner",
+                "temp",
+                "vds",
+                "vgs",
+                "vbs",
+                meas_out_result,
+            ]
+        )
+        sim_df.to_csv(f"{case['dev_path']}/sim_results_{dev}.csv", index=False)
+
+        # Verify regression results
+        if not sim_df[meas_out_result].isnull().values.any():
+            logging.info(f"# Device {dev} for {meas_out_result} simulation has passed.")
+            return True
+
+        logging.error(
+            f"# Device {dev} {meas_out_result} simulation has failed regression."
+        )
+        logging.error(f"#Failed regression for {dev}-{meas_out_result} analysis.")
+        return False
+
+
+class MosCvAdapter(DeviceAdapter):
+    """
+    Regression of MOSFETs gate capacitances against measured cv data, each
+    device is checked for each measured capacitance.
+    """
+
+    name = "mos_cv"
+    group = "mos_cv"
+    main_regr_dir = "run_mos_cv_regr"
+    devices = [
+        "fet_03v3",  # For both types [nfet, pfet]
+        "fet_03v3_dss",  # For both types [nfet, pfet]
+        "fet_06v0",  # For both types [nfet, pfet]
+        "fet_06v0_dss",  # For both types [nfet, pfet]
+        "fet_06v0_nvt",  # For one types [nfet]
+    ]
+    # Types of measured parasitic caps
+    # caps = ['cgc', 'cgg', 'cgs', 'cgd']
+    caps = ["cgs", "cgs", "cgd"]
+    data_dir = "MOS_cv"
+    tole = 0.001
+
+    keys = [
+        "device_name",
+        "W (um)",
+        "L (um)",
+        "nf",
+        "corner",
+        "temp",
+        "vds",
+        "vgs",
+        "vbs",
+    ]
+    round_cols = ROUND_VOLTS
+    quantile = 0.98
+    max_val_detect = 10  # 10fF
+    bad_err_file = "{device}_bad_err_{cap}.csv"
+    full_data_file = "{device}_full_merged_data_{cap}.csv"
+    # TODO: Check high errors for Caps measurements [Cgs, Cgd, Cgg]
+    exit_on_fail = False
+
+    def cases(self) -> list:
+        return [
+            {
+                "device": dev,
+                "cap": cap,
+                "column": cap,
+                "label": f"{dev} {cap}",
+                "dev_path": os.path.normpath(
+                    os.path.join(self.run_dir, self.main_regr_dir, dev, cap)
+                ),
+            }
+            for dev in self.devices
+            for cap in self.caps
+        ]
+
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        meas_df = read_data(
+            self.data_path(f"{case['device']}_meas_{case['cap']}.csv"),
+            round_cols=ROUND_VOLTS,
+            dedup=True,
+        )
+        return meas_df.replace(-0, 0)
+
+    def load_sweeps(self, case: dict, meas_df: pd.DataFrame) -> pd.DataFrame:
+        return read_data(self.data_path(f"{case['device']}_sweeps_{case['cap']}.csv"))
+
+    def run_sim(self, case: dict, job: dict) -> pd.DataFrame:
+        device = job["device_name"]
+        cap = case["cap"]
+        width = job["W (um)"]
+        length = job["L (um)"]
+        nf = job["nf"]
+        temp = job["temp"]
+        const_var = job["const_var"]
+        const_var_val = job["const_var_val"]
+        sweeps = job["sweeps"]
+
+        dev_netlists_path = self.netlists_dir(case, device)
+        name = f"w{width}_l{length}_nf{nf}_t{temp}_{const_var}{const_var_val}_{cap}"
+        netlist_path = os.path.join(dev_netlists_path, f"netlist_{name}.spice")
+        result_path = os.path.join(dev_netlists_path, f"simulated_{name}.csv")
+
+        # Check constant voltage values
+        vbs_val = const_var_val if const_var == "vbs" else 0
+        vds_val = const_var_val if const_var == "vds" else 6
+
+        # Formating sweeps to be valid for our template
+        tole = 0 if cap == "cgg" else self.tole
+        main_sweep = " ".join(sweeps.split(" ")[:4])
+        second_sweep = sweeps.split(" ")[4:]
+
+        self.render(
+            os.path.join(
+                "device_netlists",
+                f"{'nfet' if 'nfet' in device else 'pfet'}_{cap}.spice",
+            ),
+            netlist_path,
+            device=device,
+            width=width,
+            length=length,
+            nf=nf,
+            temp=temp,
+            corner=job["corner"],
+            cap=cap,
+            main_sweep=main_sweep,
+            second_sweep_volt=second_sweep[0],
+            second_sweep_start=float(second_sweep[1]),
+            second_sweep_stop=float(second_sweep[2]) + tole,
+            second_sweep_step=float(second_sweep[3]),
+            vds_val=vds_val,
+            vbs_val=vbs_val,
+            const_var=const_var,
+            const_var_val=const_var_val,
+            result_path=result_path,
+        )
+
+        logging.info(
+            f"Running simulation for {device} at w={width}, l={length}, temp={temp}, sweeps={sweeps}, out={cap}"
+        )
+
+        # calling simulator to run netlist and write its results
+        try:
+            self.engine.simulate(netlist_path)
+        except Exception:
+            pass
+
+        if not os.path.isfile(result_path):
+            return None
+
+        result_df = pd.read_csv(result_path, delimiter=r"\s+")
+        result_df = result_df[result_df.iloc[:, 0] != result_df.columns[0]]
+        # Values are parsed as strings if headers are repeated in results
+        result_df = result_df.apply(pd.to_numeric)
+
+        # Drop unwanted columns for simplicity
+        result_df.drop("v-sweep", axis=1, inplace=True)
+
+        # Adding columns for all variations per each run
+        result_df["device_name"] = device
+        result_df["W (um)"] = width
+        result_df["L (um)"] = length
+        result_df["nf"] = nf
+        result_df["corner"] = job["corner"]
+        result_df["temp"] = temp
+
+        # Writing output in clean format in same csv path of resutls
+        result_df.to_csv(result_path, index=False, header=True, sep=",")
+        return result_df
+
+    def post_sim(self, case: dict, sim_df: pd.DataFrame) -> pd.DataFrame:
+        sim_df = sim_df.round(ROUND_VOLTS).replace(-0, 0)
+        sim_df.drop_duplicates(inplace=True)
+        return sim_df
@@ -0,0 +1,154 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Resistors regression of GF180MCU models.
+"""
+
+import pandas as pd
+import numpy as np
+import logging
+import os
+
+from ..adapter import DeviceAdapter, read_data
+
+
+def find_res(log_file: str) -> float:
+    """
+    Function to parse resistance value from simulation run log.
+
+    Parameters
+    ----------
+    log_file : str or Path
+        Path to the simulation run log file.
+    Returns
+    -------
+        Parsed resistance value measured in simulation run.
+    """
+    with open(log_file, errors="replace") as f:
+        line = next(line for line in f if "res = " in line)
+    return float(line.split(" ")[2])
+
+
+class ResistorAdapter(DeviceAdapter):
+    """
+    Regression of resistors against measured resistance at many geometries,
+    temperatures and voltages.
+    """
+
+    name = "resistor_r"
+    group = "resistor_r"
+    main_regr_dir = "run_res_r_regr"
+    devices = [
+        "nplus_u",
+        "pplus_u",
+        "nplus_s",
+        "pplus_s",
+        "npolyf_u",
+        "ppolyf_u",
+        "npolyf_s",
+        "ppolyf_s",
+        "ppolyf_u_1k",
+        "ppolyf_u_2k",
+        "ppolyf_u_1k_6p0",
+        "ppolyf_u_2k_6p0",
+        "ppolyf_u_3k",
+        "rm1",
+        "rm2",
+        "rm3",
+        "tm6k",
+        "tm9k",
+        "tm11k",
+        "tm30k",
+        "nwell",
+    ]
+    data_dir = "RES_r"
+
+    column = "res"
+    keys = ["device", "corner", "length", "width", "voltage", "temp"]
+    quantile = 0.98
+    max_val_detect = 1
+    bad_err_cols = ["res_sim", "res_err"]
+    bad_err_file = "{device}_r_bad_err.csv"
+
+    def cases(self) -> list:
+        cases = super().cases()
+        for case in cases:
+            case["label"] = f"{case['device']}-R"
+        return cases
+
+    def load_meas(self, case: dict) -> pd.DataFrame:
+        meas_df = pd.concat(
+            [
+                read_data(self.data_path(f"{case['device']}_res_{meas}_meas.csv"))
+                for meas in ["wl", "temp"]
+            ]
+        )
+        meas_df.drop_duplicates(inplace=True)
+        return meas_df
+
+    def run_sim(self, case: dict, job: dict) -> pd.DataFrame:
+        device = case["device"]
+        width = job["width"]
+        length = job["length"]
+        corner = job["corner"]
+        temp = job["temp"]
+        voltage = job["voltage"]
+
+        netlist_path = os.path.join(
+            self.netlists_dir(case),
+            f"netlist_w{width}_l{length}_t{temp}_{corner}_v{voltage}.spice",
+        )
+
+        # Differientiate between 2 or 3 terminal res
+        terminals = "GND" if "rm" in device or "tm" in device else "GND GND"
+
+        self.render(
+            os.path.join("device_netlists", "res_r.spice"),
+            netlist_path,
+            device=device,
+            terminals=terminals,
+            width=width,
+            length=length,
+            temp=temp,
+            corner=corner,
+            voltage=voltage,
+        )
+
+        logging.info(
+            f"Running simulation for {device}-R at w={width}, l={length}, temp={temp}, corner={corner}, voltage={voltage}"
+        )
+
+        # calling simulator to run netlist and get res value from run log
+        try:
+            self.engine.simulate(netlist_path)
+            res_val = find_res(f"{netlist_path}.log")
+        except Exception:
+            res_val = np.nan
+            logging.error(
+                f"Running simulation at w={width}, l={length}, temp={temp}, corner={corner} got an exception"
+            )
+            logging.error(f"Regression couldn't get the output from {netlist_path}.log")
+
+        return pd.DataFrame(
+            {
+                "device": [device],
+                "corner": [corner],
+                "length": [length],
+                "width": [width],
+                "voltage": [voltage],
+                "temp": [temp],
+                "res_unscaled": [res_val],
+                "res": [res_val * width / length],
+            }
+        )
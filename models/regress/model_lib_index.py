@@ -0,0 +1,460 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Index of ngspice model card libraries for GF180MCU models regression.
+
+Parses the `.lib`/`.endl` sections of a model card once, with the byte
+offsets of its sections, subckts and models, and emits minimal self-contained
+include files per section and devices: nested `.lib` calls are expanded and
+only the subckts and models reachable from the devices are kept.
+
+Usage:
+  model_lib_index.py (--lib=<lib_path>) [--cache_dir=<cache_dir>] [--list]
+  model_lib_index.py (--lib=<lib_path>) (--section=<section>) [--device=<device>...] [--cache_dir=<cache_dir>]
+
+  -h, --help                     Show help text.
+  --lib=<lib_path>               Path of the model card library.
+  --cache_dir=<cache_dir>        Directory of the index and generated include files. [default: model_lib_cache]
+  --list                         List sections of the library.
+  --section=<section>            Library section to be emitted, a corner for example.
+  --device=<device>              Device subckt or model to be kept, all are kept if not given.
+"""
+
+from docopt import docopt
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+LIB_RE = re.compile(rb"^\s*\.lib\s+(\S+)\s*$", re.IGNORECASE)
+LIB_CALL_RE = re.compile(rb"^\s*\.lib\s+(\S+)\s+(\S+)\s*$", re.IGNORECASE)
+ENDL_RE = re.compile(rb"^\s*\.endl\b", re.IGNORECASE)
+SUBCKT_RE = re.compile(rb"^\s*\.subckt\s+(\S+)", re.IGNORECASE)
+ENDS_RE = re.compile(rb"^\s*\.ends\b", re.IGNORECASE)
+MODEL_RE = re.compile(rb"^\s*\.model\s+(\S+)\s+(\w+)", re.IGNORECASE)
+WORD_RE = re.compile(r"[A-Za-z_][\w.]*")
+
+
+def model_base_name(name: str) -> str:
+    """
+    Returns the name used to instantiate a model, without its bin suffix.
+    Args:
+        name (str): Model name, nfet_03v3.0 for example.
+    """
+    return name.split(".")[0]
+
+
+class ModelLibIndex:
+    """
+    Index of the sections, subckts and models of a model card library.
+
+    Args:
+        lib_path (str): Path of the model card library.
+        cache_dir (str): Directory where the index is saved, not saved if None.
+    """
+
+    def __init__(self, lib_path: str, cache_dir: str = None):
+        self.lib_path = os.path.abspath(lib_path)
+
+        with open(self.lib_path, "rb") as f:
+            self._data = f.read()
+        self.digest = hashlib.sha256(self._data).hexdigest()[:16]
+
+        index_path = None
+        if cache_dir:
+            stem = os.path.basename(self.lib_path)
+            index_path = os.path.join(cache_dir, f"{stem}_{self.digest}.index.json")
+
+        if index_path and os.path.isfile(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+        else:
+            index = self._build()
+            if index_path:
+                write_atomic(index_path, json.dumps(index, indent=1).encode())
+
+        self.sections = index["sections"]
+        self.subckts = index["subckts"]
+        self.models = index["models"]
+
+    def _build(self) -> dict:
+        sections = {}
+        subckts = {}
+        models = {}
+
+        section = None
+        subckt = None
+        offset = 0
+        for line_no, line in enumerate(self._data.splitlines(keepends=True), 1):
+            start = offset
+            offset += len(line)
+
+            lib_call = LIB_CALL_RE.match(line)
+            lib = LIB_RE.match(line)
+
+            if section is None:
+                if lib:
+                    name = lib.group(1).decode().lower()
+                    section = {"name": name, "start": offset, "line": line_no}
+                    section["refs"] = []
+                continue
+
+            if ENDL_RE.match(line):
+                section["end"] = start
+                sections[section.pop("name")] = section
+                section = None
+            elif lib_call:
+                ref_path = lib_call.group(1).decode().strip("'\"")
+                ref_name = lib_call.group(2).decode().lower()
+                section["refs"].append([start, offset, ref_path, ref_name])
+            elif SUBCKT_RE.match(line):
+                name = SUBCKT_RE.match(line).group(1).decode().lower()
+                subckt = [name, start]
+            elif ENDS_RE.match(line) and subckt:
+                name, subckt_start = subckt
+                subckts.setdefault(name, []).append(
+                    [section["name"], subckt_start, offset]
+                )
+                subckt = None
+            elif MODEL_RE.match(line):
+                name, model_type = MODEL_RE.match(line).groups()
+                models.setdefault(name.decode().lower(), []).append(
+                    [section["name"], start, model_type.decode().lower()]
+                )
+
+        return {"sections": sections, "subckts": subckts, "models": models}
+
+    def section_text(self, name: str, _stack: tuple = ()) -> str:
+        """
+        Returns the body of a section, with nested `.lib` calls expanded.
+        Args:
+            name (str): Section name.
+        Returns:
+            str: Section body, without its `.lib` and `.endl` lines.
+        """
+        name = name.lower()
+        if name not in self.sections:
+            raise KeyError(f"Section {name} is not found in {self.lib_path}")
+        if name in _stack:
+            raise ValueError(f"Section {name} of {self.lib_path} includes itself")
+
+        section = self.sections[name]
+        chunks = []
+        pos = section["start"]
+        for ref_start, ref_end, ref_path, ref_name in section["refs"]:
+            chunks.append(self._data[pos:ref_start].decode(errors="replace"))
+
+            ref_path = os.path.join(os.path.dirname(self.lib_path), ref_path)
+            if os.path.abspath(ref_path) == self.lib_path:
+                ref_index = self
+            else:
+                ref_index = ModelLibIndex(ref_path)
+
+            chunks.append(f"* expanded from .lib {ref_path} {ref_name}\n")
+            chunks.append(ref_index.section_text(ref_name, _stack + (name,)))
+            pos = ref_end
+
+        chunks.append(self._data[pos : section["end"]].decode(errors="replace"))
+        return "".join(chunks)
+
+    def minimal_section(self, name: str, devices=None) -> str:
+        """
+        Returns a self-contained library with a single section, only keeping
+        the subckts and models reachable from the given devices.
+        Args:
+            name (str): Section name.
+            devices (list): Names of device subckts or models, all are kept if empty.
+        Returns:
+            str: Library text.
+        """
+        text = self.section_text(name)
+        if devices:
+            text = prune(text, devices)
+
+        return (
+            f"* Generated from {os.path.basename(self.lib_path)} section {name}\n"
+            f".lib {name}\n{text}\n.endl {name}\n"
+        )
+
+
+def statements(text: str) -> list:
+    """
+    Splits spice text into statements, joining `+` continuation lines and
+    dropping comments.
+    Args:
+        text (str): Spice text.
+    Returns:
+        list: List of statements, each is a list of lines.
+    """
+    stmts = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("*"):
+            continue
+        if stripped.startswith("+") and stmts:
+            stmts[-1].append(line)
+        else:
+            stmts.append([line])
+
+    return stmts
+
+
+def prune(text: str, devices) -> str:
+    """
+    Removes subckts and models which aren't reachable from the given devices.
+    Params, options and other statements are always kept.
+    Args:
+        text (str): Spice text of a flat library section.
+        devices (list): Names of device subckts or models.
+    Returns:
+        str: Pruned spice text.
+    """
+    # Group statements in top level items: (kind, name, statements)
+    items = []
+    depth = 0
+    for stmt in statements(text):
+        head = stmt[0].strip().lower()
+        if depth:
+            items[-1][2].append(stmt)
+            if head.startswith(".subckt"):
+                depth += 1
+            elif head.startswith(".ends"):
+                depth -= 1
+        elif head.startswith(".subckt"):
+            items.append(["subckt", head.split()[1], [stmt]])
+            depth = 1
+        elif head.startswith(".model"):
+            items.append(["model", model_base_name(head.split()[1]), [stmt]])
+        else:
+            items.append(["other", None, [stmt]])
+
+    names = {name for kind, name, _ in items if kind != "other"}
+
+    # Collect subckts and models used by each subckt
+    uses = {}
+    for kind, name, stmts in items:
+        if kind == "subckt":
+            words = set()
+            for stmt in stmts[1:]:
+                words.update(w.lower() for w in WORD_RE.findall(" ".join(stmt)))
+            uses.setdefault(name, set()).update((words & names) - {name})
+
+    # Walk dependencies from devices
+    kept = set()
+    pending = [d.lower() for d in devices if d.lower() in names]
+    while pending:
+        name = pending.pop()
+        if name not in kept:
+            kept.add(name)
+            pending.extend(uses.get(name, ()))
+
+    # Devices aren't defined in this section, keep it complete
+    if not kept:
+        return text
+
+    lines = []
+    for kind, name, stmts in items:
+        if kind == "other" or name in kept:
+            for stmt in stmts:
+                lines.extend(stmt)
+
+    return "\n".join(lines)
+
+
+def write_atomic(path: str, data: bytes):
+    """
+    Writes a file through a temp file, so that concurrent readers never see it partially written.
+    Args:
+        path (str): Output file path.
+        data (bytes): File content.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ModelLibCache:
+    """
+    Cache of minimal per-section and per-device include files, used to
+    rewrite the `.lib` calls of regression netlists.
+
+    Args:
+        cache_dir (str): Directory of the indexes and generated include files.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self._indexes = {}
+        self._libs = {}
+        self._lock = threading.Lock()
+
+    def index(self, lib_path: str) -> ModelLibIndex:
+        """
+        Returns the index of a model card library, built once per run.
+        Args:
+            lib_path (str): Path of the model card library.
+        """
+        lib_path = os.path.abspath(lib_path)
+        with self._lock:
+            if lib_path not in self._indexes:
+                self._indexes[lib_path] = ModelLibIndex(lib_path, self.cache_dir)
+            return self._indexes[lib_path]
+
+    def minimal_lib(self, lib_path: str, section: str, devices=()) -> str:
+        """
+        Returns the path of the minimal include file of a section, generating it if needed.
+        Args:
+            lib_path (str): Path of the model card library.
+            section (str): Section name.
+            devices (list): Names of device subckts or models.
+        Returns:
+            str: Path of a library file with a single section of the same name.
+        """
+        index = self.index(lib_path)
+        devices = sorted({d.lower() for d in devices})
+        key = (index.lib_path, section.lower(), tuple(devices))
+
+        with self._lock:
+            if key in self._libs:
+                return self._libs[key]
+
+            # Named by content, as nested calls may read other libraries
+            text = index.minimal_section(section, devices).encode()
+            digest = hashlib.sha256(text).hexdigest()[:16]
+            stem = os.path.basename(index.lib_path)
+            out_path = os.path.join(
+                self.cache_dir, f"{stem}_{section.lower()}_{digest}.lib"
+            )
+            if not os.path.isfile(out_path):
+                write_atomic(out_path, text)
+
+            self._libs[key] = out_path
+            return out_path
+
+    def netlist_libs(self, netlist: str) -> list:
+        """
+        Returns the `.lib <model card> <section>` calls of a netlist, with the
+        devices of each model card instantiated in the netlist.
+        Args:
+            netlist (str): Netlist text.
+        Returns:
+            list: (line, lib_path, section, devices) of each call.
+        """
+        lib_calls = []
+        for line in netlist.splitlines():
+            lib_call = LIB_CALL_RE.match(line.encode())
+            if lib_call:
+                lib_path = lib_call.group(1).decode().strip("'\"")
+                if os.path.isfile(lib_path):
+                    lib_calls.append((line, lib_path, lib_call.group(2).decode()))
+
+        if not lib_calls:
+            return []
+
+        # Devices are names of subckts or models used in the netlist
+        words = {w.lower() for w in WORD_RE.findall(netlist)}
+
+        libs = []
+        for line, lib_path, section in lib_calls:
+            index = self.index(lib_path)
+            names = set(index.subckts) | {model_base_name(m) for m in index.models}
+            libs.append((line, lib_path, section, words & names))
+
+        return libs
+
+    def rewrite_netlist(self, netlist_path: str):
+        """
+        Replaces `.lib <model card> <section>` calls of a netlist with minimal
+        include files, keeping only the devices instantiated in the netlist.
+        Args:
+            netlist_path (str): Netlist to be rewritten in place.
+        """
+        with open(netlist_path) as f:
+            netlist = f.read()
+
+        libs = self.netlist_libs(netlist)
+        if not libs:
+            return
+
+        for line, lib_path, section, devices in libs:
+            try:
+                min_lib_path = self.minimal_lib(lib_path, section, devices)
+            except KeyError as e:
+                logging.warning(f"{e}, keeping {line.strip()} in {netlist_path}")
+                continue
+
+            netlist = netlist.replace(line, f".lib {min_lib_path} {section}", 1)
+
+        with open(netlist_path, "w") as f:
+            f.write(netlist)
+
+
+def main(arguments):
+    """
+    Main function of model card library index tool.
+    Args:
+        arguments (dict): Parsed command line arguments.
+    """
+    lib_cache = ModelLibCache(arguments["--cache_dir"])
+    index = lib_cache.index(arguments["--lib"])
+
+    if arguments["--section"] is None:
+        for name, section in index.sections.items():
+            refs = ", ".join(ref_name for _, _, _, ref_name in section["refs"])
+            logging.info(
+                f"{name:<24} line {section['line']:>6}, {section['end'] - section['start']:>9} bytes"
+                + (f", calls: {refs}" if refs else "")
+            )
+        logging.info(
+            f"{len(index.sections)} sections, {len(index.subckts)} subckts, {len(index.models)} models"
+        )
+        return
+
+    section = arguments["--section"]
+    out_path = lib_cache.minimal_lib(arguments["--lib"], section, arguments["--device"])
+
+    full_lines = len(statements(index.section_text(section)))
+    with open(out_path) as f:
+        min_lines = len(statements(f.read()))
+
+    logging.info(f"Section {section} has {full_lines} statements when expanded")
+    logging.info(f"Minimal library with {min_lines} statements written to {out_path}")
+
+
+# ================================================================
+# -------------------------- MAIN --------------------------------
+# ================================================================
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="MODEL-LIB-INDEX: 0.1")
+
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    main(arguments)
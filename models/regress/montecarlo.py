@@ -0,0 +1,527 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Monte Carlo simulation of GF180MCU models statistical sections.
+
+Each sample of a device is one netlist calling the statistical section of its
+family (`statistical`, `bjt_statistical` or `res_statistical`), whose `agauss`
+draws are seeded by `.options seed`. Sample seeds are derived from the run seed
+and the sample index only, so results don't depend on the number of workers
+or on which worker ran a sample. Samples run in batches on the regression
+engine workers, each batch is appended to a Parquet file as a row group, and
+the running mean and standard deviation of the outputs are updated. Sampling
+stops once the standard deviation of all outputs changed less than the
+tolerance over a batch. Run it from the models directory.
+
+Usage:
+  montecarlo (--device=<device>...) [--samples=<num>] [--batch=<num>] [--min_samples=<num>] [--tol=<pct>] [--seed=<num>] [--mode=<mode>] [--temp=<temp>] [--width=<um>] [--length=<um>] [--run_dir=<dir>] [--num_cores=<num>] [--backend=<backend>] [--lib_cache=<dir>] [--sim_cache=<dir>]
+  montecarlo --list
+
+  -h, --help                     Show help text.
+  --list                         List supported devices and their outputs.
+  --device=<device>              Simulated device, nfet_03v3 for example.
+  --samples=<num>                Max number of samples per device. [default: 1000]
+  --batch=<num>                  Number of samples run between convergence checks. [default: 100]
+  --min_samples=<num>            Least number of samples before sampling could stop. [default: 200]
+  --tol=<pct>                    Max relative change (%) of outputs standard deviation over a batch to stop sampling, 0 to run all samples. [default: 1]
+  --seed=<num>                   Seed of the run, the same samples are drawn for the same seed. [default: 1]
+  --mode=<mode>                  Statistical variations (Allowed: all, global, mismatch). [default: all]
+  --temp=<temp>                  Simulated temperature. [default: 25]
+  --width=<um>                   Device width in um, default of the device if not given.
+  --length=<um>                  Device length in um, default of the device if not given.
+  --run_dir=<dir>                Directory of netlists and results. [default: montecarlo_run]
+  --num_cores=<num>              Max number of concurrent simulator processes, capped at the physical cores count which is used by default.
+  --backend=<backend>            Simulation backend (Allowed: batch, shared). [default: batch]
+  --lib_cache=<dir>              Directory of minimal model card include files.
+  --sim_cache=<dir>              Directory of simulation outputs stored by hash of netlist, its includes and ngspice version.
+"""
+
+from docopt import docopt
+from functools import partial
+from jinja2 import Template
+import json
+import logging
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .adapter import NGSPICE_DIR, setup_pandas
+from .engine import Engine
+from .model_lib_index import write_atomic
+
+TEMPLATE_DIR = os.path.join(NGSPICE_DIR, "testing", "monte_carlo", "device_netlists")
+
+# Model card section, netlist template and printed outputs of each device kind
+KINDS = {
+    "mos": ("statistical", "mos.spice", ["idsat", "idlin"]),
+    "bjt": ("bjt_statistical", "bjt.spice", ["ic", "ib", "beta"]),
+    "res": ("res_statistical", "res.spice", ["res"]),
+}
+
+# Bias and default geometry of each device, voltages of p devices are negative
+MOS_DEVICES = {
+    "nfet_03v3": {"vdd": 3.3, "width": 1.0, "length": 0.28},
+    "pfet_03v3": {"vdd": -3.3, "width": 1.0, "length": 0.28},
+    "nfet_06v0": {"vdd": 6.0, "width": 1.0, "length": 0.7},
+    "pfet_06v0": {"vdd": -6.0, "width": 1.0, "length": 0.5},
+    "nfet_06v0_nvt": {"vdd": 6.0, "width": 1.0, "length": 1.8},
+}
+BJT_DEVICES = [
+    "npn_10p00x10p00",
+    "npn_05p00x05p00",
+    "npn_00p54x16p00",
+    "npn_00p54x08p00",
+    "npn_00p54x04p00",
+    "npn_00p54x02p00",
+    "pnp_10p00x10p00",
+    "pnp_05p00x05p00",
+    "pnp_10p00x00p42",
+    "pnp_05p00x00p42",
+]
+RES_DEVICES = [
+    "nplus_u",
+    "pplus_u",
+    "nplus_s",
+    "pplus_s",
+    "npolyf_u",
+    "ppolyf_u",
+    "npolyf_s",
+    "ppolyf_s",
+    "ppolyf_u_1k",
+    "ppolyf_u_2k",
+    "ppolyf_u_1k_6p0",
+    "ppolyf_u_2k_6p0",
+    "ppolyf_u_3k",
+]
+
+# Values of the statistical switches per mode
+MODES = {
+    "all": {"sw_stat_global": 1, "sw_stat_mismatch": 1},
+    "global": {"sw_stat_global": 1, "sw_stat_mismatch": 0},
+    "mismatch": {"sw_stat_global": 0, "sw_stat_mismatch": 1},
+}
+
+
+def device_bench(device: str, width: float = None, length: float = None) -> dict:
+    """
+    Returns the kind and template parameters of a device sample netlist.
+    Args:
+        device (str): Device name.
+        width (float): Width in um, the device default if not given.
+        length (float): Length in um, the device default if not given.
+    """
+    if device in MOS_DEVICES:
+        bench = dict(MOS_DEVICES[device], kind="mos")
+        bench["vlin"] = 0.05 if bench["vdd"] > 0 else -0.05
+    elif device in BJT_DEVICES:
+        npn = device.startswith("npn")
+        bench = {
+            "kind": "bjt",
+            "terminals": "c b 0 0" if npn else "c b 0",
+            "vc": 2.0 if npn else -2.0,
+            "vb": 0.7 if npn else -0.7,
+        }
+    elif device in RES_DEVICES:
+        bench = {
+            "kind": "res",
+            "terminals": "0 0",
+            "voltage": 0.1,
+            "width": 1.0,
+            "length": 10.0,
+        }
+    else:
+        raise ValueError(f"Device {device} has no Monte Carlo bench")
+
+    if width is not None and "width" in bench:
+        bench["width"] = width
+    if length is not None and "length" in bench:
+        bench["length"] = length
+    return bench
+
+
+def sample_seed(seed: int, sample: int) -> int:
+    """
+    Returns the simulator seed of a sample, a positive 31 bits integer.
+    Args:
+        seed (int): Seed of the run.
+        sample (int): Sample index.
+    """
+    state = np.random.SeedSequence(seed, spawn_key=(sample,)).generate_state(1)[0]
+    return int(state % 2147483646) + 1
+
+
+def find_outputs(log_file: str, outputs: list) -> dict:
+    """
+    Returns the values printed by a sample netlist in its run log.
+    Args:
+        log_file (str): Path of the simulation run log.
+        outputs (list): Names of the printed values.
+    Returns:
+        dict: Value of each output, NaN if it isn't found.
+    """
+    values = dict.fromkeys(outputs, np.nan)
+    pattern = re.compile(r"^\s*(\w+)\s*=\s*(\S+)")
+    with open(log_file, errors="replace") as f:
+        for line in f:
+            match = pattern.match(line)
+            if match and match.group(1).lower() in values:
+                try:
+                    values[match.group(1).lower()] = float(match.group(2))
+                except ValueError:
+                    pass
+    return values
+
+
+class RunningStats:
+    """
+    Running mean and standard deviation of columns, updated per batch by
+    merging the batch moments (Welford's algorithm for groups of samples).
+
+    Args:
+        columns (list): Names of the columns.
+    """
+
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        self.count = np.zeros(len(self.columns))
+        self.mean = np.zeros(len(self.columns))
+        self.m2 = np.zeros(len(self.columns))
+
+    def update(self, values: np.ndarray):
+        """
+        Adds a batch of samples, NaN values are ignored.
+        Args:
+            values (np.ndarray): Samples (rows) of each column.
+        """
+        values = np.asarray(values, dtype=float).reshape(-1, len(self.columns))
+        count = np.sum(~np.isnan(values), axis=0)
+        if not count.any():
+            return
+        # Columns without samples in the batch get a zero mean, without warnings
+        mean = np.nansum(values, axis=0) / np.maximum(count, 1)
+        m2 = np.nansum((values - mean) ** 2, axis=0)
+
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.mean = np.where(
+                total > 0, self.mean + delta * count / total, self.mean
+            )
+            self.m2 = np.where(
+                total > 0, self.m2 + m2 + delta**2 * self.count * count / total, 0.0
+            )
+        self.count = total
+
+    @property
+    def sigma(self) -> np.ndarray:
+        """Sample standard deviation of each column, NaN below two samples."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(
+                self.count > 1, np.sqrt(self.m2 / np.maximum(self.count - 1, 1)), np.nan
+            )
+
+    def summary(self) -> dict:
+        """Returns the samples count, mean and standard deviation of each column."""
+        sigma = self.sigma
+        summary = {}
+        for i, name in enumerate(self.columns):
+            mean = float(self.mean[i])
+            summary[name] = {
+                "count": int(self.count[i]),
+                "mean": mean,
+                "sigma": float(sigma[i]),
+                "sigma_rel": float(100.0 * sigma[i] / abs(mean)) if mean else np.nan,
+            }
+        return summary
+
+
+class ColumnWriter:
+    """
+    Writer of sample batches to a Parquet file, a row group per batch. Rows are
+    written to a temporary file, renamed once the writer is closed.
+
+    Args:
+        path (str): Path of the Parquet file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._tmp_path = f"{path}.tmp{os.getpid()}"
+        self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        """
+        Appends a batch of samples.
+        Args:
+            df (pd.DataFrame): Samples of the batch.
+        """
+        if not len(df):
+            return
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._tmp_path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+        self.rows += len(df)
+
+    def close(self):
+        """Closes the file, it isn't written if no sample was."""
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._tmp_path, self.path)
+            self._writer = None
+
+
+def run_sim(engine: Engine, dev_path: str, params: dict, outputs: list, job: dict):
+    """
+    Runs a Monte Carlo sample of a device.
+    Args:
+        engine (Engine): Regression engine running the simulation.
+        dev_path (str): Directory of the device netlists.
+        params (dict): Template parameters of the device netlist.
+        outputs (list): Names of the printed values.
+        job (dict): Index and seed of the sample.
+    Returns:
+        pd.DataFrame: Sample index, seed and outputs. None if the simulation failed.
+    """
+    netlist_path = os.path.join(dev_path, f"sample_{job['sample']}.spice")
+    with engine.telemetry.phase("render"):
+        with open(os.path.join(TEMPLATE_DIR, params["template"])) as f:
+            tmpl = Template(f.read())
+        with open(netlist_path, "w") as netlist:
+            netlist.write(
+                tmpl.render(
+                    model_card_path=os.path.join(NGSPICE_DIR, "sm141064.ngspice"),
+                    seed=job["seed"],
+                    **params,
+                )
+            )
+
+    # calling simulator to run netlist and get outputs from run log
+    try:
+        engine.simulate(netlist_path)
+    except Exception:
+        pass
+
+    log_path = f"{netlist_path}.log"
+    if not os.path.isfile(log_path):
+        return None
+    with engine.telemetry.phase("parse"):
+        values = find_outputs(log_path, outputs)
+    if all(np.isnan(v) for v in values.values()):
+        logging.error(f"Monte Carlo couldn't get the outputs from {log_path}")
+        return None
+    return pd.DataFrame({"sample": [job["sample"]], "seed": [job["seed"]]}).assign(
+        **{name: [value] for name, value in values.items()}
+    )
+
+
+def run_device(engine: Engine, device: str, arguments: dict) -> dict:
+    """
+    Runs the Monte Carlo samples of a device until its outputs spread converges.
+    Args:
+        engine (Engine): Regression engine running the simulations.
+        device (str): Device name.
+        arguments (dict): Arguments used by user in the run command, generated by docopt.
+    Returns:
+        dict: Summary of the device run.
+    """
+    width = float(arguments["--width"]) if arguments["--width"] else None
+    length = float(arguments["--length"]) if arguments["--length"] else None
+    bench = device_bench(device, width, length)
+    section, template, outputs = KINDS[bench["kind"]]
+
+    max_samples = int(arguments["--samples"])
+    batch = max(1, int(arguments["--batch"]))
+    min_samples = int(arguments["--min_samples"])
+    tol = float(arguments["--tol"]) / 100.0
+    seed = int(arguments["--seed"])
+    mode = arguments["--mode"]
+
+    dev_path = os.path.join(arguments["--run_dir"], device)
+    netlists_path = os.path.join(dev_path, "netlists")
+    os.makedirs(netlists_path, exist_ok=True)
+
+    params = dict(
+        bench,
+        device=device,
+        section=section,
+        template=template,
+        temp=arguments["--temp"],
+        **MODES[mode],
+    )
+    sim = partial(run_sim, engine, netlists_path, params, outputs)
+
+    stats = RunningStats(outputs)
+    writer = ColumnWriter(os.path.join(dev_path, f"{device}_mc.parquet"))
+    history = []
+    attempted = 0
+    converged = False
+    start = time.perf_counter()
+    logging.info(
+        f"# Device {device} Monte Carlo: {section} section, {mode} variations, up to {max_samples} samples"
+    )
+
+    try:
+        for first in range(0, max_samples, batch):
+            jobs = [
+                {"sample": k, "seed": sample_seed(seed, k)}
+                for k in range(first, min(first + batch, max_samples))
+            ]
+            df = engine.run(sim, jobs, f"{device} mc", case_key=dev_path)
+            attempted += len(jobs)
+            prev_sigma = stats.sigma
+            if len(df):
+                df = df.sort_values("sample", ignore_index=True)
+                writer.write(df)
+                stats.update(df[outputs].to_numpy(dtype=float))
+
+            elapsed = time.perf_counter() - start
+            sigma = stats.sigma
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change = np.abs(sigma - prev_sigma) / np.abs(sigma)
+            history.append(
+                {
+                    "samples": writer.rows,
+                    "sigma": dict(zip(outputs, sigma.tolist())),
+                    "change": dict(zip(outputs, change.tolist())),
+                }
+            )
+            logging.info(
+                f"# Device {device}: {writer.rows}/{attempted} samples done, "
+                f"{writer.rows / elapsed:.1f} samples/s, "
+                + ", ".join(
+                    f"{name} sigma {s:.4g} ({100 * c:.2f} % change)"
+                    for name, s, c in zip(outputs, sigma, change)
+                )
+            )
+
+            if (
+                tol > 0
+                and writer.rows >= min_samples
+                and np.all(np.nan_to_num(change, nan=np.inf) < tol)
+            ):
+                converged = True
+                break
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "device": device,
+        "section": section,
+        "mode": mode,
+        "temp": float(arguments["--temp"]),
+        "bench": {k: v for k, v in bench.items() if k != "kind"},
+        "seed": seed,
+        "samples": writer.rows,
+        "failed": attempted - writer.rows,
+        "converged": converged,
+        "tol": tol * 100.0,
+        "elapsed": round(elapsed, 3),
+        "samples_per_sec": round(writer.rows / elapsed, 3) if elapsed else None,
+        "stats": stats.summary(),
+        "history": history,
+    }
+    write_atomic(
+        os.path.join(dev_path, f"{device}_mc.json"),
+        json.dumps(summary, indent=2).encode(),
+    )
+    return summary
+
+
+def main(arguments: dict) -> int:
+    """
+    Main function of the Monte Carlo command.
+    Args:
+        arguments (dict): Arguments used by user in the run command, generated by docopt.
+    Returns:
+        int: Exit code, 1 if a device isn't supported or has no successful sample.
+    """
+    devices = list(MOS_DEVICES) + BJT_DEVICES + RES_DEVICES
+    if arguments["--list"]:
+        for device in devices:
+            section, _, outputs = KINDS[device_bench(device)["kind"]]
+            print(f"{device:<20} {section:<16} {', '.join(outputs)}")
+        return 0
+
+    unknown = [d for d in arguments["--device"] if d not in devices]
+    if unknown:
+        logging.error(
+            f"{', '.join(unknown)} devices are not supported, allowed devices are [{', '.join(devices)}], please recheck"
+        )
+        return 1
+    if arguments["--mode"] not in MODES:
+        logging.error(
+            f"{arguments['--mode']} mode is not supported, allowed modes are [{', '.join(MODES)}], please recheck"
+        )
+        return 1
+
+    setup_pandas()
+    engine = Engine.from_args(arguments)
+    engine.backend.check_version()
+
+    status = 0
+    try:
+        for device in arguments["--device"]:
+            summary = run_device(engine, device, arguments)
+            if not summary["samples"]:
+                logging.error(f"# Device {device}: no Monte Carlo sample succeeded")
+                status = 1
+                continue
+
+            logging.info(
+                f"# Device {device}: {summary['samples']} samples "
+                f"({summary['failed']} failed) in {summary['elapsed']:.1f} s, "
+                f"{summary['samples_per_sec']:.1f} samples/s, "
+                f"{'converged' if summary['converged'] else 'not converged'}"
+            )
+            for name, col in summary["stats"].items():
+                logging.info(
+                    f"# {device} {name}: mean {col['mean']:.6g}, sigma {col['sigma']:.6g} ({col['sigma_rel']:.2f} %)"
+                )
+    finally:
+        engine.close()
+
+    logging.info(f"Monte Carlo samples are written to {arguments['--run_dir']}")
+    return status
+
+
+# ================================================================
+# -------------------------- MAIN --------------------------------
+# ================================================================
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="MONTECARLO: 0.1")
+
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    exit(main(arguments))
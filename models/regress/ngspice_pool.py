@@ -0,0 +1,213 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Pool of long-lived ngspice workers for GF180MCU models regression.
+
+Each worker process loads the ngspice shared library once and then runs
+many netlists through it, instead of spawning an `ngspice -b` process and
+a shell per netlist. Netlists are run with the ngspice `source` command,
+so their `.control` sections and `wrdata` outputs behave as in batch mode.
+
+Only the process start-up is saved: ngspice binds models to a circuit when
+it's parsed and drops them with it, so the model card section called by a
+netlist is parsed again for each netlist. Minimal include files of the model
+lib cache (`--lib_cache`) keep that parse to the simulated device.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from subprocess import CalledProcessError
+
+# ngspice shared library callbacks, refer to sharedspice.h
+SEND_CHAR = ctypes.CFUNCTYPE(
+    ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_void_p
+)
+SEND_STAT = ctypes.CFUNCTYPE(
+    ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_void_p
+)
+CONTROLLED_EXIT = ctypes.CFUNCTYPE(
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_bool,
+    ctypes.c_bool,
+    ctypes.c_int,
+    ctypes.c_void_p,
+)
+
+
+def find_ngspice_library() -> str:
+    """
+    Returns the path of the ngspice shared library, or None if it isn't found.
+    NGSPICE_LIBRARY_PATH environment variable takes precedence over system paths.
+    """
+    return os.environ.get("NGSPICE_LIBRARY_PATH") or ctypes.util.find_library("ngspice")
+
+
+class SharedNgspice:
+    """
+    ngspice shared library instance, ngspice supports only one per process.
+
+    Args:
+        lib_path (str): Path of the ngspice shared library.
+    """
+
+    def __init__(self, lib_path: str):
+        self.lib_path = lib_path
+        self.output = []
+        self.exited = False
+
+        # Keep references to callbacks, so they aren't garbage collected
+        self._send_char = SEND_CHAR(self._on_char)
+        self._send_stat = SEND_STAT(lambda msg, ident, data: 0)
+        self._controlled_exit = CONTROLLED_EXIT(self._on_exit)
+
+        self._load()
+
+    def _load(self):
+        self._lib = ctypes.CDLL(self.lib_path)
+        self._lib.ngSpice_Command.argtypes = [ctypes.c_char_p]
+        self._lib.ngSpice_Command.restype = ctypes.c_int
+        self._lib.ngSpice_Init(
+            self._send_char,
+            self._send_stat,
+            self._controlled_exit,
+            None,
+            None,
+            None,
+            None,
+        )
+        self.exited = False
+
+    def _reload(self):
+        # ngspice can't be used anymore after it requested an exit
+        import _ctypes
+
+        _ctypes.dlclose(self._lib._handle)
+        self._load()
+
+    def _on_char(self, msg, ident, data):
+        self.output.append(msg.decode(errors="replace"))
+        return 0
+
+    def _on_exit(self, status, unload, quit_, ident, data):
+        self.exited = True
+        return 0
+
+    def command(self, cmd: str) -> int:
+        """
+        Runs an ngspice interactive command.
+        Args:
+            cmd (str): ngspice command.
+        Returns:
+            int: Return code of the command. 0 if success.
+        """
+        return self._lib.ngSpice_Command(cmd.encode())
+
+    def run_netlist(self, netlist_path: str) -> int:
+        """
+        Runs a netlist and writes the ngspice output to <netlist_path>.log.
+        Args:
+            netlist_path (str): Netlist to be simulated.
+        Returns:
+            int: Return code of the simulation. 0 if success.  Non-zero if failed.
+        """
+        self.output = []
+        status = self.command(f"source {netlist_path}")
+
+        # Drop the circuit and its plots, so memory doesn't grow across jobs
+        if not self.exited:
+            self.command("destroy all")
+            self.command("remcirc")
+
+        errors = [line for line in self.output if line.startswith("stderr Error")]
+        with open(f"{netlist_path}.log", "w") as f:
+            f.write("\n".join(line.split(" ", 1)[-1] for line in self.output))
+            f.write("\n")
+
+        if self.exited:
+            self._reload()
+            return 1
+
+        return 1 if status or errors else 0
+
+
+# Per process ngspice instance of pool workers
+_ngspice = None
+
+
+def _init_worker(lib_path: str):
+    global _ngspice
+    _ngspice = SharedNgspice(lib_path)
+
+
+def _run_netlist(netlist_path: str) -> int:
+    return _ngspice.run_netlist(netlist_path)
+
+
+class NgspicePool:
+    """
+    Pool of worker processes, each running netlists on its own ngspice
+    shared library instance.
+
+    Args:
+        workers (int): Number of worker processes.
+        lib_path (str): Path of the ngspice shared library, searched if not given.
+    """
+
+    def __init__(self, workers: int, lib_path: str = None):
+        lib_path = lib_path or find_ngspice_library()
+        if lib_path is None:
+            raise FileNotFoundError(
+                "ngspice shared library is not found. Please make sure libngspice is installed, "
+                "or set NGSPICE_LIBRARY_PATH."
+            )
+
+        logging.info(f"Starting {workers} ngspice workers using {lib_path}")
+
+        # Fresh interpreters, so that each worker owns a single ngspice instance
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(lib_path,),
+        )
+
+    def simulate(self, netlist_path: str) -> int:
+        """
+        Runs a netlist on the next free worker and waits for it.
+        Args:
+            netlist_path (str): Netlist to be simulated.
+        Returns:
+            int: Return code of the simulation, 0 as failures raise.
+        Raises:
+            CalledProcessError: If the simulation failed, as for batch runs.
+        """
+        status = self._executor.submit(_run_netlist, netlist_path).result()
+        if status != 0:
+            raise CalledProcessError(status, ["source", netlist_path])
+        return status
+
+    def shutdown(self):
+        """Stops all the workers."""
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,144 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Reader of ngspice binary rawfiles for GF180MCU models regression.
+
+Rawfiles are written by the ngspice `write` command with `set filetype=binary`.
+Each plot has a text header followed by its points, each point holds one double
+per variable (two for complex plots). Vectors are returned as strided views of a
+memory map of the file, so no value is parsed or copied until it's used.
+"""
+
+import numpy as np
+import os
+
+
+class RawPlot:
+    """
+    Plot of an ngspice rawfile.
+
+    Args:
+        title (str): Title of the circuit.
+        name (str): Plot name, e.g. DC transfer characteristic.
+        flags (str): Plot flags, e.g. real.
+        variables (list): (name, type) of each variable, the first one is the scale.
+        data (np.ndarray): Points of the plot, one row per point.
+    """
+
+    def __init__(self, title: str, name: str, flags: str, variables: list, data):
+        self.title = title
+        self.name = name
+        self.flags = flags
+        self.variables = variables
+        self.data = data
+
+    @property
+    def names(self) -> list:
+        """Names of the plot variables, in file order."""
+        return [name for name, _ in self.variables]
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        Returns a vector of the plot by its name, names are case insensitive.
+        Args:
+            name (str): Vector name.
+        """
+        names = [n.lower() for n in self.names]
+        try:
+            return self.data[:, names.index(name.lower())]
+        except ValueError:
+            raise KeyError(f"{name} isn't a vector of plot {self.name}") from None
+
+
+def _read_header(f):
+    # Header is text lines, up to a `Binary:` line followed by the data
+    header = {}
+    variables = []
+    in_variables = False
+
+    for raw_line in iter(f.readline, b""):
+        line = raw_line.decode("latin-1").rstrip("\r\n")
+        key = line.split(":", 1)[0].strip().lower()
+
+        if key == "binary":
+            return header, variables
+        if key == "values":
+            raise ValueError("ASCII rawfiles aren't supported, use set filetype=binary")
+
+        if in_variables and line[:1] in (" ", "\t"):
+            fields = line.split()
+            variables.append((fields[1], fields[2] if len(fields) > 2 else ""))
+        elif ":" in line:
+            in_variables = key == "variables"
+            header[key] = line.split(":", 1)[1].strip()
+
+    raise ValueError("Rawfile header isn't terminated by Binary:")
+
+
+def read_rawfile(path: str) -> list:
+    """
+    Reads all plots of an ngspice binary rawfile.
+    Args:
+        path (str): Path of the rawfile.
+    Returns:
+        list: RawPlot of each plot in the file.
+    """
+    plots = []
+    file_size = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+        while f.tell() < file_size:
+            header, variables = _read_header(f)
+
+            n_vars = int(header["no. variables"])
+            n_points = int(header["no. points"])
+            flags = header.get("flags", "real").lower()
+            dtype = np.complex128 if "complex" in flags else np.float64
+
+            data = np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=f.tell(),
+                shape=(n_points, n_vars),
+            )
+
+            plots.append(
+                RawPlot(
+                    header.get("title", ""),
+                    header.get("plotname", ""),
+                    flags,
+                    variables[:n_vars],
+                    data,
+                )
+            )
+            f.seek(f.tell() + data.nbytes)
+
+    return plots
+
+
+def read_vectors(path: str, names: list) -> dict:
+    """
+    Reads vectors of the first plot of an ngspice binary rawfile.
+    Args:
+        path (str): Path of the rawfile.
+        names (list): Vectors names.
+    Returns:
+        dict: Vector of each name.
+    """
+    plot = read_rawfile(path)[0]
+    return {name: plot[name] for name in names}
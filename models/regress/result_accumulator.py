@@ -0,0 +1,153 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming merge of simulation results for GF180MCU models regression.
+
+Results of each simulation are appended, as soon as it completes, to typed
+column buffers preallocated for all simulations of a run. The merged frame is
+available at the end of the run without reading result files back, and the
+error against measured data is tracked as results arrive, so progress logs
+show the running error quantile.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Errors histogram covers 1e-6 % to 1e6 %, with 100 bins per decade
+ERR_BINS = np.logspace(-6, 6, 1201)
+
+
+class ErrorHistogram:
+    """
+    Histogram of relative errors on log bins, to get a quantile of all errors
+    seen so far without keeping them.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(len(ERR_BINS) + 1, dtype=np.int64)
+        self.total = 0
+
+    def add(self, errors: np.ndarray):
+        """
+        Adds errors to the histogram, NaN values are ignored.
+        Args:
+            errors (np.ndarray): Relative errors in %.
+        """
+        errors = errors[~np.isnan(errors)]
+        self.counts += np.bincount(
+            np.searchsorted(ERR_BINS, errors), minlength=len(self.counts)
+        )
+        self.total += len(errors)
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the upper edge of the bin holding the q quantile, nan if empty.
+        Args:
+            q (float): Quantile, between 0 and 1.
+        """
+        if self.total == 0:
+            return np.nan
+        idx = int(np.searchsorted(np.cumsum(self.counts), q * self.total))
+        return float(ERR_BINS[min(idx, len(ERR_BINS) - 1)])
+
+
+class ResultAccumulator:
+    """
+    Merges results of simulations as they complete.
+
+    Args:
+        total (int): Number of simulations of the run.
+        name (str): Name of the run, used in progress logs.
+        error_fn (callable): Function of a results frame to its relative errors,
+            errors aren't tracked if not given.
+        quantile (float): Error quantile reported in progress logs.
+    """
+
+    def __init__(self, total: int, name: str, error_fn=None, quantile: float = 0.98):
+        self.total = total
+        self.name = name
+        self.error_fn = error_fn
+        self.quantile = quantile
+        self.errors = ErrorHistogram()
+        self.done = 0
+        self.rows = 0
+        self._columns = None
+
+    def _reserve(self, rows: int):
+        # Buffers grow by doubling, if the first results size doesn't fit all
+        capacity = len(next(iter(self._columns.values())))
+        if self.rows + rows <= capacity:
+            return
+        capacity = max(capacity * 2, self.rows + rows)
+        for name, buf in self._columns.items():
+            grown = np.empty(capacity, dtype=buf.dtype)
+            grown[: self.rows] = buf[: self.rows]
+            self._columns[name] = grown
+
+    def add(self, *dfs: pd.DataFrame):
+        """
+        Appends results of a completed simulation.
+        Args:
+            dfs (pd.DataFrame): Results frames of the simulation, one per simulated
+                variation, None for failed ones.
+        """
+        self.done += 1
+
+        for df in dfs:
+            if df is None or not len(df):
+                continue
+
+            if self._columns is None:
+                # Preallocated for all simulations, assuming the same size
+                self._columns = {
+                    name: np.empty(
+                        len(df) * self.total * len(dfs),
+                        dtype=df[name].to_numpy().dtype,
+                    )
+                    for name in df.columns
+                }
+            elif list(df.columns) != list(self._columns):
+                raise ValueError(
+                    f"Results columns {list(df.columns)} don't match {list(self._columns)}"
+                )
+
+            self._reserve(len(df))
+            for name, buf in self._columns.items():
+                values = df[name].to_numpy()
+                dtype = np.result_type(buf.dtype, values.dtype)
+                if dtype != buf.dtype:
+                    buf = self._columns[name] = buf.astype(dtype)
+                buf[self.rows : self.rows + len(df)] = values
+            self.rows += len(df)
+
+            if self.error_fn is not None:
+                self.errors.add(self.error_fn(df))
+
+        msg = f"{self.name}: {self.done}/{self.total} simulations done, {self.rows} points"
+        if self.errors.total:
+            msg += (
+                f", running {self.quantile} quantile error"
+                f" {self.errors.quantile(self.quantile):.2f} %"
+            )
+        logging.info(msg)
+
+    def frame(self) -> pd.DataFrame:
+        """Returns all merged results."""
+        if self._columns is None:
+            return pd.DataFrame()
+        return pd.DataFrame(
+            {name: buf[: self.rows] for name, buf in self._columns.items()}
+        )
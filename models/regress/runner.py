@@ -0,0 +1,241 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Bounded runner of simulator processes.
+
+Simulators are launched directly, without a shell, and at most one process per
+physical core runs at a time whatever the number of threads submitting them.
+Their exit status, stdout and stderr are collected through pipes.
+"""
+
+from subprocess import CalledProcessError, DEVNULL, PIPE, Popen, TimeoutExpired
+import contextlib
+import logging
+import os
+import queue
+import threading
+import time
+
+
+def core_cpus() -> list:
+    """
+    Returns one cpu of each physical core available to the process, hyper threads
+    of the same core are counted once.
+    """
+    cpus = sorted(
+        os.sched_getaffinity(0)
+        if hasattr(os, "sched_getaffinity")
+        else range(os.cpu_count() or 1)
+    )
+
+    cores = {}
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpu = package = None
+            for line in f:
+                name, _, value = line.partition(":")
+                name, value = name.strip(), value.strip()
+                if name == "processor":
+                    cpu = int(value)
+                elif name == "physical id":
+                    package = value
+                elif name == "core id" and cpu in cpus:
+                    cores.setdefault((package, value), cpu)
+    except OSError:
+        pass
+
+    return sorted(cores.values()) or cpus
+
+
+def physical_cores() -> int:
+    """Returns the number of physical cores available to the process."""
+    return len(core_cpus())
+
+
+class RunResult:
+    """
+    Outcome of a simulator process.
+
+    Args:
+        args (list): Command of the process.
+        returncode (int): Exit status, None if the process timed out.
+        stdout (str): Standard output of the process.
+        stderr (str): Standard error of the process.
+        duration (float): Run time (s) of the process.
+    """
+
+    def __init__(
+        self, args: list, returncode: int, stdout: str, stderr: str, duration: float
+    ):
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+
+    @property
+    def timed_out(self) -> bool:
+        return self.returncode is None
+
+    def check(self):
+        """Raises CalledProcessError if the process failed or timed out."""
+        if self.returncode != 0:
+            raise CalledProcessError(
+                -1 if self.timed_out else self.returncode,
+                self.args,
+                self.stdout,
+                self.stderr,
+            )
+
+
+class ProcessRunner:
+    """
+    Runs simulator processes from many threads, bounding how many run at a time.
+
+    Args:
+        max_procs (int): Max number of concurrent processes, capped at the
+            physical cores count which is used if not given.
+        nice (int): Niceness increment of the processes.
+        pin (bool): Pins each process to its own cpu.
+        timeout (float): Default time limit (s) of a process, no limit if not given.
+        telemetry (Telemetry): Records the time waiting for a slot and launching
+            processes, if given.
+    """
+
+    def __init__(
+        self,
+        max_procs: int = None,
+        nice: int = 0,
+        pin: bool = False,
+        timeout: float = None,
+        telemetry=None,
+    ):
+        cpus = core_cpus()
+        self.max_procs = (
+            len(cpus) if max_procs is None else max(1, min(max_procs, len(cpus)))
+        )
+        self.nice = nice
+        self.pin = pin and hasattr(os, "sched_setaffinity")
+        self.timeout = timeout
+        self.telemetry = telemetry
+
+        # Each running process holds a slot, the core it's pinned to if pinning
+        self._slots = queue.Queue()
+        for cpu in cpus[: self.max_procs]:
+            self._slots.put(cpu)
+
+        self._lock = threading.Lock()
+        # Processes of many slots take them one at a time, one process at a time
+        self._multi_lock = threading.Lock()
+        self.count = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    def _acquire(self, procs: int) -> list:
+        if procs == 1:
+            return [self._slots.get()]
+        with self._multi_lock:
+            return [self._slots.get() for _ in range(procs)]
+
+    def _phase(self, name: str):
+        if self.telemetry is None:
+            return contextlib.nullcontext()
+        return self.telemetry.phase(name)
+
+    def _tune(self, pid: int, cpus: list):
+        try:
+            if self.pin:
+                os.sched_setaffinity(pid, set(cpus))
+            if self.nice:
+                os.setpriority(
+                    os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, 0) + self.nice
+                )
+        except (OSError, AttributeError):
+            # Process already exited or not allowed, it runs untuned
+            pass
+
+    def run(
+        self,
+        args: list,
+        timeout: float = None,
+        log_path: str = None,
+        cwd: str = None,
+        procs: int = 1,
+    ) -> RunResult:
+        """
+        Runs a process once a slot is free and waits for it.
+        Args:
+            args (list): Command of the process, run without a shell.
+            timeout (float): Time limit (s) of the process, the runner one if not given.
+            log_path (str): File to write the process stdout and stderr to, if given.
+            cwd (str): Working directory of the process.
+            procs (int): Number of slots held by the process, a MPI launcher of
+                many processes for example. Capped at the runner max_procs.
+        Returns:
+            RunResult: Exit status and outputs of the process.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._phase("queue"):
+            cpus = self._acquire(max(1, min(procs, self.max_procs)))
+        try:
+            start = time.perf_counter()
+            try:
+                with self._phase("launch"):
+                    proc = Popen(
+                        args,
+                        stdin=DEVNULL,
+                        stdout=PIPE,
+                        stderr=PIPE,
+                        cwd=cwd,
+                        text=True,
+                        errors="replace",
+                    )
+            except OSError as exc:
+                result = RunResult(args, 127, "", str(exc), 0.0)
+            else:
+                self._tune(proc.pid, cpus)
+                try:
+                    stdout, stderr = proc.communicate(timeout=timeout)
+                    returncode = proc.returncode
+                except TimeoutExpired:
+                    proc.kill()
+                    stdout, stderr = proc.communicate()
+                    returncode = None
+                result = RunResult(
+                    args, returncode, stdout, stderr, time.perf_counter() - start
+                )
+        finally:
+            for cpu in cpus:
+                self._slots.put(cpu)
+
+        with self._lock:
+            self.count += 1
+            self.failed += result.returncode != 0
+            self.timed_out += result.timed_out
+
+        if log_path:
+            with open(log_path, "w") as f:
+                f.write(result.stdout)
+                f.write(result.stderr)
+
+        if result.timed_out:
+            logging.error(
+                f"{args[0]} run timed out after {timeout} s: {' '.join(args)}"
+            )
+        elif result.returncode != 0 and result.stderr.strip():
+            logging.debug(
+                f"{args[0]} exited with {result.returncode}: {result.stderr.strip()[-500:]}"
+            )
+
+        return result
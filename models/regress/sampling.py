@@ -0,0 +1,262 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Sampled fast regression of GF180MCU models.
+
+Instead of simulating all jobs of a case, jobs are drawn at random in rounds
+from each stratum (the jobs sharing corner and temp by default), the same
+fraction of each stratum per round. The error quantile of the measured points
+of the sampled jobs is estimated with a confidence interval from a bootstrap of
+the sampled jobs, as points of a sweep aren't independent. Sampling stops once
+the interval is below or above the pass threshold, or once all jobs are run.
+"""
+
+import logging
+import math
+import threading
+import zlib
+
+import numpy as np
+
+
+def weighted_quantile(values: np.ndarray, weights: np.ndarray, q: float) -> float:
+    """
+    Returns the lowest value whose cumulative weight reaches q of the total.
+    Args:
+        values (np.ndarray): Values, NaN values are ignored.
+        weights (np.ndarray): Weight of each value.
+        q (float): Quantile, between 0 and 1.
+    """
+    keep = ~np.isnan(values)
+    values, weights = values[keep], weights[keep]
+    if not len(values):
+        return np.nan
+    order = np.argsort(values)
+    cum = np.cumsum(weights[order])
+    idx = int(np.searchsorted(cum, q * cum[-1]))
+    return float(values[order][min(idx, len(values) - 1)])
+
+
+class JobSampler:
+    """
+    Stratified random sampling of the jobs of a case, until its error quantile
+    is known to be below or above the pass threshold.
+
+    Args:
+        jobs (list): Jobs of the case.
+        error_fn (callable): Function of a results frame to its relative errors.
+        quantile (float): Error quantile of the regression verdict.
+        thresh (float): Pass threshold (%) of the error quantile.
+        strata (list): Job keys of a stratum, jobs that aren't dicts are one stratum.
+        seed (str): Seed of the random draws, the same jobs are sampled for the same seed.
+        round_frac (float): Fraction of each stratum sampled per round, at least a job.
+        confidence (float): Confidence level of the error quantile interval.
+        min_jobs (int): Least number of jobs run before a verdict.
+        resamples (int): Number of bootstrap resamples.
+    """
+
+    def __init__(
+        self,
+        jobs: list,
+        error_fn,
+        quantile: float,
+        thresh: float,
+        strata: list = ("corner", "temp"),
+        seed: str = "",
+        round_frac: float = 0.1,
+        confidence: float = 0.95,
+        min_jobs: int = 10,
+        resamples: int = 200,
+    ):
+        self.error_fn = error_fn
+        self.quantile = quantile
+        self.thresh = thresh
+        self.round_frac = round_frac
+        self.confidence = confidence
+        self.min_jobs = min(min_jobs, len(jobs))
+        self.resamples = resamples
+        self.total = len(jobs)
+        self.rounds = 0
+        self.sampled = 0
+        # Jobs returned by next_round, in sampling order
+        self.run_jobs = []
+        self.rng = np.random.default_rng(zlib.crc32(str(seed).encode()))
+
+        # Jobs left of each stratum in random order, and errors of its run jobs
+        self.left = {}
+        self.size = {}
+        self.errors = {}
+        self._stratum = {}
+        for job in jobs:
+            key = tuple(job.get(k) for k in strata) if isinstance(job, dict) else None
+            self.left.setdefault(key, []).append(job)
+            self._stratum[id(job)] = key
+        for key, left in self.left.items():
+            self.size[key] = len(left)
+            self.errors[key] = []
+            self.rng.shuffle(left)
+
+        self._lock = threading.Lock()
+        self._estimate = None
+        # Errors of results frames recorded by wrap, until read by frame_errors
+        self._frame_errors = {}
+
+    def wrap(self, run_sim):
+        """
+        Returns run_sim recording the errors of each job results.
+        Args:
+            run_sim (callable): Function of a case and job to its results.
+        """
+
+        def sampled_run_sim(case: dict, job):
+            data = run_sim(case, job)
+            dfs = data if isinstance(data, list) else [data]
+            frame_errors = {
+                id(df): self.error_fn(df) for df in dfs if df is not None and len(df)
+            }
+            errors = list(frame_errors.values())
+            errors = np.concatenate(errors) if errors else np.array([])
+            with self._lock:
+                self.errors[self._stratum[id(job)]].append(errors)
+                self._frame_errors.update(frame_errors)
+                self._estimate = None
+            return data
+
+        return sampled_run_sim
+
+    def frame_errors(self, df) -> np.ndarray:
+        """
+        Returns the relative errors of a results frame, as recorded by wrap so
+        merged results don't compute them again.
+        Args:
+            df (pd.DataFrame): Results frame of a sampled job.
+        """
+        with self._lock:
+            errors = self._frame_errors.pop(id(df), None)
+        return self.error_fn(df) if errors is None else errors
+
+    def next_round(self) -> list:
+        """Returns the jobs of the next round, empty once the verdict is known."""
+        if self.sampled and self.verdict() is not None:
+            return []
+
+        jobs = []
+        for key, left in self.left.items():
+            count = max(1, math.ceil(self.round_frac * self.size[key]))
+            jobs.extend(left[:count])
+            del left[:count]
+
+        self.run_jobs.extend(jobs)
+        self.sampled += len(jobs)
+        self.rounds += bool(jobs)
+        return jobs
+
+    def estimate(self) -> tuple:
+        """
+        Returns the error quantile of the run jobs and its confidence interval.
+        Errors of a stratum are weighted by its jobs count over its run jobs.
+        """
+        with self._lock:
+            if self._estimate is not None:
+                return self._estimate
+            strata = [
+                (self.size[key], list(errors))
+                for key, errors in self.errors.items()
+                if errors
+            ]
+
+        if not strata:
+            return np.nan, np.nan, np.nan
+
+        def pooled(picks):
+            values, weights = [], []
+            for (size, errors), idx in zip(strata, picks):
+                for i in idx:
+                    values.append(errors[i])
+                    weights.append(np.full(len(errors[i]), size / len(idx)))
+            return weighted_quantile(
+                np.concatenate(values), np.concatenate(weights), self.quantile
+            )
+
+        estimate = pooled([range(len(errors)) for _, errors in strata])
+        if np.isnan(estimate):
+            return np.nan, np.nan, np.nan
+
+        # Jobs of each stratum are resampled, as errors of a sweep are correlated
+        boot = np.array(
+            [
+                pooled(
+                    [
+                        self.rng.integers(0, len(errors), len(errors))
+                        for _, errors in strata
+                    ]
+                )
+                for _ in range(self.resamples)
+            ]
+        )
+        alpha = 1.0 - self.confidence
+        lower, upper = np.nanquantile(boot, [alpha / 2, 1 - alpha / 2])
+
+        # Finite population correction, the interval is closed once all jobs are run
+        run = sum(len(errors) for _, errors in strata)
+        fpc = math.sqrt(max(0.0, 1.0 - run / max(self.total, 1)))
+        lower = estimate - (estimate - min(lower, estimate)) * fpc
+        upper = estimate + (max(upper, estimate) - estimate) * fpc
+
+        with self._lock:
+            self._estimate = (estimate, float(lower), float(upper))
+            return self._estimate
+
+    def verdict(self):
+        """Returns True if the case passes, False if it fails, None if not known yet."""
+        if self.sampled < self.min_jobs and self.sampled < self.total:
+            return None
+
+        estimate, lower, upper = self.estimate()
+        if upper < self.thresh:
+            return True
+        if lower > self.thresh:
+            return False
+        if self.sampled >= self.total:
+            return bool(estimate <= self.thresh)
+        return None
+
+    def report(self) -> dict:
+        """Returns the sampling state and error quantile estimate."""
+        estimate, lower, upper = self.estimate()
+        return {
+            "jobs": self.total,
+            "sampled_jobs": self.sampled,
+            "rounds": self.rounds,
+            "strata": len(self.size),
+            "quantile": self.quantile,
+            "estimate": round(estimate, 4),
+            "confidence": self.confidence,
+            "lower": round(lower, 4),
+            "upper": round(upper, 4),
+            "verdict": self.verdict(),
+        }
+
+    def log(self, label: str):
+        """
+        Logs the sampling state of a case.
+        Args:
+            label (str): Label of the case.
+        """
+        report = self.report()
+        logging.info(
+            f"# Device {label} fast mode: {report['sampled_jobs']}/{report['jobs']} jobs in {report['rounds']} rounds, "
+            f"{self.quantile} quantile error {report['estimate']:.2f} % "
+            f"({100 * self.confidence:.0f}% CI {report['lower']:.2f} - {report['upper']:.2f} %)"
+        )
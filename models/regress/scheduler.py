@@ -0,0 +1,384 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Global scheduler of GF180MCU models regression.
+
+Cases of all the scheduled device families are run on one thread pool, longest
+first using the job durations of previous runs. A case is prepared, cleaning
+its results directory and loading its measured data and jobs, once the pool
+runs short of queued jobs, and its data is released once it's evaluated. Only
+the measured data of running cases is held, while the tail of a device runs
+next to jobs of the other devices instead of leaving cores idle.
+
+Cases are ordered longest first across all families, but jobs are only ordered
+longest first within the jobs submitted together, as cases are prepared a few
+at a time. Durations of a run are added to the history once its jobs complete.
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from .adapter import setup_pandas
+from .engine import add_result
+from .model_lib_index import write_atomic
+from .result_accumulator import ResultAccumulator
+from .telemetry import describe_job
+
+
+def job_key(family: str, device: str, job: dict) -> str:
+    """
+    Returns the durations history key of a job.
+    Args:
+        family (str): Name of the device family.
+        device (str): Device of the job case.
+        job (dict): Job as returned by the family adapter.
+    Returns:
+        str: Key made of family, device and hash of the job parameters.
+    """
+    digest = hashlib.sha1(
+        json.dumps(job, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+    return f"{family}/{device}/{digest}"
+
+
+class CaseRun:
+    """
+    State of a scheduled case, its results are merged while its jobs complete.
+    The case is prepared once scheduled, its measured data and results are
+    released once it's evaluated.
+
+    Args:
+        adapter (DeviceAdapter): Family adapter of the case.
+        case (dict): Regression case, as returned by the adapter cases.
+    """
+
+    def __init__(self, adapter, case: dict):
+        self.adapter = adapter
+        self.case = case
+        self.meas_df = None
+        self.results = None
+        self.sampler = None
+        self.run_sim = adapter.run_sim
+        self.jobs = []
+
+        # Durations history keys of the submitted jobs
+        self.keys = []
+        self.pending = 0
+        self.passed = None
+
+    def prepare(self):
+        """Cleans the case results directory and loads its measured data and jobs."""
+        adapter, case = self.adapter, self.case
+        self.meas_df, jobs, error_fn = adapter.prepare_case(case)
+
+        # Jobs are sampled in rounds in fast mode, else all are run at once
+        self.sampler = adapter.sampler(case, jobs, error_fn)
+        if self.sampler is not None:
+            # Errors recorded by the sampler are reused by merged results
+            self.run_sim = self.sampler.wrap(adapter.run_sim)
+            error_fn = self.sampler.frame_errors
+        self.jobs = jobs
+
+        self.results = ResultAccumulator(
+            len(jobs), case["label"], error_fn, adapter.quantile
+        )
+
+    def next_jobs(self) -> list:
+        """Returns the next jobs of the case, empty once the case is complete."""
+        if self.sampler is None:
+            jobs, self.jobs = self.jobs, []
+        else:
+            if self.sampler.sampled:
+                self.sampler.log(self.case["label"])
+            jobs = self.sampler.next_round()
+
+        self.pending = len(jobs)
+        return jobs
+
+    def finish(self):
+        """Evaluates the case once all its jobs completed, and releases its data."""
+        telemetry = self.adapter.engine.telemetry
+        with telemetry.case(self.case["dev_path"]), telemetry.phase("merge"):
+            sim_df = self.results.frame()
+        self.passed = self.adapter.finish_case(
+            self.case, self.meas_df, sim_df, self.sampler
+        )
+        self.meas_df = self.results = self.sampler = None
+
+
+class Scheduler:
+    """
+    Runs all jobs of many device families on the engine workers, longest first.
+
+    Args:
+        engine (Engine): Engine running the family simulations.
+        history_path (str): JSON file of job and family durations of previous
+            runs, used to order the jobs and updated after each run.
+    """
+
+    # Queued jobs per worker, next cases are prepared below it
+    backlog = 4
+
+    def __init__(self, engine, history_path: str = None):
+        self.engine = engine
+        self.history_path = history_path
+        self.history = {"jobs": {}, "families": {}}
+        # Job durations of the running group, written by the worker threads
+        self.durations = {}
+        self._lock = threading.Lock()
+
+        if history_path and os.path.isfile(history_path):
+            with open(history_path) as f:
+                self.history.update(json.load(f))
+
+    def save_history(self):
+        """Writes the durations history, if a history file is used."""
+        if self.history_path:
+            write_atomic(
+                self.history_path, json.dumps(self.history, sort_keys=True).encode()
+            )
+
+    def estimates(self, keys: list) -> list:
+        """
+        Returns the expected duration of jobs from the durations history.
+        Jobs without history get the mean duration of their device, then of their
+        family, then of all known jobs.
+        Args:
+            keys (list): Durations history keys of the jobs.
+        Returns:
+            list: Expected duration (s) of each job.
+        """
+        known = self.history["jobs"]
+        means = {}
+        for key, duration in known.items():
+            family, device, _ = key.split("/")
+            for group in [f"{family}/{device}", family, ""]:
+                total, count = means.get(group, (0.0, 0))
+                means[group] = (total + duration, count + 1)
+
+        def estimate(key):
+            if key in known:
+                return known[key]
+            family, device, _ = key.split("/")
+            for group in [f"{family}/{device}", family, ""]:
+                if group in means:
+                    total, count = means[group]
+                    return total / count
+            return 0.0
+
+        return [estimate(key) for key in keys]
+
+    def case_estimate(self, run: CaseRun) -> float:
+        """
+        Returns the expected job time of a case, from the durations history of
+        its device jobs.
+        Args:
+            run (CaseRun): Scheduled case.
+        """
+        prefix = f"{run.adapter.name}/{run.case['device']}/"
+        return sum(
+            duration
+            for key, duration in self.history["jobs"].items()
+            if key.startswith(prefix)
+        )
+
+    def _timed(self, run_sim, case: dict, job: dict, key: str, spans: dict):
+        telemetry = self.engine.telemetry
+        queued = telemetry.thread_time("queue")
+        start = time.perf_counter()
+        try:
+            label = f"{key.split('/')[0]}/{case['label']} {describe_job(job)}"
+            with telemetry.job(label, case["dev_path"]):
+                return run_sim(case, job)
+        finally:
+            end = time.perf_counter()
+            # Waiting for a simulator slot depends on the other jobs, not this one
+            queued = telemetry.thread_time("queue") - queued
+            with self._lock:
+                self.durations[key] = round(max(end - start - queued, 0.0), 4)
+                spans[key] = (start, end)
+
+    def run_group(self, runs: list) -> dict:
+        """
+        Runs the jobs of many cases on one thread pool, longest case first and
+        longest job first in each case. Cases are prepared while the pool holds
+        less than backlog queued jobs per worker. Cases sampled in fast mode
+        submit their next round once their last completes.
+        Args:
+            runs (list): Scheduled cases.
+        Returns:
+            dict: Start and end time of each job, by durations history key.
+        """
+        spans = {}
+        expected = [self.case_estimate(run) for run in runs]
+        waiting = [
+            runs[i] for i in sorted(range(len(runs)), key=lambda i: -expected[i])
+        ]
+        logging.info(
+            f"Scheduling {len(runs)} cases, expected job time {sum(expected):.1f} s"
+        )
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.engine.workers
+        ) as executor:
+            futures = {}
+
+            def submit(run: CaseRun, jobs: list):
+                keys = [
+                    job_key(run.adapter.name, run.case["device"], job) for job in jobs
+                ]
+                job_times = self.estimates(keys)
+                for i in sorted(range(len(jobs)), key=lambda i: -job_times[i]):
+                    run.keys.append(keys[i])
+                    future = executor.submit(
+                        self._timed, run.run_sim, run.case, jobs[i], keys[i], spans
+                    )
+                    futures[future] = run
+
+            def fill():
+                while waiting and len(futures) < self.backlog * self.engine.workers:
+                    run = waiting.pop(0)
+                    run.prepare()
+                    jobs = run.next_jobs()
+                    if jobs:
+                        submit(run, jobs)
+                    else:
+                        # Cases without jobs are evaluated right away
+                        run.finish()
+
+            fill()
+            while futures:
+                done, _ = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    run = futures.pop(future)
+                    with self.engine.telemetry.case(run.case["dev_path"]):
+                        add_result(run.results, future, self.engine.telemetry)
+                    run.pending -= 1
+                    if run.pending > 0:
+                        continue
+
+                    jobs = run.next_jobs()
+                    if jobs:
+                        submit(run, jobs)
+                    else:
+                        run.finish()
+                fill()
+
+        with self._lock:
+            self.history["jobs"].update(self.durations)
+            self.durations = {}
+        return spans
+
+    def prepare(self, adapter) -> list:
+        """
+        Returns the cases of a device family, prepared once scheduled.
+        Args:
+            adapter (DeviceAdapter): Family adapter.
+        Returns:
+            list: Scheduled cases of the family.
+        """
+        runs, dev_paths = [], set()
+        for case in adapter.cases():
+            # Repeated cases would write the same results directory concurrently
+            if case["dev_path"] in dev_paths:
+                continue
+            dev_paths.add(case["dev_path"])
+            runs.append(CaseRun(adapter, case))
+        return runs
+
+    def run(self, adapters: list, per_family: bool = False) -> dict:
+        """
+        Runs the regression of device families.
+        Args:
+            adapters (list): Family adapters to be run.
+            per_family (bool): Runs families one after the other, recording their
+                run times as the reference of the global schedule.
+        Returns:
+            dict: True for each family name if all its cases passed regression.
+        """
+        setup_pandas()
+        start = time.perf_counter()
+
+        groups, spans = [], {}
+        if per_family:
+            for adapter in adapters:
+                family_start = time.perf_counter()
+                runs = self.prepare(adapter)
+                groups.append((adapter.name, runs))
+                spans.update(self.run_group(runs))
+                self.history["families"][adapter.name] = round(
+                    time.perf_counter() - family_start, 2
+                )
+        else:
+            groups = [(adapter.name, self.prepare(adapter)) for adapter in adapters]
+            spans = self.run_group([run for _, runs in groups for run in runs])
+
+        wall_time = time.perf_counter() - start
+        self.save_history()
+        self.summary(groups, spans, wall_time)
+
+        return {
+            name: all(run.passed or not run.adapter.exit_on_fail for run in runs)
+            for name, runs in groups
+        }
+
+    def summary(self, groups: list, spans: dict, wall_time: float):
+        """
+        Logs the wall time of the run against job time and per family run times.
+        Args:
+            groups (list): Family names and their scheduled cases.
+            spans (dict): Start and end time of each job, by durations history key.
+            wall_time (float): Wall time (s) of the run.
+        """
+        workers = self.engine.workers
+        job_time = sum(end - start for start, end in spans.values())
+
+        logging.info("######" * 10)
+        for name, runs in groups:
+            family_spans = [spans[key] for run in runs for key in run.keys]
+            if not family_spans:
+                continue
+            busy = sum(end - start for start, end in family_spans)
+            span = max(end for _, end in family_spans) - min(
+                start for start, _ in family_spans
+            )
+            logging.info(
+                f"# {name:<12} jobs: {len(family_spans):>6}, job time: {busy:>9.1f} s, span: {span:>8.1f} s"
+            )
+
+        logging.info(
+            f"# Wall time: {wall_time:.1f} s, job time: {job_time:.1f} s, "
+            f"{workers} workers utilization: {100 * job_time / max(wall_time * workers, 1e-9):.1f} %"
+        )
+
+        names = [name for name, _ in groups]
+        family_times = self.history["families"]
+        missing = [name for name in names if name not in family_times]
+        if missing:
+            logging.info(
+                f"# No per family run time of {', '.join(missing)}, run with --schedule=family to record them."
+            )
+            return
+
+        sequential = sum(family_times[name] for name in names)
+        logging.info(
+            f"# Sum of per family runs: {sequential:.1f} s, speedup: {sequential / max(wall_time, 1e-9):.2f}x"
+        )
@@ -0,0 +1,508 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Model card parameter sensitivity of GF180MCU MOSFETs against measured data.
+
+For each listed parameter, the device subckt and models of a model card
+section are copied with a `__s<k>` suffix in an include file, with the
+parameter perturbed by a relative step. Parameters assigned in the device
+models or subckt are perturbed in place, section `.param` are copied as
+`<param>__s<k>` and referenced by the copies. Each geometry and sweep of the
+measured data is simulated by one packed netlist holding the device and all
+its perturbed copies, and netlists run in parallel on the regression engine.
+
+The change of the relative error of each measured point per 1% step of each
+parameter is written per geometry and averaged per model bin as a Jacobian
+table. Run it from the models directory.
+
+Usage:
+  sensitivity (--device=<device>) (--param=<param>...) [--corner=<corner>] [--family=<family>] [--temp=<temp>...] [--step=<pct>] [--run_dir=<dir>] [--num_cores=<num>] [--backend=<backend>] [--lib_cache=<dir>] [--sim_cache=<dir>] [--output_format=<fmt>]
+
+  -h, --help                     Show help text.
+  --device=<device>              Perturbed device, nfet_03v3 for example.
+  --param=<param>                Perturbed parameter, a model parameter of the device as vth0 or a .param of the section.
+  --corner=<corner>              Model card section, measured data of the same corner are compared. [default: typical]
+  --family=<family>              Device family of measured data and netlist templates (Allowed: mos_id, mos_rds). [default: mos_id]
+  --temp=<temp>                  Simulated temperature, all measured temperatures if not given.
+  --step=<pct>                   Relative step of parameters in %, parameters valued 0 have no relative step and are skipped. [default: 1]
+  --run_dir=<dir>                Directory of netlists and sensitivity tables. [default: sensitivity_run]
+  --num_cores=<num>              Max number of concurrent simulator processes, capped at the physical cores count which is used by default.
+  --backend=<backend>            Simulation backend (Allowed: batch, shared). [default: batch]
+  --lib_cache=<dir>              Directory of minimal model card include files.
+  --sim_cache=<dir>              Directory of simulation outputs stored by hash of netlist, its includes and ngspice version.
+  --output_format=<fmt>          Format of simulation results (Allowed: ascii, binary). [default: ascii]
+"""
+
+from docopt import docopt
+from functools import partial
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .adapter import NGSPICE_DIR, setup_pandas
+from .engine import Engine
+from .families import FAMILIES
+from .model_lib_index import (
+    ModelLibIndex,
+    model_base_name,
+    prune,
+    statements,
+    write_atomic,
+)
+from .rawfile import read_rawfile
+
+# Families whose packed netlist templates take a device per variation
+SENSITIVITY_FAMILIES = ["mos_id", "mos_rds"]
+
+VALUE_RE = r"('[^']*'|\{[^}]*\}|[^\s'{}=]+)"
+
+
+def assign_re(name: str) -> re.Pattern:
+    """Returns the pattern of `name = value` assignments, the value is group 1."""
+    return re.compile(rf"(?<![\w.]){re.escape(name)}\s*=\s*{VALUE_RE}", re.IGNORECASE)
+
+
+def word_re(name: str) -> re.Pattern:
+    """Returns the pattern of a name used in spice text, as `nfet_03v3.0` for nfet_03v3."""
+    return re.compile(rf"(?<![\w.]){re.escape(name)}(?!\w)", re.IGNORECASE)
+
+
+def perturb_value(value: str, step: float) -> str:
+    """
+    Returns a parameter value changed by a relative step.
+    Args:
+        value (str): Number or expression, quoted or in braces.
+        step (float): Relative step.
+    Returns:
+        str: Perturbed value, None for values of 0 which a relative step
+            doesn't change.
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        return f"{{({value.strip(chr(39)).strip('{}')})*{1 + step:.10g}}}"
+    if number == 0:
+        return None
+    return f"{number * (1 + step):.10g}"
+
+
+def device_statements(text: str, device: str) -> tuple:
+    """
+    Returns the statements of a device in a flat library section.
+    Args:
+        text (str): Spice text of the section.
+        device (str): Device subckt or models name.
+    Returns:
+        tuple: Text of the device models and subckt, and values of the section
+            `.param` by lower case name.
+    """
+    lines, params = [], {}
+    depth = 0
+    for stmt in statements(text):
+        head = stmt[0].strip().lower()
+        if depth:
+            lines.extend(stmt)
+            if head.startswith(".subckt"):
+                depth += 1
+            elif head.startswith(".ends"):
+                depth -= 1
+        elif head.startswith(".subckt") and head.split()[1] == device.lower():
+            lines.extend(stmt)
+            depth = 1
+        elif head.startswith(".model") and model_base_name(head.split()[1]) == (
+            device.lower()
+        ):
+            lines.extend(stmt)
+        elif head.startswith(".param"):
+            joined = " ".join(line.strip().lstrip("+") for line in stmt)[6:]
+            for name, value in re.findall(rf"([A-Za-z_]\w*)\s*=\s*{VALUE_RE}", joined):
+                params[name.lower()] = value
+
+    return "\n".join(lines), params
+
+
+def perturbed_library(text: str, device: str, params: list, step: float) -> tuple:
+    """
+    Returns copies of a device with each parameter perturbed.
+    Args:
+        text (str): Spice text of the model card section.
+        device (str): Device subckt or models name.
+        params (list): Perturbed parameters.
+        step (float): Relative step of the parameters.
+    Returns:
+        tuple: Spice text of the copies, and the parameter and device name of
+            each copy. Parameters not found in the device are skipped.
+    """
+    base, section_params = device_statements(text, device)
+    if not base:
+        raise ValueError(f"Device {device} is not found in the model card section")
+
+    chunks, variants = [], []
+    for k, param in enumerate(params, 1):
+        name = f"{device}__s{k}"
+        copy = word_re(device).sub(name, base)
+
+        # Parameters assigned in the device models or subckt are perturbed in place
+        zeros = []
+
+        def perturb(m):
+            value = perturb_value(m.group(1), step)
+            if value is None:
+                zeros.append(m.group(1))
+                return m.group(0)
+            return m.group(0)[: m.start(1) - m.start(0)] + value
+
+        copy, count = assign_re(param).subn(perturb, copy)
+        # Sensitivities are per relative step, values of 0 have none
+        count -= len(zeros)
+
+        # Section params are copied, and used by this device copy only
+        if not count and not zeros and param.lower() in section_params:
+            renamed = f"{param}__s{k}"
+            renamed_copy, used = word_re(param).subn(renamed, copy)
+            value = perturb_value(section_params[param.lower()], step)
+            if used and value is None:
+                zeros.append(section_params[param.lower()])
+            elif used:
+                copy = f".param {renamed} = {value}\n{renamed_copy}"
+                count = used
+
+        if not count and zeros:
+            logging.warning(
+                f"Parameter {param} is 0 in {device}, it has no relative step and it's skipped"
+            )
+            continue
+        if not count:
+            logging.warning(f"Parameter {param} isn't used by {device}, it's skipped")
+            continue
+        if zeros:
+            logging.warning(
+                f"Parameter {param} is 0 at {len(zeros)} places of {device}, they aren't perturbed"
+            )
+
+        logging.info(f"Parameter {param} is perturbed at {count} places of {name}")
+        chunks.append(f"* {param} perturbed by {100 * step:g} %\n{copy}\n")
+        variants.append({"param": param, "device": name})
+
+    return "".join(chunks), variants
+
+
+def model_bins(text: str, device: str) -> pd.DataFrame:
+    """
+    Returns the geometry range of each model bin of a device, in um.
+    Args:
+        text (str): Spice text of the model card section.
+        device (str): Device models name.
+    """
+    rows = []
+    for stmt in statements(text):
+        head = stmt[0].strip().lower().split()
+        if len(head) < 2 or head[0] != ".model":
+            continue
+        if model_base_name(head[1]) != device.lower():
+            continue
+        joined = " ".join(stmt)
+        row = {"bin": head[1].split(".")[-1] if "." in head[1] else ""}
+        for key in ["lmin", "lmax", "wmin", "wmax"]:
+            match = assign_re(key).search(joined)
+            row[key] = float(match.group(1)) * 1e6 if match else np.nan
+        rows.append(row)
+    return pd.DataFrame(rows, columns=["bin", "lmin", "lmax", "wmin", "wmax"])
+
+
+def geometry_bin(bins: pd.DataFrame, width: float, length: float) -> str:
+    """
+    Returns the model bin of a geometry, as selected by ngspice.
+    Args:
+        bins (pd.DataFrame): Model bins, as returned by model_bins.
+        width (float): Width in um.
+        length (float): Length in um.
+    """
+    eps = 1e-6
+    inside = (
+        (bins["lmin"] <= length + eps)
+        & (length < bins["lmax"] - eps)
+        & (bins["wmin"] <= width + eps)
+        & (width < bins["wmax"] - eps)
+    )
+    if not inside.any():
+        # Upper bounds of the largest bins are included
+        inside = (
+            (bins["lmin"] <= length + eps)
+            & (length <= bins["lmax"] + eps)
+            & (bins["wmin"] <= width + eps)
+            & (width <= bins["wmax"] + eps)
+        )
+    return bins["bin"][inside].iloc[0] if inside.any() else ""
+
+
+def run_sim(adapter, case: dict, variants: list, include_path: str, job: dict):
+    """
+    Runs the device and its perturbed copies at a geometry in one simulation.
+    Args:
+        adapter (MosIdAdapter): Family adapter of the device.
+        case (dict): Regression case of the device.
+        variants (list): Parameter and device name of each copy.
+        include_path (str): Include file of the copies.
+        job (dict): Sweeps row of the geometry.
+    Returns:
+        pd.DataFrame: Results of the device, and of each copy in a `<column>__s<k>`
+            column. None if the simulation failed.
+    """
+    device = case["device"]
+    col = adapter.meas_out_result
+    width, length = job["W (um)"], job["L (um)"]
+
+    name = f"w{width}_l{length}_t{job['temp']}_{job['const_var']}{job['const_var_val']}_{col}"
+    dev_netlists_path = adapter.netlists_dir(case)
+    netlist_path = os.path.join(dev_netlists_path, f"netlist_sens_{name}.spice")
+    result_path = netlist_path.replace(
+        ".spice", ".raw" if adapter.engine.raw_output else ".txt"
+    )
+
+    devices = [device] + [variant["device"] for variant in variants]
+    adapter.render_job(
+        job,
+        netlist_path,
+        result_path,
+        template=adapter.netlist_template(device),
+        packed=True,
+        device=device,
+        variations=[{"width": width, "length": length, "device": d} for d in devices],
+        includes=[include_path],
+    )
+
+    # calling simulator to run netlist and write its results
+    try:
+        adapter.engine.simulate(netlist_path)
+    except Exception:
+        pass
+
+    if not os.path.isfile(result_path):
+        return None
+
+    if adapter.engine.raw_output:
+        data = read_rawfile(result_path)[0]
+    else:
+        data = pd.read_csv(result_path, delimiter=r"\s+")
+
+    vectors = {v: data[v] for v in ["vds", "vgs", "vbs"]}
+    vectors[col] = data[f"{col}0"]
+    result_df = adapter.result_frame(job, width, length, vectors)
+    for k in range(1, len(devices)):
+        result_df[f"{col}__s{k}"] = np.asarray(data[f"{col}{k}"])
+    return result_df
+
+
+def signed_error(adapter, case: dict, meas_df: pd.DataFrame, sim_df: pd.DataFrame):
+    """Returns the relative error (%) of measured points, merged as in regression."""
+    col = adapter.column
+    full_df = adapter.merge(case, meas_df, sim_df)
+    meas = full_df[f"{col}_meas"].to_numpy(dtype=float)
+    sim = full_df[f"{col}_sim"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return full_df, (sim - meas) * 100.0 / meas
+
+
+def sensitivity_tables(
+    adapter,
+    case: dict,
+    meas_df: pd.DataFrame,
+    sim_df: pd.DataFrame,
+    variants: list,
+    bins: pd.DataFrame,
+    step: float,
+) -> tuple:
+    """
+    Returns the error change of measured points per 1% step of each parameter.
+    Args:
+        adapter (MosIdAdapter): Family adapter of the device.
+        case (dict): Regression case of the device.
+        meas_df (pd.DataFrame): Measured data.
+        sim_df (pd.DataFrame): Results of the device and its copies.
+        variants (list): Parameter and device name of each copy.
+        bins (pd.DataFrame): Model bins of the device.
+        step (float): Relative step of the parameters.
+    Returns:
+        tuple: Table per geometry and parameter, and Jacobian of the mean error
+            per model bin (rows) and parameter (columns).
+    """
+    col = adapter.column
+    keys = ["W (um)", "L (um)", "corner", "temp", "vds", "vgs", "vbs"]
+    full_df, base_err = signed_error(adapter, case, meas_df, sim_df[keys + [col]])
+
+    points = full_df[["W (um)", "L (um)"]].copy()
+    points["bin"] = [
+        geometry_bin(bins, w, l) for w, l in zip(points["W (um)"], points["L (um)"])
+    ]
+    points["err"] = np.abs(base_err)
+
+    step_pct = 100.0 * step
+    for k, variant in enumerate(variants, 1):
+        variant_df = sim_df[keys + [f"{col}__s{k}"]].rename(
+            columns={f"{col}__s{k}": col}
+        )
+        _, err = signed_error(adapter, case, meas_df, variant_df)
+        points[f"d_{k}"] = (err - base_err) / step_pct
+        points[f"e_{k}"] = np.abs(err)
+
+    rows = []
+    quantile = adapter.quantile
+    for (width, length, bin_name), group in points.groupby(
+        ["W (um)", "L (um)", "bin"], sort=True
+    ):
+        base_q = group["err"].quantile(quantile)
+        for k, variant in enumerate(variants, 1):
+            rows.append(
+                {
+                    "W (um)": width,
+                    "L (um)": length,
+                    "bin": bin_name,
+                    "param": variant["param"],
+                    "points": int(group[f"d_{k}"].notna().sum()),
+                    f"{col}_err_q": base_q,
+                    "d_mean": group[f"d_{k}"].mean(),
+                    "d_abs": group[f"d_{k}"].abs().mean(),
+                    "d_err_q": (group[f"e_{k}"].quantile(quantile) - base_q) / step_pct,
+                }
+            )
+    table = pd.DataFrame(rows)
+
+    jacobian = points.groupby("bin").agg(
+        {f"d_{k}": "mean" for k in range(1, len(variants) + 1)}
+    )
+    jacobian.columns = [variant["param"] for variant in variants]
+    jacobian = bins.set_index("bin").join(jacobian, how="inner").reset_index()
+    return table, jacobian
+
+
+def main(arguments: dict) -> int:
+    """
+    Main function of the sensitivity command.
+    Args:
+        arguments (dict): Arguments used by user in the run command, generated by docopt.
+    Returns:
+        int: Exit code, 1 if no parameter could be perturbed.
+    """
+    family = arguments["--family"]
+    if family not in SENSITIVITY_FAMILIES:
+        logging.error(
+            f"{family} family is not supported, allowed families are [{', '.join(SENSITIVITY_FAMILIES)}], please recheck"
+        )
+        return 1
+
+    device = arguments["--device"]
+    corner = arguments["--corner"]
+    step = float(arguments["--step"]) / 100.0
+    setup_pandas()
+
+    engine = Engine.from_args(arguments)
+    engine.backend.check_version()
+
+    try:
+        adapter = FAMILIES[family](engine, run_dir=arguments["--run_dir"])
+        if device not in adapter.devices:
+            logging.error(
+                f"{device} device is not supported by {family}, allowed devices are [{', '.join(adapter.devices)}], please recheck"
+            )
+            return 1
+
+        case = next(case for case in adapter.cases() if case["device"] == device)
+        case["dev_path"] = os.path.join(arguments["--run_dir"], f"{device}_{corner}")
+        os.makedirs(case["dev_path"], exist_ok=True)
+
+        # Copies of the device are made from the section it is simulated with
+        lib_path = os.path.join(NGSPICE_DIR, adapter.model_card)
+        text = prune(ModelLibIndex(lib_path).section_text(corner), [device])
+        lib_text, variants = perturbed_library(text, device, arguments["--param"], step)
+        if not variants:
+            logging.error(f"No parameter of {arguments['--param']} is used by {device}")
+            return 1
+
+        include_path = os.path.abspath(
+            os.path.join(case["dev_path"], f"{device}_{corner}_perturbed.lib")
+        )
+        write_atomic(include_path, lib_text.encode())
+
+        meas_df = adapter.load_meas(case)
+        sweeps_df = adapter.load_sweeps(case, meas_df)
+        temps = [float(t) for t in arguments["--temp"]]
+        if temps:
+            meas_df = meas_df[meas_df["temp"].isin(temps)]
+            sweeps_df = sweeps_df[sweeps_df["temp"].isin(temps)]
+        meas_df = meas_df[meas_df["corner"] == corner]
+        sweeps_df = sweeps_df[sweeps_df["corner"] == corner]
+        if sweeps_df.empty:
+            logging.error(f"No measured data of {device} at {corner} corner")
+            return 1
+
+        logging.info(
+            f"# Device {device} {len(variants)} perturbed parameters, {len(sweeps_df)} simulations of {len(variants) + 1} instances"
+        )
+
+        sim_df = engine.run(
+            partial(run_sim, adapter, case, variants, include_path),
+            sweeps_df.to_dict("records"),
+            f"{device} sensitivity",
+            case_key=case["dev_path"],
+        )
+
+        table, jacobian = sensitivity_tables(
+            adapter, case, meas_df, sim_df, variants, model_bins(text, device), step
+        )
+    finally:
+        engine.close()
+
+    table_path = os.path.join(case["dev_path"], f"{device}_{corner}_sensitivity.csv")
+    table.to_csv(table_path, index=False)
+    jacobian_path = os.path.join(case["dev_path"], f"{device}_{corner}_jacobian.csv")
+    jacobian.to_csv(jacobian_path, index=False)
+
+    for param, group in table.groupby("param", sort=False):
+        if group["d_abs"].isna().all():
+            logging.warning(f"# {param}: no measured point is simulated")
+            continue
+        top = group.loc[group["d_abs"].idxmax()]
+        logging.info(
+            f"# {param}: largest error change {top['d_abs']:.3f} % per 1% step at W={top['W (um)']}, L={top['L (um)']} (bin {top['bin']})"
+        )
+    logging.info(f"Sensitivity per geometry is written to {table_path}")
+    logging.info(f"Jacobian per model bin is written to {jacobian_path}")
+    return 0
+
+
+# ================================================================
+# -------------------------- MAIN --------------------------------
+# ================================================================
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="SENSITIVITY: 0.1")
+
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    exit(main(arguments))
@@ -0,0 +1,187 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Cache of simulation outputs for GF180MCU models regression.
+
+Outputs of a netlist (its `wrdata`/`write` files and its log) are stored by a
+hash of its content, so that unchanged simulation points of a later run are
+restored instead of being simulated again. The hash covers:
+
+- The rendered netlist text, which holds the device, its sweeps and options.
+- The model card statements used by the netlist: only the subckts and models of
+  its devices in the called sections, so that editing a device model doesn't
+  invalidate simulations of other devices.
+- Content of other included files.
+- The simulator version.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+
+from .model_lib_index import ModelLibCache, write_atomic
+
+INCLUDE_RE = re.compile(r"^\s*\.inc(?:lude)?\s+(\S+)", re.IGNORECASE | re.MULTILINE)
+OUTPUT_RE = re.compile(r"^\s*(?:wrdata|write)\s+(\S+)", re.IGNORECASE | re.MULTILINE)
+
+
+def file_digest(path: str) -> str:
+    """
+    Returns the sha256 digest of a file content.
+    Args:
+        path (str): Path of the file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SimCache:
+    """
+    Content addressed store of simulation outputs.
+
+    Args:
+        cache_dir (str): Directory of stored outputs.
+        simulator (str): Simulator name and version, part of every netlist hash.
+        lib_cache (ModelLibCache): Used to hash model card statements per device,
+            a new one is created in the cache directory if not given.
+    """
+
+    def __init__(self, cache_dir: str, simulator: str, lib_cache=None):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.simulator = simulator
+        self.lib_cache = lib_cache or ModelLibCache(
+            os.path.join(self.cache_dir, "model_lib")
+        )
+        self.hits = 0
+        self.misses = 0
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _file_digest(self, path: str) -> str:
+        # Included files are hashed once per run
+        path = os.path.abspath(path)
+        with self._lock:
+            if path not in self._files:
+                self._files[path] = file_digest(path)
+            return self._files[path]
+
+    def netlist_digest(self, netlist_path: str) -> str:
+        """
+        Returns the hash of a netlist and of all its inputs.
+        Args:
+            netlist_path (str): Rendered netlist, before its `.lib` calls are rewritten.
+        """
+        with open(netlist_path) as f:
+            netlist = f.read()
+
+        digest = hashlib.sha256()
+        digest.update(self.simulator.encode())
+        digest.update(netlist.encode())
+
+        # Minimal include files are named by their content hash
+        for _, lib_path, section, devices in self.lib_cache.netlist_libs(netlist):
+            try:
+                min_lib_path = self.lib_cache.minimal_lib(lib_path, section, devices)
+                digest.update(os.path.basename(min_lib_path).encode())
+            except KeyError:
+                digest.update(self._file_digest(lib_path).encode())
+
+        for include_path in INCLUDE_RE.findall(netlist):
+            include_path = include_path.strip("'\"")
+            if os.path.isfile(include_path):
+                digest.update(self._file_digest(include_path).encode())
+
+        return digest.hexdigest()
+
+    def _entry_dir(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    @staticmethod
+    def outputs(netlist_path: str) -> list:
+        """
+        Returns the paths of files written by a netlist simulation.
+        Args:
+            netlist_path (str): Rendered netlist.
+        """
+        with open(netlist_path) as f:
+            netlist = f.read()
+
+        paths = [p.strip("'\"") for p in OUTPUT_RE.findall(netlist)]
+        return paths + [f"{netlist_path}.log"]
+
+    def restore(self, netlist_path: str, digest: str) -> bool:
+        """
+        Restores the stored outputs of a netlist, if its hash is in the cache.
+        Args:
+            netlist_path (str): Rendered netlist.
+            digest (str): Hash of the netlist, from netlist_digest.
+        Returns:
+            bool: True if outputs were restored, so the netlist doesn't need to be simulated.
+        """
+        entry_dir = self._entry_dir(digest)
+        meta_path = os.path.join(entry_dir, "outputs.json")
+
+        if not os.path.isfile(meta_path):
+            with self._lock:
+                self.misses += 1
+            return False
+
+        with open(meta_path) as f:
+            stored = json.load(f)
+
+        for i, out_path in enumerate(self.outputs(netlist_path)):
+            name = str(i)
+            if name in stored:
+                shutil.copyfile(os.path.join(entry_dir, name), out_path)
+
+        with self._lock:
+            self.hits += 1
+
+        return True
+
+    def store(self, netlist_path: str, digest: str):
+        """
+        Stores the outputs of a simulated netlist.
+        Args:
+            netlist_path (str): Simulated netlist.
+            digest (str): Hash of the netlist, from netlist_digest.
+        """
+        entry_dir = self._entry_dir(digest)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        stored = []
+        for i, out_path in enumerate(self.outputs(netlist_path)):
+            if os.path.isfile(out_path):
+                with open(out_path, "rb") as f:
+                    write_atomic(os.path.join(entry_dir, str(i)), f.read())
+                stored.append(str(i))
+
+        # Written last, an entry without it is incomplete and isn't restored
+        write_atomic(
+            os.path.join(entry_dir, "outputs.json"),
+            json.dumps(stored).encode(),
+        )
+
+    def log_stats(self):
+        """Logs the number of restored and simulated netlists."""
+        logging.info(
+            f"Simulation cache: {self.hits} netlists restored, {self.misses} simulated"
+        )
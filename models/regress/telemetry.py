@@ -0,0 +1,246 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Performance telemetry of GF180MCU models regression.
+
+Each regression run records the wall and CPU time of its phases, the number
+of simulations, the simulator processes CPU time and peak RSS and its slowest
+jobs. Phases are timed by the thread running them and nested phases are
+subtracted from the enclosing one, so phase times add up to the worker time:
+
+- render: rendering netlist templates.
+- cache: simulation outputs cache and minimal model card include files.
+- queue: waiting for a free simulator slot.
+- launch: starting simulator processes.
+- simulate: simulations, out of queue and launch.
+- parse: reading and formatting simulation results, the job time out of the
+  phases above.
+- merge: merging results of completed jobs.
+- analysis: comparing merged results with measured data and writing reports.
+
+A report is written as `<device>_telemetry.json` next to the merged data of
+each device and as `telemetry.json` for the whole run, reports are compared by
+`python -m regress.telemetry_diff`. Xyce regression scripts record the queue,
+launch, simulate and analysis phases of the whole run in `telemetry.json`.
+"""
+
+import contextlib
+import heapq
+import json
+import logging
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Simulator processes resources are only reported on Unix
+    resource = None
+
+from .model_lib_index import write_atomic
+
+PHASES = [
+    "render",
+    "cache",
+    "queue",
+    "launch",
+    "simulate",
+    "parse",
+    "merge",
+    "analysis",
+]
+
+
+def children_usage() -> dict:
+    """Returns CPU time (s) and peak RSS (MB) of the waited child processes."""
+    if resource is None:
+        return {"cpu": 0.0, "peak_rss_mb": 0.0}
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is the peak of the largest child, in KB on Linux
+    return {
+        "cpu": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": usage.ru_maxrss / 1024.0,
+    }
+
+
+def describe_job(job, max_len: int = 160) -> str:
+    """
+    Returns a short description of a job, its scalar parameters if a dict.
+    Args:
+        job: Job as returned by the family adapter.
+        max_len (int): Max length of the description.
+    """
+    if isinstance(job, dict):
+        text = " ".join(
+            f"{key}={value}"
+            for key, value in job.items()
+            if isinstance(value, (str, int, float))
+        )
+    else:
+        text = str(job)
+    return text if len(text) <= max_len else f"{text[: max_len - 3]}..."
+
+
+class Telemetry:
+    """
+    Records phase times and slowest jobs of a regression run, from many threads.
+    Records are kept for the whole run and for each case.
+
+    Args:
+        slowest (int): Number of slowest jobs kept in reports.
+    """
+
+    def __init__(self, slowest: int = 10):
+        self.slowest = slowest
+        self.start = time.perf_counter()
+        self.children_start = children_usage()
+        # Phase [wall, cpu, count] and slowest jobs heap, by case, None for the run
+        self.phases = {None: {}}
+        self.jobs = {None: []}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def case(self, key: str):
+        """
+        Records phases run by the current thread in a case.
+        Args:
+            key (str): Key of the case, its results directory.
+        """
+        previous = getattr(self._local, "case", None)
+        self._local.case = key
+        try:
+            yield
+        finally:
+            self._local.case = previous
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Times a phase run by the current thread, out of its nested phases.
+        Args:
+            name (str): Name of the phase.
+        """
+        stack = self._local.__dict__.setdefault("stack", [])
+        # Wall and cpu time of nested phases
+        nested = [0.0, 0.0]
+        stack.append(nested)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            stack.pop()
+            if stack:
+                stack[-1][0] += wall
+                stack[-1][1] += cpu
+            totals = self._local.__dict__.setdefault("totals", {})
+            totals[name] = totals.get(name, 0.0) + wall - nested[0]
+            self.add(name, wall - nested[0], cpu - nested[1])
+
+    def thread_time(self, name: str) -> float:
+        """
+        Returns the wall time (s) of a phase run by the current thread so far.
+        Args:
+            name (str): Name of the phase.
+        """
+        return self._local.__dict__.get("totals", {}).get(name, 0.0)
+
+    @contextlib.contextmanager
+    def job(self, label: str, case: str = None):
+        """
+        Times a job, its time out of nested phases is the parse phase.
+        Args:
+            label (str): Name of the job in slowest jobs.
+            case (str): Key of the job case.
+        """
+        start = time.perf_counter()
+        try:
+            with self.case(case), self.phase("parse"):
+                yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                for key in {None, case}:
+                    jobs = self.jobs.setdefault(key, [])
+                    heapq.heappush(jobs, (duration, label))
+                    if len(jobs) > self.slowest:
+                        heapq.heappop(jobs)
+
+    def add(self, name: str, wall: float, cpu: float = 0.0):
+        """
+        Adds time to a phase of the current thread case.
+        Args:
+            name (str): Name of the phase.
+            wall (float): Wall time (s).
+            cpu (float): CPU time (s) of the thread.
+        """
+        case = getattr(self._local, "case", None)
+        with self._lock:
+            for key in {None, case}:
+                record = self.phases.setdefault(key, {}).setdefault(name, [0.0, 0.0, 0])
+                record[0] += wall
+                record[1] += cpu
+                record[2] += 1
+
+    def report(self, case: str = None) -> dict:
+        """
+        Returns the report of a case, or of the whole run if not given.
+        Args:
+            case (str): Key of the case.
+        """
+        with self._lock:
+            phases = {
+                name: list(record) for name, record in self.phases.get(case, {}).items()
+            }
+            jobs = sorted(self.jobs.get(case, []), reverse=True)
+
+        order = PHASES + sorted(set(phases) - set(PHASES))
+        report = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "phases": {
+                name: {
+                    "wall": round(phases[name][0], 4),
+                    "cpu": round(phases[name][1], 4),
+                    "count": phases[name][2],
+                }
+                for name in order
+                if name in phases
+            },
+            "simulations": phases.get("simulate", [0, 0, 0])[2],
+            "slowest_jobs": [
+                {"job": label, "duration": round(duration, 4)}
+                for duration, label in jobs
+            ],
+        }
+
+        if case is None:
+            usage = children_usage()
+            report["wall_time"] = round(time.perf_counter() - self.start, 4)
+            report["simulator"] = {
+                "cpu": round(usage["cpu"] - self.children_start["cpu"], 4),
+                "peak_rss_mb": round(usage["peak_rss_mb"], 2),
+            }
+        return report
+
+    def write(self, path: str, case: str = None):
+        """
+        Writes the report of a case, or of the whole run if not given.
+        Args:
+            path (str): Path of the JSON report.
+            case (str): Key of the case.
+        """
+        write_atomic(path, json.dumps(self.report(case), indent=2).encode())
+        logging.info(f"Performance telemetry is written to {path}")
@@ -0,0 +1,140 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares two performance telemetry reports of GF180MCU models regression, the
+wall and CPU time of each phase, simulations and simulator resources. It exits
+with 1 if any phase got slower than the threshold. Run it from the models
+directory.
+
+Usage:
+  telemetry_diff <old_report> <new_report> [--threshold=<pct>] [--min_time=<sec>]
+
+  -h, --help                     Show help text.
+  --threshold=<pct>              Relative increase of a phase wall time reported as a regression. [default: 10]
+  --min_time=<sec>               Min increase of a phase wall time reported as a regression, below it times are noise. [default: 1.0]
+"""
+
+from docopt import docopt
+import json
+import logging
+
+from .telemetry import PHASES
+
+
+def diff_reports(old: dict, new: dict, threshold: float, min_time: float) -> list:
+    """
+    Logs the differences between two reports.
+    Args:
+        old (dict): Reference report.
+        new (dict): Compared report.
+        threshold (float): Relative increase (%) of a phase wall time reported as
+            a regression.
+        min_time (float): Min increase (s) of a phase wall time reported as a
+            regression.
+    Returns:
+        list: Phases whose wall time regressed.
+    """
+
+    def change(old_val, new_val):
+        if not old_val:
+            return "     n/a"
+        return f"{100 * (new_val - old_val) / old_val:+7.1f}%"
+
+    old_phases, new_phases = old.get("phases", {}), new.get("phases", {})
+    names = [name for name in PHASES if name in old_phases or name in new_phases]
+    names += sorted((set(old_phases) | set(new_phases)) - set(PHASES))
+
+    logging.info(
+        f"{'phase':<10} {'old wall':>10} {'new wall':>10} {'change':>8} {'old cpu':>10} {'new cpu':>10} {'change':>8}"
+    )
+
+    regressed = []
+    empty = {"wall": 0.0, "cpu": 0.0}
+    for name in names:
+        old_p, new_p = old_phases.get(name, empty), new_phases.get(name, empty)
+        increase = new_p["wall"] - old_p["wall"]
+        slower = increase >= min_time and increase > threshold * old_p["wall"] / 100
+        if slower:
+            regressed.append(name)
+        logging.log(
+            logging.ERROR if slower else logging.INFO,
+            f"{name:<10} {old_p['wall']:>10.2f} {new_p['wall']:>10.2f} {change(old_p['wall'], new_p['wall'])}"
+            f" {old_p['cpu']:>10.2f} {new_p['cpu']:>10.2f} {change(old_p['cpu'], new_p['cpu'])}",
+        )
+
+    for key in ["wall_time", "simulations"]:
+        if key in old or key in new:
+            logging.info(
+                f"{key}: {old.get(key, 0)} -> {new.get(key, 0)} {change(old.get(key, 0), new.get(key, 0))}"
+            )
+    old_sim, new_sim = old.get("simulator", {}), new.get("simulator", {})
+    for key in ["cpu", "peak_rss_mb"]:
+        if key in old_sim or key in new_sim:
+            logging.info(
+                f"simulator {key}: {old_sim.get(key, 0)} -> {new_sim.get(key, 0)} {change(old_sim.get(key, 0), new_sim.get(key, 0))}"
+            )
+
+    if new.get("slowest_jobs"):
+        logging.info("Slowest jobs of the new report:")
+        for job in new["slowest_jobs"]:
+            logging.info(f"  {job['duration']:>9.2f} s  {job['job']}")
+
+    return regressed
+
+
+def main(arguments: dict) -> int:
+    """
+    Main function of the telemetry diff command.
+    Args:
+        arguments (dict): Arguments used by user in the run command, generated by docopt.
+    Returns:
+        int: Exit code, 1 if any phase regressed.
+    """
+    with open(arguments["<old_report>"]) as f:
+        old = json.load(f)
+    with open(arguments["<new_report>"]) as f:
+        new = json.load(f)
+
+    regressed = diff_reports(
+        old, new, float(arguments["--threshold"]), float(arguments["--min_time"])
+    )
+    if regressed:
+        logging.error(f"Phases got slower: {', '.join(regressed)}")
+        return 1
+
+    logging.info("No phase got slower.")
+    return 0
+
+
+# ================================================================
+# -------------------------- MAIN --------------------------------
+# ================================================================
+
+
+if __name__ == "__main__":
+
+    # Args
+    arguments = docopt(__doc__, version="TELEMETRY_DIFF: 0.1")
+
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=[
+            logging.StreamHandler(),
+        ],
+        format="%(asctime)s | %(levelname)-7s | %(message)s",
+        datefmt="%d-%b-%Y %H:%M:%S",
+    )
+
+    # Calling main function
+    exit(main(arguments))
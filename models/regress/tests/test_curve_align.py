@@ -0,0 +1,87 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the alignment of simulated curves on measured points.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from regress.curve_align import align_dc_sweeps, interp_curves  # noqa E402
+
+
+def test_interp_curves():
+    # Two curves of slope 2 and 10, simulated out of order with a NaN point
+    sim_df = pd.DataFrame(
+        {
+            "W": [1, 1, 1, 2, 2, 2, 2],
+            "x": [1.0, 0.0, 0.5, 0.0, 0.5, 0.75, 1.0],
+            "y": [2.0, 0.0, 1.0, 0.0, 5.0, np.nan, 10.0],
+        }
+    )
+    meas_df = pd.DataFrame(
+        {
+            "W": [1, 1, 2, 2, 2, 1, 3, 1],
+            "x": [0.25, 0.5, 1.0, 0.75, 1.004, 1.2, 0.5, np.nan],
+        }
+    )
+
+    values = interp_curves(meas_df, sim_df, ["W"], "x", "y", tol=0.005)
+    np.testing.assert_allclose(
+        values, [0.5, 1.0, 10.0, 7.5, 10.0, np.nan, np.nan, np.nan]
+    )
+
+
+def test_interp_curves_empty():
+    meas_df = pd.DataFrame({"W": [1], "x": [0.5]})
+    sim_df = pd.DataFrame({"W": [1], "x": [np.nan], "y": [1.0]})
+
+    assert np.isnan(interp_curves(meas_df, sim_df, ["W"], "x", "y")).all()
+    assert np.isnan(interp_curves(meas_df, sim_df.iloc[:0], ["W"], "x", "y")).all()
+
+
+def test_align_dc_sweeps():
+    sweeps_df = pd.DataFrame(
+        {
+            "const_var": ["vbs"],
+            "const_var_val": [0.0],
+            "sweeps": ["vds 0 1 0.5 vgs 1 2 1"],
+        }
+    )
+
+    # Simulated biases aren't rounded, the drain current is vgs * vds
+    vds = np.tile([1e-16, 0.5, 1.0], 2)
+    vgs = np.repeat([1.0 + 1e-12, 2.0 - 1e-12], 3)
+    sim_df = pd.DataFrame(
+        {"L": 1.0, "vbs": -1e-17, "vgs": vgs, "vds": vds, "id": vgs * vds}
+    )
+    meas_df = pd.DataFrame(
+        {
+            "L": [1.0, 1.0, 1.0, 1.0, 2.0],
+            "vbs": [0.0, 0.0, 0.0, -1.0, 0.0],
+            "vgs": [1.0, 2.0, 2.0, 1.0, 1.0],
+            "vds": [0.25, 0.5, 1.5, 0.5, 0.5],
+        }
+    )
+
+    values = align_dc_sweeps(meas_df, sim_df, sweeps_df, ["L"], "id")
+    # Out of the sweep range, at a not simulated vbs or geometry points are NaN
+    np.testing.assert_allclose(values, [0.25, 1.0, np.nan, np.nan, np.nan])
@@ -0,0 +1,66 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the model card section index and minimal include files.
+"""
+
+import os
+import re
+import sys
+
+MODELS_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.insert(0, MODELS_DIR)
+
+from regress.model_lib_index import ModelLibCache, ModelLibIndex  # noqa E402
+
+LIB_PATH = os.path.join(MODELS_DIR, "ngspice", "sm141064.ngspice")
+MODEL_RE = re.compile(r"^\s*\.model\s+(\S+)", re.IGNORECASE | re.MULTILINE)
+
+
+def test_minimal_section_keeps_device_models():
+    index = ModelLibIndex(LIB_PATH)
+    text = index.minimal_section("typical", ["nfet_03v3"])
+
+    # Typical models of the device are in the section called by typical
+    models = MODEL_RE.findall(text)
+    expected = [
+        name
+        for name, defs in index.models.items()
+        if name.startswith("nfet_03v3.")
+        and any(section == "nfet_03v3_t" for section, _, _ in defs)
+    ]
+    assert sorted(models) == sorted(expected)
+    # Models of other devices in the same section are pruned
+    assert "np_junction" not in models
+    assert expected
+
+    lines = text.strip().splitlines()
+    assert lines[1] == ".lib typical"
+    assert lines[-1] == ".endl typical"
+    assert len(text) < len(index.section_text("typical"))
+
+
+def test_minimal_lib_is_reused(tmp_path):
+    cache = ModelLibCache(str(tmp_path))
+    path = cache.minimal_lib(LIB_PATH, "typical", ["NFET_03V3"])
+
+    assert os.path.dirname(path) == str(tmp_path)
+    assert os.path.basename(path).startswith("sm141064.ngspice_typical_")
+    assert (
+        ModelLibCache(str(tmp_path)).minimal_lib(LIB_PATH, "typical", ["nfet_03v3"])
+        == path
+    )
+    assert cache.minimal_lib(LIB_PATH, "typical", ["pfet_03v3"]) != path
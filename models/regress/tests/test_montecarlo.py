@@ -0,0 +1,60 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the Monte Carlo running statistics.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from regress.montecarlo import RunningStats  # noqa E402
+
+
+def test_batches_match_full_samples():
+    rng = np.random.default_rng(0)
+    # Large offset, as naive sums of squares lose precision on it
+    samples = rng.normal([1e-3, 1e4, 0.7], [1e-5, 2.0, 0.01], size=(1000, 3))
+    samples[rng.random(samples.shape) < 0.05] = np.nan
+
+    stats = RunningStats(["id", "rds", "vth"])
+    for batch in np.split(samples, [1, 7, 300, 301, 999]):
+        stats.update(batch)
+
+    np.testing.assert_array_equal(stats.count, np.sum(~np.isnan(samples), axis=0))
+    np.testing.assert_allclose(stats.mean, np.nanmean(samples, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(
+        stats.sigma, np.nanstd(samples, axis=0, ddof=1), rtol=1e-9
+    )
+
+    summary = stats.summary()
+    assert summary["rds"]["count"] == stats.count[1]
+    assert summary["vth"]["sigma_rel"] == 100.0 * stats.sigma[2] / abs(stats.mean[2])
+
+
+def test_nan_columns():
+    stats = RunningStats(["a", "b"])
+    stats.update(np.array([[np.nan, 1.0], [np.nan, 3.0]]))
+    stats.update(np.array([[2.0, np.nan]]))
+
+    np.testing.assert_array_equal(stats.count, [1, 2])
+    np.testing.assert_allclose(stats.mean, [2.0, 2.0])
+    # A single sample has no sample standard deviation
+    assert np.isnan(stats.sigma[0])
+    assert stats.sigma[1] == np.std([1.0, 3.0], ddof=1)
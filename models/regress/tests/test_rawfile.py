@@ -0,0 +1,92 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the ngspice binary rawfile reader.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from regress.rawfile import read_rawfile, read_vectors  # noqa E402
+
+
+def plot_bytes(name: str, names: list, data: np.ndarray) -> bytes:
+    """Returns a binary rawfile plot as written by ngspice."""
+    header = [
+        "Title: test",
+        "Date: -",
+        f"Plotname: {name}",
+        "Flags: real",
+        f"No. Variables: {len(names)}",
+        f"No. Points: {len(data)}",
+        "Variables:",
+    ]
+    header += [f"\t{i}\t{var}\tvoltage" for i, var in enumerate(names)]
+    header += ["Binary:", ""]
+    return "\n".join(header).encode() + np.ascontiguousarray(data, float).tobytes()
+
+
+def test_multi_plot(tmp_path):
+    dc = np.column_stack([np.linspace(0, 3.3, 5), np.linspace(0, 1e-3, 5)])
+    op = np.array([[1.0, 2.0, 3.0]])
+    path = tmp_path / "result.raw"
+    path.write_bytes(
+        plot_bytes("DC transfer characteristic", ["v-sweep", "i(vds)"], dc)
+        + plot_bytes("Operating Point", ["v(d)", "v(g)", "I(Vds)"], op)
+    )
+
+    plots = read_rawfile(str(path))
+    assert [plot.name for plot in plots] == [
+        "DC transfer characteristic",
+        "Operating Point",
+    ]
+    assert len(plots[0]) == 5
+    np.testing.assert_array_equal(plots[0]["I(VDS)"], dc[:, 1])
+    assert plots[1].names == ["v(d)", "v(g)", "I(Vds)"]
+    np.testing.assert_array_equal(plots[1]["i(vds)"], [3.0])
+
+    vectors = read_vectors(str(path), ["v-sweep"])
+    np.testing.assert_array_equal(vectors["v-sweep"], dc[:, 0])
+    with pytest.raises(KeyError):
+        plots[1]["v-sweep"]
+
+
+def test_empty_plot(tmp_path):
+    data = np.array([[0.0, 1e-6], [0.1, 2e-6]])
+    path = tmp_path / "result.raw"
+    path.write_bytes(
+        plot_bytes(
+            "DC transfer characteristic", ["v-sweep", "i(vds)"], np.empty((0, 2))
+        )
+        + plot_bytes("DC transfer characteristic", ["v-sweep", "i(vds)"], data)
+    )
+
+    empty, plot = read_rawfile(str(path))
+    assert len(empty) == 0
+    assert empty["i(vds)"].shape == (0,)
+    np.testing.assert_array_equal(plot["i(vds)"], data[:, 1])
+
+
+def test_ascii_rawfile(tmp_path):
+    path = tmp_path / "result.raw"
+    path.write_text("Title: test\nNo. Variables: 1\nNo. Points: 1\nValues:\n 0 0.0\n")
+    with pytest.raises(ValueError):
+        read_rawfile(str(path))
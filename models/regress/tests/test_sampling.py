@@ -0,0 +1,122 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the sampled fast regression verdict.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from regress.sampling import JobSampler, weighted_quantile  # noqa E402
+
+QUANTILE = 0.95
+THRESH = 5.0
+
+
+def make_jobs(low: float, high: float) -> list:
+    """Returns jobs of 3 corners and 2 temps, each with 20 points of uniform errors."""
+    rng = np.random.default_rng(0)
+    return [
+        {"corner": corner, "temp": temp, "errors": rng.uniform(low, high, 20)}
+        for corner in ["typical", "ff", "ss"]
+        for temp in [25, 125]
+        for _ in range(30)
+    ]
+
+
+def error_fn(df: pd.DataFrame) -> np.ndarray:
+    return df["err"].to_numpy()
+
+
+def run(sampler: JobSampler):
+    run_sim = sampler.wrap(lambda case, job: pd.DataFrame({"err": job["errors"]}))
+    while True:
+        jobs = sampler.next_round()
+        if not jobs:
+            return
+        for job in jobs:
+            run_sim({}, job)
+
+
+@pytest.mark.parametrize("low, high, passed", [(0.0, 2.0, True), (6.0, 10.0, False)])
+def test_verdict_before_all_jobs(low, high, passed):
+    jobs = make_jobs(low, high)
+    sampler = JobSampler(jobs, error_fn, QUANTILE, THRESH, seed="test")
+    run(sampler)
+
+    assert sampler.verdict() is passed
+    assert sampler.sampled < len(jobs)
+    estimate, lower, upper = sampler.estimate()
+    assert lower <= estimate <= upper
+    assert (upper < THRESH) if passed else (lower > THRESH)
+
+
+def test_verdict_of_all_jobs():
+    # Errors quantile of every job is at the threshold, so is its interval
+    jobs = make_jobs(0.0, 1.0)
+    for job in jobs:
+        job["errors"] = np.arange(21) * 0.25 + 0.25
+    sampler = JobSampler(jobs, error_fn, QUANTILE, THRESH, seed="test")
+    run(sampler)
+
+    estimate, lower, upper = sampler.estimate()
+    assert sampler.sampled == len(jobs)
+    assert estimate == lower == upper == THRESH
+    assert sampler.verdict() is True
+
+
+def test_estimate_of_all_jobs():
+    jobs = make_jobs(0.0, 2.0)
+    sampler = JobSampler(jobs, error_fn, QUANTILE, THRESH, round_frac=1.0)
+    run(sampler)
+
+    errors = np.concatenate([job["errors"] for job in jobs])
+    expected = np.quantile(errors, QUANTILE, method="inverted_cdf")
+    estimate, lower, upper = sampler.estimate()
+
+    # The interval is closed once all jobs are run
+    assert sampler.sampled == len(jobs)
+    assert estimate == lower == upper == pytest.approx(expected)
+
+
+def test_frame_errors_are_reused():
+    calls = []
+
+    def counted_error_fn(df):
+        calls.append(len(df))
+        return error_fn(df)
+
+    jobs = make_jobs(0.0, 2.0)[:2]
+    sampler = JobSampler(jobs, counted_error_fn, QUANTILE, THRESH)
+    df = sampler.wrap(lambda case, job: pd.DataFrame({"err": job["errors"]}))(
+        {}, jobs[0]
+    )
+
+    np.testing.assert_array_equal(sampler.frame_errors(df), jobs[0]["errors"])
+    assert calls == [20]
+
+
+def test_weighted_quantile():
+    values = np.array([3.0, np.nan, 1.0, 2.0])
+    assert weighted_quantile(values, np.ones(4), 0.5) == 2.0
+    assert weighted_quantile(values, np.array([1.0, 1.0, 1.0, 10.0]), 0.5) == 2.0
+    assert np.isnan(weighted_quantile(np.array([np.nan]), np.ones(1), 0.5))
@@ -0,0 +1,94 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the simulation outputs cache keys.
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from regress.sim_cache import SimCache  # noqa E402
+
+LIB = """* test model card
+.lib typical
+.model nfet_03v3 nmos level=54 vth0=0.5
+.model pfet_03v3 pmos level=54 vth0=-0.5
+.endl typical
+"""
+
+
+def write(path, text: str) -> str:
+    with open(path, "w") as f:
+        f.write(text)
+    return str(path)
+
+
+def netlist(tmp_path, vds: float = 3.3) -> str:
+    return write(
+        tmp_path / "netlist.spice",
+        f".lib {tmp_path / 'models.lib'} typical\n"
+        f".include {tmp_path / 'design.spice'}\n"
+        f"m1 d g 0 0 nfet_03v3 w=1u l=1u\n"
+        f"vds d 0 {vds}\n"
+        f".dc vds 0 {vds} 0.05\n"
+        f"wrdata {tmp_path / 'result.csv'} i(vds)\n",
+    )
+
+
+def digest(tmp_path, simulator: str = "ngspice-41", **kwargs) -> str:
+    # A new cache per digest, as included files are hashed once per run
+    cache = SimCache(str(tmp_path / "cache"), simulator)
+    return cache.netlist_digest(netlist(tmp_path, **kwargs))
+
+
+def test_netlist_digest_invalidation(tmp_path):
+    write(tmp_path / "models.lib", LIB)
+    write(tmp_path / "design.spice", ".param sw_stat_global=0\n")
+    base = digest(tmp_path)
+
+    assert digest(tmp_path) == base
+    assert digest(tmp_path, vds=6.6) != base
+    assert digest(tmp_path, simulator="ngspice-42") != base
+
+    write(tmp_path / "design.spice", ".param sw_stat_global=1\n")
+    changed_include = digest(tmp_path)
+    assert changed_include != base
+
+    # Only models of the netlist devices are part of its key
+    write(tmp_path / "models.lib", LIB.replace("vth0=-0.5", "vth0=-0.6"))
+    assert digest(tmp_path) == changed_include
+    write(tmp_path / "models.lib", LIB.replace("vth0=0.5", "vth0=0.6"))
+    assert digest(tmp_path) != changed_include
+
+
+def test_store_restore(tmp_path):
+    write(tmp_path / "models.lib", LIB)
+    write(tmp_path / "design.spice", "")
+    cache = SimCache(str(tmp_path / "cache"), "ngspice-41")
+    netlist_path = netlist(tmp_path)
+    key = cache.netlist_digest(netlist_path)
+
+    assert not cache.restore(netlist_path, key)
+    write(tmp_path / "result.csv", "0 1e-6\n")
+    cache.store(netlist_path, key)
+
+    os.remove(tmp_path / "result.csv")
+    assert cache.restore(netlist_path, key)
+    with open(tmp_path / "result.csv") as f:
+        assert f.read() == "0 1e-6\n"
+    assert (cache.hits, cache.misses) == (1, 1)
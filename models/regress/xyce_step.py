@@ -0,0 +1,92 @@
+# Copyright 2023 GlobalFoundries PDK Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Temperature steps of Xyce regression netlists.
+
+Xyce parses the model card once per process, which takes most of the run time
+of a single temperature simulation. All temperatures of a device variation are
+simulated in one Xyce run with a `.STEP TEMP LIST` statement, the results of
+all steps are written to the same `.print` file one after the other and split
+back into one table per temperature.
+"""
+
+import io
+import re
+
+import pandas as pd
+
+STEP_TEMP_RE = re.compile(r"^[ \t]*\.step[ \t]+temp\b.*$", re.IGNORECASE | re.MULTILINE)
+END_RE = re.compile(r"^[ \t]*\.end[ \t]*$", re.IGNORECASE | re.MULTILINE)
+
+
+def step_temps(text: str, temps: list) -> str:
+    """
+    Returns a netlist simulating a list of temperatures in one run.
+    Args:
+        text (str): Netlist text, its `.STEP TEMP` statements are replaced if any.
+        temps (list): Temperatures to be simulated, in order.
+    Returns:
+        str: Netlist text stepping the temperatures.
+    """
+    step = f".STEP TEMP LIST {' '.join(str(temp) for temp in temps)}"
+    if STEP_TEMP_RE.search(text):
+        return STEP_TEMP_RE.sub(step, text)
+
+    end = END_RE.search(text)
+    if end is None:
+        return f"{text.rstrip()}\n{step}\n"
+    return f"{text[: end.start()]}{step}\n{text[end.start() :]}"
+
+
+def split_steps(path: str, n_steps: int, sep: str = ",") -> list:
+    """
+    Splits the `.print` output of a stepped Xyce run into one table per step.
+    Steps are delimited by repeated header lines if any, else the output is
+    split into blocks of equal rows count as all steps run the same sweeps.
+    Args:
+        path (str): Output file of the stepped run.
+        n_steps (int): Number of steps of the run.
+        sep (str): Columns separator of the output file.
+    Returns:
+        list: Table of each step, in steps order.
+    """
+    with open(path) as f:
+        lines = [
+            line for line in f if line.strip() and not line.startswith("End of Xyce")
+        ]
+    if not lines:
+        raise ValueError(f"Output {path} of stepped run is empty")
+
+    header, blocks = lines[0], [[]]
+    for line in lines[1:]:
+        if line == header:
+            blocks.append([])
+        else:
+            blocks[-1].append(line)
+
+    if len(blocks) == 1 and n_steps > 1:
+        rows = blocks[0]
+        if len(rows) % n_steps:
+            raise ValueError(
+                f"{len(rows)} rows of {path} can't be split into {n_steps} steps"
+            )
+        size = len(rows) // n_steps
+        blocks = [rows[i * size : (i + 1) * size] for i in range(n_steps)]
+
+    if len(blocks) != n_steps:
+        raise ValueError(f"Output {path} has {len(blocks)} steps, {n_steps} expected")
+
+    return [
+        pd.read_csv(io.StringIO(header + "".join(block)), sep=sep) for block in blocks
+    ]
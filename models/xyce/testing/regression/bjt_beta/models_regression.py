@@ -1,10 +1,11 @@
 """
 Usage:
-  models_regression.py [--num_cores=<num>]
+  models_regression.py [--num_cores=<num>] [--mpi_min_size=<num>]
 
   -h, --help             Show help text.
   -v, --version          Show version.
   --num_cores=<num>      Number of cores to be used by simulator
+  --mpi_min_size=<num>   Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
 """
 
 from cmath import inf
@@ -19,6 +20,25 @@ import shutil
 import logging
 import glob
 import multiprocessing as mp
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import (  # noqa E402
+    ProcessRunner,
+    Telemetry,
+    XyceBackend,
+    read_excel_cached,
+)
+
+xyce = XyceBackend(telemetry=Telemetry())
 
 pd.options.mode.chained_assignment = None  # default='warn'
 
@@ -29,14 +49,7 @@ def check_xyce_version():
     """
     check_xyce_version checks ngspice version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read()
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
+    xyce.check_version()
 
 
 def call_simulator(file_name):
@@ -44,7 +57,7 @@ def call_simulator(file_name):
     Args:
         file_name (str): Netlist file name.
     """
-    os.system(f"Xyce -hspice-ext all {file_name} -l {file_name}.log 2>/dev/null")
+    xyce.simulate(file_name)
 
 
 def ext_measured(
@@ -466,7 +479,7 @@ def main():
             )
             continue
         # From xlsx to csv
-        read_file = pd.read_excel(
+        read_file = read_excel_cached(
             f"../../180MCU_SPICE_DATA/BJT/bjt_{device}_beta_f.nl_out.xlsx"
         )
         read_file.to_csv(f"{dirpath}/{device}.csv", index=False, header=True)
@@ -495,55 +508,62 @@ def main():
             steps,
             num_workers=mp.cpu_count(),
         )
-        merged_all = error_cal(sims_ic, df_ic, device, step, vc[i], Id_sim[0], vb[i])
-        merged_all_ib = error_cal(sims_ib, df_ib, device, step, vc[i], Id_sim[1], vb[i])
-
-        # ============ Results =============
-        for s in Id_sim:
-            if s == Id_sim[1]:
-                merged_all = merged_all_ib
-            for dev in list_devices[i]:
-                min_error_total = float()
-                max_error_total = float()
-                error_total = float()
-                number_of_existance = int()
-
-                # number of rows in the final excel sheet
-                num_rows = merged_all["device"].count()
-
-                for n in range(num_rows):
-                    if dev == merged_all["device"].iloc[n]:
-                        number_of_existance += 1
-                        error_total += merged_all["rms_error"].iloc[n]
-                        if merged_all["rms_error"].iloc[n] > max_error_total:
-                            max_error_total = merged_all["rms_error"].iloc[n]
-                        elif merged_all["rms_error"].iloc[n] < min_error_total:
-                            min_error_total = merged_all["rms_error"].iloc[n]
-
-                mean_error_total = error_total / number_of_existance
-
-                # Making sure that min, max, mean errors are not > 100%
-                if min_error_total > 100:
-                    min_error_total = 100
-
-                if max_error_total > 100:
-                    max_error_total = 100
-
-                if mean_error_total > 100:
-                    mean_error_total = 100
-
-                # logging.infoing min, max, mean errors to the consol
-                logging.info(
-                    f"# Device {dev} {s} min error: {min_error_total:.2f}, max error: {max_error_total:.2f}, mean error {mean_error_total:.2f}"
-                )
 
-                if max_error_total <= PASS_THRESH:
-                    logging.info(f"# Device {dev} {s} has passed regression.")
-                else:
-                    logging.error(
-                        f"# Device {dev} {s} has failed regression. Needs more analysis."
+        # Comparing simulated results with measured data
+        with xyce.telemetry.phase("analysis"):
+            merged_all = error_cal(
+                sims_ic, df_ic, device, step, vc[i], Id_sim[0], vb[i]
+            )
+            merged_all_ib = error_cal(
+                sims_ib, df_ib, device, step, vc[i], Id_sim[1], vb[i]
+            )
+
+            # ============ Results =============
+            for s in Id_sim:
+                if s == Id_sim[1]:
+                    merged_all = merged_all_ib
+                for dev in list_devices[i]:
+                    min_error_total = float()
+                    max_error_total = float()
+                    error_total = float()
+                    number_of_existance = int()
+
+                    # number of rows in the final excel sheet
+                    num_rows = merged_all["device"].count()
+
+                    for n in range(num_rows):
+                        if dev == merged_all["device"].iloc[n]:
+                            number_of_existance += 1
+                            error_total += merged_all["rms_error"].iloc[n]
+                            if merged_all["rms_error"].iloc[n] > max_error_total:
+                                max_error_total = merged_all["rms_error"].iloc[n]
+                            elif merged_all["rms_error"].iloc[n] < min_error_total:
+                                min_error_total = merged_all["rms_error"].iloc[n]
+
+                    mean_error_total = error_total / number_of_existance
+
+                    # Making sure that min, max, mean errors are not > 100%
+                    if min_error_total > 100:
+                        min_error_total = 100
+
+                    if max_error_total > 100:
+                        max_error_total = 100
+
+                    if mean_error_total > 100:
+                        mean_error_total = 100
+
+                    # logging.infoing min, max, mean errors to the consol
+                    logging.info(
+                        f"# Device {dev} {s} min error: {min_error_total:.2f}, max error: {max_error_total:.2f}, mean error {mean_error_total:.2f}"
                     )
 
+                    if max_error_total <= PASS_THRESH:
+                        logging.info(f"# Device {dev} {s} has passed regression.")
+                    else:
+                        logging.error(
+                            f"# Device {dev} {s} has failed regression. Needs more analysis."
+                        )
+
 
 # ================================================================
 # -------------------------- MAIN --------------------------------
@@ -558,6 +578,10 @@ if __name__ == "__main__":
         if arguments["--num_cores"] is None
         else int(arguments["--num_cores"])
     )
+
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
     logging.basicConfig(
         level=logging.DEBUG,
         handlers=[
@@ -567,4 +591,8 @@ if __name__ == "__main__":
         datefmt="%d-%b-%Y %H:%M:%S",
     )
     # Calling main function
-    main()
+    try:
+        main()
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
@@ -13,11 +13,12 @@
 # limitations under the License.
 """
 Usage:
-  models_regression.py [--num_cores=<num>]
+  models_regression.py [--num_cores=<num>] [--mpi_min_size=<num>]
 
   -h, --help             Show help text.
   -v, --version          Show version.
   --num_cores=<num>      Number of cores to be used by simulator
+  --mpi_min_size=<num>   Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
 """
 
 from docopt import docopt
@@ -31,6 +32,25 @@ import multiprocessing as mp
 import logging
 import subprocess
 import glob
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import (  # noqa E402
+    ProcessRunner,
+    Telemetry,
+    XyceBackend,
+    read_excel_cached,
+)
+
+xyce = XyceBackend(telemetry=Telemetry())
 
 PASS_THRESH = 5.0  # threshold value for passing devices
 NO_ROWS_NPN = 54  # no.of combinations extracted from npn sheet
@@ -42,14 +62,7 @@ def check_xyce_version():
     """
     check_xyce_version checks ngspice version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read()
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
+    xyce.check_version()
 
 
 def find_freq(filename):
@@ -88,7 +101,7 @@ def call_simulator(file_name):
     Args:
         file_name (str): Netlist file name.
     """
-    os.system(f"Xyce -hspice-ext all {file_name} -l {file_name}.log 2> /dev/null")
+    xyce.simulate(file_name)
 
 
 def ext_measured(
@@ -109,7 +122,7 @@ def ext_measured(
     """
 
     # Reading excel sheet and creating data frame
-    df = pd.read_excel(cj_file)
+    df = read_excel_cached(cj_file)
 
     # temp_range is threshold for switching between 25, -40, 125
     temp_range = int(no_rows / 3)
@@ -555,70 +568,72 @@ def main():
         # calling run_sims function for simulating devices
         sim_df = run_sims(meas_df, dev_path, workers_count)
 
-        # Merging measured dataframe with the simulated one
-        merged_df = meas_df.merge(sim_df, on=["device", "temp", "cap"], how="left")
-
-        # passing dataframe to the error_calculation function
-        # calling error function for creating statistical csv file
-        error_cal(merged_df, dev_path)
-
-        merged_all = pd.read_csv(f"{dev_path}/final_error_analysis.csv")
-        # number of rows in the final excel sheet
-        num_rows = merged_all["device"].count()
+        # Comparing simulated results with measured data
+        with xyce.telemetry.phase("analysis"):
+            # Merging measured dataframe with the simulated one
+            merged_df = meas_df.merge(sim_df, on=["device", "temp", "cap"], how="left")
 
-        # calculating the error of each device and reporting it
-        for i in range(NO_ROWS_NPN_W):
-            min_error_total = float()
-            max_error_total = float()
-            error_total = float()
-            number_of_existance = int()
+            # passing dataframe to the error_calculation function
+            # calling error function for creating statistical csv file
+            error_cal(merged_df, dev_path)
 
+            merged_all = pd.read_csv(f"{dev_path}/final_error_analysis.csv")
             # number of rows in the final excel sheet
             num_rows = merged_all["device"].count()
 
-        # calculating the error of each device and reporting it
-        for dev in list_dev:
-            min_error_total = float()
-            max_error_total = float()
-            error_total = float()
-            number_of_existance = int()
-
-            # number of rows in the final excel sheet
-            num_rows = merged_all["device"].count()
-
-            for n in range(num_rows):
-                if dev == merged_all["device"][n]:
-                    number_of_existance += 1
-                    error_total += merged_all["rms_error"][n]
-                    if merged_all["rms_error"][n] > max_error_total:
-                        max_error_total = merged_all["rms_error"][n]
-                    elif merged_all["rms_error"][n] < min_error_total:
-                        min_error_total = merged_all["rms_error"][n]
-
-            mean_error_total = error_total / number_of_existance
-
-            # Making sure that min, max, mean errors are not > 100%
-            if min_error_total > 100:
-                min_error_total = 100
-
-            if max_error_total > 100:
-                max_error_total = 100
-
-            if mean_error_total > 100:
-                mean_error_total = 100
-
-            # logging.infoing min, max, mean errors to the consol
-            logging.info(
-                f"# Device {dev} min error: {min_error_total:.2f}, max error: {max_error_total:.2f}, mean error {mean_error_total:.2f}"
-            )
-
-            if max_error_total <= PASS_THRESH:
-                logging.info(f"# Device {dev} has passed regression.")
-            else:
-                logging.error(
-                    f"# Device {dev} has failed regression. Needs more analysis."
+            # calculating the error of each device and reporting it
+            for i in range(NO_ROWS_NPN_W):
+                min_error_total = float()
+                max_error_total = float()
+                error_total = float()
+                number_of_existance = int()
+
+                # number of rows in the final excel sheet
+                num_rows = merged_all["device"].count()
+
+            # calculating the error of each device and reporting it
+            for dev in list_dev:
+                min_error_total = float()
+                max_error_total = float()
+                error_total = float()
+                number_of_existance = int()
+
+                # number of rows in the final excel sheet
+                num_rows = merged_all["device"].count()
+
+                for n in range(num_rows):
+                    if dev == merged_all["device"][n]:
+                        number_of_existance += 1
+                        error_total += merged_all["rms_error"][n]
+                        if merged_all["rms_error"][n] > max_error_total:
+                            max_error_total = merged_all["rms_error"][n]
+                        elif merged_all["rms_error"][n] < min_error_total:
+                            min_error_total = merged_all["rms_error"][n]
+
+                mean_error_total = error_total / number_of_existance
+
+                # Making sure that min, max, mean errors are not > 100%
+                if min_error_total > 100:
+                    min_error_total = 100
+
+                if max_error_total > 100:
+                    max_error_total = 100
+
+                if mean_error_total > 100:
+                    mean_error_total = 100
+
+                # logging.infoing min, max, mean errors to the consol
+                logging.info(
+                    f"# Device {dev} min error: {min_error_total:.2f}, max error: {max_error_total:.2f}, mean error {mean_error_total:.2f}"
                 )
 
+                if max_error_total <= PASS_THRESH:
+                    logging.info(f"# Device {dev} has passed regression.")
+                else:
+                    logging.error(
+                        f"# Device {dev} has failed regression. Needs more analysis."
+                    )
+
 
 # # ================================================================
 # -------------------------- MAIN --------------------------------
@@ -632,6 +647,10 @@ if __name__ == "__main__":
         if arguments["--num_cores"] is None
         else int(arguments["--num_cores"])
     )
+
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
     logging.basicConfig(
         level=logging.DEBUG,
         handlers=[
@@ -642,4 +661,8 @@ if __name__ == "__main__":
     )
 
     # Calling main function
-    main()
+    try:
+        main()
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
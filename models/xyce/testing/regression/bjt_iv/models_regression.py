@@ -13,11 +13,12 @@
 # limitations under the License.
 """
 Usage:
-  models_regression.py [--num_cores=<num>]
+  models_regression.py [--num_cores=<num>] [--mpi_min_size=<num>]
 
   -h, --help                     Show help text.
   -v, --version                  Show version.
   --num_cores=<num>              Number of cores to be used by simulator
+  --mpi_min_size=<num>           Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
 """
 
 from docopt import docopt
@@ -31,6 +32,20 @@ import glob
 import os
 import logging
 import re
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import ProcessRunner, Telemetry, XyceBackend  # noqa E402
+
+xyce = XyceBackend(telemetry=Telemetry())
 
 # CONSTANT VALUES
 PASS_THRESH = 5.0
@@ -43,14 +58,7 @@ def check_xyce_version():
     """
     check_xyce_version checks Xyce version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read()
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
+    xyce.check_version()
 
 
 def simulate_device(netlist_path: str):
@@ -61,9 +69,7 @@ def simulate_device(netlist_path: str):
     Returns:
         int: Return code of the simulation. 0 if success.  Non-zero if failed.
     """
-    return os.system(
-        f"Xyce -hspice-ext all {netlist_path} -l {netlist_path}.log > {netlist_path}.log 2>&1"
-    )
+    return xyce.simulate(netlist_path)
 
 
 def run_sim(dirpath: str, device: str, corner: float, temp: float, sweep: str) -> dict:
@@ -282,64 +288,69 @@ def main():
 
         # Simulating all data points
         sim_df = run_sims(df_sweeps, dev_path)
-        sim_df.drop_duplicates(inplace=True)
 
-        logging.info(f"# Device {dev} number of simulated datapoints: {len(sim_df)} ")
+        # Comparing simulated results with measured data
+        with xyce.telemetry.phase("analysis"):
+            sim_df.drop_duplicates(inplace=True)
 
-        # Merging meas and sim dataframe in one
-        full_df = meas_df.merge(
-            sim_df,
-            on=["device_name", "corner", "temp", "ibp", "vcp"],
-            how="left",
-            suffixes=("_meas", "_sim"),
-        )
+            logging.info(
+                f"# Device {dev} number of simulated datapoints: {len(sim_df)} "
+            )
 
-        # Error calculation and report
-        ## Relative error calculation for BJT-iv
-        full_df["ic_err"] = np.abs(
-            (full_df["ic_meas"] - full_df["ic_sim"]) * 100.0 / (full_df["ic_meas"])
-        )
-        full_df.to_csv(f"{dev_path}/{dev}_full_merged_data.csv", index=False)
-
-        # Calculate Q [quantile] to verify matching between measured and simulated data
-        ## Refer to https://builtin.com/data-science/boxplot for more details.
-        q_target = full_df["ic_err"].quantile(QUANTILE_RATIO)
-        logging.info(f"Quantile target for {dev} device is: {q_target} %")
-
-        bad_err_full_df_loc = full_df[full_df["ic_err"] > PASS_THRESH]
-        bad_err_full_df = bad_err_full_df_loc[
-            (bad_err_full_df_loc["ic_sim"] >= MAX_VAL_DETECT)
-            | (bad_err_full_df_loc["ic_err"] >= MAX_VAL_DETECT)
-        ]
-        bad_err_full_df.to_csv(f"{dev_path}/{dev}_ic_bad_err.csv", index=False)
-        logging.info(
-            f"Bad relative errors between measured and simulated data at {dev}_ic_bad_err.csv"
-        )
+            # Merging meas and sim dataframe in one
+            full_df = meas_df.merge(
+                sim_df,
+                on=["device_name", "corner", "temp", "ibp", "vcp"],
+                how="left",
+                suffixes=("_meas", "_sim"),
+            )
 
-        # calculating the relative error of each device and reporting it
-        min_error_total = float(full_df["ic_err"].min())
-        max_error_total = float(full_df["ic_err"].max())
-        mean_error_total = float(full_df["ic_err"].mean())
+            # Error calculation and report
+            ## Relative error calculation for BJT-iv
+            full_df["ic_err"] = np.abs(
+                (full_df["ic_meas"] - full_df["ic_sim"]) * 100.0 / (full_df["ic_meas"])
+            )
+            full_df.to_csv(f"{dev_path}/{dev}_full_merged_data.csv", index=False)
+
+            # Calculate Q [quantile] to verify matching between measured and simulated data
+            ## Refer to https://builtin.com/data-science/boxplot for more details.
+            q_target = full_df["ic_err"].quantile(QUANTILE_RATIO)
+            logging.info(f"Quantile target for {dev} device is: {q_target} %")
+
+            bad_err_full_df_loc = full_df[full_df["ic_err"] > PASS_THRESH]
+            bad_err_full_df = bad_err_full_df_loc[
+                (bad_err_full_df_loc["ic_sim"] >= MAX_VAL_DETECT)
+                | (bad_err_full_df_loc["ic_err"] >= MAX_VAL_DETECT)
+            ]
+            bad_err_full_df.to_csv(f"{dev_path}/{dev}_ic_bad_err.csv", index=False)
+            logging.info(
+                f"Bad relative errors between measured and simulated data at {dev}_ic_bad_err.csv"
+            )
 
-        # Cliping relative error at 100%
-        min_error_total = 100 if min_error_total > 100 else min_error_total
-        max_error_total = 100 if max_error_total > 100 else max_error_total
-        mean_error_total = 100 if mean_error_total > 100 else mean_error_total
+            # calculating the relative error of each device and reporting it
+            min_error_total = float(full_df["ic_err"].min())
+            max_error_total = float(full_df["ic_err"].max())
+            mean_error_total = float(full_df["ic_err"].mean())
 
-        # logging relative error
-        logging.info(
-            f"# Device {dev}-iv min error: {min_error_total:.2f} %, max error: {max_error_total:.2f} %, mean error {mean_error_total:.2f} %"
-        )
+            # Cliping relative error at 100%
+            min_error_total = 100 if min_error_total > 100 else min_error_total
+            max_error_total = 100 if max_error_total > 100 else max_error_total
+            mean_error_total = 100 if mean_error_total > 100 else mean_error_total
 
-        # Verify regression results
-        if q_target <= PASS_THRESH:
-            logging.info(f"# Device {dev}-iv for simulation has passed regression.")
-        else:
-            logging.error(
-                f"# Device {dev}-iv simulation has failed regression. Needs more analysis."
+            # logging relative error
+            logging.info(
+                f"# Device {dev}-iv min error: {min_error_total:.2f} %, max error: {max_error_total:.2f} %, mean error {mean_error_total:.2f} %"
             )
-            logging.error(f"#Failed regression for {dev}-iv analysis.")
-            # exit(1)
+
+            # Verify regression results
+            if q_target <= PASS_THRESH:
+                logging.info(f"# Device {dev}-iv for simulation has passed regression.")
+            else:
+                logging.error(
+                    f"# Device {dev}-iv simulation has failed regression. Needs more analysis."
+                )
+                logging.error(f"#Failed regression for {dev}-iv analysis.")
+                # exit(1)
 
 
 # ================================================================
@@ -357,6 +368,10 @@ if __name__ == "__main__":
         else int(arguments["--num_cores"])
     )
 
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
+
     logging.basicConfig(
         level=logging.DEBUG,
         handlers=[
@@ -367,4 +382,8 @@ if __name__ == "__main__":
     )
 
     # Calling main function
-    main()
+    try:
+        main()
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
@@ -13,11 +13,12 @@
 # limitations under the License.
 """
 Usage:
-  models_regression.py [--num_cores=<num>]
+  models_regression.py [--num_cores=<num>] [--mpi_min_size=<num>]
 
   -h, --help                     Show help text.
   -v, --version                  Show version.
   --num_cores=<num>              Number of cores to be used by simulator
+  --mpi_min_size=<num>           Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
 """
 
 from docopt import docopt
@@ -30,6 +31,20 @@ import shutil
 import os
 import logging
 import re
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import ProcessRunner, Telemetry, XyceBackend  # noqa E402
+
+xyce = XyceBackend(telemetry=Telemetry())
 
 # CONSTANT VALUES
 PASS_THRESH = 5.0
@@ -41,14 +56,7 @@ def check_xyce_version():
     """
     check_xyce_version checks Xyce version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read()
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
+    xyce.check_version()
 
 
 def find_mimcap(log_file):
@@ -86,10 +94,7 @@ def simulate_device(netlist_path: str):
     Returns:
         int: Return code of the simulation. 0 if success.  Non-zero if failed.
     """
-    return check_call(
-        f"Xyce {netlist_path} -hspice-ext all -l {netlist_path}.log  > {netlist_path}.log 2>&1",
-        shell=True,
-    )
+    return xyce.simulate(netlist_path, check=True)
 
 
 def run_sim(
@@ -302,66 +307,69 @@ def main():
 
         # Simulating all data points to be compared with measured ones
         sim_df = run_sims(meas_df, dev_path)
-        sim_df.drop_duplicates(inplace=True)
 
-        logging.info(
-            f"# Device cap_mim {dev} number of simulated datapoints for cv : {len(sim_df)} "
-        )
+        # Comparing simulated results with measured data
+        with xyce.telemetry.phase("analysis"):
+            sim_df.drop_duplicates(inplace=True)
 
-        # Merging meas and sim dataframe in one
-        full_df = meas_df.merge(
-            sim_df,
-            on=["device_name", "W (um)", "L (um)", "corner", "temp"],
-            how="left",
-            suffixes=("_meas", "_sim"),
-        )
+            logging.info(
+                f"# Device cap_mim {dev} number of simulated datapoints for cv : {len(sim_df)} "
+            )
 
-        # Error calculation and report
-        ## Relative error calculation for fets
-        full_df["Cj_err"] = np.abs(
-            (full_df["Cj_meas"] - full_df["Cj_sim"]) * 100.0 / (full_df["Cj_meas"])
-        )
-        full_df.to_csv(f"{dev_path}/{dev}_full_merged_data.csv", index=False)
-
-        # Calculate Q [quantile] to verify matching between measured and simulated data
-        ## Refer to https://builtin.com/data-science/boxplot for more details.
-        q_target = full_df["Cj_err"].quantile(QUANTILE_RATIO)
-        logging.info(f"Quantile target for {dev} device is: {q_target}")
-
-        bad_err_full_df_loc = full_df[full_df["Cj_err"] > PASS_THRESH]
-        bad_err_full_df = bad_err_full_df_loc[
-            (bad_err_full_df_loc["Cj_sim"] >= MIN_VAL_DETECT)
-            | (bad_err_full_df_loc["Cj_meas"] >= MIN_VAL_DETECT)
-        ]
-        bad_err_full_df.to_csv(f"{dev_path}/{dev}_bad_err_cv.csv", index=False)
-        logging.info(
-            f"Bad relative errors between measured and simulated data at {dev}_bad_err_cv.csv"
-        )
+            # Merging meas and sim dataframe in one
+            full_df = meas_df.merge(
+                sim_df,
+                on=["device_name", "W (um)", "L (um)", "corner", "temp"],
+                how="left",
+                suffixes=("_meas", "_sim"),
+            )
 
-        # calculating the relative error of each device and reporting it
-        min_error_total = float(full_df["Cj_err"].min())
-        max_error_total = float(full_df["Cj_err"].max())
-        mean_error_total = float(full_df["Cj_err"].mean())
+            # Error calculation and report
+            ## Relative error calculation for fets
+            full_df["Cj_err"] = np.abs(
+                (full_df["Cj_meas"] - full_df["Cj_sim"]) * 100.0 / (full_df["Cj_meas"])
+            )
+            full_df.to_csv(f"{dev_path}/{dev}_full_merged_data.csv", index=False)
+
+            # Calculate Q [quantile] to verify matching between measured and simulated data
+            ## Refer to https://builtin.com/data-science/boxplot for more details.
+            q_target = full_df["Cj_err"].quantile(QUANTILE_RATIO)
+            logging.info(f"Quantile target for {dev} device is: {q_target}")
+
+            bad_err_full_df_loc = full_df[full_df["Cj_err"] > PASS_THRESH]
+            bad_err_full_df = bad_err_full_df_loc[
+                (bad_err_full_df_loc["Cj_sim"] >= MIN_VAL_DETECT)
+                | (bad_err_full_df_loc["Cj_meas"] >= MIN_VAL_DETECT)
+            ]
+            bad_err_full_df.to_csv(f"{dev_path}/{dev}_bad_err_cv.csv", index=False)
+            logging.info(
+                f"Bad relative errors between measured and simulated data at {dev}_bad_err_cv.csv"
+            )
 
-        # Cliping relative error at 100%
-        min_error_total = 100 if min_error_total > 100 else min_error_total
-        max_error_total = 100 if max_error_total > 100 else max_error_total
-        mean_error_total = 100 if mean_error_total > 100 else mean_error_total
+            # calculating the relative error of each device and reporting it
+            min_error_total = float(full_df["Cj_err"].min())
+            max_error_total = float(full_df["Cj_err"].max())
+            mean_error_total = float(full_df["Cj_err"].mean())
 
-        # logging relative error
-        logging.info(
-            f"# Device {dev}-cv min error: {min_error_total:.2f} %, max error: {max_error_total:.2f} %, mean error {mean_error_total:.2f} %"
-        )
+            # Cliping relative error at 100%
+            min_error_total = 100 if min_error_total > 100 else min_error_total
+            max_error_total = 100 if max_error_total > 100 else max_error_total
+            mean_error_total = 100 if mean_error_total > 100 else mean_error_total
 
-        # Verify regression results
-        if q_target <= PASS_THRESH:
-            logging.info(f"# Device {dev} for CV simulation has passed regression.")
-        else:
-            logging.error(
-                f"# Device {dev} CV simulation has failed regression. Needs more analysis."
+            # logging relative error
+            logging.info(
+                f"# Device {dev}-cv min error: {min_error_total:.2f} %, max error: {max_error_total:.2f} %, mean error {mean_error_total:.2f} %"
             )
-            logging.error(f"#Failed regression for {dev}-CV analysis.")
-            exit(1)
+
+            # Verify regression results
+            if q_target <= PASS_THRESH:
+                logging.info(f"# Device {dev} for CV simulation has passed regression.")
+            else:
+                logging.error(
+                    f"# Device {dev} CV simulation has failed regression. Needs more analysis."
+                )
+                logging.error(f"#Failed regression for {dev}-CV analysis.")
+                exit(1)
 
 
 # # ================================================================
@@ -379,6 +387,10 @@ if __name__ == "__main__":
         else int(arguments["--num_cores"])
     )
 
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
+
     logging.basicConfig(
         level=logging.DEBUG,
         handlers=[
@@ -389,4 +401,8 @@ if __name__ == "__main__":
     )
 
     # Calling main function
-    main()
+    try:
+        main()
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
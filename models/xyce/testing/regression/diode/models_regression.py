@@ -13,11 +13,12 @@
 # limitations under the License.
 """
 Usage:
-  model_reg.py [--num_cores=<num>]
+  model_reg.py [--num_cores=<num>] [--mpi_min_size=<num>]
 
   -h, --help             Show help text.
   -v, --version          Show version.
   --num_cores=<num>      Number of cores to be used by simulator
+  --mpi_min_size=<num>   Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
 """
 
 from docopt import docopt
@@ -30,6 +31,25 @@ import shutil
 import multiprocessing as mp
 import logging
 import glob
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import (  # noqa E402
+    ProcessRunner,
+    Telemetry,
+    XyceBackend,
+    read_excel_cached,
+)
+
+xyce = XyceBackend(telemetry=Telemetry())
 
 
 DEFAULT_TEMP = 25.0
@@ -41,14 +61,7 @@ def check_xyce_version():
     """
     check_xyce_version checks ngspice version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read()
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
+    xyce.check_version()
 
 
 def find_diode(filepath):
@@ -63,7 +76,7 @@ def call_simulator(file_name):
     Args:
         file_name (str): Netlist file name.
     """
-    os.system(f"Xyce -hspice-ext all {file_name} -l {file_name}.log 2> /dev/null")
+    xyce.simulate(file_name)
 
 
 def ext_iv_measured(
@@ -80,7 +93,7 @@ def ext_iv_measured(
         df: output dataframe
     """
     # Read Data
-    df = pd.read_excel(dev_data_path)
+    df = read_excel_cached(dev_data_path)
 
     dim_df = df[["L (um)", "W (um)"]].copy()
     dim_df.rename(
@@ -372,118 +385,128 @@ def main():
             )
 
             sim_df = run_sims(c, meas_df, dev_path, 3)
-            sim_len = len(pd.read_csv(glob.glob(f"{dev_path}/simulated_{c}/*.csv")[1]))
-            logging.info(
-                f"# Device {dev} number of {c}_simulated datapoints : {len(sim_df) * sim_len}"
-            )
-
-            # compare section
-
-            merged_df = meas_df.merge(
-                sim_df, on=["device", "corner", "length", "width", "temp"], how="left"
-            )
-            merged_dfs = []
-            # create a new dataframe for rms error
-            rms_df = pd.DataFrame(
-                columns=["device", "corner", "length", "width", "temp", "rms_error"]
-            )
 
-            for i in range(len(merged_df)):
-                measured_data = pd.read_csv(merged_df["diode_measured"][i])
-                simulated_data = pd.read_csv(merged_df["diode_sim"][i])
-                simulated_data
-                result_data = simulated_data.merge(measured_data, how="left")
-                result_data["corner"] = (
-                    merged_df["diode_measured"][i]
-                    .split("/")[-1]
-                    .split("_")[-1]
-                    .split(".")[0]
+            # Comparing simulated results with measured data
+            with xyce.telemetry.phase("analysis"):
+                sim_len = len(
+                    pd.read_csv(glob.glob(f"{dev_path}/simulated_{c}/*.csv")[1])
                 )
-                result_data["device"] = merged_df["diode_measured"][i].split("/")[1]
-                result_data["length"] = (
-                    merged_df["diode_measured"][i]
-                    .split("/")[-1]
-                    .split("_")[1]
-                    .split("A")[1]
+                logging.info(
+                    f"# Device {dev} number of {c}_simulated datapoints : {len(sim_df) * sim_len}"
                 )
-                result_data["width"] = (
-                    merged_df["diode_measured"][i]
-                    .split("/")[-1]
-                    .split("_")[2]
-                    .split("P")[1]
+
+                # compare section
+
+                merged_df = meas_df.merge(
+                    sim_df,
+                    on=["device", "corner", "length", "width", "temp"],
+                    how="left",
                 )
-                result_data["temp"] = (
-                    merged_df["diode_measured"][i]
-                    .split("/")[-1]
-                    .split("_")[3]
-                    .split("t")[1]
+                merged_dfs = []
+                # create a new dataframe for rms error
+                rms_df = pd.DataFrame(
+                    columns=["device", "corner", "length", "width", "temp", "rms_error"]
                 )
 
-                result_data["error"] = (
-                    np.abs(
-                        result_data["diode_simulated"] - result_data["diode_measured"]
+                for i in range(len(merged_df)):
+                    measured_data = pd.read_csv(merged_df["diode_measured"][i])
+                    simulated_data = pd.read_csv(merged_df["diode_sim"][i])
+                    simulated_data
+                    result_data = simulated_data.merge(measured_data, how="left")
+                    result_data["corner"] = (
+                        merged_df["diode_measured"][i]
+                        .split("/")[-1]
+                        .split("_")[-1]
+                        .split(".")[0]
+                    )
+                    result_data["device"] = merged_df["diode_measured"][i].split("/")[1]
+                    result_data["length"] = (
+                        merged_df["diode_measured"][i]
+                        .split("/")[-1]
+                        .split("_")[1]
+                        .split("A")[1]
+                    )
+                    result_data["width"] = (
+                        merged_df["diode_measured"][i]
+                        .split("/")[-1]
+                        .split("_")[2]
+                        .split("P")[1]
+                    )
+                    result_data["temp"] = (
+                        merged_df["diode_measured"][i]
+                        .split("/")[-1]
+                        .split("_")[3]
+                        .split("t")[1]
                     )
-                    * 100.0
-                    / result_data["diode_measured"]
-                )
-                # get rms error
-                result_data["rms_error"] = np.sqrt(np.mean(result_data["error"] ** 2))
-                # fill rms dataframe
-                rms_df.loc[i] = [
-                    result_data["device"][0],
-                    result_data["corner"][0],
-                    result_data["length"][0],
-                    result_data["width"][0],
-                    result_data["temp"][0],
-                    result_data["rms_error"][0],
-                ]
-                result_data = result_data[
-                    [
-                        "device",
-                        "length",
-                        "width",
-                        "temp",
-                        "corner",
-                        "measured_volt",
-                        "diode_measured",
-                        "diode_simulated",
-                        "error",
-                    ]
-                ]
 
-                merged_dfs.append(result_data)
+                    result_data["error"] = (
+                        np.abs(
+                            result_data["diode_simulated"]
+                            - result_data["diode_measured"]
+                        )
+                        * 100.0
+                        / result_data["diode_measured"]
+                    )
+                    # get rms error
+                    result_data["rms_error"] = np.sqrt(
+                        np.mean(result_data["error"] ** 2)
+                    )
+                    # fill rms dataframe
+                    rms_df.loc[i] = [
+                        result_data["device"][0],
+                        result_data["corner"][0],
+                        result_data["length"][0],
+                        result_data["width"][0],
+                        result_data["temp"][0],
+                        result_data["rms_error"][0],
+                    ]
+                    result_data = result_data[
+                        [
+                            "device",
+                            "length",
+                            "width",
+                            "temp",
+                            "corner",
+                            "measured_volt",
+                            "diode_measured",
+                            "diode_simulated",
+                            "error",
+                        ]
+                    ]
 
-            merged_out = pd.concat(merged_dfs)
+                    merged_dfs.append(result_data)
 
-            merged_out.to_csv(f"{dev_path}/error_analysis_{c}.csv", index=False)
-            rms_df.to_csv(f"{dev_path}/final_error_analysis_{c}.csv", index=False)
+                merged_out = pd.concat(merged_dfs)
 
-            if rms_df["rms_error"].min() > 100:
-                min_error = 100
-            else:
-                min_error = rms_df["rms_error"].min()
+                merged_out.to_csv(f"{dev_path}/error_analysis_{c}.csv", index=False)
+                rms_df.to_csv(f"{dev_path}/final_error_analysis_{c}.csv", index=False)
 
-            if rms_df["rms_error"].max() > 100:
-                max_error = 100
-            else:
-                max_error = rms_df["rms_error"].max()
+                if rms_df["rms_error"].min() > 100:
+                    min_error = 100
+                else:
+                    min_error = rms_df["rms_error"].min()
 
-            if rms_df["rms_error"].mean() > 100:
-                mean_error = 100
-            else:
-                mean_error = rms_df["rms_error"].mean()
+                if rms_df["rms_error"].max() > 100:
+                    max_error = 100
+                else:
+                    max_error = rms_df["rms_error"].max()
 
-            logging.info(
-                f"# Device {dev} min error: {min_error:.2f}, max error: {max_error:.2f}, mean error {mean_error:.2f}"
-            )
+                if rms_df["rms_error"].mean() > 100:
+                    mean_error = 100
+                else:
+                    mean_error = rms_df["rms_error"].mean()
 
-            if rms_df["rms_error"].max() <= PASS_THRESH:
-                logging.info(f"# Device {dev} has passed regression.")
-            else:
-                logging.error(
-                    f"# Device {dev} has failed regression. Needs more analysis."
+                logging.info(
+                    f"# Device {dev} min error: {min_error:.2f}, max error: {max_error:.2f}, mean error {mean_error:.2f}"
                 )
 
+                if rms_df["rms_error"].max() <= PASS_THRESH:
+                    logging.info(f"# Device {dev} has passed regression.")
+                else:
+                    logging.error(
+                        f"# Device {dev} has failed regression. Needs more analysis."
+                    )
+
 
 # # ================================================================
 # -------------------------- MAIN --------------------------------
@@ -498,6 +521,10 @@ if __name__ == "__main__":
         if arguments["--num_cores"] is None
         else int(arguments["--num_cores"])
     )
+
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
     logging.basicConfig(
         level=logging.DEBUG,
         handlers=[
@@ -508,4 +535,8 @@ if __name__ == "__main__":
     )
 
     # Calling main function
-    main()
+    try:
+        main()
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
@@ -13,11 +13,12 @@
 # limitations under the License.
 """
 Usage:
-  models_regression.py [--num_cores=<num>]
+  models_regression.py [--num_cores=<num>] [--mpi_min_size=<num>]
 
   -h, --help             Show help text.
   -v, --version          Show version.
   --num_cores=<num>      Number of cores to be used by simulator
+  --mpi_min_size=<num>   Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
 """
 
 from docopt import docopt
@@ -30,6 +31,25 @@ import shutil
 import multiprocessing as mp
 import glob
 import logging
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import (  # noqa E402
+    ProcessRunner,
+    Telemetry,
+    XyceBackend,
+    read_excel_cached,
+)
+
+xyce = XyceBackend(hspice_ext=False, telemetry=Telemetry())
 
 pd.options.mode.chained_assignment = None  # default='warn'
 # constants
@@ -74,14 +94,7 @@ def check_xyce_version():
     """
     check_xyce_version checks ngspice version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read()
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
+    xyce.check_version()
 
 
 def ext_measured(dev_data_path: str, device: str) -> pd.DataFrame:
@@ -96,11 +109,8 @@ def ext_measured(dev_data_path: str, device: str) -> pd.DataFrame:
 
     """
 
-    # Read Data
-    read_file = pd.read_excel(dev_data_path)
-    read_file.to_csv(f"mos_cv_regr/{device}/{device}.csv", index=False, header=True)
-
-    df = pd.read_csv(f"mos_cv_regr/{device}/{device}.csv")
+    # Read Data, as read back from a csv copy of the sheet
+    df = read_excel_cached(dev_data_path, as_csv=True)
     loops = int(0.5 * df["L (um)"].count())
     all_dfs1 = []
     all_dfs2 = []
@@ -331,8 +341,7 @@ def call_simulator(file_name):
     Args:
         file_name (str): Netlist file name.
     """
-    log_file = file_name.replace("-hspice-ext all ", "")
-    os.system(f"Xyce {file_name} -l {log_file}.log 2> /dev/null")
+    xyce.simulate(file_name)
 
 
 def run_sim(dirpath: str, device: str, width: float, length: float, nf: float) -> dict:
@@ -435,9 +444,32 @@ def run_sim(dirpath: str, device: str, width: float, length: float, nf: float) -
     return info
 
 
+def sim_long_table(sdf: pd.DataFrame, cap: str, file_name: str) -> pd.DataFrame:
+    """Reshapes the simulated data of a geometry into a long table
+
+    Args:
+        sdf(pd.DataFrame): simulated data, one column per bias step
+        cap(str): simulated capacitance, c, d or s
+        file_name(str): name of the simulated data file of the geometry
+
+    Returns:
+        sim_df(pd.DataFrame): one row per voltage and bias step of the geometry
+    """
+    prefix = "vb" if cap == "c" else "vgs"
+    steps = [col for col in sdf.columns if str(col).startswith(prefix)]
+
+    sim_df = sdf[steps].rename_axis("V").reset_index()
+    sim_df.insert(0, "row", range(len(sim_df)))
+    sim_df = sim_df.melt(id_vars=["row", "V"], var_name="bias", value_name="simulated")
+    sim_df["bias"] = sim_df["bias"].str[len(prefix) :].astype(int)
+    sim_df["cap"] = cap
+    sim_df["file"] = file_name
+    return sim_df
+
+
 def run_sims(
     df: pd.DataFrame, dirpath: str, device: str, num_workers=mp.cpu_count()
-) -> pd.DataFrame:
+) -> tuple:
     """passing netlists to run_sim function
         and storing the results csv files into dataframes
 
@@ -449,9 +481,11 @@ def run_sims(
         device(str): name of the device
     Returns:
         df(pd.DataFrame): dataframe contains simulated results
+        sim_df(pd.DataFrame): long table of simulated data of all geometries
     """
 
     results = []
+    sim_tables = []
     df["nf"] = 1
     df["nf"][0] = 20
     with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
@@ -567,14 +601,52 @@ def run_sims(
                 # reverse the rows
                 sdf = sdf.iloc[::-1]
             sdf.to_csv(sf[i], index=True, header=True, sep=",")
+            sim_tables.append(sim_long_table(sdf, cap, os.path.basename(sf[i])))
 
         df = pd.DataFrame(results)
-    return df
+
+    sim_df = pd.concat(sim_tables, ignore_index=True) if sim_tables else None
+    return df, sim_df
+
+
+def meas_long_table(
+    meas_df: pd.DataFrame, cap: str, steps: list, geometries: list
+) -> pd.DataFrame:
+    """Reshapes the measured data of all geometries into a long table
+
+    Args:
+        meas_df(pd.DataFrame): measured data from ext_measured, columns of each
+          geometry and bias step side by side
+        cap(str): measured capacitance, c, d or s
+        steps(list): bias steps of the capacitance
+        geometries(list): indices of the geometries in the measured data
+
+    Returns:
+        meas_df(pd.DataFrame): one row per data point, geometry and bias step
+    """
+    name = "measured_vbs" if cap == "c" else "measured_vgs"
+    columns = {
+        f"{name}{i}={step}": (i, k + 1)
+        for i in geometries
+        for k, step in enumerate(steps)
+    }
+
+    meas_df = (
+        meas_df[list(columns)]
+        .rename_axis("row")
+        .reset_index()
+        .melt(id_vars="row", var_name="column", value_name="measured")
+    )
+    meas_df["i"] = meas_df["column"].map(lambda col: columns[col][0])
+    meas_df["bias"] = meas_df["column"].map(lambda col: columns[col][1])
+    meas_df["cap"] = cap
+    return meas_df.drop(columns="column")
 
 
 def error_cal(
     df: pd.DataFrame,
     sim_df: pd.DataFrame,
+    sim_long: pd.DataFrame,
     meas_df1: pd.DataFrame,
     meas_df2: pd.DataFrame,
     meas_df3: pd.DataFrame,
@@ -583,10 +655,15 @@ def error_cal(
 ) -> None:
     """error function calculates the error between measured, simulated data
 
+    Measured and simulated data of all geometries are reshaped once into a long
+    table keyed by geometry, capacitance, bias step and data point, errors and
+    rms errors are computed over it in one pass.
+
     Args:
         df(pd.DataFrame): Dataframe contains devices and csv files
           which represent measured, simulated data
         sim_df(pd.DataFrame): Dataframe contains devices and csv files simulated
+        sim_long(pd.DataFrame): Long table of simulated data from run_sims
         meas_df(pd.DataFrame): Dataframe contains devices and csv files measured
         dev_path(str): The path in which we write data
         id_rds(str): select id or rds
@@ -611,195 +688,91 @@ def error_cal(
         mos1 = MOS1
     caps = ["c", "s", "d"]
 
-    # create a new dataframe for rms error
-    rms_df = pd.DataFrame(columns=["temp", "W (um)", "L (um)", "rms_error"])
-    for cap in caps:
-        merged_dfs = list()
-        if cap == "c":
-            meas_df = meas_df1
-        elif cap == "s":
-            meas_df = meas_df2
-        else:
-            meas_df = meas_df3
-
-        for i in range(len(sim_df)):
-            length = df["L (um)"].iloc[int(i)]
-            w = df["W (um)"].iloc[int(i)]
-            s = f"simulated_W{w}_L{length}.csv"
-            sim_path = f"mos_cv_regr/{device}/{device}_netlists_Cg{cap}/{s}"
-            if w == "200":
-                continue
-            simulated_data = pd.read_csv(sim_path)
-
-            if cap == "c":
-                if device in [
-                    "nfet_03v3",
-                    "pfet_03v3",
-                    "nfet_03v3_dss",
-                    "pfet_03v3_dss",
-                ]:
-                    measured_data = meas_df[
-                        [
-                            f"measured_vbs{i}={mos[0]}",
-                            f"measured_vbs{i}={mos[1]}",
-                            f"measured_vbs{i}={mos[2]}",
-                            f"measured_vbs{i}={mos[3]}",
-                            f"measured_vbs{i}={mos[4]}",
-                        ]
-                    ].copy()
-                    measured_data.rename(
-                        columns={
-                            f"measured_vbs{i}={mos[0]}": "measured_v1",
-                            f"measured_vbs{i}={mos[1]}": "measured_v2",
-                            f"measured_vbs{i}={mos[2]}": "measured_v3",
-                            f"measured_vbs{i}={mos[3]}": "measured_v4",
-                            f"measured_vbs{i}={mos[4]}": "measured_v5",
-                        },
-                        inplace=True,
-                    )
-                else:
-
-                    measured_data = meas_df[
-                        [
-                            f"measured_vbs{i}={mos[0]}",
-                            f"measured_vbs{i}={mos[1]}",
-                            f"measured_vbs{i}={mos[2]}",
-                            f"measured_vbs{i}={mos[3]}",
-                        ]
-                    ].copy()
-                    measured_data.rename(
-                        columns={
-                            f"measured_vbs{i}={mos[0]}": "measured_v1",
-                            f"measured_vbs{i}={mos[1]}": "measured_v2",
-                            f"measured_vbs{i}={mos[2]}": "measured_v3",
-                            f"measured_vbs{i}={mos[3]}": "measured_v4",
-                        },
-                        inplace=True,
-                    )
-                measured_data["V(G_TN)"] = simulated_data["V(G_TN)"]
-                result_data = simulated_data.merge(measured_data, how="left")
-
-            else:
-                measured_data = meas_df[
-                    [
-                        f"measured_vgs{i}={mos1[0]}",
-                        f"measured_vgs{i}={mos1[1]}",
-                        f"measured_vgs{i}={mos1[2]}",
-                        f"measured_vgs{i}={mos1[3]}",
-                    ]
-                ].copy()
-                measured_data.rename(
-                    columns={
-                        f"measured_vgs{i}={mos1[0]}": "measured_v1",
-                        f"measured_vgs{i}={mos1[1]}": "measured_v2",
-                        f"measured_vgs{i}={mos1[2]}": "measured_v3",
-                        f"measured_vgs{i}={mos1[3]}": "measured_v4",
-                    },
-                    inplace=True,
-                )
+    # geometries of the simulated data, index i is the one of measured columns
+    geometries = df[["W (um)", "L (um)"]].iloc[: len(sim_df)].copy()
+    geometries["i"] = range(len(geometries))
+    geometries = geometries[geometries["W (um)"] != "200"]
+    geometries["file"] = [
+        f"simulated_W{w}_L{length}.csv"
+        for w, length in zip(geometries["W (um)"], geometries["L (um)"])
+    ]
 
-                measured_data["V(D_TN)"] = simulated_data["V(D_TN)"]
-                result_data = simulated_data.merge(measured_data, how="left")
+    meas_long = pd.concat(
+        [
+            meas_long_table(meas_df, cap, mos if cap == "c" else mos1, geometries["i"])
+            for cap, meas_df in zip(caps, [meas_df1, meas_df2, meas_df3])
+        ],
+        ignore_index=True,
+    )
 
-            if cap == "c":
+    # Simulated data point at row p is compared to the measured one at row p
+    keys = ["cap", "i", "row"]
+    result_data = geometries.merge(sim_long, on="file").merge(
+        meas_long, on=keys + ["bias"], how="left"
+    )
+    result_data["step_error"] = (
+        np.abs(result_data["measured"] - result_data["simulated"])
+        * 100.0
+        / result_data["measured"]
+    )
 
-                result_data["step1_error"] = (
-                    np.abs(result_data["measured_v1"] - result_data["vb1"])
-                    * 100.0
-                    / (result_data["measured_v1"])
-                )
-                result_data["step2_error"] = (
-                    np.abs(result_data["measured_v2"] - result_data["vb2"])
-                    * 100.0
-                    / (result_data["measured_v2"])
-                )
-                result_data["step3_error"] = (
-                    np.abs(result_data["measured_v3"] - result_data["vb3"])
-                    * 100.0
-                    / (result_data["measured_v3"])
-                )
-                result_data["step4_error"] = (
-                    np.abs(result_data["measured_v4"] - result_data["vb4"])
-                    * 100.0
-                    / (result_data["measured_v4"])
-                )
-                if device in [
-                    "nfet_03v3",
-                    "pfet_03v3",
-                    "nfet_03v3_dss",
-                    "pfet_03v3_dss",
-                ]:
-                    result_data["step5_error"] = (
-                        np.abs(result_data["measured_v5"] - result_data["vb5"])
-                        * 100.0
-                        / (result_data["measured_v5"])
-                    )
+    # Error of a data point is the mean of its bias steps errors, 0 if any is missing
+    points = result_data.groupby(keys)["step_error"].agg(["sum", "count", "size"])
+    points["error"] = (
+        (np.abs(points["sum"]) / points["size"])
+        .where(points["count"] == points["size"], 0)
+        .fillna(0)
+    )
+    rms = np.sqrt((points["error"] ** 2).groupby(level=["cap", "i"]).mean())
 
-                    result_data["error"] = (
-                        np.abs(
-                            result_data["step1_error"]
-                            + result_data["step2_error"]
-                            + result_data["step3_error"]
-                            + result_data["step4_error"]
-                            + result_data["step5_error"]
-                        )
-                        / 5
-                    )
-                else:
-                    result_data["error"] = (
-                        np.abs(
-                            result_data["step1_error"]
-                            + result_data["step2_error"]
-                            + result_data["step3_error"]
-                            + result_data["step4_error"]
-                        )
-                        / 4
-                    )
+    for cap in caps:
+        prefix = "vb" if cap == "c" else "vgs"
+        volt = "V(G_TN)" if cap == "c" else "V(D_TN)"
+        cap_data = result_data[result_data["cap"] == cap]
+        if cap_data.empty:
+            continue
+
+        wide = cap_data.pivot(
+            index=["i", "row"],
+            columns="bias",
+            values=["simulated", "measured", "step_error"],
+        )
+        merged_out = pd.DataFrame(index=wide.index)
+        merged_out[volt] = cap_data.groupby(["i", "row"])["V"].first()
+        # simulated columns keep the order of the simulated data files
+        for k in cap_data["bias"].unique():
+            merged_out[f"{prefix}{k}"] = wide["simulated", k]
+        for k in wide["measured"].columns:
+            merged_out[f"measured_v{k}"] = wide["measured", k]
+        for k in wide["step_error"].columns:
+            merged_out[f"step{k}_error"] = wide["step_error", k]
+        merged_out["error"] = points.loc[cap, "error"]
+
+        cap_geometries = geometries.set_index("i").loc[
+            merged_out.index.get_level_values("i")
+        ]
+        merged_out["length"] = cap_geometries["L (um)"].values
+        merged_out["width"] = cap_geometries["W (um)"].values
+        merged_out["temp"] = 25.0
+        merged_out["rms_error"] = (
+            rms.loc[cap].loc[merged_out.index.get_level_values("i")].values
+        )
 
-            else:
-                result_data["step1_error"] = (
-                    np.abs(result_data["measured_v1"] - result_data["vgs1"])
-                    * 100.0
-                    / (result_data["measured_v1"])
-                )
-                result_data["step2_error"] = (
-                    np.abs(result_data["measured_v2"] - result_data["vgs2"])
-                    * 100.0
-                    / (result_data["measured_v2"])
-                )
-                result_data["step3_error"] = (
-                    np.abs(result_data["measured_v3"] - result_data["vgs3"])
-                    * 100.0
-                    / (result_data["measured_v3"])
-                )
-                result_data["step4_error"] = (
-                    np.abs(result_data["measured_v4"] - result_data["vgs4"])
-                    * 100.0
-                    / (result_data["measured_v4"])
-                )
-                result_data["error"] = (
-                    np.abs(
-                        result_data["step1_error"]
-                        + result_data["step2_error"]
-                        + result_data["step3_error"]
-                        + result_data["step4_error"]
-                    )
-                    / 4
-                )
-            result_data["length"] = length
-            result_data["width"] = w
-            result_data["temp"] = 25.0
-            # fill nan values with 0
-            result_data.fillna(0, inplace=True)
-            result_data["rms_error"] = np.sqrt(np.mean(result_data["error"] ** 2))
-            # fill rms dataframe
-            rms_df.loc[i] = [25.0, w, length, result_data["rms_error"].iloc[0]]
-
-            merged_dfs.append(result_data)
-            merged_out = pd.concat(merged_dfs)
-            merged_out.fillna(0, inplace=True)
-            merged_out.to_csv(f"{dev_path}/error_analysis_Cg{cap}.csv", index=False)
-            rms_df.to_csv(f"{dev_path}/finalerror_analysis_Cg{cap}.csv", index=False)
+        # fill nan values with 0
+        merged_out.fillna(0, inplace=True)
+        merged_out.to_csv(f"{dev_path}/error_analysis_Cg{cap}.csv", index=False)
+
+        # create a new dataframe for rms error
+        rms_df = geometries.set_index("i").loc[rms.loc[cap].index]
+        rms_df = pd.DataFrame(
+            {
+                "temp": 25.0,
+                "W (um)": rms_df["W (um)"].values,
+                "L (um)": rms_df["L (um)"].values,
+                "rms_error": rms.loc[cap].values,
+            }
+        )
+        rms_df.to_csv(f"{dev_path}/finalerror_analysis_Cg{cap}.csv", index=False)
 
     return None
 
@@ -860,59 +833,63 @@ def main():
             meas_df2 = []
             meas_df3 = []
 
-        df1 = pd.read_csv(f"mos_cv_regr/{dev}/{dev}.csv")
+        df1 = read_excel_cached(file, as_csv=True)
         df2 = df1[["L (um)", "W (um)"]].copy()
         df2.dropna(inplace=True)
         loops = int(0.5 * df2["L (um)"].count())
         df = df2[["L (um)", "W (um)"]].iloc[0:loops]
-        sim_df_id = run_sims(df, dev_path, dev)
+        sim_df_id, sim_long = run_sims(df, dev_path, dev)
 
-        logging.info(
-            f"# Device {dev} number of measured_datapoints for cv : {len(sim_df_id) * (len(meas_df1) + len(meas_df2) + len(meas_df3))}",
-        )
-        logging.info(
-            f"# Device {dev} number of simulated datapoints for cv : {len(sim_df_id) * (len(meas_df1) + len(meas_df2) + len(meas_df3))}",
-        )
+        # Comparing simulated results with measured data
+        with xyce.telemetry.phase("analysis"):
+            logging.info(
+                f"# Device {dev} number of measured_datapoints for cv : {len(sim_df_id) * (len(meas_df1) + len(meas_df2) + len(meas_df3))}",
+            )
+            logging.info(
+                f"# Device {dev} number of simulated datapoints for cv : {len(sim_df_id) * (len(meas_df1) + len(meas_df2) + len(meas_df3))}",
+            )
 
-        # passing dataframe to the error_calculation function
-        # calling error function for creating statistical csv file
+            # passing dataframe to the error_calculation function
+            # calling error function for creating statistical csv file
 
-        error_cal(df, sim_df_id, meas_df1, meas_df2, meas_df3, dev_path, dev)
+            error_cal(
+                df, sim_df_id, sim_long, meas_df1, meas_df2, meas_df3, dev_path, dev
+            )
 
-        caps = ["c", "d", "s"]
+            caps = ["c", "d", "s"]
 
-        for cap in caps:
-            # reading from the csv file contains all error data
-            # merged_all contains all simulated, measured, error data
-            merged_all = pd.read_csv(f"{dev_path}/finalerror_analysis_Cg{cap}.csv")
+            for cap in caps:
+                # reading from the csv file contains all error data
+                # merged_all contains all simulated, measured, error data
+                merged_all = pd.read_csv(f"{dev_path}/finalerror_analysis_Cg{cap}.csv")
 
-            # calculating the error of each device and reporting it
-            min_error_total = float()
-            max_error_total = float()
-            mean_error_total = float()
-            min_error_total = merged_all["rms_error"].min()
-            max_error_total = merged_all["rms_error"].max()
-            mean_error_total = merged_all["rms_error"].mean()
+                # calculating the error of each device and reporting it
+                min_error_total = float()
+                max_error_total = float()
+                mean_error_total = float()
+                min_error_total = merged_all["rms_error"].min()
+                max_error_total = merged_all["rms_error"].max()
+                mean_error_total = merged_all["rms_error"].mean()
 
-            # Making sure that min, max, mean errors are not > 100%
-            if min_error_total > 100:
-                min_error_total = 100
+                # Making sure that min, max, mean errors are not > 100%
+                if min_error_total > 100:
+                    min_error_total = 100
 
-            if max_error_total > 100:
-                max_error_total = 100
+                if max_error_total > 100:
+                    max_error_total = 100
 
-            if mean_error_total > 100:
-                mean_error_total = 100
+                if mean_error_total > 100:
+                    mean_error_total = 100
 
-            # logging.infoing min, max, mean errors to the consol
-            logging.info(
-                f"# Device {dev} Cg{cap} min error: {min_error_total:.2f}, max error: {max_error_total:.2f}, mean error {mean_error_total:.2f}"
-            )
+                # logging.infoing min, max, mean errors to the consol
+                logging.info(
+                    f"# Device {dev} Cg{cap} min error: {min_error_total:.2f}, max error: {max_error_total:.2f}, mean error {mean_error_total:.2f}"
+                )
 
-            if max_error_total <= PASS_THRESH:
-                logging.info(f"# Device {dev} Cg{cap} has passed regression.")
-            else:
-                logging.error(f"# Device {dev} Cg{cap} has failed regression.")
+                if max_error_total <= PASS_THRESH:
+                    logging.info(f"# Device {dev} Cg{cap} has passed regression.")
+                else:
+                    logging.error(f"# Device {dev} Cg{cap} has failed regression.")
 
 
 # # ================================================================
@@ -928,6 +905,10 @@ if __name__ == "__main__":
         if arguments["--num_cores"] is None
         else int(arguments["--num_cores"])
     )
+
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
     logging.basicConfig(
         level=logging.DEBUG,
         handlers=[
@@ -938,4 +919,8 @@ if __name__ == "__main__":
     )
 
     # Calling main function
-    main()
+    try:
+        main()
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
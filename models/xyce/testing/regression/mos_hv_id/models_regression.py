@@ -14,11 +14,12 @@
 
 """
 Usage:
-  models_regression.py [--num_cores=<num>] [--meas_result=<meas_result>]
+  models_regression.py [--num_cores=<num>] [--mpi_min_size=<num>] [--meas_result=<meas_result>]
 
   -h, --help                     Show help text.
   -v, --version                  Show version.
   --num_cores=<num>              Number of cores to be used by simulator
+  --mpi_min_size=<num>           Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
   --meas_result=<meas_result>    Measurement to be tested (Allowed: id, rds). [default: id]
 """
 
@@ -32,22 +33,27 @@ import shutil
 import glob
 import os
 import logging
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import ProcessRunner, Telemetry, XyceBackend  # noqa E402
+
+xyce = XyceBackend(telemetry=Telemetry())
 
 
 def check_xyce_version():
     """
     check_xyce_version checks Xyce version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read().replace("\n", "")
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
-
-    logging.info(f"Your Xyce version is: {Xyce_v_}")
+    xyce.check_version()
 
 
 def simulate_device(netlist_path: str):
@@ -58,10 +64,7 @@ def simulate_device(netlist_path: str):
     Returns:
         int: Return code of the simulation. 0 if success.  Non-zero if failed.
     """
-
-    return check_call(
-        f"Xyce {netlist_path} -hspice-ext all  > {netlist_path}.log 2>&1", shell=True
-    )
+    return xyce.simulate(netlist_path, check=True)
 
 
 def run_sim(
@@ -327,35 +330,42 @@ def main(meas_out_result):
         logging.info(f"Data points used in simulation for {dev}:\n {df_sweeps}")
 
         sim_df = run_sims(df_sweeps, dev_path, dev, meas_out_result)
-        sim_df.drop_duplicates(inplace=True)
-
-        sim_df_columns = [
-            "W (um)",
-            "L (um)",
-            "corner",
-            "temp",
-            "vds",
-            "vgs",
-            "vbs",
-            f"{meas_out_result}",
-        ]
-        sim_df = sim_df.reindex(columns=sim_df_columns)
-
-        sim_df.to_csv(f"{dev_path}/sim_results_{dev}.csv", index=False)
-
-        logging.info(
-            f"# Device {dev} number of simulated datapoints for {meas_out_result} : {len(sim_df)} "
-        )
 
-        # Verify regression results
-        if not sim_df[f"{meas_out_result}"].isnull().values.any():
-            logging.info(f"# Device {dev} for {meas_out_result} simulation has passed.")
-        else:
-            logging.error(
-                f"# Device {dev} {meas_out_result} simulation has failed regression."
+        # Comparing simulated results with measured data
+        with xyce.telemetry.phase("analysis"):
+            sim_df.drop_duplicates(inplace=True)
+
+            sim_df_columns = [
+                "W (um)",
+                "L (um)",
+                "corner",
+                "temp",
+                "vds",
+                "vgs",
+                "vbs",
+                f"{meas_out_result}",
+            ]
+            sim_df = sim_df.reindex(columns=sim_df_columns)
+
+            sim_df.to_csv(f"{dev_path}/sim_results_{dev}.csv", index=False)
+
+            logging.info(
+                f"# Device {dev} number of simulated datapoints for {meas_out_result} : {len(sim_df)} "
             )
-            logging.error(f"#Failed regression for {dev}-{meas_out_result} analysis.")
-            exit(1)
+
+            # Verify regression results
+            if not sim_df[f"{meas_out_result}"].isnull().values.any():
+                logging.info(
+                    f"# Device {dev} for {meas_out_result} simulation has passed."
+                )
+            else:
+                logging.error(
+                    f"# Device {dev} {meas_out_result} simulation has failed regression."
+                )
+                logging.error(
+                    f"#Failed regression for {dev}-{meas_out_result} analysis."
+                )
+                exit(1)
 
 
 # ================================================================
@@ -373,6 +383,10 @@ if __name__ == "__main__":
         else int(arguments["--num_cores"])
     )
 
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
+
     meas_out_result = arguments["--meas_result"]
 
     logging.basicConfig(
@@ -391,4 +405,8 @@ if __name__ == "__main__":
         exit(1)
 
     # Calling main function
-    main(meas_out_result)
+    try:
+        main(meas_out_result)
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
@@ -13,12 +13,14 @@
 # limitations under the License.
 """
 Usage:
-  models_regression.py [--num_cores=<num>] [--meas_result=<meas_result>]
+  models_regression.py [--num_cores=<num>] [--mpi_min_size=<num>] [--meas_result=<meas_result>] [--step_temp]
 
   -h, --help                     Show help text.
   -v, --version                  Show version.
   --num_cores=<num>              Number of cores to be used by simulator
+  --mpi_min_size=<num>           Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
   --meas_result=<meas_result>    Select measurement output to be tested (Allowed values for Fets are id, rds). [default: rds]
+  --step_temp                    Simulate all temperatures of a variation in one Xyce run.
 """
 
 from docopt import docopt
@@ -33,6 +35,27 @@ import glob
 import os
 import logging
 import re
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import (  # noqa E402
+    ProcessRunner,
+    Telemetry,
+    XyceBackend,
+    align_dc_sweeps,
+    split_steps,
+    step_temps,
+)
+
+xyce = XyceBackend(hspice_ext=False, telemetry=Telemetry())
 
 # CONSTANT VALUES
 PASS_THRESH = 5.0
@@ -49,16 +72,7 @@ def check_xyce_version():
     """
     check_xyce_version checks Xyce version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read().replace("\n", "")
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
-
-    logging.info(f"Your Xyce version is: {Xyce_v_}")
+    xyce.check_version()
 
 
 def simulate_device(netlist_path: str):
@@ -69,29 +83,29 @@ def simulate_device(netlist_path: str):
     Returns:
         int: Return code of the simulation. 0 if success.  Non-zero if failed.
     """
+    return xyce.simulate(netlist_path, check=True)
 
-    return check_call(f"Xyce {netlist_path}  > {netlist_path}.log 2>&1", shell=True)
 
-
-def run_sim(
-    dirpath: str,
+def render_netlist(
+    netlist_path: str,
     device: str,
     meas_out_result: str,
     width: str,
     length: float,
-    corner: float,
-    temp: float,
+    corner: str,
+    temps: list,
     const_var: str,
     const_var_val: float,
     sweeps: str,
-) -> dict:
+    result_path: str,
+):
     """
-    Function to run simulation for all data points per each variation.
+    Function to generate the netlist of a variation.
 
     Parameters
     ----------
-    dirpath : str or Path
-        Path to the run results directory
+    netlist_path : str or Path
+        Path of the generated netlist
     device : str
         Device used in regression test
     meas_out_result : str
@@ -100,18 +114,18 @@ def run_sim(
         Width value for the current run
     length: float
         length value for the current run
-    temp: float
-        temp value for the current run
+    corner: str
+        corner value for the current run
+    temps: list
+        Temperatures of the current run, stepped in one run if more than one
     const_var: str
         Name of constant voltage for the current run
     const_var_val: float
         Value of constant voltage for the current run
     sweeps: str
         Str that holds all voltage sweeps for the current run
-    Returns
-    -------
-    info(dict):
-        Dataframe contains results for the current run
+    result_path : str or Path
+        Path of simulation results written by the netlist
     """
 
     # Get model card path
@@ -135,6 +149,162 @@ def run_sim(
         f"device_netlists_{meas_out_result}", f"{device_group_netlist}.spice"
     )
 
+    # Check constant voltage values
+    vbs_val = const_var_val if const_var == "vbs" else 0
+    vds_val = const_var_val if const_var == "vds" else 6
+
+    with open(netlist_tmp) as f:
+        tmpl = Template(f.read())
+
+    netlist = tmpl.render(
+        device=device,
+        width=width,
+        length=length,
+        temp=temps[0],
+        corner=corner,
+        sweeps=sweeps,
+        vds_val=vds_val,
+        vbs_val=vbs_val,
+        result_path=result_path,
+        model_card_path=model_card_path,
+        model_design_path=model_design_path,
+    )
+    if len(temps) > 1:
+        netlist = step_temps(netlist, temps)
+
+    with open(netlist_path, "w") as f:
+        f.write(netlist)
+
+
+def write_result(
+    result_df: pd.DataFrame,
+    result_path: str,
+    device: str,
+    meas_out_result: str,
+    width: str,
+    length: float,
+    corner: str,
+    temp: float,
+):
+    """
+    Function to write simulation results in the same format of measured data.
+
+    Parameters
+    ----------
+    result_df : pd.DataFrame
+        Simulation results of a variation at one temperature
+    result_path : str or Path
+        Path of the written results
+    device : str
+        Device used in regression test
+    meas_out_result : str
+        Measurement selected to be test for the current regression.
+    width: float
+        Width value for the current run
+    length: float
+        length value for the current run
+    corner: str
+        corner value for the current run
+    temp: float
+        temp value for the current run
+    """
+
+    # Renaming output columns with proper names
+    if meas_out_result == "id":
+        if "nfet" in device:
+            result_df.rename(
+                columns={
+                    "V(D_TN)": "vds",
+                    "V(G_TN)": "vgs",
+                    "V(B_TN)": "vbs",
+                    "{-I(VDS)}": "id",
+                },
+                inplace=True,
+            )
+        if "pfet" in device:
+            result_df.rename(
+                columns={
+                    "V(D_TN)": "vds",
+                    "V(G_TN)": "vgs",
+                    "V(B_TN)": "vbs",
+                    "{I(VDS)}": "id",
+                },
+                inplace=True,
+            )
+
+    if meas_out_result == "rds":
+        if "nfet" in device:
+            result_df.rename(
+                columns={
+                    "V(D_TN)": "vds",
+                    "V(G_TN)": "vgs",
+                    "V(B_TN)": "vbs",
+                    "{1/N(XMN1:M0:GDS)}": "rds",
+                },
+                inplace=True,
+            )
+        if "pfet" in device:
+            result_df.rename(
+                columns={
+                    "V(D_TN)": "vds",
+                    "V(G_TN)": "vgs",
+                    "V(B_TN)": "vbs",
+                    "{1/N(XMN1:M0:GDS)}": "rds",
+                },
+                inplace=True,
+            )
+
+    # Adding columns for all variations per each run
+    result_df["W (um)"] = width
+    result_df["L (um)"] = length
+    result_df["corner"] = corner
+    result_df["temp"] = temp
+
+    # Writing output in clean format in same csv path of resutls
+    result_df.to_csv(result_path, index=False, header=True, sep=",")
+
+
+def run_sim(
+    dirpath: str,
+    device: str,
+    meas_out_result: str,
+    width: str,
+    length: float,
+    corner: float,
+    temp: float,
+    const_var: str,
+    const_var_val: float,
+    sweeps: str,
+) -> dict:
+    """
+    Function to run simulation for all data points per each variation.
+
+    Parameters
+    ----------
+    dirpath : str or Path
+        Path to the run results directory
+    device : str
+        Device used in regression test
+    meas_out_result : str
+        Measurement selected to be test for the current regression.
+    width: float
+        Width value for the current run
+    length: float
+        length value for the current run
+    temp: float
+        temp value for the current run
+    const_var: str
+        Name of constant voltage for the current run
+    const_var_val: float
+        Value of constant voltage for the current run
+    sweeps: str
+        Str that holds all voltage sweeps for the current run
+    Returns
+    -------
+    info(dict):
+        Dataframe contains results for the current run
+    """
+
     # Preparing output directory at which results will be added
     dev_netlists_path = os.path.join(dirpath, f"{device}_netlists")
     os.makedirs(dev_netlists_path, exist_ok=True)
@@ -152,29 +322,20 @@ def run_sim(
     info["length"] = length
     info["width"] = width
 
-    # Check constant voltage values
-    vbs_val = const_var_val if const_var == "vbs" else 0
-    vds_val = const_var_val if const_var == "vds" else 6
-
     # Generating netlist templates for all variations
-    with open(netlist_tmp) as f:
-        tmpl = Template(f.read())
-        with open(netlist_path, "w") as netlist:
-            netlist.write(
-                tmpl.render(
-                    device=device,
-                    width=width,
-                    length=length,
-                    temp=temp,
-                    corner=corner,
-                    sweeps=sweeps,
-                    vds_val=vds_val,
-                    vbs_val=vbs_val,
-                    result_path=result_path,
-                    model_card_path=model_card_path,
-                    model_design_path=model_design_path,
-                )
-            )
+    render_netlist(
+        netlist_path,
+        device,
+        meas_out_result,
+        width,
+        length,
+        corner,
+        [temp],
+        const_var,
+        const_var_val,
+        sweeps,
+        result_path,
+    )
 
     # Running xyce for each netlist
     logging.info(
@@ -191,64 +352,160 @@ def run_sim(
     # Cleaning output csv files from simulation results and
     ## fromating columns to match what we have in measurement
     if os.path.exists(result_path) and os.path.isfile(result_path):
-        result_df = pd.read_csv(result_path)
-        # Renaming output columns with proper names
-        if meas_out_result == "id":
-            if "nfet" in device:
-                result_df.rename(
-                    columns={
-                        "V(D_TN)": "vds",
-                        "V(G_TN)": "vgs",
-                        "V(B_TN)": "vbs",
-                        "{-I(VDS)}": "id",
-                    },
-                    inplace=True,
-                )
-            if "pfet" in device:
-                result_df.rename(
-                    columns={
-                        "V(D_TN)": "vds",
-                        "V(G_TN)": "vgs",
-                        "V(B_TN)": "vbs",
-                        "{I(VDS)}": "id",
-                    },
-                    inplace=True,
-                )
+        write_result(
+            pd.read_csv(result_path),
+            result_path,
+            device,
+            meas_out_result,
+            width,
+            length,
+            corner,
+            temp,
+        )
 
-        if meas_out_result == "rds":
-            if "nfet" in device:
-                result_df.rename(
-                    columns={
-                        "V(D_TN)": "vds",
-                        "V(G_TN)": "vgs",
-                        "V(B_TN)": "vbs",
-                        "{1/N(XMN1:M0:GDS)}": "rds",
-                    },
-                    inplace=True,
-                )
-            if "pfet" in device:
-                result_df.rename(
-                    columns={
-                        "V(D_TN)": "vds",
-                        "V(G_TN)": "vgs",
-                        "V(B_TN)": "vbs",
-                        "{1/N(XMN1:M0:GDS)}": "rds",
-                    },
-                    inplace=True,
-                )
+    info["id_rds_sim"] = mos_id_rd
 
-        # Adding columns for all variations per each run
-        result_df["W (um)"] = width
-        result_df["L (um)"] = length
-        result_df["corner"] = corner
-        result_df["temp"] = temp
+    return info
 
-        # Writing output in clean format in same csv path of resutls
-        result_df.to_csv(result_path, index=False, header=True, sep=",")
 
-    info["id_rds_sim"] = mos_id_rd
+def run_sim_stepped(
+    dirpath: str,
+    device: str,
+    meas_out_result: str,
+    width: str,
+    length: float,
+    corner: float,
+    temps: list,
+    const_var: str,
+    const_var_val: float,
+    sweeps: str,
+) -> list:
+    """
+    Function to run simulation for all temperatures of a variation in one Xyce run.
+    Temperatures are stepped with `.STEP TEMP LIST`, the stepped results are split
+    back into the results of each temperature, written as done by run_sim.
 
-    return info
+    Parameters
+    ----------
+    dirpath : str or Path
+        Path to the run results directory
+    device : str
+        Device used in regression test
+    meas_out_result : str
+        Measurement selected to be test for the current regression.
+    width: float
+        Width value for the current run
+    length: float
+        length value for the current run
+    corner: str
+        corner value for the current run
+    temps: list
+        temp values for the current run
+    const_var: str
+        Name of constant voltage for the current run
+    const_var_val: float
+        Value of constant voltage for the current run
+    sweeps: str
+        Str that holds all voltage sweeps for the current run
+    Returns
+    -------
+    list
+        Results info of each temperature, as returned by run_sim
+    """
+
+    temps = list(dict.fromkeys(temps))
+    if len(temps) == 1:
+        return [
+            run_sim(
+                dirpath,
+                device,
+                meas_out_result,
+                width,
+                length,
+                corner,
+                temps[0],
+                const_var,
+                const_var_val,
+                sweeps,
+            )
+        ]
+
+    # Preparing output directory at which results will be added
+    dev_netlists_path = os.path.join(dirpath, f"{device}_netlists")
+    os.makedirs(dev_netlists_path, exist_ok=True)
+
+    run_name = f"w{width}_l{length}_tstep_{const_var}{const_var_val}_{meas_out_result}"
+    netlist_path = os.path.join(dev_netlists_path, f"netlist_{run_name}.spice")
+    # Stepped results aren't a csv file, so they aren't merged with other results
+    stepped_path = os.path.join(dev_netlists_path, f"simulated_{run_name}.prn")
+
+    render_netlist(
+        netlist_path,
+        device,
+        meas_out_result,
+        width,
+        length,
+        corner,
+        temps,
+        const_var,
+        const_var_val,
+        sweeps,
+        stepped_path,
+    )
+
+    logging.info(
+        f"Running simulation for {device} at w={width}, l={length}, temps={temps}, sweeps={sweeps}, out={meas_out_result}"
+    )
+
+    try:
+        simulate_device(netlist_path)
+        steps_df = split_steps(stepped_path, len(temps))
+    except Exception as exc:
+        logging.error(
+            f"Stepped simulation {netlist_path} failed: {exc}, simulating each temperature"
+        )
+        return [
+            run_sim(
+                dirpath,
+                device,
+                meas_out_result,
+                width,
+                length,
+                corner,
+                temp,
+                const_var,
+                const_var_val,
+                sweeps,
+            )
+            for temp in temps
+        ]
+
+    infos = []
+    for temp, result_df in zip(temps, steps_df):
+        sim_file_name = f"simulated_w{width}_l{length}_t{temp}_{const_var}{const_var_val}_{meas_out_result}.csv"
+        result_path = os.path.join(dev_netlists_path, sim_file_name)
+        write_result(
+            result_df,
+            result_path,
+            device,
+            meas_out_result,
+            width,
+            length,
+            corner,
+            temp,
+        )
+        infos.append(
+            {
+                "device": device,
+                "temp": temp,
+                "corner": corner,
+                "length": length,
+                "width": width,
+                "id_rds_sim": result_path,
+            }
+        )
+
+    return infos
 
 
 def run_sims(
@@ -256,6 +513,7 @@ def run_sims(
     dirpath: str,
     device: str,
     meas_out_result: str,
+    step_temp: bool = False,
 ) -> pd.DataFrame:
     """
     Function to run all simulations for all data points and generating results in proper format.
@@ -270,6 +528,8 @@ def run_sims(
         Name of device for the current run
     meas_out_result: str
         Measurement selected to be test for the current regression.
+    step_temp: bool
+        Simulate all temperatures of a variation in one Xyce run.
     Returns
     -------
     df: Pd.DataFrame
@@ -279,27 +539,58 @@ def run_sims(
     results = []
     with concurrent.futures.ThreadPoolExecutor(max_workers=workers_count) as executor:
         futures_list = []
-        for j, row in df.iterrows():
-            futures_list.append(
-                executor.submit(
-                    run_sim,
-                    dirpath,
-                    device,
-                    meas_out_result,
-                    row["W (um)"],
-                    row["L (um)"],
-                    row["corner"],
-                    row["temp"],
-                    row["const_var"],
-                    row["const_var_val"],
-                    row["sweeps"],
+        if step_temp:
+            variations = df.groupby(
+                [
+                    "W (um)",
+                    "L (um)",
+                    "corner",
+                    "const_var",
+                    "const_var_val",
+                    "sweeps",
+                ],
+                sort=False,
+                dropna=False,
+            )["temp"].agg(list)
+            for variation, temps in variations.items():
+                width, length, corner, const_var, const_var_val, sweeps = variation
+                futures_list.append(
+                    executor.submit(
+                        run_sim_stepped,
+                        dirpath,
+                        device,
+                        meas_out_result,
+                        width,
+                        length,
+                        corner,
+                        temps,
+                        const_var,
+                        const_var_val,
+                        sweeps,
+                    )
+                )
+        else:
+            for j, row in df.iterrows():
+                futures_list.append(
+                    executor.submit(
+                        run_sim,
+                        dirpath,
+                        device,
+                        meas_out_result,
+                        row["W (um)"],
+                        row["L (um)"],
+                        row["corner"],
+                        row["temp"],
+                        row["const_var"],
+                        row["const_var_val"],
+                        row["sweeps"],
+                    )
                 )
-            )
 
         for future in concurrent.futures.as_completed(futures_list):
             try:
                 data = future.result()
-                results.append(data)
+                results.extend(data if isinstance(data, list) else [data])
             except Exception as exc:
                 logging.info("Test case generated an exception: %s" % (exc))
 
@@ -312,13 +603,15 @@ def run_sims(
     return df
 
 
-def main(meas_out_result):
+def main(meas_out_result, step_temp=False):
     """
     Main function for Fets regression for GF180MCU models
     Parameters
     ----------
     meas_out_result : str
         Measurement selected to be test for the current regression.
+    step_temp : bool
+        Simulate all temperatures of a variation in one Xyce run.
     """
 
     ## Check xyce version
@@ -371,120 +664,129 @@ def main(meas_out_result):
         df_sweeps = pd.read_csv(sweeps_file)
         logging.info(f"Data points used in simulation for {dev}:\n {df_sweeps}")
 
-        sim_df = run_sims(df_sweeps, dev_path, dev, meas_out_result)
-        # Round all voltages to elimniate using long digits that could cause mismatch with meas df
-        ## Simulator uses small values instead of 0 [10e-16 for example]
-        sim_df = sim_df.round({"vbs": 2, "vgs": 2, "vds": 2})
-        sim_df.drop_duplicates(inplace=True)
-
-        logging.info(
-            f"# Device {dev} number of simulated datapoints for {meas_out_result} : {len(sim_df)} "
-        )
-
-        # Loading measured data to be compared
-        meas_data_path = f"../../../../180MCU_SPICE_DATA_clean/gf180mcu_data/MOS_iv/{dev}_meas_{meas_out_result}.csv"
+        sim_df = run_sims(df_sweeps, dev_path, dev, meas_out_result, step_temp)
 
-        if not os.path.exists(meas_data_path) or not os.path.isfile(meas_data_path):
-            logging.error(
-                "There is no measured data to be used in simulation, please recheck"
+        # Comparing simulated results with measured data
+        with xyce.telemetry.phase("analysis"):
+            logging.info(
+                f"# Device {dev} number of simulated datapoints for {meas_out_result} : {len(sim_df)} "
             )
-            logging.error(f"{meas_data_path} file doesn't exist, please recheck")
-            exit(1)
 
-        meas_df = pd.read_csv(meas_data_path)
-        meas_df = meas_df.round({"vbs": 2, "vgs": 2, "vds": 2})
-        meas_df.drop_duplicates(inplace=True)
+            # Loading measured data to be compared
+            meas_data_path = f"../../../../180MCU_SPICE_DATA_clean/gf180mcu_data/MOS_iv/{dev}_meas_{meas_out_result}.csv"
 
-        logging.info(
-            f"# Device {dev} number of measured datapoints for {meas_out_result} : {len(meas_df)} "
-        )
+            if not os.path.exists(meas_data_path) or not os.path.isfile(meas_data_path):
+                logging.error(
+                    "There is no measured data to be used in simulation, please recheck"
+                )
+                logging.error(f"{meas_data_path} file doesn't exist, please recheck")
+                exit(1)
 
-        # Merging meas and sim dataframe in one
-        full_df = meas_df.merge(
-            sim_df,
-            on=["W (um)", "L (um)", "corner", "temp", "vds", "vgs", "vbs"],
-            how="left",
-            suffixes=("_meas", "_sim"),
-        )
+            meas_df = pd.read_csv(meas_data_path)
+            meas_df = meas_df.round({"vbs": 2, "vgs": 2, "vds": 2})
+            meas_df.drop_duplicates(inplace=True)
 
-        # Clipping current values to lowest curr
-        if meas_out_result == "id":
-            full_df["id_meas"] = full_df["id_meas"].clip(lower=CLIP_CURR)
-            full_df["id_sim"] = full_df["id_sim"].clip(lower=CLIP_CURR)
-
-        # Droping first/last row for Rds measurement [first/last simulation point]
-        ## as we have measured Rds as a partial derivative of vds to ids.
-        ## As each point is related to next point, so last point have no next point so its calculated value isn't correct.
-        if meas_out_result == "rds":
-            full_df = full_df[~full_df["vds"].isin([0.0, -0.0])]  # Either nfet or pfet
-            if "03v3" in dev:
-                # Last simlulation points for 03v3 devices for Rds measurements at Vds = 3.3V
-                full_df = full_df[
-                    ~full_df["vds"].isin([3.3, -3.3])
-                ]  # Either nfet or pfet
-            else:
-                # Last simlulation points for 03v3 devices for Rds measurements at Vds = 6.6V
-                full_df = full_df[
-                    ~full_df["vds"].isin([6.6, -6.6])
-                ]  # Either nfet or pfet
+            logging.info(
+                f"# Device {dev} number of measured datapoints for {meas_out_result} : {len(meas_df)} "
+            )
 
-        # Error calculation and report
-        ## Relative error calculation for FETs
-        full_df[f"{meas_out_result}_err"] = np.abs(
-            (full_df[f"{meas_out_result}_meas"] - full_df[f"{meas_out_result}_sim"])
-            * 100.0
-            / full_df[f"{meas_out_result}_meas"]
-        )
-        full_df.to_csv(f"{dev_path}/{dev}_full_merged_data.csv", index=False)
+            # Interpolating simulated curves at measured voltages
+            ## Simulated voltages aren't rounded, simulator uses small values instead of 0 [10e-16 for example]
+            full_df = meas_df.rename(
+                columns={meas_out_result: f"{meas_out_result}_meas"}
+            )
+            full_df[f"{meas_out_result}_sim"] = align_dc_sweeps(
+                meas_df,
+                sim_df,
+                df_sweeps,
+                ["W (um)", "L (um)", "corner", "temp"],
+                meas_out_result,
+            )
 
-        # Calculate Q [quantile] to verify matching between measured and simulated data
-        ## Refer to https://builtin.com/data-science/boxplot for more details.
-        quantile_val = QUANTILE_ID if meas_out_result == "id" else QUANTILE_RDS
-        max_val_detect = (
-            MAX_VAL_DETECT_ID if meas_out_result == "id" else MAX_VAL_DETECT_RDS
-        )
+            # Clipping current values to lowest curr
+            if meas_out_result == "id":
+                full_df["id_meas"] = full_df["id_meas"].clip(lower=CLIP_CURR)
+                full_df["id_sim"] = full_df["id_sim"].clip(lower=CLIP_CURR)
 
-        q_target = full_df[f"{meas_out_result}_err"].quantile(quantile_val)
-        logging.info(f"Quantile target for {dev} device is: {q_target} %")
+            # Droping first/last row for Rds measurement [first/last simulation point]
+            ## as we have measured Rds as a partial derivative of vds to ids.
+            ## As each point is related to next point, so last point have no next point so its calculated value isn't correct.
+            if meas_out_result == "rds":
+                full_df = full_df[
+                    ~full_df["vds"].isin([0.0, -0.0])
+                ]  # Either nfet or pfet
+                if "03v3" in dev:
+                    # Last simlulation points for 03v3 devices for Rds measurements at Vds = 3.3V
+                    full_df = full_df[
+                        ~full_df["vds"].isin([3.3, -3.3])
+                    ]  # Either nfet or pfet
+                else:
+                    # Last simlulation points for 03v3 devices for Rds measurements at Vds = 6.6V
+                    full_df = full_df[
+                        ~full_df["vds"].isin([6.6, -6.6])
+                    ]  # Either nfet or pfet
+
+            # Error calculation and report
+            ## Relative error calculation for FETs
+            full_df[f"{meas_out_result}_err"] = np.abs(
+                (full_df[f"{meas_out_result}_meas"] - full_df[f"{meas_out_result}_sim"])
+                * 100.0
+                / full_df[f"{meas_out_result}_meas"]
+            )
+            full_df.to_csv(f"{dev_path}/{dev}_full_merged_data.csv", index=False)
 
-        bad_err_full_df_loc = full_df[full_df[f"{meas_out_result}_err"] > PASS_THRESH]
-        bad_err_full_df = bad_err_full_df_loc[
-            (bad_err_full_df_loc[f"{meas_out_result}_sim"] >= max_val_detect)
-            | (bad_err_full_df_loc[f"{meas_out_result}_meas"] >= max_val_detect)
-        ]
-        bad_err_full_df.to_csv(
-            f"{dev_path}/{dev}_bad_err_{meas_out_result}.csv", index=False
-        )
-        logging.info(
-            f"Bad relative errors between measured and simulated data at {dev}_bad_err_{meas_out_result}.csv"
-        )
+            # Calculate Q [quantile] to verify matching between measured and simulated data
+            ## Refer to https://builtin.com/data-science/boxplot for more details.
+            quantile_val = QUANTILE_ID if meas_out_result == "id" else QUANTILE_RDS
+            max_val_detect = (
+                MAX_VAL_DETECT_ID if meas_out_result == "id" else MAX_VAL_DETECT_RDS
+            )
 
-        # calculating the relative error of each device and reporting it
-        min_error_total = float(full_df[f"{meas_out_result}_err"].min())
-        max_error_total = float(full_df[f"{meas_out_result}_err"].max())
-        mean_error_total = float(full_df[f"{meas_out_result}_err"].mean())
+            q_target = full_df[f"{meas_out_result}_err"].quantile(quantile_val)
+            logging.info(f"Quantile target for {dev} device is: {q_target} %")
+
+            bad_err_full_df_loc = full_df[
+                full_df[f"{meas_out_result}_err"] > PASS_THRESH
+            ]
+            bad_err_full_df = bad_err_full_df_loc[
+                (bad_err_full_df_loc[f"{meas_out_result}_sim"] >= max_val_detect)
+                | (bad_err_full_df_loc[f"{meas_out_result}_meas"] >= max_val_detect)
+            ]
+            bad_err_full_df.to_csv(
+                f"{dev_path}/{dev}_bad_err_{meas_out_result}.csv", index=False
+            )
+            logging.info(
+                f"Bad relative errors between measured and simulated data at {dev}_bad_err_{meas_out_result}.csv"
+            )
 
-        # Cliping relative error at 100%
-        min_error_total = 100 if min_error_total > 100 else min_error_total
-        max_error_total = 100 if max_error_total > 100 else max_error_total
-        mean_error_total = 100 if mean_error_total > 100 else mean_error_total
+            # calculating the relative error of each device and reporting it
+            min_error_total = float(full_df[f"{meas_out_result}_err"].min())
+            max_error_total = float(full_df[f"{meas_out_result}_err"].max())
+            mean_error_total = float(full_df[f"{meas_out_result}_err"].mean())
 
-        # logging relative error
-        logging.info(
-            f"# Device {dev} {meas_out_result} min error: {min_error_total:.2f} %, max error: {max_error_total:.2f} %, mean error {mean_error_total:.2f} %"
-        )
+            # Cliping relative error at 100%
+            min_error_total = 100 if min_error_total > 100 else min_error_total
+            max_error_total = 100 if max_error_total > 100 else max_error_total
+            mean_error_total = 100 if mean_error_total > 100 else mean_error_total
 
-        # Verify regression results
-        if q_target <= PASS_THRESH:
+            # logging relative error
             logging.info(
-                f"# Device {dev} for {meas_out_result} simulation has passed regression."
+                f"# Device {dev} {meas_out_result} min error: {min_error_total:.2f} %, max error: {max_error_total:.2f} %, mean error {mean_error_total:.2f} %"
             )
-        else:
-            logging.error(
-                f"# Device {dev} {meas_out_result} simulation has failed regression. Needs more analysis."
-            )
-            logging.error(f"#Failed regression for {dev}-{meas_out_result} analysis.")
-            exit(1)
+
+            # Verify regression results
+            if q_target <= PASS_THRESH:
+                logging.info(
+                    f"# Device {dev} for {meas_out_result} simulation has passed regression."
+                )
+            else:
+                logging.error(
+                    f"# Device {dev} {meas_out_result} simulation has failed regression. Needs more analysis."
+                )
+                logging.error(
+                    f"#Failed regression for {dev}-{meas_out_result} analysis."
+                )
+                exit(1)
 
 
 # ================================================================
@@ -502,6 +804,10 @@ if __name__ == "__main__":
         else int(arguments["--num_cores"])
     )
 
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
+
     meas_out_result = arguments["--meas_result"]
 
     logging.basicConfig(
@@ -520,4 +826,8 @@ if __name__ == "__main__":
         exit(1)
 
     # Calling main function
-    main(meas_out_result)
+    try:
+        main(meas_out_result, arguments["--step_temp"])
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
@@ -13,11 +13,12 @@
 # limitations under the License.
 """
 Usage:
-  models_regression.py [--num_cores=<num>]
+  models_regression.py [--num_cores=<num>] [--mpi_min_size=<num>]
 
   -h, --help             Show help text.
   -v, --version          Show version.
   --num_cores=<num>      Number of cores to be used by simulator
+  --mpi_min_size=<num>   Min number of instances of netlists run by parallel Xyce, if built with MPI. [default: 5000]
 """
 
 from unittest.mock import DEFAULT
@@ -32,6 +33,25 @@ import multiprocessing as mp
 import logging
 import subprocess
 import glob
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import (  # noqa E402
+    ProcessRunner,
+    Telemetry,
+    XyceBackend,
+    read_excel_cached,
+)
+
+xyce = XyceBackend(hspice_ext=False, telemetry=Telemetry())
 
 
 PASS_THRESH = 5.0
@@ -43,14 +63,7 @@ def check_xyce_version():
     """
     check_xyce_version checks ngspice version and makes sure it would work with the models.
     """
-    # ======= Checking Xyce  =======
-    Xyce_v_ = os.popen("Xyce  -v 2> /dev/null").read()
-    if Xyce_v_ == "":
-        logging.error("Xyce is not found. Please make sure Xyce is installed.")
-        exit(1)
-    elif "7.5" not in Xyce_v_:
-        logging.error("Xyce version 7.5 is required.")
-        exit(1)
+    xyce.check_version()
 
 
 def find_res(filename):
@@ -73,8 +86,7 @@ def call_simulator(file_name):
     Args:
         file_name (str): Netlist file name.
     """
-    log_file = file_name.replace("-hspice-ext all ", "")
-    os.system(f"Xyce {file_name} -l {log_file}.log 2> /dev/null")
+    xyce.simulate(file_name)
 
 
 def ext_const_temp_corners(
@@ -89,7 +101,7 @@ def ext_const_temp_corners(
         pd.DataFrame: Dataframe with extracted data.
     """
     # Read Data
-    df = pd.read_excel(dev_data_path)
+    df = read_excel_cached(dev_data_path)
 
     all_dfs = []
     for corner in corners:
@@ -125,7 +137,7 @@ def ext_temp_corners(dev_data_path: str, device: str, corners: str) -> pd.DataFr
         pd.DataFrame: Dataframe with extracted data.
     """
     # Read Data
-    df = pd.read_excel(dev_data_path)
+    df = read_excel_cached(dev_data_path)
 
     all_dfs = []
     for corner in corners:
@@ -372,30 +384,37 @@ def main(num_cores: int):
         logging.info(f"# Device {dev} number of measured_datapoints : {len(meas_df)}")
 
         sim_df = run_sims(meas_df, dev_path, num_cores)
-        logging.info(f"# Device {dev} number of simulated datapoints : {len(sim_df)}")
 
-        merged_df = meas_df.merge(
-            sim_df, on=["device", "corner", "length", "width", "temp"], how="left"
-        )
-        merged_df["error"] = (
-            np.abs(merged_df["res_sim"] - merged_df["res_measured"])
-            * 100.0
-            / merged_df["res_measured"]
-        )
+        # Comparing simulated results with measured data
+        with xyce.telemetry.phase("analysis"):
+            logging.info(
+                f"# Device {dev} number of simulated datapoints : {len(sim_df)}"
+            )
+
+            merged_df = meas_df.merge(
+                sim_df, on=["device", "corner", "length", "width", "temp"], how="left"
+            )
+            merged_df["error"] = (
+                np.abs(merged_df["res_sim"] - merged_df["res_measured"])
+                * 100.0
+                / merged_df["res_measured"]
+            )
 
-        merged_df.to_csv(f"{dev_path}/error_analysis.csv", index=False)
-        m1 = merged_df["error"].min()
-        m2 = merged_df["error"].max()
-        m3 = merged_df["error"].mean()
+            merged_df.to_csv(f"{dev_path}/error_analysis.csv", index=False)
+            m1 = merged_df["error"].min()
+            m2 = merged_df["error"].max()
+            m3 = merged_df["error"].mean()
 
-        logging.info(
-            f"# Device {dev} min error: {m1:.2f} , max error: {m2:.2f}, mean error {m3:.2f}"
-        )
+            logging.info(
+                f"# Device {dev} min error: {m1:.2f} , max error: {m2:.2f}, mean error {m3:.2f}"
+            )
 
-        if merged_df["error"].max() <= PASS_THRESH:
-            logging.info(f"# Device {dev} has passed regression.")
-        else:
-            logging.error(f"# Device {dev} has failed regression. Needs more analysis.")
+            if merged_df["error"].max() <= PASS_THRESH:
+                logging.info(f"# Device {dev} has passed regression.")
+            else:
+                logging.error(
+                    f"# Device {dev} has failed regression. Needs more analysis."
+                )
 
 
 # # ================================================================
@@ -411,6 +430,10 @@ if __name__ == "__main__":
         if arguments["--num_cores"] is None
         else int(arguments["--num_cores"])
     )
+
+    # Xyce processes are capped at the physical cores count
+    xyce.runner = ProcessRunner(workers_count, telemetry=xyce.telemetry)
+    xyce.mpi_min_size = int(arguments["--mpi_min_size"])
     logging.basicConfig(
         level=logging.DEBUG,
         handlers=[logging.StreamHandler()],
@@ -419,4 +442,8 @@ if __name__ == "__main__":
     )
 
     # Calling main function
-    main(workers_count)
+    try:
+        main(workers_count)
+    finally:
+        xyce.summary("xyce_runs.csv")
+        xyce.telemetry.write("telemetry.json")
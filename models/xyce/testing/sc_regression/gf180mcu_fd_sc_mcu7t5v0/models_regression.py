@@ -17,6 +17,18 @@ from jinja2 import Template
 import concurrent.futures
 import shutil
 from datetime import datetime
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        )
+    ),
+)
+
+from regress import ProcessRunner  # noqa E402
 
 
 def call_simulator(file_name):
@@ -24,7 +36,7 @@ def call_simulator(file_name):
     Args:
         file_name (str): Netlist file name.
     """
-    os.system(f"Xyce -hspice-ext all {file_name} -l {file_name}.log")
+    runner.run(["Xyce", "-hspice-ext", "all", file_name, "-l", f"{file_name}.log"])
 
 
 def ext_measured(table, dev_meas):
@@ -64,10 +76,7 @@ def ext_simulated(device, processes, volts, temps, dev_netlists, dev_meas, dev_s
                     )
 
                 # Running ngspice for each netlist
-                with concurrent.futures.ProcessPoolExecutor(
-                    max_workers=workers_count
-                ) as executor:
-                    executor.submit(call_simulator, netlist_path)
+                call_simulator(netlist_path)
 
                 df_simulated = pd.read_csv(
                     dev_sim_path,
@@ -188,5 +197,8 @@ if __name__ == "__main__":
         else int(arguments["--num_cores"])
     )
 
+    # Simulator processes are capped at the physical cores count
+    runner = ProcessRunner(workers_count)
+
     # Calling main function
     main()
@@ -28,6 +28,16 @@ import os
 from jinja2 import Template
 import concurrent.futures
 from datetime import datetime
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    ),
+)
+
+from regress import ProcessRunner  # noqa E402
 
 
 def call_simulator(file_name):
@@ -35,7 +45,7 @@ def call_simulator(file_name):
     Args:
         file_name (str): Netlist file name.
     """
-    os.system(f"Xyce -hspice-ext all {file_name} -l {file_name}.log")
+    runner.run(["Xyce", "-hspice-ext", "all", file_name, "-l", f"{file_name}.log"])
 
 
 def get_sizes(models_path):
@@ -84,10 +94,7 @@ def get_results(run_path, sizes, temp, corner):
                 )
             )  # , AD = AD , PD = PD , AS = AS , PS = PS, AD_p = AD_p, PD_p = PD_p ))
         # Running ngspice for each netlist
-        with concurrent.futures.ProcessPoolExecutor(
-            max_workers=workers_count
-        ) as executor:
-            executor.submit(call_simulator, netlist_path)
+        call_simulator(netlist_path)
 
         # Writing simulated data
         df_simulated = pd.read_csv(
@@ -115,10 +122,18 @@ def main():
     sizes = get_sizes(models_path)
     results = []
 
-    for corner in corners:
-        for temp in temps:
-            for size in sizes:
-                results.append(get_results(run_path, size, temp, corner))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers_count) as executor:
+        future_list = [
+            executor.submit(get_results, run_path, size, temp, corner)
+            for corner in corners
+            for temp in temps
+            for size in sizes
+        ]
+        for future in concurrent.futures.as_completed(future_list):
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                print("Generated an exception: %s" % (exc))
 
     df_results = pd.DataFrame(results)
     df_results.columns = ["run", "tpd_result"]
@@ -141,5 +156,8 @@ if __name__ == "__main__":
         else int(arguments["--num_cores"])
     )
 
+    # Simulator processes are capped at the physical cores count
+    runner = ProcessRunner(workers_count)
+
     # Calling main function
     main()